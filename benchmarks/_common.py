@@ -0,0 +1,80 @@
+"""
+Result rows and the JSON document shared by the benchmark scripts.
+
+Every script writes the same document, ``{"meta": ..., "results": [...]}``,
+so benchmarks/compare.py can compare any two runs of the same script. Rows
+come from ``row()``, so a metric means the same thing in every script.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import time
+
+
+def percentile(values, q):
+    """The ``q`` quantile of already sorted values."""
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def row(name, latencies, seconds=None, **extra):
+    """
+    Result row from per-operation latencies in seconds.
+
+    ``ops_per_second`` divides by ``seconds``, the wall-clock time of the
+    run, when the operations overlapped (several threads); otherwise by the
+    summed latencies, which for sequential operations is that same time.
+    """
+    latencies = sorted(latencies)
+    total = seconds if seconds is not None else sum(latencies)
+    return dict({
+        "name": name,
+        "operations": len(latencies),
+        "ops_per_second": round(len(latencies) / total) if total else 0,
+        "mean_us": round(sum(latencies) / len(latencies) * 1e6, 3),
+        "p50_us": round(percentile(latencies, 0.50) * 1e6, 3),
+        "p99_us": round(percentile(latencies, 0.99) * 1e6, 3),
+        "p999_us": round(percentile(latencies, 0.999) * 1e6, 3),
+    }, **extra)
+
+
+def meta(benchmark, args):
+    """The document's "meta": script, commit, Python, platform and arguments."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "benchmark": benchmark,
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+    }
+
+
+def add_output_arguments(parser):
+    """Add ``--json`` and ``--output``."""
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--output", help="also write the JSON document to this file")
+
+
+def write(benchmark, args, results):
+    """
+    Write the document to ``--output`` and print it with ``--json``.
+
+    Returns:
+        True when the document was printed, so the caller skips its table
+    """
+    document = {"meta": meta(benchmark, args), "results": results}
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(document, output, indent=2)
+    if args.json:
+        print(json.dumps(document, indent=2))
+        return True
+    return False
@@ -0,0 +1,236 @@
+"""
+Library call benchmarks against local stand-ins for Key Vault and the API.
+
+Needs the built library but no Azure: every call goes to a
+libcorehey.standins server on localhost. Groups (select with ``--only``):
+
+- ffi:        one Python -> Go call (the Add export) and each math export
+- copy:       cached fetches per body size, read through ``view`` (no copy),
+              ``body`` (one copy) and ``json()``
+- latency:    sequential uncached fetches, with the overhead over the
+              stand-in's own latency
+- throughput: calls per second with 1, 2, 4, ... ``--max-threads`` threads
+- batch:      add/multiply/is_prime over int64 arrays of ``--batch-sizes``
+              elements in one call, against a Python loop of scalar calls
+              (``ns_per_element`` compares the two)
+
+``--json`` prints (and ``--output`` writes) a document with "meta" (commit,
+Python, platform) and "results" (a name plus metrics per row) that
+benchmarks/compare.py compares across commits.
+
+Usage:
+    python benchmarks/calls.py [--only ffi,copy] [--json] [--output results.json]
+"""
+
+import argparse
+import array
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Measure the in-process library, not a sidecar daemon that may be running
+os.environ.setdefault("LIBCOREHEY_DAEMON", "0")
+
+import libcorehey  # noqa: E402
+from _common import add_output_arguments, row as _row, write  # noqa: E402
+from libcorehey.core import _get_library  # noqa: E402
+from libcorehey.standins import StandIns  # noqa: E402
+
+GROUPS = ("ffi", "copy", "latency", "throughput", "batch")
+
+
+def _rounds(function, calls, rounds):
+    """Per-call time of ``rounds`` timed loops of ``calls`` calls each."""
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        times.append((time.perf_counter() - start) / calls)
+    return times
+
+
+def bench_ffi(calls, rounds):
+    lib = _get_library()
+    results = []
+    for name, function in (
+        ("ffi.add", lambda: lib.Add(2, 3)),
+        ("ffi.multiply", lambda: lib.Multiply(6, 7)),
+        ("ffi.fibonacci_30", lambda: lib.Fibonacci(30)),
+        ("ffi.is_prime_1000003", lambda: lib.IsPrime(1000003)),
+        ("math.add_numbers", lambda: libcorehey.add_numbers(2, 3)),
+        ("math.get_fibonacci_30", lambda: libcorehey.get_fibonacci(30)),
+        ("math.is_prime_1000003", lambda: libcorehey.is_prime(1000003)),
+    ):
+        function()
+        row = _row(name, _rounds(function, calls, rounds))
+        row["operations"] = calls * rounds
+        results.append(row)
+    return results
+
+
+def bench_copy(sizes, calls):
+    results = []
+    libcorehey.configure_response_cache(quick_replies_ttl_seconds=3600)
+    try:
+        for size in sizes:
+            with StandIns(payload_bytes=size) as standins, \
+                    libcorehey.LibCoreHeyClient(standins.vault_config()) as client:
+                client.fetch_quick_replies("bench", "copy").close()
+                for mode, read in (("view", lambda r: r.view), ("body", lambda r: r.body),
+                                   ("json", lambda r: r.json())):
+                    latencies = []
+                    for _ in range(calls if mode != "json" else max(1, calls // 10)):
+                        start = time.perf_counter()
+                        with client.fetch_quick_replies("bench", "copy") as result:
+                            read(result)
+                        latencies.append(time.perf_counter() - start)
+                    results.append(_row(f"copy.{mode}.{size}", latencies, body_bytes=len(result)))
+    finally:
+        libcorehey.configure_response_cache(enabled=False)
+    return results
+
+
+def bench_latency(latency_ms, payload_bytes, calls):
+    with StandIns(latency_ms=latency_ms, payload_bytes=payload_bytes) as standins, \
+            libcorehey.LibCoreHeyClient(standins.vault_config()) as client:
+        client.fetch_quick_replies("bench", "latency").close()
+        latencies = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            with client.fetch_quick_replies("bench", "latency") as result:
+                result.raise_for_error()
+            latencies.append(time.perf_counter() - start)
+    row = _row("latency.fetch", latencies, upstream_ms=latency_ms, payload_bytes=payload_bytes)
+    row["overhead_p50_us"] = round(row["p50_us"] - latency_ms * 1000, 3)
+    return [row]
+
+
+def bench_throughput(latency_ms, payload_bytes, max_threads, seconds):
+    results = []
+    with StandIns(latency_ms=latency_ms, payload_bytes=payload_bytes) as standins, \
+            libcorehey.LibCoreHeyClient(standins.vault_config()) as client:
+        client.fetch_quick_replies("bench", "throughput").close()
+        threads = 1
+        while threads <= max_threads:
+            per_thread = [[] for _ in range(threads)]
+            errors = []
+            start_event = threading.Event()
+            deadline = [0.0]
+
+            def worker(index, latencies):
+                start_event.wait()
+                while True:
+                    t0 = time.perf_counter()
+                    if t0 >= deadline[0]:
+                        return
+                    # Groups unique to each thread, so concurrent calls never
+                    # coalesce into one upstream request
+                    with client.fetch_quick_replies("bench", f"t{index}-g{len(latencies) % 64}") as result:
+                        if not result.ok:
+                            errors.append(result.error_code)
+                    latencies.append(time.perf_counter() - t0)
+
+            workers = [threading.Thread(target=worker, args=(index, latencies))
+                       for index, latencies in enumerate(per_thread)]
+            for thread in workers:
+                thread.start()
+            deadline[0] = time.perf_counter() + seconds
+            start_event.set()
+            for thread in workers:
+                thread.join()
+
+            latencies = [value for values in per_thread for value in values]
+            results.append(_row(f"throughput.threads_{threads}", latencies, seconds,
+                                threads=threads, errors=len(errors), upstream_ms=latency_ms))
+            threads *= 2
+    return results
+
+
+def bench_batch(sizes, rounds):
+    results = []
+    for size in sizes:
+        a = array.array("q", range(size))
+        b = array.array("q", range(size, 2 * size))
+        # Odd values around 10^12, so is_prime does real work on each
+        candidates = array.array("q", range(10 ** 12 + 1, 10 ** 12 + 1 + 2 * size, 2))
+        out = array.array("q", [0]) * size
+        flags = bytearray(size)
+        for name, function in (
+            ("add", lambda: libcorehey.add_numbers_batch(a, b, out)),
+            ("multiply", lambda: libcorehey.multiply_numbers_batch(a, b, out)),
+            ("is_prime", lambda: libcorehey.is_prime_batch(candidates, flags)),
+        ):
+            function()
+            calls = max(1, 100000 // size) if name != "is_prime" else 1
+            row = _row(f"batch.{name}.{size}", _rounds(function, calls, rounds), elements=size)
+            row["operations"] = calls * rounds
+            row["ns_per_element"] = round(row["mean_us"] * 1000 / size, 3)
+            results.append(row)
+
+    # The scalar path, one call per element (add_numbers takes C ints)
+    values = list(range(min(sizes[0], 100000)))
+    for name, function in (
+        ("add", libcorehey.add_numbers),
+        ("multiply", libcorehey.multiply_numbers),
+    ):
+        def loop(function=function):
+            for value in values:
+                function(value, value)
+
+        row = _row(f"batch.scalar_{name}.{len(values)}", _rounds(loop, 1, rounds), elements=len(values))
+        row["ns_per_element"] = round(row["mean_us"] * 1000 / len(values), 3)
+        results.append(row)
+    return results
+
+
+def run(args):
+    groups = args.only.split(",") if args.only else GROUPS
+    results = []
+    if "ffi" in groups:
+        results += bench_ffi(args.calls, args.rounds)
+    if "copy" in groups:
+        results += bench_copy([int(size) for size in args.copy_sizes.split(",")], args.copy_calls)
+    if "latency" in groups:
+        results += bench_latency(args.latency_ms, args.payload_bytes, args.latency_calls)
+    if "throughput" in groups:
+        results += bench_throughput(args.latency_ms, args.payload_bytes, args.max_threads, args.seconds)
+    if "batch" in groups:
+        results += bench_batch([int(size) for size in args.batch_sizes.split(",")], args.rounds)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", help=f"comma-separated groups among {', '.join(GROUPS)}")
+    parser.add_argument("--calls", type=int, default=100000, help="calls per round in ffi benchmarks")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--copy-sizes", default="1024,16384,262144,2097152")
+    parser.add_argument("--copy-calls", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="stand-in API latency")
+    parser.add_argument("--payload-bytes", type=int, default=8192)
+    parser.add_argument("--latency-calls", type=int, default=500)
+    parser.add_argument("--max-threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=2.0, help="duration of each throughput step")
+    parser.add_argument("--batch-sizes", default="1000,100000,1000000", help="elements per batch call")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+
+    unknown = set(args.only.split(",")) - set(GROUPS) if args.only else set()
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+
+    results = run(args)
+    if write("calls", args, results):
+        return
+    print(f"{'benchmark':<28} {'ops/s':>10} {'mean us':>11} {'p50 us':>11} {'p99 us':>11} {'p99.9 us':>11}")
+    for row in results:
+        print(f"{row['name']:<28} {row['ops_per_second']:>10} {row['mean_us']:>11} {row['p50_us']:>11} "
+              f"{row['p99_us']:>11} {row['p999_us']:>11}")
+
+
+if __name__ == "__main__":
+    main()
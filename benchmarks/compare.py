@@ -0,0 +1,71 @@
+"""
+Compare two benchmark JSON documents (from ``--output`` / ``--json``).
+
+Rows are matched by name. Metrics ending in ``_us`` or ``_bytes`` are
+better when lower and ``ops_per_second`` when higher; a change worse than
+``--threshold`` percent is flagged as a regression and makes the exit status 1.
+
+Usage:
+    python benchmarks/compare.py baseline.json candidate.json [--threshold 10]
+"""
+
+import argparse
+import json
+import sys
+
+
+def _load(path):
+    with open(path) as source:
+        document = json.load(source)
+    rows = document["results"] if isinstance(document, dict) else document
+    return document.get("meta", {}) if isinstance(document, dict) else {}, {row["name"]: row for row in rows}
+
+
+def _lower_is_better(metric):
+    return metric.endswith(("_us", "_bytes"))
+
+
+def compare(baseline, candidate, threshold):
+    """Rows (name, metric, before, after, change %, regression) for the metrics both sides have."""
+    rows = []
+    for name in sorted(baseline.keys() & candidate.keys()):
+        for metric in sorted(baseline[name]):
+            if not (_lower_is_better(metric) or metric == "ops_per_second"):
+                continue
+            before, after = baseline[name][metric], candidate[name].get(metric)
+            if not isinstance(after, (int, float)) or not before:
+                continue
+            change = (after - before) / before * 100
+            worse = change if _lower_is_better(metric) else -change
+            rows.append((name, metric, before, after, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    parser.add_argument("--all", action="store_true", help="show every metric, not only p50/p99, ops/s and retained bytes")
+    args = parser.parse_args()
+
+    baseline_meta, baseline = _load(args.baseline)
+    candidate_meta, candidate = _load(args.candidate)
+    print(f"baseline:  {baseline_meta.get('commit') or args.baseline}")
+    print(f"candidate: {candidate_meta.get('commit') or args.candidate}")
+
+    regressions = 0
+    print(f"{'benchmark':<28} {'metric':<15} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for name, metric, before, after, change, regression in compare(baseline, candidate, args.threshold):
+        if not args.all and metric not in ("p50_us", "p99_us", "ops_per_second", "retained_bytes") and not regression:
+            continue
+        regressions += regression
+        flag = "  REGRESSION" if regression else ""
+        print(f"{name:<28} {metric:<15} {before:>12} {after:>12} {change:>+8.1f}%{flag}")
+    for name in sorted(baseline.keys() - candidate.keys()):
+        print(f"{name:<28} missing from candidate")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
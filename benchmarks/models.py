@@ -0,0 +1,138 @@
+"""
+Typed model benchmarks: decode latency and retained memory against json.loads.
+
+For each endpoint and payload size (bodies built by libcorehey.standins):
+
+- decode.dicts:   ``json.loads(body)``, the current approach
+- decode.typed:   QuickReplies/Typifications decoded in bulk into __slots__ models
+- decode.stream:  models built item by item from 64 KiB chunks (iter_json_items)
+- memory.*:       bytes still held per payload with ``--copies`` payloads alive,
+                  for the raw body, the dict tree, an undecoded typed payload
+                  and a decoded one (tracemalloc, so Python allocations only)
+
+``--json`` / ``--output`` write the same document as benchmarks/calls.py, so
+benchmarks/compare.py compares runs.
+
+Usage:
+    python benchmarks/models.py [--sizes 16384,1048576] [--json] [--output models.json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from _common import add_output_arguments, row as _row, write  # noqa: E402
+from libcorehey.models import QuickReplies, Typifications, decode_items  # noqa: E402
+from libcorehey.standins import make_payload  # noqa: E402
+from libcorehey.stream import iter_json_items  # noqa: E402
+
+ENDPOINTS = {"quick_replies": QuickReplies, "typification": Typifications}
+
+
+def _time(function, body, rounds):
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function(body)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _chunks(body, size=64 * 1024):
+    return (body[i:i + size] for i in range(0, len(body), size))
+
+
+def bench_decode(endpoint, size, rounds):
+    cls = ENDPOINTS[endpoint]
+    body = make_payload(endpoint, "bench", "models", size)
+    items = len(json.loads(body)["data"])
+    results = []
+    for mode, function in (
+        ("dicts", json.loads),
+        ("typed", lambda body: len(cls(body))),
+        ("stream", lambda body: decode_items(cls.model, iter_json_items(_chunks(body)))),
+    ):
+        function(body)
+        results.append(_row(f"decode.{mode}.{endpoint}.{size}", _time(function, body, rounds),
+                            body_bytes=len(body), items=items))
+    return results
+
+
+def _retained(build, copies):
+    """(bytes held per payload, peak bytes per payload) while ``copies`` results of build() are alive."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    kept = [build(i) for i in range(copies)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return (current - baseline) // copies, (peak - baseline) // copies
+
+
+def bench_memory(endpoint, size, copies):
+    cls = ENDPOINTS[endpoint]
+    # Distinct bodies, as for responses of different orgs and groups
+    bodies = [make_payload(endpoint, f"org{i}", "models", size) for i in range(copies)]
+
+    def received(i):
+        # A new copy, like the body of a fetched result
+        return bytes(memoryview(bodies[i]))
+
+    def typed(i):
+        payload = cls(received(i))
+        len(payload)
+        return payload
+
+    results = []
+    for mode, build in (
+        ("body", received),
+        ("dicts", lambda i: json.loads(received(i))),
+        ("lazy", lambda i: cls(received(i))),
+        ("typed", typed),
+    ):
+        retained, peak = _retained(build, copies)
+        results.append({
+            "name": f"memory.{mode}.{endpoint}.{size}",
+            "copies": copies,
+            "retained_bytes": retained,
+            "peak_bytes": peak,
+            "body_bytes": len(bodies[0]),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="16384,262144,4194304", help="comma-separated payload sizes in bytes")
+    parser.add_argument("--rounds", type=int, default=20, help="decodes timed per payload")
+    parser.add_argument("--copies", type=int, default=20, help="payloads alive in the memory benchmarks")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        for endpoint in ENDPOINTS:
+            results += bench_decode(endpoint, size, args.rounds)
+            results += bench_memory(endpoint, size, args.copies)
+
+    if write("models", args, results):
+        return
+    print(f"{'benchmark':<40} {'items':>7} {'mean us':>11} {'p99 us':>11}")
+    for row in results:
+        if "mean_us" in row:
+            print(f"{row['name']:<40} {row['items']:>7} {row['mean_us']:>11} {row['p99_us']:>11}")
+    print(f"\n{'benchmark':<40} {'body bytes':>11} {'retained':>11} {'peak':>11}")
+    for row in results:
+        if "retained_bytes" in row:
+            print(f"{row['name']:<40} {row['body_bytes']:>11} {row['retained_bytes']:>11} {row['peak_bytes']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Quick-reply index benchmarks: query latency against scanning the payload.
+
+For each payload size (bodies built by libcorehey.standins):
+
+- search.build:        building a QuickReplyIndex from the decoded models
+- search.update:       update() with one reply changed
+- search.prefix.*:     top-10 shortcut autocomplete, per keystroke of a shortcut
+- search.keyword.*:    top-10 keyword search, per keystroke of a query
+- search.scan:         json.loads plus a linear shortcut scan, the current approach
+
+``--json`` / ``--output`` write the same document as benchmarks/calls.py, so
+benchmarks/compare.py compares runs.
+
+Usage:
+    python benchmarks/search.py [--sizes 65536,1048576] [--json] [--output search.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from _common import add_output_arguments, row as _row, write  # noqa: E402
+from libcorehey.models import QuickReplies  # noqa: E402
+from libcorehey.search import QuickReplyIndex  # noqa: E402
+from libcorehey.standins import make_payload  # noqa: E402
+
+SHORTCUT = "/respuesta12"
+QUERY = "gracias por comunic"
+
+
+def _time(function, rounds):
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _keystrokes(text):
+    """Every prefix of ``text``, as typed one character at a time."""
+    return [text[:end] for end in range(1, len(text) + 1)]
+
+
+def bench(size, rounds):
+    body = make_payload("quick_replies", "bench", "search", size)
+    replies = list(QuickReplies(body))
+    index = QuickReplyIndex(replies)
+    items = {"items": len(replies), "body_bytes": len(body)}
+    results = [_row(f"search.build.{size}", _time(lambda: QuickReplyIndex(replies), max(1, rounds // 100)),
+                    **items)]
+
+    changed = list(replies)
+
+    def update():
+        reply = changed[len(changed) // 2]
+        changed[len(changed) // 2] = type(reply)(reply.id, reply.shortcut, reply.text + "!")
+        index.update(changed)
+
+    results.append(_row(f"search.update.{size}", _time(update, max(1, rounds // 100)), **items))
+
+    for kind, query, texts in (("prefix", index.prefix, _keystrokes(SHORTCUT)),
+                               ("keyword", index.search, _keystrokes(QUERY))):
+        # First keystroke after a change (cold caches), then the same again (warm)
+        index.update(replies)
+        cold = [latency for text in texts for latency in _time(lambda: query(text), 1)]
+        warm = [latency for _ in range(max(1, rounds // len(texts)))
+                for text in texts for latency in _time(lambda: query(text), 1)]
+        results.append(_row(f"search.{kind}.cold.{size}", cold, **items))
+        results.append(_row(f"search.{kind}.warm.{size}", warm, **items))
+
+    def scan():
+        data = json.loads(body)["data"]
+        return [item for item in data if item["shortcut"].startswith(SHORTCUT)][:10]
+
+    results.append(_row(f"search.scan.{size}", _time(scan, max(1, rounds // 100)), **items))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="65536,1048576", help="comma-separated payload sizes in bytes")
+    parser.add_argument("--rounds", type=int, default=2000, help="queries timed per benchmark")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        results += bench(size, args.rounds)
+
+    if write("search", args, results):
+        return
+    print(f"{'benchmark':<32} {'items':>7} {'mean us':>11} {'p50 us':>11} {'p99 us':>11}")
+    for row in results:
+        print(f"{row['name']:<32} {row['items']:>7} {row['mean_us']:>11} {row['p50_us']:>11} {row['p99_us']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Shared cache benchmark: hit latency and scaling with the number of workers.
+
+Fills a SharedCache with ``--keys`` responses of ``--body-size`` bytes, then
+starts 1, 2, 4, ... ``--max-workers`` processes that read random keys for
+``--seconds`` each, while one extra process keeps rewriting entries (so
+readers hit the seqlock retry path). Prints per-worker-count throughput and
+hit latency percentiles.
+
+Usage:
+    python benchmarks/shared_cache.py [--max-workers 16] [--json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from libcorehey.shm import SharedCache  # noqa: E402
+
+
+def _key(i: int) -> str:
+    return f"0|org-{i}|group|bench"
+
+
+def _reader(path, keys, seconds, start, queue):
+    cache = SharedCache(path)
+    rng = random.Random(os.getpid())
+    latencies = []
+    start.wait()
+    deadline = time.perf_counter() + seconds
+    while True:
+        key = _key(rng.randrange(keys))
+        t0 = time.perf_counter()
+        entry = cache.get(key)
+        t1 = time.perf_counter()
+        latencies.append(t1 - t0)
+        if t1 >= deadline:
+            break
+    queue.put((latencies, cache.read_retries, cache.misses))
+    cache.close()
+
+
+def _writer(path, keys, body, stop):
+    cache = SharedCache(path)
+    rng = random.Random(0)
+    while not stop.is_set():
+        cache.put(_key(rng.randrange(keys)), 200, body, ttl=3600)
+    cache.close()
+
+
+def _percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(max_workers, keys, body_size, seconds):
+    path = os.path.join(tempfile.mkdtemp(prefix="libcorehey-bench-"), "shared.cache")
+    body = os.urandom(body_size // 2).hex().encode()
+    with SharedCache(path, slots=max(keys * 2, 64), slot_size=body_size + 512) as cache:
+        for i in range(keys):
+            cache.put(_key(i), 200, body, ttl=3600)
+
+    results = []
+    workers = 1
+    while workers <= max_workers:
+        start = multiprocessing.Event()
+        stop = multiprocessing.Event()
+        queue = multiprocessing.Queue()
+        readers = [multiprocessing.Process(target=_reader, args=(path, keys, seconds, start, queue))
+                   for _ in range(workers)]
+        writer = multiprocessing.Process(target=_writer, args=(path, keys, body, stop))
+        for process in readers + [writer]:
+            process.start()
+        start.set()
+
+        latencies, retries, misses = [], 0, 0
+        for _ in readers:
+            worker_latencies, worker_retries, worker_misses = queue.get()
+            latencies.extend(worker_latencies)
+            retries += worker_retries
+            misses += worker_misses
+        stop.set()
+        for process in readers + [writer]:
+            process.join()
+
+        latencies.sort()
+        results.append({
+            "workers": workers,
+            "ops_per_second": round(len(latencies) / seconds),
+            "p50_us": round(_percentile(latencies, 0.50) * 1e6, 2),
+            "p99_us": round(_percentile(latencies, 0.99) * 1e6, 2),
+            "p999_us": round(_percentile(latencies, 0.999) * 1e6, 2),
+            "hit_ratio": round(1 - misses / len(latencies), 4),
+            "read_retries": retries,
+        })
+        workers *= 2
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-workers", type=int, default=16)
+    parser.add_argument("--keys", type=int, default=256)
+    parser.add_argument("--body-size", type=int, default=8192)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.max_workers, args.keys, args.body_size, args.seconds)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'workers':>8} {'ops/s':>12} {'p50 us':>9} {'p99 us':>9} {'p99.9 us':>9} {'hit %':>7} {'retries':>8}")
+    for row in results:
+        print(f"{row['workers']:>8} {row['ops_per_second']:>12} {row['p50_us']:>9} "
+              f"{row['p99_us']:>9} {row['p999_us']:>9} {row['hit_ratio'] * 100:>7.2f} {row['read_retries']:>8}")
+
+
+if __name__ == "__main__":
+    main()
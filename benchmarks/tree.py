@@ -0,0 +1,115 @@
+"""
+Typification tree benchmarks: queries and memory against walking the raw JSON.
+
+For each payload size (bodies built by libcorehey.standins):
+
+- tree.build:       TypificationTree.from_body(body)
+- tree.lookup:      get(code) of a random code
+- tree.path:        path(code) of a random code
+- tree.validate:    validate() of a batch of ``--batch`` codes, per batch
+- tree.scan:        json.loads plus a walk up the parents of one code, the
+                    current approach
+- memory.*:         bytes held per catalog for the tree and for the dict tree
+                    (tracemalloc, so Python allocations only)
+
+``--json`` / ``--output`` write the same document as benchmarks/calls.py, so
+benchmarks/compare.py compares runs.
+
+Usage:
+    python benchmarks/tree.py [--sizes 65536,1048576] [--json] [--output tree.json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from _common import add_output_arguments, row as _row, write  # noqa: E402
+from libcorehey.standins import make_payload  # noqa: E402
+from libcorehey.tree import TypificationTree  # noqa: E402
+
+
+def _time(function, arguments):
+    latencies = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _scan(body, code):
+    """Path of ``code`` found by walking the decoded payload, as callers do today."""
+    by_code = {item["code"]: item for item in json.loads(body)["data"]}
+    path = []
+    while code is not None:
+        path.append(code)
+        code = by_code[code].get("parent")
+    return path[::-1]
+
+
+def _retained(build):
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del kept
+    return retained
+
+
+def bench(size, rounds, batch):
+    body = make_payload("typification", "bench", "tree", size)
+    tree = TypificationTree.from_body(body)
+    codes = list(tree)
+    sample = [random.choice(codes) for _ in range(rounds)]
+    items = {"items": len(codes), "body_bytes": len(body)}
+
+    results = [_row(f"tree.build.{size}", _time(lambda _: TypificationTree.from_body(body), range(5)), **items)]
+    results.append(_row(f"tree.lookup.{size}", _time(tree.get, sample), **items))
+    results.append(_row(f"tree.path.{size}", _time(tree.path, sample), **items))
+    batches = [sample[start:start + batch] for start in range(0, len(sample), batch)]
+    results.append(_row(f"tree.validate.{size}", _time(tree.validate, batches), batch=batch, **items))
+    results.append(_row(f"tree.scan.{size}", _time(lambda code: _scan(body, code), sample[:5]), **items))
+
+    # Bodies are copied first, like the body of a fetched result
+    for mode, build in (("tree", lambda: TypificationTree.from_body(bytes(memoryview(body)))),
+                        ("dicts", lambda: json.loads(bytes(memoryview(body))))):
+        results.append({"name": f"memory.{mode}.{size}", "retained_bytes": _retained(build), **items})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="65536,1048576", help="comma-separated payload sizes in bytes")
+    parser.add_argument("--rounds", type=int, default=10000, help="random codes looked up per benchmark")
+    parser.add_argument("--batch", type=int, default=1000, help="codes per validate() call")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+
+    random.seed(0)
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        results += bench(size, args.rounds, args.batch)
+
+    if write("tree", args, results):
+        return
+    print(f"{'benchmark':<28} {'items':>7} {'mean us':>11} {'p50 us':>11} {'p99 us':>11}")
+    for row in results:
+        if "mean_us" in row:
+            print(f"{row['name']:<28} {row['items']:>7} {row['mean_us']:>11} {row['p50_us']:>11} {row['p99_us']:>11}")
+    print(f"\n{'benchmark':<28} {'body bytes':>11} {'retained':>11}")
+    for row in results:
+        if "retained_bytes" in row:
+            print(f"{row['name']:<28} {row['body_bytes']:>11} {row['retained_bytes']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,175 +2,5158 @@ package main
 
 /*
 #include <stdlib.h>
+
+// CoreHeyResult es el sobre que devuelven las funciones Client*: el cuerpo de
+// la respuesta (data, len) más el status HTTP y un código de error fuera de
+// banda. En los lotes, index es la posición de la petición (-1 fuera de lotes).
+// flags indica si la respuesta salió de cache (ver resultFlag*). etag y
+// last_modified son los validadores de la respuesta (NULL si no hay). Se libera
+// con FreeResult.
+typedef struct {
+	char*     data;
+	long long len;
+	int       status;
+	int       code;
+	long long index;
+	int       flags;
+	char*     etag;
+	char*     last_modified;
+} CoreHeyResult;
+
+// El demonio crea su socket con umask 077 y sólo borra sockets propios. umask
+// y st_uid no existen en Windows: allí umask no hace nada y el dueño es -1,
+// como os.Getuid.
+#ifdef _WIN32
+static int libcorehey_umask(int mask) { return 0; }
+static long long libcorehey_owner(const char* path) { return -1; }
+#else
+#include <sys/stat.h>
+static int libcorehey_umask(int mask) { return (int)umask((mode_t)mask); }
+static long long libcorehey_owner(const char* path) {
+	struct stat st;
+	if (lstat(path, &st) != 0) {
+		return -2;
+	}
+	return (long long)st.st_uid;
+}
+#endif
 */
 import "C"
 
 import (
+	"bufio"
+	"bytes"
+	"container/list"
 	"context"
+	"crypto/tls"
+	"encoding/binary"
 	"encoding/json"
+	"errors"
+	"flag"
 	"fmt"
+	"hash/crc32"
 	"io"
+	"log"
+	"math"
+	"math/bits"
+	"math/rand"
+	"net"
 	"net/http"
+	"net/http/httptrace"
+	"net/url"
 	"os"
+	"os/signal"
+	"path/filepath"
+	"runtime"
+	"sort"
+	"strconv"
+	"strings"
+	"sync"
+	"sync/atomic"
+	"syscall"
 	"time"
 	"unsafe"
 
+	"github.com/Azure/azure-sdk-for-go/sdk/azcore"
+	"github.com/Azure/azure-sdk-for-go/sdk/azcore/policy"
 	"github.com/Azure/azure-sdk-for-go/sdk/azidentity"
 	azsecrets "github.com/Azure/azure-sdk-for-go/sdk/keyvault/azsecrets"
 )
 
 // ============ FUNCIONES ESPECÍFICAS HEYBANCO ============
 
+const (
+	quickRepliesPath = "/v2/quick_replies"
+	typificationPath = "/v2/typification"
+)
+
+// Endpoints aceptados por ClientFetch
+const (
+	endpointQuickReplies = 0
+	endpointTypification = 1
+)
+
+var endpointPaths = []string{
+	endpointQuickReplies: quickRepliesPath,
+	endpointTypification: typificationPath,
+}
+
 //export GetQuickReplies
 func GetQuickReplies(vaultConfig *C.char, org *C.char, group *C.char) *C.char {
-	goVaultConfig := C.GoString(vaultConfig)
-	goOrg := C.GoString(org)
-	goGroup := C.GoString(group)
+	client, err := clientForConfig(C.GoString(vaultConfig))
+	if err != nil {
+		return C.CString(errorJSON("Failed to get secrets", err))
+	}
+	ctx, cancel := callContext(0, 0)
+	defer cancel()
+	return C.CString(string(client.fetch(ctx, endpointQuickReplies, C.GoString(org), C.GoString(group)).body))
+}
 
-	baseURL, token, err := getSecretsFromVault(goVaultConfig)
+//export GetTypification
+func GetTypification(vaultConfig *C.char, org *C.char, group *C.char) *C.char {
+	client, err := clientForConfig(C.GoString(vaultConfig))
 	if err != nil {
-		return C.CString(fmt.Sprintf(`{"error": "Failed to get secrets: %s"}`, err.Error()))
+		return C.CString(errorJSON("Failed to get secrets", err))
 	}
+	ctx, cancel := callContext(0, 0)
+	defer cancel()
+	return C.CString(string(client.fetch(ctx, endpointTypification, C.GoString(org), C.GoString(group)).body))
+}
 
-	fullURL := fmt.Sprintf("%s/v2/quick_replies?org=%s&group=%s", baseURL, goOrg, goGroup)
+func errorJSON(prefix string, err error) string {
+	message, _ := json.Marshal(prefix + ": " + err.Error())
+	return fmt.Sprintf(`{"error": %s}`, message)
+}
 
-	client := &http.Client{
-		Timeout: 30 * time.Second,
-	}
+// ============ SOBRE DE RESULTADO ============
 
-	req, err := http.NewRequest("GET", fullURL, nil)
-	if err != nil {
-		return C.CString(fmt.Sprintf(`{"error": "Failed to create request: %s"}`, err.Error()))
-	}
+// Códigos de error de CoreHeyResult.code
+const (
+	resultOK            = 0
+	resultErrConfig     = 1  // config inválida
+	resultErrSecrets    = 2  // fallo leyendo secretos del Key Vault
+	resultErrRequest    = 3  // fallo de red o al construir la petición
+	resultErrRead       = 4  // fallo leyendo el cuerpo de la respuesta
+	resultErrHTTPStatus = 5  // la API respondió con status >= 400
+	resultErrHandle     = 6  // handle de cliente inválido
+	resultErrEndpoint   = 7  // endpoint desconocido
+	resultErrCanceled   = 8  // petición cancelada
+	resultErrTimeout    = 9  // se agotó el plazo de la llamada
+	resultErrCircuit    = 10 // circuit breaker del host abierto (ver RESILIENCIA)
+	resultErrRateLimit  = 11 // límite de tasa o bulkhead sin hueco a tiempo
+)
 
-	req.Header.Set("Content-Type", "application/json")
-	req.Header.Set("Authorization", "Bearer "+token)
+// Flags de CoreHeyResult.flags
+const (
+	resultFlagCached = 1 << 0 // respuesta servida desde la cache de respuestas
+	resultFlagStale  = 1 << 1 // respuesta expirada servida mientras se revalida
+)
 
-	resp, err := client.Do(req)
-	if err != nil {
-		return C.CString(fmt.Sprintf(`{"error": "Request failed: %s"}`, err.Error()))
+// fetchResult es el resultado de una consulta del lado Go. En caso de error,
+// body contiene un JSON {"error": ...} igual que las funciones que devuelven
+// cadenas.
+type fetchResult struct {
+	status int
+	code   int
+	body   []byte
+	index  int
+	flags  int
+	validators
+}
+
+// validators son los validadores HTTP de una respuesta, usados para pedir
+// sólo cambios (If-None-Match / If-Modified-Since) y recibir 304 si no los hay.
+type validators struct {
+	etag         string
+	lastModified string
+}
+
+func (v validators) empty() bool {
+	return v.etag == "" && v.lastModified == ""
+}
+
+func errorResult(code int, prefix string, err error) fetchResult {
+	return fetchResult{code: code, body: []byte(errorJSON(prefix, err)), index: -1}
+}
+
+// newCResult copia el resultado a memoria C. Es la única copia del cuerpo
+// entre Go y Python: Python lo lee sin copiar y lo libera con FreeResult.
+func newCResult(r fetchResult) *C.CoreHeyResult {
+	if metrics.enabled.Load() {
+		defer metrics.observeSince("cstring", "", r.status, time.Now())
 	}
-	defer resp.Body.Close()
+	res := (*C.CoreHeyResult)(C.malloc(C.size_t(unsafe.Sizeof(C.CoreHeyResult{}))))
+	res.data = nil
+	if len(r.body) > 0 {
+		res.data = (*C.char)(C.CBytes(r.body))
+	}
+	res.len = C.longlong(len(r.body))
+	res.status = C.int(r.status)
+	res.code = C.int(r.code)
+	res.index = C.longlong(r.index)
+	res.flags = C.int(r.flags)
+	res.etag = nil
+	if r.etag != "" {
+		res.etag = C.CString(r.etag)
+	}
+	res.last_modified = nil
+	if r.lastModified != "" {
+		res.last_modified = C.CString(r.lastModified)
+	}
+	return res
+}
 
-	body, err := io.ReadAll(resp.Body)
-	if err != nil {
-		return C.CString(fmt.Sprintf(`{"error": "Failed to read response: %s"}`, err.Error()))
+//export FreeResult
+func FreeResult(r *C.CoreHeyResult) {
+	if r == nil {
+		return
 	}
+	C.free(unsafe.Pointer(r.data))
+	C.free(unsafe.Pointer(r.etag))
+	C.free(unsafe.Pointer(r.last_modified))
+	C.free(unsafe.Pointer(r))
+}
 
-	return C.CString(string(body))
+// readBody lee el cuerpo completo reservando de antemano Content-Length bytes
+// cuando el servidor lo informa.
+func readBody(resp *http.Response) ([]byte, error) {
+	var buf bytes.Buffer
+	if resp.ContentLength > 0 {
+		buf.Grow(int(resp.ContentLength))
+	}
+	_, err := buf.ReadFrom(resp.Body)
+	return buf.Bytes(), err
 }
 
-//export GetTypification
-func GetTypification(vaultConfig *C.char, org *C.char, group *C.char) *C.char {
-	goVaultConfig := C.GoString(vaultConfig)
-	goOrg := C.GoString(org)
-	goGroup := C.GoString(group)
+// ============ PLAZOS Y CANCELACIÓN ============
 
-	baseURL, token, err := getSecretsFromVault(goVaultConfig)
-	if err != nil {
-		return C.CString(fmt.Sprintf(`{"error": "Failed to get secrets: %s"}`, err.Error()))
-	}
+// Cada llamada tiene un único plazo total que cubre la lectura de secretos, la
+// conexión, la espera de la respuesta y la lectura del cuerpo. Sin plazo
+// explícito se usa defaultCallTimeout. Un token de cancelación aborta todas
+// las llamadas en curso que lo usan.
+
+const defaultCallTimeout = 30 * time.Second
 
-	fullURL := fmt.Sprintf("%s/v2/typification?org=%s&group=%s", baseURL, goOrg, goGroup)
+type cancelToken struct {
+	ctx    context.Context
+	cancel context.CancelFunc
+}
+
+var (
+	cancelTokensMu    sync.Mutex
+	cancelTokens      = make(map[int64]*cancelToken)
+	nextCancelTokenID int64
+)
 
-	client := &http.Client{
-		Timeout: 30 * time.Second,
+// callContext construye el contexto de una llamada con timeoutMs milisegundos
+// de plazo (<= 0 para el plazo por defecto) y, si token > 0, ligado a ese token
+// de cancelación.
+func callContext(timeoutMs C.longlong, token C.longlong) (context.Context, context.CancelFunc) {
+	parent := context.Background()
+	if token > 0 {
+		cancelTokensMu.Lock()
+		if t, ok := cancelTokens[int64(token)]; ok {
+			parent = t.ctx
+		}
+		cancelTokensMu.Unlock()
 	}
+	timeout := defaultCallTimeout
+	if timeoutMs > 0 {
+		timeout = time.Duration(timeoutMs) * time.Millisecond
+	}
+	return context.WithTimeout(parent, timeout)
+}
 
-	req, err := http.NewRequest("GET", fullURL, nil)
-	if err != nil {
-		return C.CString(fmt.Sprintf(`{"error": "Failed to create request: %s"}`, err.Error()))
+// canceledResult distingue un plazo agotado de una cancelación explícita.
+func canceledResult(err error) fetchResult {
+	if errors.Is(err, context.DeadlineExceeded) {
+		return errorResult(resultErrTimeout, "Deadline exceeded", err)
 	}
+	return errorResult(resultErrCanceled, "Request canceled", err)
+}
 
-	req.Header.Set("Content-Type", "application/json")
-	req.Header.Set("Authorization", "Bearer "+token)
+// NewCancelToken crea un token de cancelación y devuelve su id (> 0). Debe
+// liberarse con ReleaseCancelToken.
+//
+//export NewCancelToken
+func NewCancelToken() C.longlong {
+	ctx, cancel := context.WithCancel(context.Background())
 
-	resp, err := client.Do(req)
-	if err != nil {
-		return C.CString(fmt.Sprintf(`{"error": "Request failed: %s"}`, err.Error()))
-	}
-	defer resp.Body.Close()
+	cancelTokensMu.Lock()
+	defer cancelTokensMu.Unlock()
+	nextCancelTokenID++
+	cancelTokens[nextCancelTokenID] = &cancelToken{ctx: ctx, cancel: cancel}
+	return C.longlong(nextCancelTokenID)
+}
 
-	body, err := io.ReadAll(resp.Body)
-	if err != nil {
-		return C.CString(fmt.Sprintf(`{"error": "Failed to read response: %s"}`, err.Error()))
+// CancelToken aborta las llamadas en curso (y las futuras) que usan el token.
+//
+//export CancelToken
+func CancelToken(token C.longlong) {
+	cancelTokensMu.Lock()
+	t, ok := cancelTokens[int64(token)]
+	cancelTokensMu.Unlock()
+	if ok {
+		t.cancel()
 	}
+}
 
-	return C.CString(string(body))
+//export ReleaseCancelToken
+func ReleaseCancelToken(token C.longlong) {
+	cancelTokensMu.Lock()
+	t, ok := cancelTokens[int64(token)]
+	delete(cancelTokens, int64(token))
+	cancelTokensMu.Unlock()
+	if ok {
+		t.cancel()
+	}
 }
 
-// ============ AZURE KEY VAULT (WORKLOAD IDENTITY) ============
+// ============ CLIENTE PERSISTENTE ============
 
-type VaultConfig struct {
-	VaultURL string `json:"vault_url,omitempty"`
+// coreClient conserva la config parseada, la credencial y el cliente de Key
+// Vault entre llamadas, para no repetir el sondeo de la cadena de credenciales
+// ni la obtención del token en cada petición.
+type coreClient struct {
+	config   VaultConfig
+	vaultURL string
+	ttl      time.Duration
+
+	mu      sync.Mutex
+	secrets secretSource
 }
 
-// getSecretsFromVault resuelve la URL del Key Vault y usa DefaultAzureCredential
-// para leer los secretos url-whatapp y token-whatapp.
-func getSecretsFromVault(configJSON string) (string, string, error) {
+func newCoreClient(configJSON string) (*coreClient, error) {
 	var config VaultConfig
 	if configJSON != "" {
 		if err := json.Unmarshal([]byte(configJSON), &config); err != nil {
-			return "", "", fmt.Errorf("invalid vault config: %v", err)
+			return nil, fmt.Errorf("invalid vault config: %v", err)
 		}
 	}
 
-	vaultURL := config.VaultURL
-	if vaultURL == "" {
-		vaultURL = os.Getenv("AZURE_KEY_VAULT_URL")
-		if vaultURL == "" {
-			vaultName := os.Getenv("AZURE_KEY_VAULT_NAME")
-			if vaultName == "" {
-				vaultName = "wasecrets"
+	switch config.RateLimitMode {
+	case "", rateLimitModeWait, rateLimitModeFailFast:
+	default:
+		return nil, fmt.Errorf("invalid vault config: unknown rate_limit_mode %q", config.RateLimitMode)
+	}
+
+	if config.Transport != nil {
+		sharedTransport.configure(*config.Transport)
+	}
+
+	return &coreClient{
+		config:   config,
+		vaultURL: config.resolveVaultURL(),
+		ttl:      config.secretTTL(),
+	}, nil
+}
+
+// secretsClient crea la credencial y el cliente de Key Vault en el primer uso
+// (o el cliente del Key Vault local, ver KEY VAULT LOCAL). Si falla, se
+// reintenta en la siguiente llamada.
+func (c *coreClient) secretsClient() (secretSource, error) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	if c.secrets == nil {
+		if c.config.LocalVault {
+			c.secrets = localVault{vaultURL: c.vaultURL}
+			return c.secrets, nil
+		}
+		client, err := newSecretsClient(c.vaultURL)
+		if err != nil {
+			return nil, err
+		}
+		c.secrets = azureVault{client}
+	}
+	return c.secrets, nil
+}
+
+// fetch consulta endpoint pasando por la cache de respuestas cuando está
+// activada.
+func (c *coreClient) fetch(ctx context.Context, endpoint int, org, group string) (result fetchResult) {
+	if metrics.enabled.Load() {
+		defer func(start time.Time) { metrics.recordCall(endpoint, result, start) }(time.Now())
+	}
+	if endpoint < 0 || endpoint >= len(endpointPaths) {
+		return errorResult(resultErrEndpoint, "Unknown endpoint", fmt.Errorf("%d", endpoint))
+	}
+	path := endpointPaths[endpoint]
+
+	key := responseKey(path, org, group, c.vaultURL)
+	cache := responseCacheStore.Load()
+
+	// Con la cache activa, las entradas expiradas conservan sus validadores y
+	// se revalidan con una petición condicional: si no hubo cambios la API
+	// responde 304 sin cuerpo y se renueva la entrada.
+	var previous validators
+	if cache != nil {
+		result, state, cached := cache.lookup(key)
+		if state != cacheMiss {
+			if state == cacheStale {
+				c.revalidateInBackground(cache, key, endpoint, org, group, cached)
 			}
-			vaultURL = fmt.Sprintf("https://%s.vault.azure.net", vaultName)
+			return result
 		}
+		previous = cached
 	}
 
-	cred, err := azidentity.NewDefaultAzureCredential(nil)
+	result, ok := apiFlights.do(ctx, key, func(ctx context.Context) fetchResult {
+		if cache == nil {
+			return c.get(ctx, path, org, group, validators{})
+		}
+		result := c.revalidate(ctx, cache, key, endpoint, org, group, previous)
+		cache.store(key, endpoint, result)
+		return result
+	})
+	if !ok {
+		return canceledResult(ctx.Err())
+	}
+	return result
+}
+
+// revalidateInBackground revalida en otra goroutine una entrada expirada que
+// se está sirviendo, salvo que ya haya una revalidación en curso.
+func (c *coreClient) revalidateInBackground(cache *responseCache, key string, endpoint int, org, group string, cached validators) {
+	if !cache.startRevalidation(key) {
+		return
+	}
+	go func() {
+		ctx, cancel := callContext(0, 0)
+		defer cancel()
+		result, _ := apiFlights.do(ctx, key, func(ctx context.Context) fetchResult {
+			return c.revalidate(ctx, cache, key, endpoint, org, group, cached)
+		})
+		cache.finishRevalidation(key, endpoint, result)
+	}()
+}
+
+// revalidate consulta la API de forma condicional con los validadores de la
+// entrada en cache. Si la API responde 304 devuelve la entrada renovada; si la
+// entrada ya no existe repite la consulta sin condiciones.
+func (c *coreClient) revalidate(ctx context.Context, cache *responseCache, key string, endpoint int, org, group string, previous validators) fetchResult {
+	path := endpointPaths[endpoint]
+	if previous.empty() {
+		return c.get(ctx, path, org, group, validators{})
+	}
+
+	result := c.get(ctx, path, org, group, previous)
+	if result.status != http.StatusNotModified {
+		return result
+	}
+	if renewed, ok := cache.renew(key, endpoint); ok {
+		return renewed
+	}
+	return c.get(ctx, path, org, group, validators{})
+}
+
+// fetchIfChanged consulta endpoint sólo si cambió respecto a los validadores
+// indicados; si no cambió devuelve status 304 sin cuerpo. No usa la cache de
+// respuestas.
+func (c *coreClient) fetchIfChanged(ctx context.Context, endpoint int, org, group string, previous validators) (result fetchResult) {
+	if metrics.enabled.Load() {
+		defer func(start time.Time) { metrics.recordCall(endpoint, result, start) }(time.Now())
+	}
+	if endpoint < 0 || endpoint >= len(endpointPaths) {
+		return errorResult(resultErrEndpoint, "Unknown endpoint", fmt.Errorf("%d", endpoint))
+	}
+	path := endpointPaths[endpoint]
+	key := responseKey(path, org, group, c.vaultURL) + "|" + previous.etag + "|" + previous.lastModified
+
+	result, ok := apiFlights.do(ctx, key, func(ctx context.Context) fetchResult {
+		return c.get(ctx, path, org, group, previous)
+	})
+	if !ok {
+		return canceledResult(ctx.Err())
+	}
+	return result
+}
+
+// get consulta path en la API de WhatsApp, de forma condicional si se indican
+// validadores. Los errores se devuelven en el propio fetchResult; si ctx se
+// cancela la consulta termina con resultErrCanceled.
+func (c *coreClient) get(ctx context.Context, path, org, group string, previous validators) fetchResult {
+	ctx = c.requestContext(ctx, path)
+	req, release, failure, ok := c.newRequest(ctx, path, org, group, previous)
+	if !ok {
+		return failure
+	}
+	defer release()
+	return attemptResult(ctx, upstream.do(ctx, req))
+}
+
+// requestContext añade a ctx el modo de limitación de tasa del cliente y el
+// endpoint al que se atribuyen las métricas.
+func (c *coreClient) requestContext(ctx context.Context, path string) context.Context {
+	if c.config.RateLimitMode != "" {
+		ctx = withFailFast(ctx, c.config.RateLimitMode == rateLimitModeFailFast)
+	}
+	if metrics.enabled.Load() {
+		ctx = context.WithValue(ctx, metricsEndpointKey{}, endpointName(path))
+	}
+	return ctx
+}
+
+// newRequest lee los secretos, construye la petición a path y entra en el
+// bulkhead de la org; release lo libera. Si algo falla devuelve ok = false y
+// el fetchResult del error.
+func (c *coreClient) newRequest(ctx context.Context, path, org, group string, previous validators) (req *http.Request, release func(), failure fetchResult, ok bool) {
+	baseURL, token, err := c.getSecretsFromVault(ctx)
 	if err != nil {
-		return "", "", fmt.Errorf("failed to create DefaultAzureCredential: %w", err)
+		if ctx.Err() != nil {
+			return nil, nil, canceledResult(ctx.Err()), false
+		}
+		if errors.Is(err, errRateLimited) {
+			return nil, nil, errorResult(resultErrRateLimit, "Key Vault request rejected", err), false
+		}
+		return nil, nil, errorResult(resultErrSecrets, "Failed to get secrets", err), false
 	}
 
-	client, err := azsecrets.NewClient(vaultURL, cred, nil)
+	fullURL := fmt.Sprintf("%s%s?org=%s&group=%s", baseURL, path, org, group)
+
+	req, err = http.NewRequestWithContext(ctx, "GET", fullURL, nil)
 	if err != nil {
-		return "", "", fmt.Errorf("failed to create secrets client: %w", err)
+		return nil, nil, errorResult(resultErrRequest, "Failed to create request", err), false
 	}
 
-	ctx, cancel := context.WithTimeout(context.Background(), 30*time.Second)
-	defer cancel()
+	req.Header.Set("Content-Type", "application/json")
+	req.Header.Set("Authorization", "Bearer "+token)
+	if previous.etag != "" {
+		req.Header.Set("If-None-Match", previous.etag)
+	}
+	if previous.lastModified != "" {
+		req.Header.Set("If-Modified-Since", previous.lastModified)
+	}
 
-	baseURL, err := getSecretValue(ctx, client, "url-whatapp")
+	release, err = limits.enterOrg(ctx, org, limits.isFailFast(ctx))
 	if err != nil {
-		return "", "", fmt.Errorf("failed to get url-whatapp secret: %w", err)
+		if ctx.Err() != nil {
+			return nil, nil, canceledResult(ctx.Err()), false
+		}
+		return nil, nil, errorResult(resultErrRateLimit, "Request rejected", err), false
+	}
+	return req, release, fetchResult{}, true
+}
+
+// attemptResult convierte el resultado de upstream.do en un fetchResult.
+func attemptResult(ctx context.Context, resp attempt) fetchResult {
+	if resp.err != nil {
+		if ctx.Err() != nil {
+			return canceledResult(ctx.Err())
+		}
+		if resp.readFailed {
+			result := errorResult(resultErrRead, "Failed to read response", resp.err)
+			result.status = resp.status
+			return result
+		}
+		if errors.Is(resp.err, errCircuitOpen) || errors.Is(resp.err, errRateLimited) {
+			code := resultErrCircuit
+			if errors.Is(resp.err, errRateLimited) {
+				code = resultErrRateLimit
+			}
+			return errorResult(code, "Request rejected", resp.err)
+		}
+		return errorResult(resultErrRequest, "Request failed", resp.err)
+	}
+
+	result := fetchResult{status: resp.status, body: resp.body, index: -1}
+	result.etag = resp.header.Get("ETag")
+	result.lastModified = resp.header.Get("Last-Modified")
+	if resp.status >= 400 {
+		result.code = resultErrHTTPStatus
 	}
+	return result
+}
+
+var (
+	clientsMu    sync.RWMutex
+	clients      = make(map[int64]*coreClient)
+	nextClientID int64
+
+	// configClients guarda un cliente por cada config usada con las funciones
+	// GetQuickReplies/GetTypification, que reciben la config en cada llamada.
+	configClients = make(map[string]*coreClient)
+)
 
-	token, err := getSecretValue(ctx, client, "token-whatapp")
+func clientForConfig(configJSON string) (*coreClient, error) {
+	clientsMu.RLock()
+	client, ok := configClients[configJSON]
+	clientsMu.RUnlock()
+	if ok {
+		return client, nil
+	}
+
+	client, err := newCoreClient(configJSON)
 	if err != nil {
-		return "", "", fmt.Errorf("failed to get token-whatapp secret: %w", err)
+		return nil, err
 	}
 
-	return baseURL, token, nil
+	clientsMu.Lock()
+	defer clientsMu.Unlock()
+	if existing, ok := configClients[configJSON]; ok {
+		return existing, nil
+	}
+	configClients[configJSON] = client
+	return client, nil
 }
 
-func getSecretValue(ctx context.Context, client *azsecrets.Client, name string) (string, error) {
-	// Versión vacía ("") => última versión del secreto
-	resp, err := client.GetSecret(ctx, name, "", nil)
+func lookupClient(handle C.longlong) (*coreClient, bool) {
+	clientsMu.RLock()
+	defer clientsMu.RUnlock()
+	client, ok := clients[int64(handle)]
+	return client, ok
+}
+
+// CreateClient crea un cliente persistente y devuelve su handle (> 0). Si la
+// config no es válida devuelve 0 y deja el mensaje en errOut, que debe
+// liberarse con FreeCString.
+//
+//export CreateClient
+func CreateClient(vaultConfig *C.char, errOut **C.char) C.longlong {
+	client, err := newCoreClient(C.GoString(vaultConfig))
 	if err != nil {
-		return "", err
+		if errOut != nil {
+			*errOut = C.CString(err.Error())
+		}
+		return 0
 	}
-	if resp.Value == nil {
-		return "", fmt.Errorf("secret %s has nil value", name)
+
+	clientsMu.Lock()
+	defer clientsMu.Unlock()
+	nextClientID++
+	clients[nextClientID] = client
+	return C.longlong(nextClientID)
+}
+
+//export CloseClient
+func CloseClient(handle C.longlong) {
+	clientsMu.Lock()
+	defer clientsMu.Unlock()
+	delete(clients, int64(handle))
+}
+
+// ClientFetch consulta endpoint (endpointQuickReplies o endpointTypification)
+// con el cliente indicado, en timeoutMs milisegundos como máximo (<= 0 para el
+// plazo por defecto) y abortando si se cancela token (0 para ninguno). El
+// resultado debe liberarse con FreeResult.
+//
+//export ClientFetch
+func ClientFetch(handle C.longlong, endpoint C.int, org *C.char, group *C.char, timeoutMs C.longlong, token C.longlong) *C.CoreHeyResult {
+	client, ok := lookupClient(handle)
+	if !ok {
+		return newCResult(errorResult(resultErrHandle, "Invalid client handle", fmt.Errorf("%d", int64(handle))))
 	}
-	return *resp.Value, nil
+	ctx, cancel := callContext(timeoutMs, token)
+	defer cancel()
+	return newCResult(client.fetch(ctx, int(endpoint), C.GoString(org), C.GoString(group)))
 }
 
-// ============ MANEJO DE MEMORIA ============
+// ClientFetchIfChanged consulta endpoint enviando If-None-Match (etag) y/o
+// If-Modified-Since (lastModified). Si el contenido no cambió el resultado
+// tiene status 304 y cuerpo vacío. timeoutMs y token como en ClientFetch. El
+// resultado debe liberarse con FreeResult.
+//
+//export ClientFetchIfChanged
+func ClientFetchIfChanged(handle C.longlong, endpoint C.int, org *C.char, group *C.char, etag *C.char, lastModified *C.char, timeoutMs C.longlong, token C.longlong) *C.CoreHeyResult {
+	client, ok := lookupClient(handle)
+	if !ok {
+		return newCResult(errorResult(resultErrHandle, "Invalid client handle", fmt.Errorf("%d", int64(handle))))
+	}
+	ctx, cancel := callContext(timeoutMs, token)
+	defer cancel()
+	previous := validators{etag: C.GoString(etag), lastModified: C.GoString(lastModified)}
+	return newCResult(client.fetchIfChanged(ctx, int(endpoint), C.GoString(org), C.GoString(group), previous))
+}
 
-//export FreeCString
-func FreeCString(p *C.char) {
-	C.free(unsafe.Pointer(p))
+// ============ LOTES (FAN-OUT) ============
+
+const defaultBatchConcurrency = 16
+
+type batchRequest struct {
+	Endpoint int    `json:"endpoint"`
+	Org      string `json:"org"`
+	Group    string `json:"group"`
+}
+
+// fetchBatch reparte las peticiones de un lote entre goroutines (como máximo
+// concurrency a la vez) y entrega cada resultado en cuanto termina.
+type fetchBatch struct {
+	results chan fetchResult
+	done    chan struct{}
+	once    sync.Once
+	cancel  context.CancelFunc
+	pending int
+}
+
+// startBatch lanza el lote. ctx es el plazo de todo el lote: al agotarse, las
+// peticiones pendientes terminan enseguida con resultErrTimeout.
+func startBatch(ctx context.Context, cancel context.CancelFunc, client *coreClient, requests []batchRequest, concurrency int) *fetchBatch {
+	if concurrency <= 0 {
+		concurrency = defaultBatchConcurrency
+	}
+	b := &fetchBatch{
+		results: make(chan fetchResult, len(requests)),
+		done:    make(chan struct{}),
+		cancel:  cancel,
+		pending: len(requests),
+	}
+
+	go func() {
+		slots := make(chan struct{}, concurrency)
+		for i, request := range requests {
+			select {
+			case slots <- struct{}{}:
+			case <-b.done:
+				return
+			}
+			go func(i int, request batchRequest) {
+				defer func() { <-slots }()
+				result := client.fetch(ctx, request.Endpoint, request.Org, request.Group)
+				result.index = i
+				b.results <- result
+			}(i, request)
+		}
+	}()
+	return b
+}
+
+// next espera el siguiente resultado. Devuelve false cuando ya se entregaron
+// todos o el lote se cerró.
+func (b *fetchBatch) next() (fetchResult, bool) {
+	if b.pending == 0 {
+		return fetchResult{}, false
+	}
+	select {
+	case result := <-b.results:
+		b.pending--
+		return result, true
+	case <-b.done:
+		return fetchResult{}, false
+	}
+}
+
+func (b *fetchBatch) close() {
+	b.once.Do(func() {
+		close(b.done)
+		b.cancel()
+	})
+}
+
+var (
+	batchesMu   sync.Mutex
+	batches     = make(map[int64]*fetchBatch)
+	nextBatchID int64
+)
+
+func lookupBatch(id C.longlong) (*fetchBatch, bool) {
+	batchesMu.Lock()
+	defer batchesMu.Unlock()
+	b, ok := batches[int64(id)]
+	return b, ok
+}
+
+// ClientStartBatch lanza un lote de peticiones ([{"endpoint", "org", "group"}]
+// en JSON) y devuelve su id (> 0). Los resultados se recogen con BatchNext en
+// orden de finalización. timeoutMs y token (como en ClientFetch) limitan el
+// lote entero. Si falla devuelve 0 y deja el mensaje en errOut, que debe
+// liberarse con FreeCString.
+//
+//export ClientStartBatch
+func ClientStartBatch(handle C.longlong, requestsJSON *C.char, concurrency C.int, timeoutMs C.longlong, token C.longlong, errOut **C.char) C.longlong {
+	fail := func(err error) C.longlong {
+		if errOut != nil {
+			*errOut = C.CString(err.Error())
+		}
+		return 0
+	}
+
+	client, ok := lookupClient(handle)
+	if !ok {
+		return fail(fmt.Errorf("invalid client handle %d", int64(handle)))
+	}
+	var requests []batchRequest
+	if err := json.Unmarshal([]byte(C.GoString(requestsJSON)), &requests); err != nil {
+		return fail(fmt.Errorf("invalid batch requests: %v", err))
+	}
+
+	ctx, cancel := callContext(timeoutMs, token)
+	b := startBatch(ctx, cancel, client, requests, int(concurrency))
+
+	batchesMu.Lock()
+	defer batchesMu.Unlock()
+	nextBatchID++
+	batches[nextBatchID] = b
+	return C.longlong(nextBatchID)
+}
+
+// BatchNext bloquea hasta el siguiente resultado del lote (index indica la
+// petición) o devuelve NULL cuando no quedan más.
+//
+//export BatchNext
+func BatchNext(batchID C.longlong) *C.CoreHeyResult {
+	b, ok := lookupBatch(batchID)
+	if !ok {
+		return nil
+	}
+	result, ok := b.next()
+	if !ok {
+		return nil
+	}
+	return newCResult(result)
+}
+
+// CloseBatch libera el lote. Las peticiones que aún no empezaron se descartan.
+//
+//export CloseBatch
+func CloseBatch(batchID C.longlong) {
+	batchesMu.Lock()
+	b, ok := batches[int64(batchID)]
+	delete(batches, int64(batchID))
+	batchesMu.Unlock()
+	if ok {
+		b.close()
+	}
+}
+
+// ============ PRECALENTAMIENTO ============
+
+// warmup hace por adelantado todo lo que paga la primera llamada de un
+// proceso: crear la credencial y el cliente de Key Vault, obtener el token y
+// leer los secretos, y abrir (TLS incluido) una conexión a la API que queda en
+// el pool. Opcionalmente precarga pares (endpoint, org, group), que quedan en
+// la cache de respuestas si está activada.
+
+type warmupPhase struct {
+	Name  string  `json:"name"`
+	Ms    float64 `json:"ms"`
+	Error string  `json:"error,omitempty"`
+}
+
+type warmupKey struct {
+	Endpoint int     `json:"endpoint"`
+	Org      string  `json:"org"`
+	Group    string  `json:"group"`
+	Status   int     `json:"status"`
+	Code     int     `json:"code"`
+	Ms       float64 `json:"ms"`
+}
+
+type warmupReport struct {
+	Phases   []warmupPhase `json:"phases"`
+	Prefetch []warmupKey   `json:"prefetch,omitempty"`
+}
+
+func millisSince(start time.Time) float64 {
+	return float64(time.Since(start)) / float64(time.Millisecond)
+}
+
+func (c *coreClient) warmup(ctx context.Context, requests []batchRequest) warmupReport {
+	var report warmupReport
+	phase := func(name string, fn func() error) bool {
+		start := time.Now()
+		err := fn()
+		result := warmupPhase{Name: name, Ms: millisSince(start)}
+		if err != nil {
+			result.Error = err.Error()
+		}
+		report.Phases = append(report.Phases, result)
+		return err == nil
+	}
+
+	// La credencial de Azure no hace peticiones hasta pedir el primer token,
+	// así que el token se mide junto con la lectura de secretos.
+	if !phase("credential", func() error {
+		_, err := c.secretsClient()
+		return err
+	}) {
+		return report
+	}
+
+	var baseURL string
+	if !phase("secrets", func() (err error) {
+		baseURL, _, err = c.getSecretsFromVault(ctx)
+		return err
+	}) {
+		return report
+	}
+
+	phase("connect", func() error {
+		req, err := http.NewRequestWithContext(ctx, http.MethodHead, baseURL, nil)
+		if err != nil {
+			return err
+		}
+		resp, err := sharedTransport.do(req)
+		if err != nil {
+			return err
+		}
+		io.Copy(io.Discard, resp.Body)
+		return resp.Body.Close()
+	})
+
+	if len(requests) == 0 {
+		return report
+	}
+	report.Prefetch = make([]warmupKey, len(requests))
+	phase("prefetch", func() error {
+		var wg sync.WaitGroup
+		for i, request := range requests {
+			wg.Add(1)
+			go func(i int, request batchRequest) {
+				defer wg.Done()
+				start := time.Now()
+				result := c.fetch(ctx, request.Endpoint, request.Org, request.Group)
+				report.Prefetch[i] = warmupKey{
+					Endpoint: request.Endpoint,
+					Org:      request.Org,
+					Group:    request.Group,
+					Status:   result.status,
+					Code:     result.code,
+					Ms:       millisSince(start),
+				}
+			}(i, request)
+		}
+		wg.Wait()
+		for _, key := range report.Prefetch {
+			if key.Code != resultOK {
+				return fmt.Errorf("%s org=%s group=%s failed with code %d", endpointPaths[key.Endpoint], key.Org, key.Group, key.Code)
+			}
+		}
+		return nil
+	})
+	return report
+}
+
+// ClientWarmup precalienta el cliente y precarga las peticiones indicadas
+// ([{"endpoint", "org", "group"}] en JSON, puede ser vacío). timeoutMs y token
+// como en ClientFetch. Devuelve un informe JSON con la duración de cada fase,
+// o {"error": ...}; debe liberarse con FreeCString.
+//
+//export ClientWarmup
+func ClientWarmup(handle C.longlong, requestsJSON *C.char, timeoutMs C.longlong, token C.longlong) *C.char {
+	client, ok := lookupClient(handle)
+	if !ok {
+		return C.CString(errorJSON("Invalid client handle", fmt.Errorf("%d", int64(handle))))
+	}
+	var requests []batchRequest
+	if raw := C.GoString(requestsJSON); raw != "" {
+		if err := json.Unmarshal([]byte(raw), &requests); err != nil {
+			return C.CString(errorJSON("Invalid warmup requests", err))
+		}
+	}
+	for _, request := range requests {
+		if request.Endpoint < 0 || request.Endpoint >= len(endpointPaths) {
+			return C.CString(errorJSON("Unknown endpoint", fmt.Errorf("%d", request.Endpoint)))
+		}
+	}
+	ctx, cancel := callContext(timeoutMs, token)
+	defer cancel()
+	data, _ := json.Marshal(client.warmup(ctx, requests))
+	return C.CString(string(data))
+}
+
+// ============ PETICIONES ASÍNCRONAS ============
+
+// Las peticiones asíncronas se ejecutan en una goroutine. Al terminar, el id de
+// la petición se escribe (8 bytes, little endian) en el descriptor de
+// notificación registrado por el llamador, que recoge el resultado con
+// AsyncTakeResult. Así un bucle de eventos puede esperar miles de peticiones
+// sin un hilo por petición.
+
+type asyncRequest struct {
+	cancel context.CancelFunc
+	result *fetchResult
+}
+
+var (
+	asyncMu       sync.Mutex
+	asyncRequests = make(map[int64]*asyncRequest)
+	nextAsyncID   int64
+
+	notifiersMu sync.Mutex
+	notifiers   = make(map[int]*os.File)
+)
+
+// RegisterNotifyFD registra el extremo de escritura de un pipe para las
+// notificaciones de ClientStartAsync. La librería toma posesión del
+// descriptor y lo cierra en CloseNotifyFD.
+//
+//export RegisterNotifyFD
+func RegisterNotifyFD(fd C.int) {
+	notifiersMu.Lock()
+	defer notifiersMu.Unlock()
+	notifiers[int(fd)] = os.NewFile(uintptr(fd), "corehey-notify")
+}
+
+//export CloseNotifyFD
+func CloseNotifyFD(fd C.int) {
+	notifiersMu.Lock()
+	f, ok := notifiers[int(fd)]
+	delete(notifiers, int(fd))
+	notifiersMu.Unlock()
+	if ok {
+		f.Close()
+	}
+}
+
+func notify(fd int, id int64) {
+	notifiersMu.Lock()
+	f, ok := notifiers[fd]
+	notifiersMu.Unlock()
+	if !ok {
+		return
+	}
+	var buf [8]byte
+	for i := range buf {
+		buf[i] = byte(uint64(id) >> (8 * i))
+	}
+	f.Write(buf[:])
 }
 
-// Requerido para -buildmode=c-shared
-func main() {}
+// ClientStartAsync lanza la consulta de endpoint en segundo plano y devuelve
+// su id (> 0), o 0 si notifyFD no está registrado. timeoutMs y token como en
+// ClientFetch.
+//
+//export ClientStartAsync
+func ClientStartAsync(handle C.longlong, endpoint C.int, org *C.char, group *C.char, timeoutMs C.longlong, token C.longlong, notifyFD C.int) C.longlong {
+	notifiersMu.Lock()
+	_, registered := notifiers[int(notifyFD)]
+	notifiersMu.Unlock()
+	if !registered {
+		return 0
+	}
+
+	goOrg, goGroup := C.GoString(org), C.GoString(group)
+	client, ok := lookupClient(handle)
+	ctx, cancel := callContext(timeoutMs, token)
+
+	asyncMu.Lock()
+	nextAsyncID++
+	id := nextAsyncID
+	request := &asyncRequest{cancel: cancel}
+	asyncRequests[id] = request
+	asyncMu.Unlock()
+
+	go func() {
+		defer cancel()
+		var result fetchResult
+		if ok {
+			result = client.fetch(ctx, int(endpoint), goOrg, goGroup)
+		} else {
+			result = errorResult(resultErrHandle, "Invalid client handle", fmt.Errorf("%d", int64(handle)))
+		}
+
+		asyncMu.Lock()
+		_, pending := asyncRequests[id]
+		if pending {
+			request.result = &result
+		}
+		asyncMu.Unlock()
+
+		// Las peticiones canceladas ya no esperan notificación
+		if pending {
+			notify(int(notifyFD), id)
+		}
+	}()
+	return C.longlong(id)
+}
+
+// AsyncTakeResult devuelve el resultado de una petición terminada (y la
+// olvida), o NULL si aún no terminó o el id no existe.
+//
+//export AsyncTakeResult
+func AsyncTakeResult(id C.longlong) *C.CoreHeyResult {
+	asyncMu.Lock()
+	request, ok := asyncRequests[int64(id)]
+	if !ok || request.result == nil {
+		asyncMu.Unlock()
+		return nil
+	}
+	delete(asyncRequests, int64(id))
+	asyncMu.Unlock()
+	return newCResult(*request.result)
+}
+
+// AsyncCancel aborta una petición en curso y descarta su resultado.
+//
+//export AsyncCancel
+func AsyncCancel(id C.longlong) {
+	asyncMu.Lock()
+	request, ok := asyncRequests[int64(id)]
+	delete(asyncRequests, int64(id))
+	asyncMu.Unlock()
+	if ok {
+		request.cancel()
+	}
+}
+
+// ============ RESPUESTAS EN STREAMING ============
+
+// Un stream entrega el cuerpo de una respuesta a medida que llega, copiándolo
+// directamente de la conexión al buffer del llamador, sin reunirlo entero en
+// memoria de Go ni de C. Sirve para los payloads grandes: la memoria usada no
+// depende del tamaño de la respuesta y Python puede procesar el principio
+// mientras se descarga el resto. Los streams no se agrupan (single-flight) ni
+// guardan la respuesta en la cache, pero sí sirven una entrada vigente (o
+// expirada, que se revalida aparte) desde ella.
+
+// responseStream es un cuerpo de respuesta pendiente de leer. El plazo de la
+// llamada cubre también la lectura.
+type responseStream struct {
+	mu       sync.Mutex
+	ctx      context.Context
+	cancel   context.CancelFunc
+	body     io.ReadCloser
+	release  func()
+	endpoint string
+	status   int
+	start    time.Time
+	code     int
+	done     bool
+}
+
+// openStream consulta endpoint y devuelve la cabecera del resultado (cuerpo
+// vacío) y el stream con el cuerpo. Si la llamada falla, o la API responde
+// con un status que no es 2xx, devuelve el mismo fetchResult que fetch y
+// ningún stream. El stream se queda con ctx y cancel.
+func (c *coreClient) openStream(ctx context.Context, cancel context.CancelFunc, endpoint int, org, group string) (fetchResult, *responseStream) {
+	if endpoint < 0 || endpoint >= len(endpointPaths) {
+		cancel()
+		return errorResult(resultErrEndpoint, "Unknown endpoint", fmt.Errorf("%d", endpoint)), nil
+	}
+	path := endpointPaths[endpoint]
+	stream := &responseStream{ctx: ctx, cancel: cancel, release: func() {}, endpoint: endpointName(path), start: time.Now()}
+	fail := func(result fetchResult) (fetchResult, *responseStream) {
+		cancel()
+		metrics.count("streams", stream.endpoint, result.code)
+		return result, nil
+	}
+
+	if cache := responseCacheStore.Load(); cache != nil {
+		key := responseKey(path, org, group, c.vaultURL)
+		result, state, cached := cache.lookup(key)
+		if state != cacheMiss {
+			if state == cacheStale {
+				c.revalidateInBackground(cache, key, endpoint, org, group, cached)
+			}
+			stream.body = io.NopCloser(bytes.NewReader(result.body))
+			stream.status = result.status
+			result.body = nil
+			return result, stream
+		}
+	}
+
+	ctx = c.requestContext(ctx, path)
+	req, release, failure, ok := c.newRequest(ctx, path, org, group, validators{})
+	if !ok {
+		return fail(failure)
+	}
+	resp, result := upstream.open(ctx, req)
+	if resp == nil {
+		release()
+		return fail(attemptResult(ctx, result))
+	}
+
+	stream.body, stream.release, stream.status = resp.Body, release, resp.StatusCode
+	header := fetchResult{status: resp.StatusCode, index: -1}
+	header.etag = resp.Header.Get("ETag")
+	header.lastModified = resp.Header.Get("Last-Modified")
+	return header, stream
+}
+
+// read copia en p el siguiente trozo del cuerpo. Devuelve los bytes leídos
+// (> 0), o 0 y el código con el que terminó el stream: resultOK al final del
+// cuerpo, resultErrRead, resultErrTimeout o resultErrCanceled si falló.
+func (s *responseStream) read(p []byte) (int, int) {
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	for !s.done {
+		n, err := s.body.Read(p)
+		if n > 0 {
+			return n, resultOK
+		}
+		switch {
+		case err == io.EOF:
+			s.finish(resultOK)
+		case err != nil && s.ctx.Err() != nil:
+			s.finish(canceledResult(s.ctx.Err()).code)
+		case err != nil:
+			s.finish(resultErrRead)
+		}
+	}
+	return 0, s.code
+}
+
+// close termina el stream; si no se leyó entero cuenta como cancelado.
+func (s *responseStream) close() {
+	// Cancelar antes de tomar el mutex desbloquea una lectura en curso
+	s.cancel()
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	if !s.done {
+		s.finish(resultErrCanceled)
+	}
+}
+
+func (s *responseStream) finish(code int) {
+	s.done, s.code = true, code
+	s.body.Close()
+	s.release()
+	s.cancel()
+	if metrics.enabled.Load() {
+		metrics.observeSince("stream", s.endpoint, s.status, s.start)
+		metrics.count("streams", s.endpoint, code)
+	}
+}
+
+var (
+	streamsMu    sync.Mutex
+	streams      = make(map[int64]*responseStream)
+	nextStreamID int64
+)
+
+func lookupStream(id C.longlong) (*responseStream, bool) {
+	streamsMu.Lock()
+	defer streamsMu.Unlock()
+	s, ok := streams[int64(id)]
+	return s, ok
+}
+
+// ClientOpenStream consulta endpoint como ClientFetch pero sin leer el cuerpo:
+// el resultado trae el status y los validadores con el cuerpo vacío, y
+// streamOut recibe el id del stream (> 0) del que se lee con StreamRead. Si la
+// llamada falla el resultado es el de ClientFetch y streamOut queda en 0.
+// timeoutMs y token limitan también la lectura del cuerpo. El resultado debe
+// liberarse con FreeResult y el stream con CloseStream.
+//
+//export ClientOpenStream
+func ClientOpenStream(handle C.longlong, endpoint C.int, org *C.char, group *C.char, timeoutMs C.longlong, token C.longlong, streamOut *C.longlong) *C.CoreHeyResult {
+	*streamOut = 0
+	client, ok := lookupClient(handle)
+	if !ok {
+		return newCResult(errorResult(resultErrHandle, "Invalid client handle", fmt.Errorf("%d", int64(handle))))
+	}
+	ctx, cancel := callContext(timeoutMs, token)
+	result, stream := client.openStream(ctx, cancel, int(endpoint), C.GoString(org), C.GoString(group))
+	if stream != nil {
+		streamsMu.Lock()
+		nextStreamID++
+		streams[nextStreamID] = stream
+		*streamOut = C.longlong(nextStreamID)
+		streamsMu.Unlock()
+	}
+	return newCResult(result)
+}
+
+// StreamRead copia en buf hasta size bytes del cuerpo, bloqueando hasta que
+// llegue alguno. Devuelve los bytes copiados, 0 al final del cuerpo o -code
+// si la lectura falló (-resultErrHandle si el stream no existe).
+//
+//export StreamRead
+func StreamRead(streamID C.longlong, buf *C.char, size C.longlong) C.longlong {
+	s, ok := lookupStream(streamID)
+	if !ok {
+		return -resultErrHandle
+	}
+	if size <= 0 {
+		return 0
+	}
+	n, code := s.read(unsafe.Slice((*byte)(unsafe.Pointer(buf)), int(size)))
+	if n == 0 {
+		return C.longlong(-code)
+	}
+	return C.longlong(n)
+}
+
+// CloseStream libera el stream y su conexión; si no se leyó entero, la
+// conexión se cierra en lugar de volver al pool.
+//
+//export CloseStream
+func CloseStream(streamID C.longlong) {
+	streamsMu.Lock()
+	s, ok := streams[int64(streamID)]
+	delete(streams, int64(streamID))
+	streamsMu.Unlock()
+	if ok {
+		s.close()
+	}
+}
+
+// ============ CACHE DE RESPUESTAS ============
+
+// ResponseCacheConfig activa la cache de respuestas (LRU + TTL +
+// stale-while-revalidate) compartida por todos los clientes del proceso. Los
+// campos en cero usan el valor por defecto.
+type ResponseCacheConfig struct {
+	Enabled                     bool  `json:"enabled"`
+	MaxEntries                  int   `json:"max_entries,omitempty"`
+	MaxBytes                    int64 `json:"max_bytes,omitempty"`
+	QuickRepliesTTLSeconds      int   `json:"quick_replies_ttl_seconds,omitempty"`
+	TypificationTTLSeconds      int   `json:"typification_ttl_seconds,omitempty"`
+	StaleWhileRevalidateSeconds int   `json:"stale_while_revalidate_seconds,omitempty"`
+}
+
+const (
+	defaultCacheMaxEntries = 1024
+	defaultCacheMaxBytes   = 64 << 20
+	defaultCacheTTL        = 5 * time.Minute
+	defaultCacheSWR        = 1 * time.Minute
+)
+
+const (
+	cacheMiss = iota
+	cacheFresh
+	cacheStale
+)
+
+type cacheEntry struct {
+	key          string
+	endpoint     int
+	status       int
+	body         []byte
+	validators   validators
+	fetchedAt    time.Time // última vez que la API confirmó el contenido
+	freshUntil   time.Time
+	staleUntil   time.Time
+	revalidating bool
+}
+
+func (e *cacheEntry) size() int64 {
+	return int64(len(e.key) + len(e.body))
+}
+
+// responseCache es una LRU acotada por número de entradas y por bytes. Las
+// entradas expiradas se siguen sirviendo (marcadas como stale) durante la
+// ventana stale-while-revalidate mientras se refrescan en segundo plano.
+// Pasada esa ventana la entrada ya no se sirve, pero se conserva hasta que la
+// LRU la desaloje para poder revalidarla con una petición condicional.
+type responseCache struct {
+	mu         sync.Mutex
+	maxEntries int
+	maxBytes   int64
+	ttls       []time.Duration
+	swr        time.Duration
+	lru        *list.List
+	entries    map[string]*list.Element
+	bytes      int64
+
+	// pinned son las claves que mantiene el planificador de refresco: no se
+	// desalojan y su último valor bueno se sigue sirviendo aunque expire.
+	pinned map[string]bool
+
+	// changes cuenta las altas y renovaciones, para saber si hay que volver a
+	// escribir la instantánea en disco.
+	changes atomic.Int64
+
+	hits          atomic.Int64
+	staleHits     atomic.Int64
+	misses        atomic.Int64
+	evictions     atomic.Int64
+	uncacheable   atomic.Int64
+	revalidations atomic.Int64
+	notModified   atomic.Int64
+}
+
+// responseCacheStore es nil mientras la cache está desactivada.
+var responseCacheStore atomic.Pointer[responseCache]
+
+func newResponseCache(config ResponseCacheConfig) *responseCache {
+	seconds := func(value int, fallback time.Duration) time.Duration {
+		if value > 0 {
+			return time.Duration(value) * time.Second
+		}
+		return fallback
+	}
+
+	c := &responseCache{
+		maxEntries: config.MaxEntries,
+		maxBytes:   config.MaxBytes,
+		ttls: []time.Duration{
+			endpointQuickReplies: seconds(config.QuickRepliesTTLSeconds, defaultCacheTTL),
+			endpointTypification: seconds(config.TypificationTTLSeconds, defaultCacheTTL),
+		},
+		swr:     defaultCacheSWR,
+		lru:     list.New(),
+		entries: make(map[string]*list.Element),
+		pinned:  make(map[string]bool),
+	}
+	if c.maxEntries <= 0 {
+		c.maxEntries = defaultCacheMaxEntries
+	}
+	if c.maxBytes <= 0 {
+		c.maxBytes = defaultCacheMaxBytes
+	}
+	if config.StaleWhileRevalidateSeconds > 0 {
+		c.swr = time.Duration(config.StaleWhileRevalidateSeconds) * time.Second
+	} else if config.StaleWhileRevalidateSeconds < 0 {
+		c.swr = 0
+	}
+	return c
+}
+
+func responseKey(path, org, group, vaultURL string) string {
+	return path + "|" + org + "|" + group + "|" + vaultURL
+}
+
+// cacheable indica si un resultado puede guardarse: sólo respuestas 2xx sin
+// error, y nunca un cuerpo {"error": ...}.
+func cacheable(result fetchResult) bool {
+	if result.code != resultOK || result.status < 200 || result.status >= 300 {
+		return false
+	}
+	return !bytes.HasPrefix(bytes.TrimLeft(result.body, " \t\r\n"), []byte(`{"error"`))
+}
+
+// lookup busca key en la cache. Además del resultado y su estado devuelve los
+// validadores de la entrada, también cuando expiró del todo (cacheMiss).
+func (c *responseCache) lookup(key string) (fetchResult, int, validators) {
+	now := time.Now()
+
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	element, ok := c.entries[key]
+	if !ok {
+		c.misses.Add(1)
+		return fetchResult{}, cacheMiss, validators{}
+	}
+	entry := element.Value.(*cacheEntry)
+	result := entry.result()
+
+	switch {
+	case now.Before(entry.freshUntil):
+		c.lru.MoveToFront(element)
+		c.hits.Add(1)
+		return result, cacheFresh, entry.validators
+	case now.Before(entry.staleUntil) || c.pinned[key]:
+		c.lru.MoveToFront(element)
+		c.staleHits.Add(1)
+		result.flags |= resultFlagStale
+		return result, cacheStale, entry.validators
+	default:
+		c.misses.Add(1)
+		return fetchResult{}, cacheMiss, entry.validators
+	}
+}
+
+func (e *cacheEntry) result() fetchResult {
+	result := fetchResult{status: e.status, body: e.body, index: -1, flags: resultFlagCached}
+	result.validators = e.validators
+	return result
+}
+
+// renew extiende la vida de una entrada tras una respuesta 304 y la devuelve.
+func (c *responseCache) renew(key string, endpoint int) (fetchResult, bool) {
+	now := time.Now()
+
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	element, ok := c.entries[key]
+	if !ok {
+		return fetchResult{}, false
+	}
+	c.notModified.Add(1)
+	c.changes.Add(1)
+	entry := element.Value.(*cacheEntry)
+	entry.fetchedAt = now
+	entry.freshUntil = now.Add(c.ttls[endpoint])
+	entry.staleUntil = entry.freshUntil.Add(c.swr)
+	entry.revalidating = false
+	c.lru.MoveToFront(element)
+	return entry.result(), true
+}
+
+func (c *responseCache) store(key string, endpoint int, result fetchResult) {
+	if result.flags&resultFlagCached != 0 {
+		// Entrada renovada por un 304: ya está en la cache
+		return
+	}
+	if !cacheable(result) {
+		c.uncacheable.Add(1)
+		return
+	}
+	now := time.Now()
+	entry := &cacheEntry{
+		key:        key,
+		endpoint:   endpoint,
+		status:     result.status,
+		body:       result.body,
+		validators: result.validators,
+		fetchedAt:  now,
+		freshUntil: now.Add(c.ttls[endpoint]),
+	}
+	entry.staleUntil = entry.freshUntil.Add(c.swr)
+	if entry.size() > c.maxBytes {
+		c.uncacheable.Add(1)
+		return
+	}
+
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	if element, ok := c.entries[key]; ok {
+		c.removeElement(element)
+	}
+	c.entries[key] = c.lru.PushFront(entry)
+	c.bytes += entry.size()
+	c.changes.Add(1)
+	c.evict()
+}
+
+// evict desaloja desde la cola de la LRU, saltándose las claves fijadas, hasta
+// respetar los límites de la cache.
+func (c *responseCache) evict() {
+	for c.lru.Len() > c.maxEntries || c.bytes > c.maxBytes {
+		victim := c.lru.Back()
+		for victim != nil && c.pinned[victim.Value.(*cacheEntry).key] {
+			victim = victim.Prev()
+		}
+		if victim == nil {
+			break
+		}
+		c.removeElement(victim)
+		c.evictions.Add(1)
+	}
+}
+
+// validatorsFor devuelve los validadores de key sin contar un acceso.
+func (c *responseCache) validatorsFor(key string) validators {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if element, ok := c.entries[key]; ok {
+		return element.Value.(*cacheEntry).validators
+	}
+	return validators{}
+}
+
+func (c *responseCache) setPinned(key string, pinned bool) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if pinned {
+		c.pinned[key] = true
+	} else {
+		delete(c.pinned, key)
+	}
+}
+
+// startRevalidation marca la entrada como "revalidando". Devuelve false si
+// otra goroutine ya la está refrescando.
+func (c *responseCache) startRevalidation(key string) bool {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	element, ok := c.entries[key]
+	if !ok {
+		return false
+	}
+	entry := element.Value.(*cacheEntry)
+	if entry.revalidating {
+		return false
+	}
+	entry.revalidating = true
+	c.revalidations.Add(1)
+	return true
+}
+
+// finishRevalidation cierra un refresco en segundo plano. Si falló, la entrada
+// anterior se sigue sirviendo hasta el final de su ventana stale.
+func (c *responseCache) finishRevalidation(key string, endpoint int, result fetchResult) {
+	if result.flags&resultFlagCached != 0 {
+		return
+	}
+	if cacheable(result) {
+		c.store(key, endpoint, result)
+		return
+	}
+	c.uncacheable.Add(1)
+
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if element, ok := c.entries[key]; ok {
+		element.Value.(*cacheEntry).revalidating = false
+	}
+}
+
+func (c *responseCache) removeElement(element *list.Element) {
+	entry := c.lru.Remove(element).(*cacheEntry)
+	delete(c.entries, entry.key)
+	c.bytes -= entry.size()
+}
+
+func (c *responseCache) clear() {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	c.lru.Init()
+	c.entries = make(map[string]*list.Element)
+	c.bytes = 0
+}
+
+type responseCacheStats struct {
+	Enabled       bool  `json:"enabled"`
+	Entries       int   `json:"entries"`
+	Bytes         int64 `json:"bytes"`
+	Hits          int64 `json:"hits"`
+	StaleHits     int64 `json:"stale_hits"`
+	Misses        int64 `json:"misses"`
+	Evictions     int64 `json:"evictions"`
+	Uncacheable   int64 `json:"uncacheable"`
+	Revalidations int64 `json:"revalidations"`
+	NotModified   int64 `json:"not_modified"`
+}
+
+func (c *responseCache) stats() responseCacheStats {
+	c.mu.Lock()
+	entries, size := c.lru.Len(), c.bytes
+	c.mu.Unlock()
+
+	return responseCacheStats{
+		Enabled:       true,
+		Entries:       entries,
+		Bytes:         size,
+		Hits:          c.hits.Load(),
+		StaleHits:     c.staleHits.Load(),
+		Misses:        c.misses.Load(),
+		Evictions:     c.evictions.Load(),
+		Uncacheable:   c.uncacheable.Load(),
+		Revalidations: c.revalidations.Load(),
+		NotModified:   c.notModified.Load(),
+	}
+}
+
+// ConfigureResponseCache activa (o desactiva, con "enabled": false) la cache
+// de respuestas. Reconfigurar vacía la cache. Devuelve NULL si todo fue bien o
+// un mensaje de error que debe liberarse con FreeCString.
+//
+//export ConfigureResponseCache
+func ConfigureResponseCache(configJSON *C.char) *C.char {
+	var config ResponseCacheConfig
+	if err := json.Unmarshal([]byte(C.GoString(configJSON)), &config); err != nil {
+		return C.CString(fmt.Sprintf("invalid response cache config: %v", err))
+	}
+	if config.Enabled {
+		responseCacheStore.Store(newResponseCache(config))
+	} else {
+		responseCacheStore.Store(nil)
+	}
+	return nil
+}
+
+//export ClearResponseCache
+func ClearResponseCache() {
+	if cache := responseCacheStore.Load(); cache != nil {
+		cache.clear()
+	}
+}
+
+//export GetResponseCacheStats
+func GetResponseCacheStats() *C.char {
+	stats := responseCacheStats{}
+	if cache := responseCacheStore.Load(); cache != nil {
+		stats = cache.stats()
+	}
+	data, _ := json.Marshal(stats)
+	return C.CString(string(data))
+}
+
+// ============ INSTANTÁNEA EN DISCO ============
+
+// La instantánea guarda en disco las respuestas de la cache para arrancar en
+// caliente tras un despliegue y seguir sirviendo durante una caída de Azure o
+// de la API. Al cargarla, las entradas entran ya expiradas: se sirven al
+// momento marcadas como stale mientras se revalidan en segundo plano, hasta
+// max_age_seconds desde la última vez que la API confirmó su contenido.
+//
+// Formato (enteros little-endian):
+//
+//	cabecera: "LCHSNAP1" | int64 creada (unix nano) | uint32 entradas
+//	entrada:  uint8 endpoint | uint16 status | int64 fetchedAt (unix nano) |
+//	          uint16+clave | uint16+etag | uint16+last-modified | uint32+cuerpo
+//	final:    uint32 CRC-32C de todo lo anterior
+//
+// Se escribe en un fichero temporal del mismo directorio que luego se renombra,
+// así que un lector nunca ve una instantánea a medias.
+
+// SnapshotConfig activa la instantánea en disco. Un path vacío la desactiva.
+type SnapshotConfig struct {
+	Path                string `json:"path"`
+	MaxBytes            int64  `json:"max_bytes,omitempty"`
+	MaxAgeSeconds       int    `json:"max_age_seconds,omitempty"`
+	SaveIntervalSeconds int    `json:"save_interval_seconds,omitempty"`
+}
+
+const (
+	snapshotMagic               = "LCHSNAP1"
+	defaultSnapshotMaxBytes     = 32 << 20
+	defaultSnapshotMaxAge       = 24 * time.Hour
+	defaultSnapshotSaveInterval = 1 * time.Minute
+)
+
+var snapshotChecksum = crc32.MakeTable(crc32.Castagnoli)
+
+type snapshotManager struct {
+	mu           sync.Mutex
+	path         string
+	maxBytes     int64
+	maxAge       time.Duration
+	saveInterval time.Duration
+	stop         chan struct{}
+	savedChanges int64
+
+	loaded    int
+	skipped   int
+	saves     int64
+	lastSave  time.Time
+	lastSize  int64
+	lastSaved int
+	lastError string
+}
+
+var snapshots = &snapshotManager{}
+
+// configure aplica la configuración, carga la instantánea existente en la cache
+// de respuestas (que se activa con los valores por defecto si hace falta) y
+// arranca el guardado periódico.
+func (m *snapshotManager) configure(config SnapshotConfig) error {
+	m.mu.Lock()
+	defer m.mu.Unlock()
+
+	if m.stop != nil {
+		close(m.stop)
+		m.stop = nil
+	}
+	m.path = config.Path
+	if m.path == "" {
+		return nil
+	}
+
+	m.maxBytes = config.MaxBytes
+	if m.maxBytes <= 0 {
+		m.maxBytes = defaultSnapshotMaxBytes
+	}
+	m.maxAge = defaultSnapshotMaxAge
+	if config.MaxAgeSeconds > 0 {
+		m.maxAge = time.Duration(config.MaxAgeSeconds) * time.Second
+	}
+	m.saveInterval = defaultSnapshotSaveInterval
+	if config.SaveIntervalSeconds > 0 {
+		m.saveInterval = time.Duration(config.SaveIntervalSeconds) * time.Second
+	} else if config.SaveIntervalSeconds < 0 {
+		m.saveInterval = 0
+	}
+
+	cache := responseCacheStore.Load()
+	if cache == nil {
+		responseCacheStore.CompareAndSwap(nil, newResponseCache(ResponseCacheConfig{Enabled: true}))
+		cache = responseCacheStore.Load()
+	}
+
+	m.loaded, m.skipped, m.lastError = 0, 0, ""
+	entries, err := readSnapshot(m.path, m.maxBytes)
+	if err != nil && !os.IsNotExist(err) {
+		m.lastError = err.Error()
+	}
+	now := time.Now()
+	fresh := entries[:0]
+	for _, entry := range entries {
+		if entry.endpoint < 0 || entry.endpoint >= len(endpointPaths) || now.Sub(entry.fetchedAt) > m.maxAge {
+			m.skipped++
+			continue
+		}
+		entry.staleUntil = entry.fetchedAt.Add(m.maxAge)
+		fresh = append(fresh, entry)
+	}
+	m.loaded = cache.restore(fresh)
+	m.skipped += len(fresh) - m.loaded
+	m.savedChanges = cache.changes.Load()
+
+	if m.saveInterval > 0 {
+		m.stop = make(chan struct{})
+		go m.saveLoop(m.stop, m.saveInterval)
+	}
+	return nil
+}
+
+func (m *snapshotManager) saveLoop(stop chan struct{}, interval time.Duration) {
+	ticker := time.NewTicker(interval)
+	defer ticker.Stop()
+	for {
+		select {
+		case <-stop:
+			return
+		case <-ticker.C:
+			m.save(false)
+		}
+	}
+}
+
+// save escribe la instantánea. Sin force, sólo si la cache cambió desde la
+// última escritura.
+func (m *snapshotManager) save(force bool) error {
+	m.mu.Lock()
+	defer m.mu.Unlock()
+
+	cache := responseCacheStore.Load()
+	if m.path == "" || cache == nil {
+		return nil
+	}
+	changes := cache.changes.Load()
+	if !force && changes == m.savedChanges {
+		return nil
+	}
+
+	saved, size, err := writeSnapshot(m.path, cache.snapshot(), m.maxBytes)
+	if err != nil {
+		m.lastError = err.Error()
+		return err
+	}
+	m.savedChanges = changes
+	m.saves++
+	m.lastSave = time.Now()
+	m.lastSize = size
+	m.lastSaved = saved
+	m.lastError = ""
+	return nil
+}
+
+// snapshot copia las entradas de la cache, de la más a la menos reciente.
+func (c *responseCache) snapshot() []*cacheEntry {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	entries := make([]*cacheEntry, 0, c.lru.Len())
+	for element := c.lru.Front(); element != nil; element = element.Next() {
+		entry := *element.Value.(*cacheEntry)
+		entries = append(entries, &entry)
+	}
+	return entries
+}
+
+// restore añade entradas leídas de disco por detrás de las que ya hay (que son
+// más recientes) mientras quepan. Devuelve cuántas añadió.
+func (c *responseCache) restore(entries []*cacheEntry) int {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	restored := 0
+	for _, entry := range entries {
+		if _, ok := c.entries[entry.key]; ok {
+			continue
+		}
+		if c.lru.Len() >= c.maxEntries || c.bytes+entry.size() > c.maxBytes {
+			break
+		}
+		c.entries[entry.key] = c.lru.PushBack(entry)
+		c.bytes += entry.size()
+		restored++
+	}
+	return restored
+}
+
+// writeSnapshot guarda las entradas, empezando por las más recientes, sin
+// pasar de maxBytes. Devuelve cuántas entradas y bytes escribió.
+func writeSnapshot(path string, entries []*cacheEntry, maxBytes int64) (int, int64, error) {
+	var buf bytes.Buffer
+	buf.WriteString(snapshotMagic)
+	binary.Write(&buf, binary.LittleEndian, time.Now().UnixNano())
+	countAt := buf.Len()
+	binary.Write(&buf, binary.LittleEndian, uint32(0))
+
+	var record bytes.Buffer
+	count := 0
+	for _, entry := range entries {
+		if len(entry.key) > 0xffff || len(entry.validators.etag) > 0xffff || len(entry.validators.lastModified) > 0xffff {
+			continue
+		}
+		record.Reset()
+		record.WriteByte(byte(entry.endpoint))
+		binary.Write(&record, binary.LittleEndian, uint16(entry.status))
+		binary.Write(&record, binary.LittleEndian, entry.fetchedAt.UnixNano())
+		for _, field := range []string{entry.key, entry.validators.etag, entry.validators.lastModified} {
+			binary.Write(&record, binary.LittleEndian, uint16(len(field)))
+			record.WriteString(field)
+		}
+		binary.Write(&record, binary.LittleEndian, uint32(len(entry.body)))
+		record.Write(entry.body)
+
+		if int64(buf.Len()+record.Len()+4) > maxBytes {
+			break
+		}
+		buf.Write(record.Bytes())
+		count++
+	}
+	data := buf.Bytes()
+	binary.LittleEndian.PutUint32(data[countAt:], uint32(count))
+	data = binary.LittleEndian.AppendUint32(data, crc32.Checksum(data, snapshotChecksum))
+
+	dir := filepath.Dir(path)
+	if err := os.MkdirAll(dir, 0o755); err != nil {
+		return 0, 0, err
+	}
+	file, err := os.CreateTemp(dir, "."+filepath.Base(path)+".tmp-*")
+	if err != nil {
+		return 0, 0, err
+	}
+	tmp := file.Name()
+	if _, err = file.Write(data); err == nil {
+		err = file.Sync()
+	}
+	if closeErr := file.Close(); err == nil {
+		err = closeErr
+	}
+	if err == nil {
+		err = os.Rename(tmp, path)
+	}
+	if err != nil {
+		os.Remove(tmp)
+		return 0, 0, err
+	}
+	return count, int64(len(data)), nil
+}
+
+// readSnapshot lee y valida una instantánea. Un fichero corrupto o truncado se
+// descarta entero.
+func readSnapshot(path string, maxBytes int64) ([]*cacheEntry, error) {
+	file, err := os.Open(path)
+	if err != nil {
+		return nil, err
+	}
+	defer file.Close()
+
+	data, err := io.ReadAll(io.LimitReader(file, maxBytes+1))
+	if err != nil {
+		return nil, err
+	}
+	if int64(len(data)) > maxBytes {
+		return nil, fmt.Errorf("snapshot %s is larger than %d bytes", path, maxBytes)
+	}
+	headerSize := len(snapshotMagic) + 8 + 4
+	if len(data) < headerSize+4 || string(data[:len(snapshotMagic)]) != snapshotMagic {
+		return nil, fmt.Errorf("snapshot %s has an unknown format", path)
+	}
+	payload := data[:len(data)-4]
+	if crc32.Checksum(payload, snapshotChecksum) != binary.LittleEndian.Uint32(data[len(payload):]) {
+		return nil, fmt.Errorf("snapshot %s is corrupt (checksum mismatch)", path)
+	}
+
+	reader := binaryReader{data: payload[headerSize:]}
+	count := int(binary.LittleEndian.Uint32(payload[headerSize-4:]))
+	entries := make([]*cacheEntry, 0, min(count, 1<<16))
+	for i := 0; i < count; i++ {
+		entry := &cacheEntry{
+			endpoint:  int(reader.uint8()),
+			status:    int(reader.uint16()),
+			fetchedAt: time.Unix(0, int64(reader.uint64())),
+		}
+		entry.key = string(reader.bytes(int(reader.uint16())))
+		entry.validators.etag = string(reader.bytes(int(reader.uint16())))
+		entry.validators.lastModified = string(reader.bytes(int(reader.uint16())))
+		entry.body = reader.bytes(int(reader.uint32()))
+		if reader.err {
+			return nil, fmt.Errorf("snapshot %s is truncated", path)
+		}
+		entries = append(entries, entry)
+	}
+	return entries, nil
+}
+
+// binaryReader lee enteros little-endian y campos con longitud de un buffer
+// (instantáneas y tramas del demonio). Si faltan bytes marca err y devuelve
+// ceros.
+type binaryReader struct {
+	data []byte
+	err  bool
+}
+
+func (r *binaryReader) bytes(n int) []byte {
+	if r.err || n > len(r.data) {
+		r.err = true
+		return nil
+	}
+	value := r.data[:n:n]
+	r.data = r.data[n:]
+	return value
+}
+
+func (r *binaryReader) uint8() uint8 {
+	if b := r.bytes(1); b != nil {
+		return b[0]
+	}
+	return 0
+}
+
+func (r *binaryReader) uint16() uint16 {
+	if b := r.bytes(2); b != nil {
+		return binary.LittleEndian.Uint16(b)
+	}
+	return 0
+}
+
+func (r *binaryReader) uint32() uint32 {
+	if b := r.bytes(4); b != nil {
+		return binary.LittleEndian.Uint32(b)
+	}
+	return 0
+}
+
+func (r *binaryReader) uint64() uint64 {
+	if b := r.bytes(8); b != nil {
+		return binary.LittleEndian.Uint64(b)
+	}
+	return 0
+}
+
+type snapshotStats struct {
+	Enabled         bool    `json:"enabled"`
+	Path            string  `json:"path,omitempty"`
+	Loaded          int     `json:"loaded"`
+	Skipped         int     `json:"skipped"`
+	Saves           int64   `json:"saves"`
+	LastSaveAgo     float64 `json:"last_save_seconds_ago"`
+	LastSaveEntries int     `json:"last_save_entries"`
+	LastSaveBytes   int64   `json:"last_save_bytes"`
+	LastError       string  `json:"last_error,omitempty"`
+}
+
+func (m *snapshotManager) stats() snapshotStats {
+	m.mu.Lock()
+	defer m.mu.Unlock()
+
+	stats := snapshotStats{
+		Enabled:         m.path != "",
+		Path:            m.path,
+		Loaded:          m.loaded,
+		Skipped:         m.skipped,
+		Saves:           m.saves,
+		LastSaveAgo:     -1,
+		LastSaveEntries: m.lastSaved,
+		LastSaveBytes:   m.lastSize,
+		LastError:       m.lastError,
+	}
+	if !m.lastSave.IsZero() {
+		stats.LastSaveAgo = time.Since(m.lastSave).Seconds()
+	}
+	return stats
+}
+
+// ConfigureSnapshot activa la instantánea en disco y carga la existente en la
+// cache de respuestas. Una instantánea ilegible se ignora (ver
+// GetSnapshotStats). Devuelve NULL o un mensaje de error que debe liberarse
+// con FreeCString.
+//
+//export ConfigureSnapshot
+func ConfigureSnapshot(configJSON *C.char) *C.char {
+	var config SnapshotConfig
+	if err := json.Unmarshal([]byte(C.GoString(configJSON)), &config); err != nil {
+		return C.CString(fmt.Sprintf("invalid snapshot config: %v", err))
+	}
+	if err := snapshots.configure(config); err != nil {
+		return C.CString(err.Error())
+	}
+	return nil
+}
+
+// SaveSnapshot escribe la instantánea ahora. Devuelve NULL o un mensaje de
+// error que debe liberarse con FreeCString.
+//
+//export SaveSnapshot
+func SaveSnapshot() *C.char {
+	if err := snapshots.save(true); err != nil {
+		return C.CString(err.Error())
+	}
+	return nil
+}
+
+//export GetSnapshotStats
+func GetSnapshotStats() *C.char {
+	data, _ := json.Marshal(snapshots.stats())
+	return C.CString(string(data))
+}
+
+// ============ AGRUPACIÓN DE PETICIONES (SINGLE-FLIGHT) ============
+
+// flightGroup agrupa llamadas simultáneas con la misma clave: sólo la primera
+// ejecuta fn y las demás esperan su resultado. fn corre con su propio contexto,
+// de modo que si un llamador se cancela los demás no se ven afectados; la
+// llamada sólo se aborta cuando todos los que esperan se han ido.
+type flightGroup[T any] struct {
+	mu    sync.Mutex
+	calls map[string]*flightCall[T]
+
+	executed  atomic.Int64
+	coalesced atomic.Int64
+}
+
+type flightCall[T any] struct {
+	done    chan struct{}
+	value   T
+	cancel  context.CancelFunc
+	waiters int
+}
+
+var (
+	apiFlights    = &flightGroup[fetchResult]{calls: make(map[string]*flightCall[fetchResult])}
+	secretFlights = &flightGroup[secretValue]{calls: make(map[string]*flightCall[secretValue])}
+)
+
+// do devuelve el resultado de fn para key, compartido con los llamadores
+// simultáneos. Devuelve false si ctx termina antes que la llamada.
+func (g *flightGroup[T]) do(ctx context.Context, key string, fn func(context.Context) T) (T, bool) {
+	g.mu.Lock()
+	call, ok := g.calls[key]
+	if ok {
+		call.waiters++
+		g.mu.Unlock()
+		g.coalesced.Add(1)
+	} else {
+		// Sin plazo propio: cada llamador espera como mucho su propio plazo y la
+		// llamada se aborta cuando ya no queda ninguno esperando.
+		callCtx, cancel := context.WithCancel(context.Background())
+		call = &flightCall[T]{done: make(chan struct{}), cancel: cancel, waiters: 1}
+		g.calls[key] = call
+		g.mu.Unlock()
+		g.executed.Add(1)
+
+		go func() {
+			call.value = fn(callCtx)
+			cancel()
+			g.forget(key, call)
+			close(call.done)
+		}()
+	}
+
+	select {
+	case <-call.done:
+		return call.value, true
+	case <-ctx.Done():
+		g.mu.Lock()
+		call.waiters--
+		abandoned := call.waiters == 0
+		g.mu.Unlock()
+		if abandoned {
+			// Nadie espera ya: se aborta y los próximos llamadores empiezan de cero
+			g.forget(key, call)
+			call.cancel()
+		}
+		var zero T
+		return zero, false
+	}
+}
+
+func (g *flightGroup[T]) forget(key string, call *flightCall[T]) {
+	g.mu.Lock()
+	defer g.mu.Unlock()
+	if g.calls[key] == call {
+		delete(g.calls, key)
+	}
+}
+
+type coalescingStats struct {
+	APICalls        int64 `json:"api_calls"`
+	APICoalesced    int64 `json:"api_coalesced"`
+	SecretCalls     int64 `json:"secret_calls"`
+	SecretCoalesced int64 `json:"secret_coalesced"`
+}
+
+// GetCoalescingStats devuelve cuántas llamadas a la API y al Key Vault se
+// ejecutaron y cuántas se resolvieron esperando una llamada ya en curso.
+//
+//export GetCoalescingStats
+func GetCoalescingStats() *C.char {
+	data, _ := json.Marshal(coalescingStats{
+		APICalls:        apiFlights.executed.Load(),
+		APICoalesced:    apiFlights.coalesced.Load(),
+		SecretCalls:     secretFlights.executed.Load(),
+		SecretCoalesced: secretFlights.coalesced.Load(),
+	})
+	return C.CString(string(data))
+}
+
+// ============ PLANIFICADOR DE REFRESCO (CLAVES CALIENTES) ============
+
+// El planificador mantiene siempre calientes en la cache de respuestas las
+// combinaciones (endpoint, org, group) registradas: las refresca antes de que
+// expiren con un intervalo con jitter, aplica backoff exponencial si la API
+// falla y, mientras tanto, la cache sigue sirviendo el último valor bueno.
+
+const (
+	refreshWorkers      = 8
+	refreshAheadOfTTL   = 0.8 // fracción del TTL tras la cual se refresca
+	refreshJitter       = 0.1 // ±10% sobre el intervalo
+	refreshBackoffBase  = 1 * time.Second
+	refreshBackoffLimit = 5 * time.Minute
+)
+
+type hotKey struct {
+	client   *coreClient
+	endpoint int
+	org      string
+	group    string
+	key      string
+	interval time.Duration
+
+	next        time.Time
+	running     bool
+	failures    int
+	lastSuccess time.Time
+	lastLatency time.Duration
+	lastError   string
+	refreshes   int64
+	errors      int64
+}
+
+type refreshScheduler struct {
+	mu      sync.Mutex
+	keys    map[string]*hotKey
+	wake    chan struct{}
+	jobs    chan *hotKey
+	started bool
+}
+
+var hotKeys = &refreshScheduler{
+	keys: make(map[string]*hotKey),
+	wake: make(chan struct{}, 1),
+	jobs: make(chan *hotKey),
+}
+
+func jittered(d time.Duration) time.Duration {
+	return time.Duration(float64(d) * (1 + refreshJitter*(2*rand.Float64()-1)))
+}
+
+// register añade (o actualiza) claves calientes. Con interval <= 0 se refrescan
+// al 80% del TTL de su endpoint. La cache de respuestas se activa con los
+// valores por defecto si estaba desactivada.
+func (s *refreshScheduler) register(client *coreClient, requests []batchRequest, interval time.Duration) error {
+	for _, request := range requests {
+		if request.Endpoint < 0 || request.Endpoint >= len(endpointPaths) {
+			return fmt.Errorf("unknown endpoint %d", request.Endpoint)
+		}
+	}
+
+	cache := responseCacheStore.Load()
+	if cache == nil {
+		responseCacheStore.CompareAndSwap(nil, newResponseCache(ResponseCacheConfig{Enabled: true}))
+		cache = responseCacheStore.Load()
+	}
+
+	s.mu.Lock()
+	defer s.mu.Unlock()
+
+	now := time.Now()
+	for _, request := range requests {
+		keyInterval := interval
+		if keyInterval <= 0 {
+			keyInterval = time.Duration(float64(cache.ttls[request.Endpoint]) * refreshAheadOfTTL)
+		}
+		key := responseKey(endpointPaths[request.Endpoint], request.Org, request.Group, client.vaultURL)
+		if existing, ok := s.keys[key]; ok {
+			existing.client = client
+			existing.interval = keyInterval
+			continue
+		}
+		s.keys[key] = &hotKey{
+			client:   client,
+			endpoint: request.Endpoint,
+			org:      request.Org,
+			group:    request.Group,
+			key:      key,
+			interval: keyInterval,
+			next:     now,
+		}
+		cache.setPinned(key, true)
+	}
+
+	if !s.started {
+		s.started = true
+		for i := 0; i < refreshWorkers; i++ {
+			go s.worker()
+		}
+		go s.loop()
+	}
+	s.signal()
+	return nil
+}
+
+func (s *refreshScheduler) unregister(client *coreClient, requests []batchRequest) {
+	cache := responseCacheStore.Load()
+
+	s.mu.Lock()
+	defer s.mu.Unlock()
+
+	for _, request := range requests {
+		if request.Endpoint < 0 || request.Endpoint >= len(endpointPaths) {
+			continue
+		}
+		key := responseKey(endpointPaths[request.Endpoint], request.Org, request.Group, client.vaultURL)
+		delete(s.keys, key)
+		if cache != nil {
+			cache.setPinned(key, false)
+		}
+	}
+}
+
+func (s *refreshScheduler) signal() {
+	select {
+	case s.wake <- struct{}{}:
+	default:
+	}
+}
+
+// loop despacha a los workers las claves que ya tocan y duerme hasta la
+// siguiente.
+func (s *refreshScheduler) loop() {
+	timer := time.NewTimer(time.Hour)
+	for {
+		now := time.Now()
+		var due []*hotKey
+		wait := time.Hour
+
+		s.mu.Lock()
+		for _, hot := range s.keys {
+			if hot.running {
+				continue
+			}
+			if !now.Before(hot.next) {
+				hot.running = true
+				due = append(due, hot)
+			} else if d := hot.next.Sub(now); d < wait {
+				wait = d
+			}
+		}
+		s.mu.Unlock()
+
+		for _, hot := range due {
+			s.jobs <- hot
+		}
+
+		if !timer.Stop() {
+			select {
+			case <-timer.C:
+			default:
+			}
+		}
+		timer.Reset(wait)
+		select {
+		case <-timer.C:
+		case <-s.wake:
+		}
+	}
+}
+
+func (s *refreshScheduler) worker() {
+	for hot := range s.jobs {
+		s.refresh(hot)
+		s.signal()
+	}
+}
+
+// refresh revalida una clave caliente. La clave sólo se fija en la cache
+// mientras sigue registrada: si unregister la quita durante la petición, se
+// desfija al terminar para que la entrada pueda volver a expulsarse.
+func (s *refreshScheduler) refresh(hot *hotKey) {
+	cache := responseCacheStore.Load()
+	start := time.Now()
+
+	// register puede cambiar client mientras tanto: se copia bajo el lock
+	s.mu.Lock()
+	if s.keys[hot.key] != hot {
+		hot.running = false
+		s.mu.Unlock()
+		return
+	}
+	if cache != nil {
+		cache.setPinned(hot.key, true)
+	}
+	client, endpoint, org, group := hot.client, hot.endpoint, hot.org, hot.group
+	s.mu.Unlock()
+
+	var result fetchResult
+	if cache == nil {
+		result = errorResult(resultErrConfig, "Response cache disabled", fmt.Errorf("hot keys need the response cache"))
+	} else {
+		previous := cache.validatorsFor(hot.key)
+		ctx, cancel := callContext(0, 0)
+		var finished bool
+		result, finished = apiFlights.do(ctx, hot.key, func(ctx context.Context) fetchResult {
+			result := client.revalidate(ctx, cache, hot.key, endpoint, org, group, previous)
+			cache.store(hot.key, endpoint, result)
+			return result
+		})
+		if !finished {
+			result = canceledResult(ctx.Err())
+		}
+		cancel()
+	}
+	latency := time.Since(start)
+	ok := result.code == resultOK && (result.flags&resultFlagCached != 0 || cacheable(result))
+
+	s.mu.Lock()
+	defer s.mu.Unlock()
+
+	hot.running = false
+	if s.keys[hot.key] != hot {
+		if cache != nil {
+			if _, registered := s.keys[hot.key]; !registered {
+				cache.setPinned(hot.key, false)
+			}
+		}
+		return
+	}
+	hot.lastLatency = latency
+	if ok {
+		hot.refreshes++
+		hot.failures = 0
+		hot.lastError = ""
+		hot.lastSuccess = time.Now()
+		hot.next = hot.lastSuccess.Add(jittered(hot.interval))
+		return
+	}
+
+	hot.errors++
+	hot.failures++
+	hot.lastError = string(result.body)
+	var envelope struct {
+		Error string `json:"error"`
+	}
+	if json.Unmarshal(result.body, &envelope) == nil && envelope.Error != "" {
+		hot.lastError = envelope.Error
+	}
+	backoff := refreshBackoffBase << uint(min(hot.failures-1, 16))
+	if backoff > refreshBackoffLimit {
+		backoff = refreshBackoffLimit
+	}
+	hot.next = time.Now().Add(jittered(backoff))
+}
+
+type hotKeyStats struct {
+	Endpoint         string  `json:"endpoint"`
+	Org              string  `json:"org"`
+	Group            string  `json:"group"`
+	VaultURL         string  `json:"vault_url"`
+	IntervalSeconds  float64 `json:"interval_seconds"`
+	AgeSeconds       float64 `json:"age_seconds"`
+	NextRefreshIn    float64 `json:"next_refresh_in_seconds"`
+	LastLatencyMs    float64 `json:"last_latency_ms"`
+	ConsecutiveFails int     `json:"consecutive_failures"`
+	Refreshes        int64   `json:"refreshes"`
+	Errors           int64   `json:"errors"`
+	LastError        string  `json:"last_error,omitempty"`
+}
+
+func (s *refreshScheduler) stats() []hotKeyStats {
+	now := time.Now()
+
+	s.mu.Lock()
+	defer s.mu.Unlock()
+
+	stats := make([]hotKeyStats, 0, len(s.keys))
+	for _, hot := range s.keys {
+		age := -1.0
+		if !hot.lastSuccess.IsZero() {
+			age = now.Sub(hot.lastSuccess).Seconds()
+		}
+		stats = append(stats, hotKeyStats{
+			Endpoint:         strings.TrimPrefix(endpointPaths[hot.endpoint], "/v2/"),
+			Org:              hot.org,
+			Group:            hot.group,
+			VaultURL:         hot.client.vaultURL,
+			IntervalSeconds:  hot.interval.Seconds(),
+			AgeSeconds:       age,
+			NextRefreshIn:    hot.next.Sub(now).Seconds(),
+			LastLatencyMs:    float64(hot.lastLatency) / float64(time.Millisecond),
+			ConsecutiveFails: hot.failures,
+			Refreshes:        hot.refreshes,
+			Errors:           hot.errors,
+			LastError:        hot.lastError,
+		})
+	}
+	return stats
+}
+
+// ClientRegisterHotKeys registra claves calientes ([{"endpoint", "org",
+// "group"}] en JSON) para el cliente indicado. intervalSeconds <= 0 refresca
+// al 80% del TTL. Devuelve NULL o un mensaje de error que debe liberarse con
+// FreeCString.
+//
+//export ClientRegisterHotKeys
+func ClientRegisterHotKeys(handle C.longlong, requestsJSON *C.char, intervalSeconds C.double) *C.char {
+	client, ok := lookupClient(handle)
+	if !ok {
+		return C.CString(fmt.Sprintf("invalid client handle %d", int64(handle)))
+	}
+	var requests []batchRequest
+	if err := json.Unmarshal([]byte(C.GoString(requestsJSON)), &requests); err != nil {
+		return C.CString(fmt.Sprintf("invalid hot keys: %v", err))
+	}
+	interval := time.Duration(float64(intervalSeconds) * float64(time.Second))
+	if err := hotKeys.register(client, requests, interval); err != nil {
+		return C.CString(err.Error())
+	}
+	return nil
+}
+
+//export ClientUnregisterHotKeys
+func ClientUnregisterHotKeys(handle C.longlong, requestsJSON *C.char) {
+	client, ok := lookupClient(handle)
+	if !ok {
+		return
+	}
+	var requests []batchRequest
+	if err := json.Unmarshal([]byte(C.GoString(requestsJSON)), &requests); err != nil {
+		return
+	}
+	hotKeys.unregister(client, requests)
+}
+
+//export GetHotKeyStats
+func GetHotKeyStats() *C.char {
+	data, _ := json.Marshal(hotKeys.stats())
+	return C.CString(string(data))
+}
+
+// ============ RESILIENCIA (HEDGING, REINTENTOS Y CIRCUIT BREAKER) ============
+
+// Cada petición a la API de WhatsApp pasa por tres mecanismos:
+//
+//   - Hedging (opcional): si la respuesta tarda más que el percentil
+//     hedge_quantile de las latencias recientes del host, se lanza una segunda
+//     petición idéntica y gana la primera que responda; la otra se cancela.
+//   - Reintentos: los errores de transporte y los status 502/503/504 se
+//     reintentan con backoff exponencial con jitter completo. Reintentos y
+//     peticiones de hedging consumen un presupuesto global que se recarga con
+//     retry_budget_ratio por cada petición original (más un mínimo por
+//     segundo), de modo que con la API caída no se multiplica la carga.
+//   - Circuit breaker por host: tras breaker_failure_threshold fallos seguidos
+//     se abre y las llamadas fallan al momento con resultErrCircuitOpen; pasado
+//     breaker_open_seconds deja pasar una única petición de prueba
+//     (semiabierto) que lo cierra si va bien o lo reabre si falla.
+
+// ResilienceConfig ajusta hedging, reintentos y circuit breaker. Los campos en
+// cero usan el valor por defecto.
+type ResilienceConfig struct {
+	Hedge                   bool    `json:"hedge,omitempty"`
+	HedgeQuantile           float64 `json:"hedge_quantile,omitempty"`
+	HedgeMinDelayMs         int     `json:"hedge_min_delay_ms,omitempty"`
+	HedgeMaxDelayMs         int     `json:"hedge_max_delay_ms,omitempty"`
+	MaxRetries              *int    `json:"max_retries,omitempty"`
+	RetryBaseDelayMs        int     `json:"retry_base_delay_ms,omitempty"`
+	RetryMaxDelayMs         int     `json:"retry_max_delay_ms,omitempty"`
+	RetryBudgetRatio        float64 `json:"retry_budget_ratio,omitempty"`
+	RetryBudgetMinPerSecond float64 `json:"retry_budget_min_per_second,omitempty"`
+	Breaker                 *bool   `json:"breaker,omitempty"`
+	BreakerFailureThreshold int     `json:"breaker_failure_threshold,omitempty"`
+	BreakerOpenSeconds      float64 `json:"breaker_open_seconds,omitempty"`
+}
+
+const (
+	defaultHedgeQuantile       = 0.95
+	defaultHedgeMinDelay       = 5 * time.Millisecond
+	defaultHedgeMaxDelay       = 2 * time.Second
+	defaultMaxRetries          = 2
+	defaultRetryBaseDelay      = 50 * time.Millisecond
+	defaultRetryMaxDelay       = time.Second
+	defaultRetryBudgetRatio    = 0.1
+	defaultRetryBudgetPerSec   = 5.0
+	defaultBreakerThreshold    = 5
+	defaultBreakerOpenDuration = 10 * time.Second
+
+	// Latencias recientes que se guardan por host y mínimo necesario para
+	// calcular el retraso de hedging
+	latencyWindow     = 512
+	latencyMinSamples = 20
+	// El percentil se recalcula cada tantas muestras nuevas
+	latencyRecompute = 32
+)
+
+var errCircuitOpen = errors.New("circuit breaker open")
+
+// resiliencePolicy es la config ya resuelta con sus valores por defecto.
+type resiliencePolicy struct {
+	hedge              bool
+	hedgeQuantile      float64
+	hedgeMinDelay      time.Duration
+	hedgeMaxDelay      time.Duration
+	maxRetries         int
+	retryBaseDelay     time.Duration
+	retryMaxDelay      time.Duration
+	budgetRatio        float64
+	budgetPerSecond    float64
+	breaker            bool
+	breakerThreshold   int
+	breakerOpenSeconds time.Duration
+}
+
+func newResiliencePolicy(config ResilienceConfig) *resiliencePolicy {
+	millis := func(value int, fallback time.Duration) time.Duration {
+		if value > 0 {
+			return time.Duration(value) * time.Millisecond
+		}
+		return fallback
+	}
+	p := &resiliencePolicy{
+		hedge:              config.Hedge,
+		hedgeQuantile:      defaultHedgeQuantile,
+		hedgeMinDelay:      millis(config.HedgeMinDelayMs, defaultHedgeMinDelay),
+		hedgeMaxDelay:      millis(config.HedgeMaxDelayMs, defaultHedgeMaxDelay),
+		maxRetries:         defaultMaxRetries,
+		retryBaseDelay:     millis(config.RetryBaseDelayMs, defaultRetryBaseDelay),
+		retryMaxDelay:      millis(config.RetryMaxDelayMs, defaultRetryMaxDelay),
+		budgetRatio:        defaultRetryBudgetRatio,
+		budgetPerSecond:    defaultRetryBudgetPerSec,
+		breaker:            config.Breaker == nil || *config.Breaker,
+		breakerThreshold:   defaultBreakerThreshold,
+		breakerOpenSeconds: defaultBreakerOpenDuration,
+	}
+	if config.HedgeQuantile > 0 && config.HedgeQuantile < 1 {
+		p.hedgeQuantile = config.HedgeQuantile
+	}
+	if config.MaxRetries != nil && *config.MaxRetries >= 0 {
+		p.maxRetries = *config.MaxRetries
+	}
+	if config.RetryBudgetRatio > 0 {
+		p.budgetRatio = config.RetryBudgetRatio
+	}
+	if config.RetryBudgetMinPerSecond > 0 {
+		p.budgetPerSecond = config.RetryBudgetMinPerSecond
+	}
+	if config.BreakerFailureThreshold > 0 {
+		p.breakerThreshold = config.BreakerFailureThreshold
+	}
+	if config.BreakerOpenSeconds > 0 {
+		p.breakerOpenSeconds = time.Duration(config.BreakerOpenSeconds * float64(time.Second))
+	}
+	return p
+}
+
+// attempt es el resultado de un intento HTTP con el cuerpo ya leído. err es
+// un error de transporte, o de lectura del cuerpo si readFailed.
+type attempt struct {
+	status     int
+	header     http.Header
+	body       []byte
+	err        error
+	readFailed bool
+	hedged     bool
+}
+
+// failed indica si el intento cuenta como fallo del host. Las peticiones que
+// no llegaron a salir por el limitador de tasa no cuentan.
+func (a attempt) failed() bool {
+	if errors.Is(a.err, errRateLimited) {
+		return false
+	}
+	return a.err != nil || a.status >= 500
+}
+
+// retryable indica si conviene reintentar. Un 429 se reintenta cuando el
+// limitador de tasa deja pasar la siguiente petición (ver LIMITACIÓN DE TASA).
+func (a attempt) retryable() bool {
+	if a.err != nil {
+		return !errors.Is(a.err, errCircuitOpen) && !errors.Is(a.err, errRateLimited)
+	}
+	return a.status == http.StatusTooManyRequests || a.status == http.StatusBadGateway ||
+		a.status == http.StatusServiceUnavailable || a.status == http.StatusGatewayTimeout
+}
+
+// retryBudget limita reintentos y hedging a una fracción de las peticiones
+// originales.
+type retryBudget struct {
+	mu      sync.Mutex
+	balance float64
+	last    time.Time
+}
+
+func (b *retryBudget) capacity(p *resiliencePolicy) float64 {
+	return max(10, 10*p.budgetPerSecond)
+}
+
+// refill suma el mínimo por segundo desde la última llamada. El presupuesto
+// empieza lleno.
+func (b *retryBudget) refill(p *resiliencePolicy, now time.Time) {
+	if b.last.IsZero() {
+		b.balance = b.capacity(p)
+	} else {
+		b.balance += now.Sub(b.last).Seconds() * p.budgetPerSecond
+	}
+	b.last = now
+	b.balance = min(b.balance, b.capacity(p))
+}
+
+func (b *retryBudget) deposit(p *resiliencePolicy) {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	b.refill(p, time.Now())
+	b.balance = min(b.balance+p.budgetRatio, b.capacity(p))
+}
+
+func (b *retryBudget) withdraw(p *resiliencePolicy) bool {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	b.refill(p, time.Now())
+	if b.balance < 1 {
+		return false
+	}
+	b.balance--
+	return true
+}
+
+const (
+	breakerClosed   = "closed"
+	breakerOpen     = "open"
+	breakerHalfOpen = "half_open"
+)
+
+// hostState guarda el circuit breaker y las latencias recientes de un host.
+type hostState struct {
+	mu       sync.Mutex
+	state    string
+	failures int
+	openedAt time.Time
+	probing  bool
+	opened   int64
+	rejected int64
+
+	latencies  [latencyWindow]time.Duration
+	samples    int
+	sinceCalc  int
+	hedgeDelay time.Duration
+}
+
+// allow decide si una petición puede salir. En semiabierto sólo pasa una
+// petición de prueba (probe = true), que debe cerrarse con record.
+func (h *hostState) allow(p *resiliencePolicy, now time.Time) (ok, probe bool) {
+	h.mu.Lock()
+	defer h.mu.Unlock()
+	if !p.breaker {
+		return true, false
+	}
+	switch h.state {
+	case breakerOpen:
+		if now.Sub(h.openedAt) < p.breakerOpenSeconds {
+			h.rejected++
+			return false, false
+		}
+		h.state = breakerHalfOpen
+		fallthrough
+	case breakerHalfOpen:
+		if h.probing {
+			h.rejected++
+			return false, false
+		}
+		h.probing = true
+		return true, true
+	}
+	return true, false
+}
+
+// record anota el resultado de una petición permitida. Un resultado neutro
+// (cancelada por el llamador) no cuenta pero libera la petición de prueba.
+func (h *hostState) record(p *resiliencePolicy, probe, failed, neutral bool, now time.Time) {
+	h.mu.Lock()
+	defer h.mu.Unlock()
+	if probe {
+		h.probing = false
+	}
+	if neutral || !p.breaker {
+		return
+	}
+	if !failed {
+		h.failures = 0
+		h.state = breakerClosed
+		return
+	}
+	h.failures++
+	if probe || (h.state == breakerClosed && h.failures >= p.breakerThreshold) {
+		h.state = breakerOpen
+		h.openedAt = now
+		h.opened++
+	}
+}
+
+// observe guarda la latencia de una respuesta correcta y recalcula el retraso
+// de hedging cada latencyRecompute muestras.
+func (h *hostState) observe(p *resiliencePolicy, latency time.Duration) {
+	h.mu.Lock()
+	defer h.mu.Unlock()
+	h.latencies[h.samples%latencyWindow] = latency
+	h.samples++
+	h.sinceCalc++
+	if h.samples < latencyMinSamples || (h.hedgeDelay != 0 && h.sinceCalc < latencyRecompute) {
+		return
+	}
+	h.sinceCalc = 0
+	window := append([]time.Duration(nil), h.latencies[:min(h.samples, latencyWindow)]...)
+	sort.Slice(window, func(i, j int) bool { return window[i] < window[j] })
+	delay := window[min(len(window)-1, int(p.hedgeQuantile*float64(len(window))))]
+	h.hedgeDelay = min(max(delay, p.hedgeMinDelay), p.hedgeMaxDelay)
+}
+
+// delay devuelve el retraso de hedging, o false si aún no hay muestras.
+func (h *hostState) delay() (time.Duration, bool) {
+	h.mu.Lock()
+	defer h.mu.Unlock()
+	return h.hedgeDelay, h.hedgeDelay > 0
+}
+
+type resilience struct {
+	policy atomic.Pointer[resiliencePolicy]
+	budget retryBudget
+
+	mu    sync.Mutex
+	hosts map[string]*hostState
+
+	requests      atomic.Int64
+	retries       atomic.Int64
+	retriesDenied atomic.Int64
+	hedges        atomic.Int64
+	hedgeWins     atomic.Int64
+	hedgesDenied  atomic.Int64
+	rejected      atomic.Int64
+}
+
+var upstream = newResilience(ResilienceConfig{})
+
+func newResilience(config ResilienceConfig) *resilience {
+	r := &resilience{hosts: make(map[string]*hostState)}
+	r.policy.Store(newResiliencePolicy(config))
+	return r
+}
+
+func (r *resilience) host(name string) *hostState {
+	r.mu.Lock()
+	defer r.mu.Unlock()
+	h, ok := r.hosts[name]
+	if !ok {
+		h = &hostState{state: breakerClosed}
+		r.hosts[name] = h
+	}
+	return h
+}
+
+// do envía req (GET, sin cuerpo) aplicando breaker, reintentos y hedging, y
+// devuelve el último intento.
+func (r *resilience) do(ctx context.Context, req *http.Request) attempt {
+	p := r.policy.Load()
+	h := r.host(req.URL.Host)
+	r.requests.Add(1)
+	r.budget.deposit(p)
+
+	for try := 0; ; try++ {
+		ok, probe := h.allow(p, time.Now())
+		if !ok {
+			r.rejected.Add(1)
+			return attempt{err: errCircuitOpen}
+		}
+		result := r.hedged(ctx, p, h, req)
+		h.record(p, probe, result.failed(), ctx.Err() != nil, time.Now())
+		if !r.retry(ctx, p, try, result) {
+			return result
+		}
+	}
+}
+
+// open hace la petición de un stream (ver RESPUESTAS EN STREAMING): como do,
+// con circuit breaker, límites y reintentos, pero sin hedging y sin leer el
+// cuerpo de una respuesta 2xx, que se devuelve abierta y debe cerrar quien
+// llama. Cualquier otra respuesta se lee entera y vuelve en el attempt.
+func (r *resilience) open(ctx context.Context, req *http.Request) (*http.Response, attempt) {
+	p := r.policy.Load()
+	h := r.host(req.URL.Host)
+	r.requests.Add(1)
+	r.budget.deposit(p)
+
+	for try := 0; ; try++ {
+		ok, probe := h.allow(p, time.Now())
+		if !ok {
+			r.rejected.Add(1)
+			return nil, attempt{err: errCircuitOpen}
+		}
+		resp, result := r.openOnce(ctx, p, h, req)
+		h.record(p, probe, result.failed(), ctx.Err() != nil, time.Now())
+		if resp != nil || !r.retry(ctx, p, try, result) {
+			return resp, result
+		}
+	}
+}
+
+// retry decide si se reintenta un intento fallido y, si es así, espera el
+// backoff. Devuelve false si no hay que reintentar o se agotó el plazo.
+func (r *resilience) retry(ctx context.Context, p *resiliencePolicy, try int, result attempt) bool {
+	if !result.retryable() || try >= p.maxRetries || ctx.Err() != nil {
+		return false
+	}
+	if result.status == http.StatusTooManyRequests && limits.isFailFast(ctx) {
+		return false
+	}
+	if !r.budget.withdraw(p) {
+		r.retriesDenied.Add(1)
+		return false
+	}
+
+	// Backoff exponencial con jitter completo
+	backoff := min(p.retryBaseDelay<<try, p.retryMaxDelay)
+	timer := time.NewTimer(time.Duration(rand.Int63n(int64(backoff) + 1)))
+	select {
+	case <-ctx.Done():
+		timer.Stop()
+		return false
+	case <-timer.C:
+	}
+	r.retries.Add(1)
+	return true
+}
+
+// hedged hace un intento y, si tarda más que el retraso de hedging del host,
+// lanza una segunda copia. Devuelve la primera respuesta correcta, o el último
+// fallo si fallan las dos.
+func (r *resilience) hedged(ctx context.Context, p *resiliencePolicy, h *hostState, req *http.Request) attempt {
+	delay, ok := h.delay()
+	if !p.hedge || !ok {
+		return r.once(ctx, p, h, req)
+	}
+
+	ctx, cancel := context.WithCancel(ctx)
+	defer cancel()
+	results := make(chan attempt, 2)
+	launch := func(hedged bool) {
+		go func() {
+			result := r.once(ctx, p, h, req)
+			result.hedged = hedged
+			results <- result
+		}()
+	}
+
+	launch(false)
+	inFlight := 1
+	timer := time.NewTimer(delay)
+	defer timer.Stop()
+	for {
+		select {
+		case result := <-results:
+			inFlight--
+			if !result.failed() || inFlight == 0 {
+				if result.hedged && !result.failed() {
+					r.hedgeWins.Add(1)
+				}
+				return result
+			}
+		case <-timer.C:
+			if !r.budget.withdraw(p) {
+				r.hedgesDenied.Add(1)
+				continue
+			}
+			r.hedges.Add(1)
+			inFlight++
+			launch(true)
+		}
+	}
+}
+
+func (r *resilience) once(ctx context.Context, p *resiliencePolicy, h *hostState, req *http.Request) attempt {
+	if err := limits.acquire(ctx, false, req.URL.Host, limits.isFailFast(ctx)); err != nil {
+		return attempt{err: err}
+	}
+
+	start := time.Now()
+	resp, err := sharedTransport.do(req.Clone(ctx))
+	if err != nil {
+		if metrics.enabled.Load() {
+			metrics.observeSince("request", metricsEndpoint(ctx), 0, start)
+		}
+		return attempt{err: err}
+	}
+	defer resp.Body.Close()
+	limits.observe(false, req.URL.Host, resp.StatusCode, resp.Header)
+
+	bodyStart := time.Now()
+	body, err := readBody(resp)
+	if metrics.enabled.Load() {
+		endpoint := metricsEndpoint(ctx)
+		metrics.observeSince("body", endpoint, resp.StatusCode, bodyStart)
+		metrics.observeSince("request", endpoint, resp.StatusCode, start)
+	}
+	result := attempt{status: resp.StatusCode, header: resp.Header, body: body}
+	if err != nil {
+		result.err, result.readFailed = err, true
+		return result
+	}
+	if resp.StatusCode < 500 {
+		h.observe(p, time.Since(start))
+	}
+	return result
+}
+
+func (r *resilience) openOnce(ctx context.Context, p *resiliencePolicy, h *hostState, req *http.Request) (*http.Response, attempt) {
+	if err := limits.acquire(ctx, false, req.URL.Host, limits.isFailFast(ctx)); err != nil {
+		return nil, attempt{err: err}
+	}
+
+	start := time.Now()
+	resp, err := sharedTransport.do(req.Clone(ctx))
+	if err != nil {
+		return nil, attempt{err: err}
+	}
+	limits.observe(false, req.URL.Host, resp.StatusCode, resp.Header)
+	if resp.StatusCode < 500 {
+		h.observe(p, time.Since(start))
+	}
+	result := attempt{status: resp.StatusCode, header: resp.Header}
+	if resp.StatusCode >= 200 && resp.StatusCode < 300 {
+		return resp, result
+	}
+
+	defer resp.Body.Close()
+	if result.body, err = readBody(resp); err != nil {
+		result.err, result.readFailed = err, true
+	}
+	return nil, result
+}
+
+// configure aplica una nueva config. El estado de los breakers, las
+// latencias y los contadores se conservan.
+func (r *resilience) configure(config ResilienceConfig) {
+	r.policy.Store(newResiliencePolicy(config))
+}
+
+type hostResilienceStats struct {
+	Host                string  `json:"host"`
+	State               string  `json:"state"`
+	ConsecutiveFailures int     `json:"consecutive_failures"`
+	TimesOpened         int64   `json:"times_opened"`
+	Rejected            int64   `json:"rejected"`
+	Samples             int     `json:"samples"`
+	HedgeDelayMs        float64 `json:"hedge_delay_ms"`
+}
+
+type resilienceStats struct {
+	Requests      int64                 `json:"requests"`
+	Retries       int64                 `json:"retries"`
+	RetriesDenied int64                 `json:"retries_denied"`
+	Hedges        int64                 `json:"hedges"`
+	HedgeWins     int64                 `json:"hedge_wins"`
+	HedgesDenied  int64                 `json:"hedges_denied"`
+	Rejected      int64                 `json:"rejected"`
+	RetryBudget   float64               `json:"retry_budget"`
+	Hosts         []hostResilienceStats `json:"hosts"`
+}
+
+func (r *resilience) stats() resilienceStats {
+	p := r.policy.Load()
+	r.budget.mu.Lock()
+	r.budget.refill(p, time.Now())
+	balance := r.budget.balance
+	r.budget.mu.Unlock()
+
+	stats := resilienceStats{
+		Requests:      r.requests.Load(),
+		Retries:       r.retries.Load(),
+		RetriesDenied: r.retriesDenied.Load(),
+		Hedges:        r.hedges.Load(),
+		HedgeWins:     r.hedgeWins.Load(),
+		HedgesDenied:  r.hedgesDenied.Load(),
+		Rejected:      r.rejected.Load(),
+		RetryBudget:   balance,
+		Hosts:         []hostResilienceStats{},
+	}
+
+	r.mu.Lock()
+	defer r.mu.Unlock()
+	for name, h := range r.hosts {
+		h.mu.Lock()
+		state := h.state
+		if state == breakerOpen && time.Since(h.openedAt) >= p.breakerOpenSeconds {
+			state = breakerHalfOpen
+		}
+		stats.Hosts = append(stats.Hosts, hostResilienceStats{
+			Host:                name,
+			State:               state,
+			ConsecutiveFailures: h.failures,
+			TimesOpened:         h.opened,
+			Rejected:            h.rejected,
+			Samples:             h.samples,
+			HedgeDelayMs:        float64(h.hedgeDelay) / float64(time.Millisecond),
+		})
+		h.mu.Unlock()
+	}
+	sort.Slice(stats.Hosts, func(i, j int) bool { return stats.Hosts[i].Host < stats.Hosts[j].Host })
+	return stats
+}
+
+// ConfigureResilience aplica una ResilienceConfig (JSON). Devuelve NULL si va
+// bien o el mensaje de error, que debe liberarse con FreeCString.
+//
+//export ConfigureResilience
+func ConfigureResilience(configJSON *C.char) *C.char {
+	var config ResilienceConfig
+	if err := json.Unmarshal([]byte(C.GoString(configJSON)), &config); err != nil {
+		return C.CString(fmt.Sprintf("invalid resilience config: %v", err))
+	}
+	upstream.configure(config)
+	return nil
+}
+
+// GetResilienceStats devuelve en JSON los contadores de reintentos y hedging
+// y el estado del breaker de cada host. Debe liberarse con FreeCString.
+//
+//export GetResilienceStats
+func GetResilienceStats() *C.char {
+	data, _ := json.Marshal(upstream.stats())
+	return C.CString(string(data))
+}
+
+// ============ LIMITACIÓN DE TASA Y BULKHEADS ============
+
+// Antes de salir, cada petición a la API pasa por un token bucket por host y
+// cada lectura del Key Vault por uno por vault. Además, un bulkhead por org
+// limita las llamadas en curso de cada org, para que una org ruidosa no se
+// quede con todas las conexiones.
+//
+// Un 429 (o un 503 con Retry-After) pausa el bucket del host o vault hasta
+// que pase el Retry-After y reduce a la mitad su tasa efectiva, que se
+// recupera poco a poco con las respuestas correctas. Los límites se aplican
+// aunque no haya tasa configurada: en ese caso sólo cuentan las pausas.
+//
+// Por defecto se espera turno hasta max_wait_ms o el plazo de la llamada. En
+// modo fail_fast, global o por cliente (rate_limit_mode en la VaultConfig),
+// la llamada falla al momento con resultErrRateLimited.
+
+// RateLimitConfig ajusta los límites. Los campos en cero desactivan el límite
+// correspondiente.
+type RateLimitConfig struct {
+	HostRate          float64 `json:"host_rate,omitempty"`
+	HostBurst         int     `json:"host_burst,omitempty"`
+	VaultRate         float64 `json:"vault_rate,omitempty"`
+	VaultBurst        int     `json:"vault_burst,omitempty"`
+	MaxInFlightPerOrg int     `json:"max_in_flight_per_org,omitempty"`
+	FailFast          bool    `json:"fail_fast,omitempty"`
+	MaxWaitMs         int     `json:"max_wait_ms,omitempty"`
+}
+
+const (
+	rateLimitModeWait     = "wait"
+	rateLimitModeFailFast = "fail_fast"
+
+	// Pausa ante un 429 sin Retry-After, y máximo que se respeta
+	defaultRetryAfter = time.Second
+	maxRetryAfter     = 5 * time.Minute
+	// Tras un 429 la tasa efectiva no baja de esta fracción de la configurada
+	minRateFraction = 0.1
+	// Fracción de la tasa configurada que recupera cada respuesta correcta
+	rateRecoveryStep = 0.05
+)
+
+var errRateLimited = errors.New("rate limit exceeded")
+
+// failFastKey marca en el contexto de una llamada el modo fail_fast.
+type failFastKey struct{}
+
+func withFailFast(ctx context.Context, failFast bool) context.Context {
+	return context.WithValue(ctx, failFastKey{}, failFast)
+}
+
+// tokenBucket es un token bucket con pausa. last puede quedar en el futuro
+// mientras dura una pausa: hasta entonces no se generan tokens.
+type tokenBucket struct {
+	mu        sync.Mutex
+	rate      float64 // tasa configurada (0 = sin límite)
+	effective float64 // tasa actual, reducida tras un 429
+	burst     float64
+	tokens    float64
+	last      time.Time
+
+	acquired  int64
+	waited    int64
+	rejected  int64
+	throttled int64
+	waitTotal time.Duration
+	waitMax   time.Duration
+}
+
+func newTokenBucket(rate float64, burst int) *tokenBucket {
+	b := &tokenBucket{rate: rate, effective: rate, burst: float64(max(burst, 1)), last: time.Now()}
+	b.tokens = b.burst
+	return b
+}
+
+func (b *tokenBucket) advance(now time.Time) {
+	if now.After(b.last) {
+		if b.effective > 0 {
+			b.tokens = min(b.burst, b.tokens+now.Sub(b.last).Seconds()*b.effective)
+		}
+		b.last = now
+	}
+}
+
+// reserve reserva un token y devuelve cuánto hay que esperar para usarlo, o
+// false (sin reservar) si la espera supera maxWait.
+func (b *tokenBucket) reserve(now time.Time, maxWait time.Duration) (time.Duration, bool) {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	b.advance(now)
+	wait := max(b.last.Sub(now), 0)
+	if b.effective > 0 && b.tokens < 1 {
+		wait += time.Duration((1 - b.tokens) / b.effective * float64(time.Second))
+	}
+	if wait > maxWait {
+		b.rejected++
+		return wait, false
+	}
+	if b.effective > 0 {
+		b.tokens--
+	}
+	b.acquired++
+	if wait > 0 {
+		b.waited++
+		b.waitTotal += wait
+		b.waitMax = max(b.waitMax, wait)
+	}
+	return wait, true
+}
+
+// cancel devuelve un token reservado que no se llegó a usar.
+func (b *tokenBucket) cancel() {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	if b.effective > 0 {
+		b.tokens = min(b.burst, b.tokens+1)
+	}
+}
+
+// throttle aplica un 429: pausa el bucket retryAfter y reduce la tasa.
+func (b *tokenBucket) throttle(now time.Time, retryAfter time.Duration) {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	b.advance(now)
+	if until := now.Add(retryAfter); until.After(b.last) {
+		b.last = until
+	}
+	b.tokens = min(b.tokens, 0)
+	if b.rate > 0 {
+		b.effective = max(b.effective/2, b.rate*minRateFraction)
+	}
+	b.throttled++
+}
+
+// speedUp sube la tasa efectiva tras una respuesta correcta.
+func (b *tokenBucket) speedUp() {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	if b.effective < b.rate {
+		b.effective = min(b.rate, b.effective+b.rate*rateRecoveryStep)
+	}
+}
+
+// bulkhead limita las llamadas en curso de una org. users cuenta quién lo
+// tiene tomado o en espera, para borrarlo del mapa cuando queda libre.
+type bulkhead struct {
+	slots chan struct{}
+	users int
+}
+
+type rateLimiter struct {
+	mu        sync.Mutex
+	config    RateLimitConfig
+	hosts     map[string]*tokenBucket
+	vaults    map[string]*tokenBucket
+	bulkheads map[string]*bulkhead
+
+	orgWaited    atomic.Int64
+	orgRejected  atomic.Int64
+	orgWaitTotal atomic.Int64 // nanosegundos
+}
+
+var limits = newRateLimiter(RateLimitConfig{})
+
+func newRateLimiter(config RateLimitConfig) *rateLimiter {
+	return &rateLimiter{
+		config:    config,
+		hosts:     make(map[string]*tokenBucket),
+		vaults:    make(map[string]*tokenBucket),
+		bulkheads: make(map[string]*bulkhead),
+	}
+}
+
+// configure aplica una nueva config. Los buckets se recrean con las nuevas
+// tasas; las llamadas en curso conservan su hueco en el bulkhead anterior.
+func (l *rateLimiter) configure(config RateLimitConfig) {
+	l.mu.Lock()
+	defer l.mu.Unlock()
+	l.config = config
+	l.hosts = make(map[string]*tokenBucket)
+	l.vaults = make(map[string]*tokenBucket)
+	l.bulkheads = make(map[string]*bulkhead)
+}
+
+func (l *rateLimiter) bucket(vault bool, key string) (*tokenBucket, RateLimitConfig) {
+	l.mu.Lock()
+	defer l.mu.Unlock()
+	buckets, rate, burst := l.hosts, l.config.HostRate, l.config.HostBurst
+	if vault {
+		buckets, rate, burst = l.vaults, l.config.VaultRate, l.config.VaultBurst
+	}
+	b, ok := buckets[key]
+	if !ok {
+		if burst <= 0 {
+			burst = int(math.Ceil(rate))
+		}
+		b = newTokenBucket(rate, burst)
+		buckets[key] = b
+	}
+	return b, l.config
+}
+
+// maxWait es lo que una llamada puede esperar turno.
+func maxWait(ctx context.Context, config RateLimitConfig, failFast bool) time.Duration {
+	if failFast {
+		return 0
+	}
+	limit := time.Duration(math.MaxInt64)
+	if config.MaxWaitMs > 0 {
+		limit = time.Duration(config.MaxWaitMs) * time.Millisecond
+	}
+	if deadline, ok := ctx.Deadline(); ok {
+		limit = min(limit, time.Until(deadline))
+	}
+	return limit
+}
+
+// isFailFast resuelve el modo de la llamada: el del cliente si lo fija, o el
+// global.
+func (l *rateLimiter) isFailFast(ctx context.Context) bool {
+	if failFast, ok := ctx.Value(failFastKey{}).(bool); ok {
+		return failFast
+	}
+	l.mu.Lock()
+	defer l.mu.Unlock()
+	return l.config.FailFast
+}
+
+// acquire toma un token del bucket del host (o del vault) esperando si hace
+// falta. Devuelve errRateLimited si no hay token a tiempo.
+func (l *rateLimiter) acquire(ctx context.Context, vault bool, key string, failFast bool) error {
+	b, config := l.bucket(vault, key)
+	wait, ok := b.reserve(time.Now(), maxWait(ctx, config, failFast))
+	if !ok {
+		return errRateLimited
+	}
+	if wait <= 0 {
+		return nil
+	}
+	timer := time.NewTimer(wait)
+	defer timer.Stop()
+	select {
+	case <-timer.C:
+		return nil
+	case <-ctx.Done():
+		b.cancel()
+		return ctx.Err()
+	}
+}
+
+// observe aplica la respuesta de un host o vault: pausa y frena ante un 429,
+// recupera la tasa ante una respuesta correcta.
+func (l *rateLimiter) observe(vault bool, key string, status int, header http.Header) {
+	b, _ := l.bucket(vault, key)
+	retryAfter := header.Get("Retry-After")
+	switch {
+	case status == http.StatusTooManyRequests || (status == http.StatusServiceUnavailable && retryAfter != ""):
+		b.throttle(time.Now(), parseRetryAfter(retryAfter))
+	case status > 0 && status < 400:
+		b.speedUp()
+	}
+}
+
+// parseRetryAfter admite segundos o una fecha HTTP.
+func parseRetryAfter(value string) time.Duration {
+	if value == "" {
+		return defaultRetryAfter
+	}
+	if seconds, err := strconv.ParseFloat(value, 64); err == nil {
+		return min(max(time.Duration(seconds*float64(time.Second)), 0), maxRetryAfter)
+	}
+	if at, err := http.ParseTime(value); err == nil {
+		return min(max(time.Until(at), 0), maxRetryAfter)
+	}
+	return defaultRetryAfter
+}
+
+// enterOrg ocupa un hueco del bulkhead de org. Devuelve la función que lo
+// libera.
+func (l *rateLimiter) enterOrg(ctx context.Context, org string, failFast bool) (func(), error) {
+	l.mu.Lock()
+	config := l.config
+	if config.MaxInFlightPerOrg <= 0 {
+		l.mu.Unlock()
+		return func() {}, nil
+	}
+	bulkheads := l.bulkheads
+	b, ok := bulkheads[org]
+	if !ok {
+		b = &bulkhead{slots: make(chan struct{}, config.MaxInFlightPerOrg)}
+		bulkheads[org] = b
+	}
+	b.users++
+	l.mu.Unlock()
+
+	leave := func() {
+		l.mu.Lock()
+		b.users--
+		if b.users == 0 && bulkheads[org] == b {
+			delete(bulkheads, org)
+		}
+		l.mu.Unlock()
+	}
+
+	select {
+	case b.slots <- struct{}{}:
+		return func() { <-b.slots; leave() }, nil
+	default:
+	}
+
+	limit := maxWait(ctx, config, failFast)
+	if limit <= 0 {
+		leave()
+		l.orgRejected.Add(1)
+		return nil, errRateLimited
+	}
+	start := time.Now()
+	timer := time.NewTimer(limit)
+	defer timer.Stop()
+	select {
+	case b.slots <- struct{}{}:
+		l.orgWaited.Add(1)
+		l.orgWaitTotal.Add(int64(time.Since(start)))
+		return func() { <-b.slots; leave() }, nil
+	case <-timer.C:
+		leave()
+		l.orgRejected.Add(1)
+		return nil, errRateLimited
+	case <-ctx.Done():
+		leave()
+		return nil, ctx.Err()
+	}
+}
+
+type bucketStats struct {
+	Name          string  `json:"name"`
+	Rate          float64 `json:"rate"`
+	EffectiveRate float64 `json:"effective_rate"`
+	Tokens        float64 `json:"tokens"`
+	PausedMs      float64 `json:"paused_ms"`
+	Acquired      int64   `json:"acquired"`
+	Waited        int64   `json:"waited"`
+	Rejected      int64   `json:"rejected"`
+	Throttled     int64   `json:"throttled"`
+	WaitMsTotal   float64 `json:"wait_ms_total"`
+	WaitMsMax     float64 `json:"wait_ms_max"`
+}
+
+type rateLimitStats struct {
+	FailFast          bool           `json:"fail_fast"`
+	Hosts             []bucketStats  `json:"hosts"`
+	Vaults            []bucketStats  `json:"vaults"`
+	MaxInFlightPerOrg int            `json:"max_in_flight_per_org"`
+	OrgsInFlight      map[string]int `json:"orgs_in_flight"`
+	OrgWaited         int64          `json:"org_waited"`
+	OrgRejected       int64          `json:"org_rejected"`
+	OrgWaitMsTotal    float64        `json:"org_wait_ms_total"`
+}
+
+func durationMs(d time.Duration) float64 {
+	return float64(d) / float64(time.Millisecond)
+}
+
+func bucketsStats(buckets map[string]*tokenBucket, now time.Time) []bucketStats {
+	stats := []bucketStats{}
+	for name, b := range buckets {
+		b.mu.Lock()
+		b.advance(now)
+		stats = append(stats, bucketStats{
+			Name:          name,
+			Rate:          b.rate,
+			EffectiveRate: b.effective,
+			Tokens:        b.tokens,
+			PausedMs:      durationMs(max(b.last.Sub(now), 0)),
+			Acquired:      b.acquired,
+			Waited:        b.waited,
+			Rejected:      b.rejected,
+			Throttled:     b.throttled,
+			WaitMsTotal:   durationMs(b.waitTotal),
+			WaitMsMax:     durationMs(b.waitMax),
+		})
+		b.mu.Unlock()
+	}
+	sort.Slice(stats, func(i, j int) bool { return stats[i].Name < stats[j].Name })
+	return stats
+}
+
+func (l *rateLimiter) stats() rateLimitStats {
+	l.mu.Lock()
+	defer l.mu.Unlock()
+	now := time.Now()
+	stats := rateLimitStats{
+		FailFast:          l.config.FailFast,
+		Hosts:             bucketsStats(l.hosts, now),
+		Vaults:            bucketsStats(l.vaults, now),
+		MaxInFlightPerOrg: l.config.MaxInFlightPerOrg,
+		OrgsInFlight:      make(map[string]int),
+		OrgWaited:         l.orgWaited.Load(),
+		OrgRejected:       l.orgRejected.Load(),
+		OrgWaitMsTotal:    durationMs(time.Duration(l.orgWaitTotal.Load())),
+	}
+	for org, b := range l.bulkheads {
+		if n := len(b.slots); n > 0 {
+			stats.OrgsInFlight[org] = n
+		}
+	}
+	return stats
+}
+
+// ConfigureRateLimits aplica una RateLimitConfig (JSON). Devuelve NULL si va
+// bien o el mensaje de error, que debe liberarse con FreeCString.
+//
+//export ConfigureRateLimits
+func ConfigureRateLimits(configJSON *C.char) *C.char {
+	var config RateLimitConfig
+	if err := json.Unmarshal([]byte(C.GoString(configJSON)), &config); err != nil {
+		return C.CString(fmt.Sprintf("invalid rate limit config: %v", err))
+	}
+	if config.HostRate < 0 || config.VaultRate < 0 || config.MaxInFlightPerOrg < 0 {
+		return C.CString("invalid rate limit config: negative limit")
+	}
+	limits.configure(config)
+	return nil
+}
+
+// GetRateLimitStats devuelve en JSON el estado de los buckets y bulkheads,
+// con las esperas y rechazos. Debe liberarse con FreeCString.
+//
+//export GetRateLimitStats
+func GetRateLimitStats() *C.char {
+	data, _ := json.Marshal(limits.stats())
+	return C.CString(string(data))
+}
+
+// ============ MÉTRICAS ============
+
+// Con las métricas activas (ConfigureStats o LIBCOREHEY_STATS=1 al cargar la
+// librería) cada fase de una llamada registra su duración en un histograma
+// log-lineal al estilo HDR, por fase, endpoint y status:
+//
+//	call     ClientFetch / ClientFetchIfChanged completo, cache incluida
+//	request  un intento HTTP (sin la espera del limitador de tasa)
+//	ttfb     de terminar de escribir la petición al primer byte de respuesta
+//	body     lectura del cuerpo
+//	dns      resolución de un host que no estaba en la cache de DNS
+//	connect  apertura de una conexión TCP
+//	tls      handshake TLS
+//	token    obtención del token de Azure (la credencial lo cachea)
+//	secrets  lectura de un secreto del Key Vault
+//	cstring  copia del resultado a memoria C
+//	stream   un stream completo, de abrirlo a leer (o cerrar) el cuerpo
+//
+// Registrar es un puñado de operaciones atómicas sin locks una vez creada la
+// serie; con las métricas desactivadas cuesta una lectura atómica.
+
+const (
+	// 2^histSubBits sub-buckets por potencia de dos: error relativo < 1/16
+	histSubBits    = 4
+	histSubBuckets = 1 << histSubBits
+	// Hasta 2^42 ns (~73 minutos); lo que pase de ahí cae en el último bucket
+	histBuckets = histSubBuckets * 40
+)
+
+// histIndex devuelve el bucket de ns: los valores menores que
+// 2*histSubBuckets tienen bucket propio y, a partir de ahí, cada potencia de
+// dos se divide en histSubBuckets buckets iguales.
+func histIndex(ns uint64) int {
+	if ns < 2*histSubBuckets {
+		return int(ns)
+	}
+	shift := bits.Len64(ns) - histSubBits - 1
+	return min(histSubBuckets*(shift+1)+int(ns>>shift)-histSubBuckets, histBuckets-1)
+}
+
+// histLowerBound es el menor valor (ns) que cae en el bucket index.
+func histLowerBound(index int) uint64 {
+	if index < 2*histSubBuckets {
+		return uint64(index)
+	}
+	shift := index/histSubBuckets - 1
+	return uint64(index%histSubBuckets+histSubBuckets) << shift
+}
+
+type histogram struct {
+	counts [histBuckets]atomic.Uint64
+	count  atomic.Uint64
+	sum    atomic.Uint64
+	min    atomic.Uint64
+	max    atomic.Uint64
+}
+
+func newHistogram() *histogram {
+	h := &histogram{}
+	h.min.Store(math.MaxUint64)
+	return h
+}
+
+func (h *histogram) record(d time.Duration) {
+	ns := uint64(max(d, 0))
+	h.counts[histIndex(ns)].Add(1)
+	h.count.Add(1)
+	h.sum.Add(ns)
+	for current := h.min.Load(); ns < current && !h.min.CompareAndSwap(current, ns); current = h.min.Load() {
+	}
+	for current := h.max.Load(); ns > current && !h.max.CompareAndSwap(current, ns); current = h.max.Load() {
+	}
+}
+
+type seriesKey struct {
+	phase    string
+	endpoint string
+	status   int
+}
+
+type counterKey struct {
+	name     string
+	endpoint string
+	code     int
+}
+
+type metricsRegistry struct {
+	enabled  atomic.Bool
+	mu       sync.RWMutex
+	series   map[seriesKey]*histogram
+	counters map[counterKey]*atomic.Uint64
+	since    time.Time
+}
+
+var metrics = newMetricsRegistry(os.Getenv("LIBCOREHEY_STATS") == "1")
+
+func newMetricsRegistry(enabled bool) *metricsRegistry {
+	m := &metricsRegistry{}
+	m.reset()
+	m.enabled.Store(enabled)
+	return m
+}
+
+// observe registra d en la serie (phase, endpoint, status).
+func (m *metricsRegistry) observe(phase, endpoint string, status int, d time.Duration) {
+	if !m.enabled.Load() {
+		return
+	}
+	key := seriesKey{phase, endpoint, status}
+	m.mu.RLock()
+	h := m.series[key]
+	m.mu.RUnlock()
+	if h == nil {
+		m.mu.Lock()
+		if h = m.series[key]; h == nil {
+			h = newHistogram()
+			m.series[key] = h
+		}
+		m.mu.Unlock()
+	}
+	h.record(d)
+}
+
+// observeSince registra el tiempo transcurrido desde start.
+func (m *metricsRegistry) observeSince(phase, endpoint string, status int, start time.Time) {
+	if m.enabled.Load() {
+		m.observe(phase, endpoint, status, time.Since(start))
+	}
+}
+
+func (m *metricsRegistry) count(name, endpoint string, code int) {
+	if !m.enabled.Load() {
+		return
+	}
+	key := counterKey{name, endpoint, code}
+	m.mu.RLock()
+	counter := m.counters[key]
+	m.mu.RUnlock()
+	if counter == nil {
+		m.mu.Lock()
+		if counter = m.counters[key]; counter == nil {
+			counter = &atomic.Uint64{}
+			m.counters[key] = counter
+		}
+		m.mu.Unlock()
+	}
+	counter.Add(1)
+}
+
+// recordCall cuenta un resultado de ClientFetch y registra su duración.
+func (m *metricsRegistry) recordCall(endpoint int, result fetchResult, start time.Time) {
+	if !m.enabled.Load() {
+		return
+	}
+	var name string
+	if endpoint >= 0 && endpoint < len(endpointPaths) {
+		name = endpointName(endpointPaths[endpoint])
+	}
+	m.observeSince("call", name, result.status, start)
+	m.count("calls", name, result.code)
+	if result.flags&resultFlagCached != 0 {
+		m.count("cache_hits", name, result.code)
+	}
+	if result.flags&resultFlagStale != 0 {
+		m.count("stale_hits", name, result.code)
+	}
+}
+
+func (m *metricsRegistry) reset() {
+	m.mu.Lock()
+	m.series = make(map[seriesKey]*histogram)
+	m.counters = make(map[counterKey]*atomic.Uint64)
+	m.since = time.Now()
+	m.mu.Unlock()
+}
+
+// endpointName es el nombre en las métricas del endpoint con ruta path.
+func endpointName(path string) string {
+	return strings.TrimPrefix(path, "/v2/")
+}
+
+// metricsEndpointKey lleva en el contexto de una petición HTTP el endpoint al
+// que se atribuyen sus fases.
+type metricsEndpointKey struct{}
+
+func metricsEndpoint(ctx context.Context) string {
+	name, _ := ctx.Value(metricsEndpointKey{}).(string)
+	return name
+}
+
+// timedCredential mide cada obtención de token de la credencial de Azure.
+type timedCredential struct {
+	azcore.TokenCredential
+}
+
+func (c timedCredential) GetToken(ctx context.Context, options policy.TokenRequestOptions) (azcore.AccessToken, error) {
+	start := time.Now()
+	token, err := c.TokenCredential.GetToken(ctx, options)
+	status := http.StatusOK
+	if err != nil {
+		status = 0
+	}
+	metrics.observeSince("token", "", status, start)
+	return token, err
+}
+
+type histogramStats struct {
+	Phase    string      `json:"phase"`
+	Endpoint string      `json:"endpoint"`
+	Status   int         `json:"status"`
+	Count    uint64      `json:"count"`
+	SumNs    uint64      `json:"sum_ns"`
+	MinNs    uint64      `json:"min_ns"`
+	MaxNs    uint64      `json:"max_ns"`
+	P50Ns    uint64      `json:"p50_ns"`
+	P90Ns    uint64      `json:"p90_ns"`
+	P99Ns    uint64      `json:"p99_ns"`
+	P999Ns   uint64      `json:"p999_ns"`
+	Buckets  [][2]uint64 `json:"buckets"` // [índice, cuenta] de los buckets no vacíos
+}
+
+type counterStats struct {
+	Name     string `json:"name"`
+	Endpoint string `json:"endpoint"`
+	Code     int    `json:"code"`
+	Value    uint64 `json:"value"`
+}
+
+type metricsStats struct {
+	Enabled       bool             `json:"enabled"`
+	SinceUnix     float64          `json:"since_unix"`
+	SubBucketBits int              `json:"sub_bucket_bits"`
+	Histograms    []histogramStats `json:"histograms"`
+	Counters      []counterStats   `json:"counters"`
+}
+
+// snapshot copia el histograma. Con registros concurrentes la copia puede
+// mezclar cuentas de antes y después de alguno, sin mayor consecuencia.
+func (h *histogram) snapshot(key seriesKey) histogramStats {
+	stats := histogramStats{Phase: key.phase, Endpoint: key.endpoint, Status: key.status, Buckets: [][2]uint64{}}
+	for i := range h.counts {
+		if n := h.counts[i].Load(); n > 0 {
+			stats.Buckets = append(stats.Buckets, [2]uint64{uint64(i), n})
+			stats.Count += n
+		}
+	}
+	if stats.Count == 0 {
+		return stats
+	}
+	stats.SumNs = h.sum.Load()
+	stats.MinNs, stats.MaxNs = h.min.Load(), h.max.Load()
+	quantile := func(q float64) uint64 {
+		rank := uint64(math.Ceil(q * float64(stats.Count)))
+		var seen uint64
+		for _, bucket := range stats.Buckets {
+			seen += bucket[1]
+			if seen >= rank {
+				// Límite superior del bucket, acotado por los extremos observados
+				upper := histLowerBound(int(bucket[0])+1) - 1
+				return min(max(upper, stats.MinNs), stats.MaxNs)
+			}
+		}
+		return stats.MaxNs
+	}
+	stats.P50Ns, stats.P90Ns = quantile(0.5), quantile(0.9)
+	stats.P99Ns, stats.P999Ns = quantile(0.99), quantile(0.999)
+	return stats
+}
+
+func (m *metricsRegistry) stats() metricsStats {
+	m.mu.RLock()
+	defer m.mu.RUnlock()
+
+	stats := metricsStats{
+		Enabled:       m.enabled.Load(),
+		SinceUnix:     float64(m.since.UnixNano()) / 1e9,
+		SubBucketBits: histSubBits,
+		Histograms:    make([]histogramStats, 0, len(m.series)),
+		Counters:      make([]counterStats, 0, len(m.counters)),
+	}
+	for key, h := range m.series {
+		stats.Histograms = append(stats.Histograms, h.snapshot(key))
+	}
+	for key, counter := range m.counters {
+		stats.Counters = append(stats.Counters, counterStats{key.name, key.endpoint, key.code, counter.Load()})
+	}
+	sort.Slice(stats.Histograms, func(i, j int) bool {
+		a, b := stats.Histograms[i], stats.Histograms[j]
+		if a.Phase != b.Phase {
+			return a.Phase < b.Phase
+		}
+		if a.Endpoint != b.Endpoint {
+			return a.Endpoint < b.Endpoint
+		}
+		return a.Status < b.Status
+	})
+	sort.Slice(stats.Counters, func(i, j int) bool {
+		a, b := stats.Counters[i], stats.Counters[j]
+		if a.Name != b.Name {
+			return a.Name < b.Name
+		}
+		if a.Endpoint != b.Endpoint {
+			return a.Endpoint < b.Endpoint
+		}
+		return a.Code < b.Code
+	})
+	return stats
+}
+
+func statsJSON() []byte {
+	data, _ := json.Marshal(metrics.stats())
+	return data
+}
+
+// StatsConfig activa o desactiva el registro de métricas.
+type StatsConfig struct {
+	Enabled bool `json:"enabled"`
+}
+
+// ConfigureStats aplica una StatsConfig (JSON). Las series ya registradas se
+// conservan. Devuelve NULL si va bien o el mensaje de error, que debe
+// liberarse con FreeCString.
+//
+//export ConfigureStats
+func ConfigureStats(configJSON *C.char) *C.char {
+	var config StatsConfig
+	if err := json.Unmarshal([]byte(C.GoString(configJSON)), &config); err != nil {
+		return C.CString(fmt.Sprintf("invalid stats config: %v", err))
+	}
+	metrics.enabled.Store(config.Enabled)
+	return nil
+}
+
+// GetStats devuelve en JSON los histogramas por fase, endpoint y status y los
+// contadores de llamadas. Debe liberarse con FreeCString.
+//
+//export GetStats
+func GetStats() *C.char {
+	return C.CString(string(statsJSON()))
+}
+
+// ResetStats descarta las series y contadores registrados.
+//
+//export ResetStats
+func ResetStats() {
+	metrics.reset()
+}
+
+// ============ TRANSPORTE HTTP COMPARTIDO ============
+
+// TransportConfig ajusta el transporte HTTP compartido por todas las llamadas a
+// la API de WhatsApp. Los campos en cero usan el valor por defecto.
+type TransportConfig struct {
+	MaxIdleConnsPerHost    int   `json:"max_idle_conns_per_host,omitempty"`
+	MaxConnsPerHost        int   `json:"max_conns_per_host,omitempty"`
+	IdleConnTimeoutSeconds int   `json:"idle_conn_timeout_seconds,omitempty"`
+	HTTP2                  *bool `json:"http2,omitempty"`
+	DNSCacheTTLSeconds     int   `json:"dns_cache_ttl_seconds,omitempty"`
+}
+
+const (
+	defaultMaxIdleConnsPerHost = 64
+	defaultIdleConnTimeout     = 90 * time.Second
+	defaultDNSCacheTTL         = 60 * time.Second
+)
+
+// transportPool es el transporte HTTP del proceso: mantiene conexiones keep-alive
+// (y HTTP/2 cuando el servidor lo soporta), resuelve DNS con cache y lleva la
+// cuenta de conexiones abiertas y en uso.
+type transportPool struct {
+	mu     sync.RWMutex
+	client *http.Client
+	dns    *dnsCache
+
+	open   atomic.Int64
+	inUse  atomic.Int64
+	dials  atomic.Int64
+	reused atomic.Int64
+}
+
+var sharedTransport = newTransportPool(TransportConfig{})
+
+func newTransportPool(config TransportConfig) *transportPool {
+	p := &transportPool{}
+	p.configure(config)
+	return p
+}
+
+// configure reemplaza el transporte con la nueva config. Las conexiones
+// inactivas del transporte anterior se cierran; las que están en uso terminan
+// su petición.
+func (p *transportPool) configure(config TransportConfig) {
+	maxIdle := config.MaxIdleConnsPerHost
+	if maxIdle <= 0 {
+		maxIdle = defaultMaxIdleConnsPerHost
+	}
+	idleTimeout := defaultIdleConnTimeout
+	if config.IdleConnTimeoutSeconds > 0 {
+		idleTimeout = time.Duration(config.IdleConnTimeoutSeconds) * time.Second
+	}
+	dnsTTL := defaultDNSCacheTTL
+	if config.DNSCacheTTLSeconds > 0 {
+		dnsTTL = time.Duration(config.DNSCacheTTLSeconds) * time.Second
+	} else if config.DNSCacheTTLSeconds < 0 {
+		dnsTTL = 0
+	}
+	http2 := config.HTTP2 == nil || *config.HTTP2
+
+	dns := &dnsCache{ttl: dnsTTL, entries: make(map[string]dnsEntry)}
+	dialer := &net.Dialer{Timeout: 10 * time.Second, KeepAlive: 30 * time.Second}
+
+	transport := &http.Transport{
+		Proxy:                 http.ProxyFromEnvironment,
+		DialContext:           p.dialContext(dialer, dns),
+		MaxIdleConns:          maxIdle * 4,
+		MaxIdleConnsPerHost:   maxIdle,
+		MaxConnsPerHost:       config.MaxConnsPerHost,
+		IdleConnTimeout:       idleTimeout,
+		TLSHandshakeTimeout:   10 * time.Second,
+		ExpectContinueTimeout: 1 * time.Second,
+		ForceAttemptHTTP2:     http2,
+	}
+	if !http2 {
+		transport.TLSNextProto = make(map[string]func(string, *tls.Conn) http.RoundTripper)
+	}
+
+	p.mu.Lock()
+	previous := p.client
+	// Sin Timeout: el plazo de cada petición viene de su contexto (callContext)
+	p.client = &http.Client{Transport: transport}
+	p.dns = dns
+	p.mu.Unlock()
+
+	if previous != nil {
+		previous.CloseIdleConnections()
+	}
+}
+
+func (p *transportPool) httpClient() *http.Client {
+	p.mu.RLock()
+	defer p.mu.RUnlock()
+	return p.client
+}
+
+// do ejecuta req con el transporte compartido. La conexión cuenta como "en
+// uso" hasta que se cierra el cuerpo de la respuesta.
+func (p *transportPool) do(req *http.Request) (*http.Response, error) {
+	var conn *countedConn
+	trace := &httptrace.ClientTrace{
+		GotConn: func(info httptrace.GotConnInfo) {
+			if info.Reused {
+				p.reused.Add(1)
+			}
+			if c := unwrapCountedConn(info.Conn); c != nil {
+				conn = c
+				if c.active.Add(1) == 1 {
+					p.inUse.Add(1)
+				}
+			}
+		},
+	}
+	// Con métricas, el tiempo hasta el primer byte se mide desde que la
+	// petición terminó de escribirse
+	var wroteAt, firstByteAt atomic.Int64
+	if metrics.enabled.Load() {
+		var tlsStart time.Time
+		trace.TLSHandshakeStart = func() { tlsStart = time.Now() }
+		trace.TLSHandshakeDone = func(_ tls.ConnectionState, err error) {
+			if err == nil && !tlsStart.IsZero() {
+				metrics.observeSince("tls", "", 0, tlsStart)
+			}
+		}
+		trace.WroteRequest = func(httptrace.WroteRequestInfo) { wroteAt.Store(time.Now().UnixNano()) }
+		trace.GotFirstResponseByte = func() { firstByteAt.Store(time.Now().UnixNano()) }
+	}
+	req = req.WithContext(httptrace.WithClientTrace(req.Context(), trace))
+
+	resp, err := p.httpClient().Do(req)
+	if err == nil && wroteAt.Load() != 0 && firstByteAt.Load() != 0 {
+		ttfb := time.Duration(firstByteAt.Load() - wroteAt.Load())
+		metrics.observe("ttfb", metricsEndpoint(req.Context()), resp.StatusCode, ttfb)
+	}
+	release := func() {
+		if conn != nil && conn.active.Add(-1) == 0 {
+			p.inUse.Add(-1)
+		}
+	}
+	if err != nil {
+		release()
+		return nil, err
+	}
+	resp.Body = &releasingBody{ReadCloser: resp.Body, release: release}
+	return resp, nil
+}
+
+func (p *transportPool) dialContext(dialer *net.Dialer, dns *dnsCache) func(ctx context.Context, network, addr string) (net.Conn, error) {
+	return func(ctx context.Context, network, addr string) (net.Conn, error) {
+		host, port, err := net.SplitHostPort(addr)
+		if err != nil {
+			return nil, err
+		}
+
+		targets := []string{addr}
+		if net.ParseIP(host) == nil && dns.ttl > 0 {
+			ips, err := dns.lookup(ctx, host)
+			if err != nil {
+				return nil, err
+			}
+			targets = targets[:0]
+			for _, ip := range ips {
+				targets = append(targets, net.JoinHostPort(ip, port))
+			}
+		}
+
+		var lastErr error
+		for _, target := range targets {
+			start := time.Now()
+			conn, err := dialer.DialContext(ctx, network, target)
+			if err == nil {
+				metrics.observeSince("connect", "", 0, start)
+				p.dials.Add(1)
+				p.open.Add(1)
+				return &countedConn{Conn: conn, pool: p}, nil
+			}
+			lastErr = err
+		}
+		return nil, lastErr
+	}
+}
+
+type transportStats struct {
+	OpenConns   int64 `json:"open_conns"`
+	IdleConns   int64 `json:"idle_conns"`
+	InUseConns  int64 `json:"in_use_conns"`
+	TotalDials  int64 `json:"total_dials"`
+	ReusedConns int64 `json:"reused_conns"`
+	DNSHits     int64 `json:"dns_hits"`
+	DNSMisses   int64 `json:"dns_misses"`
+}
+
+func (p *transportPool) stats() transportStats {
+	p.mu.RLock()
+	dns := p.dns
+	p.mu.RUnlock()
+
+	open, inUse := p.open.Load(), p.inUse.Load()
+	idle := open - inUse
+	if idle < 0 {
+		idle = 0
+	}
+	return transportStats{
+		OpenConns:   open,
+		IdleConns:   idle,
+		InUseConns:  inUse,
+		TotalDials:  p.dials.Load(),
+		ReusedConns: p.reused.Load(),
+		DNSHits:     dns.hits.Load(),
+		DNSMisses:   dns.misses.Load(),
+	}
+}
+
+// countedConn descuenta la conexión de las estadísticas al cerrarse.
+type countedConn struct {
+	net.Conn
+	pool   *transportPool
+	active atomic.Int64
+	closed atomic.Bool
+}
+
+func (c *countedConn) Close() error {
+	if c.closed.CompareAndSwap(false, true) {
+		c.pool.open.Add(-1)
+		if c.active.Swap(0) > 0 {
+			c.pool.inUse.Add(-1)
+		}
+	}
+	return c.Conn.Close()
+}
+
+func unwrapCountedConn(conn net.Conn) *countedConn {
+	for conn != nil {
+		if c, ok := conn.(*countedConn); ok {
+			return c
+		}
+		inner, ok := conn.(interface{ NetConn() net.Conn })
+		if !ok {
+			return nil
+		}
+		conn = inner.NetConn()
+	}
+	return nil
+}
+
+type releasingBody struct {
+	io.ReadCloser
+	once    sync.Once
+	release func()
+}
+
+func (b *releasingBody) Close() error {
+	err := b.ReadCloser.Close()
+	b.once.Do(b.release)
+	return err
+}
+
+type dnsEntry struct {
+	ips       []string
+	expiresAt time.Time
+}
+
+// dnsCache guarda las IPs resueltas por host durante ttl.
+type dnsCache struct {
+	ttl     time.Duration
+	mu      sync.Mutex
+	entries map[string]dnsEntry
+	hits    atomic.Int64
+	misses  atomic.Int64
+}
+
+func (d *dnsCache) lookup(ctx context.Context, host string) ([]string, error) {
+	now := time.Now()
+
+	d.mu.Lock()
+	entry, ok := d.entries[host]
+	d.mu.Unlock()
+	if ok && now.Before(entry.expiresAt) {
+		d.hits.Add(1)
+		return entry.ips, nil
+	}
+
+	d.misses.Add(1)
+	ips, err := net.DefaultResolver.LookupHost(ctx, host)
+	if err != nil {
+		return nil, err
+	}
+	metrics.observeSince("dns", "", 0, now)
+
+	d.mu.Lock()
+	d.entries[host] = dnsEntry{ips: ips, expiresAt: now.Add(d.ttl)}
+	d.mu.Unlock()
+	return ips, nil
+}
+
+// ConfigureTransport aplica una TransportConfig (JSON) al transporte compartido.
+// Devuelve NULL si todo fue bien o un mensaje de error que debe liberarse con
+// FreeCString.
+//
+//export ConfigureTransport
+func ConfigureTransport(configJSON *C.char) *C.char {
+	var config TransportConfig
+	if err := json.Unmarshal([]byte(C.GoString(configJSON)), &config); err != nil {
+		return C.CString(fmt.Sprintf("invalid transport config: %v", err))
+	}
+	sharedTransport.configure(config)
+	return nil
+}
+
+//export GetTransportStats
+func GetTransportStats() *C.char {
+	data, _ := json.Marshal(sharedTransport.stats())
+	return C.CString(string(data))
+}
+
+// ============ AZURE KEY VAULT (WORKLOAD IDENTITY) ============
+
+const (
+	secretURLName   = "url-whatapp"
+	secretTokenName = "token-whatapp"
+
+	defaultSecretTTL = 15 * time.Minute
+)
+
+type VaultConfig struct {
+	VaultURL         string           `json:"vault_url,omitempty"`
+	SecretTTLSeconds int              `json:"secret_ttl_seconds,omitempty"`
+	Transport        *TransportConfig `json:"transport,omitempty"`
+	// RateLimitMode ("wait" o "fail_fast") fija el modo de los límites de tasa
+	// para este cliente; vacío usa el de ConfigureRateLimits
+	RateLimitMode string `json:"rate_limit_mode,omitempty"`
+	// LocalVault lee los secretos de un Key Vault local sin credencial de
+	// Azure (ver KEY VAULT LOCAL)
+	LocalVault bool `json:"local_vault,omitempty"`
+}
+
+// resolveVaultURL devuelve la URL del Key Vault: config > AZURE_KEY_VAULT_URL >
+// AZURE_KEY_VAULT_NAME > vault por defecto.
+func (c VaultConfig) resolveVaultURL() string {
+	vaultURL := c.VaultURL
+	if vaultURL == "" {
+		vaultURL = os.Getenv("AZURE_KEY_VAULT_URL")
+		if vaultURL == "" {
+			vaultName := os.Getenv("AZURE_KEY_VAULT_NAME")
+			if vaultName == "" {
+				vaultName = "wasecrets"
+			}
+			vaultURL = fmt.Sprintf("https://%s.vault.azure.net", vaultName)
+		}
+	}
+	return strings.TrimRight(vaultURL, "/")
+}
+
+// secretTTL devuelve el TTL de la cache de secretos. Un valor negativo en la
+// config desactiva la cache.
+func (c VaultConfig) secretTTL() time.Duration {
+	if c.SecretTTLSeconds == 0 {
+		return defaultSecretTTL
+	}
+	if c.SecretTTLSeconds < 0 {
+		return 0
+	}
+	return time.Duration(c.SecretTTLSeconds) * time.Second
+}
+
+// getSecretsFromVault lee los secretos url-whatapp y token-whatapp usando la
+// credencial del cliente. Los valores se sirven desde la cache de secretos del
+// proceso; sólo se consulta el Key Vault en un fallo de cache (ambos secretos en
+// paralelo) o al refrescar en segundo plano.
+func (c *coreClient) getSecretsFromVault(ctx context.Context) (string, string, error) {
+	names := []string{secretURLName, secretTokenName}
+
+	values, missing, stale, generation := secretStore.lookup(c.vaultURL, names)
+	if len(missing) == 0 && len(stale) == 0 {
+		return values[0], values[1], nil
+	}
+
+	client, err := c.secretsClient()
+	if err != nil {
+		return "", "", err
+	}
+
+	if len(stale) > 0 {
+		go secretStore.refresh(client, c.vaultURL, stale, c.ttl, generation)
+	}
+	if len(missing) == 0 {
+		return values[0], values[1], nil
+	}
+
+	fetched, err := fetchSecrets(ctx, client, c.vaultURL, missing, generation)
+	if err != nil {
+		return "", "", err
+	}
+	for i, name := range names {
+		if v, ok := fetched[name]; ok {
+			values[i] = v
+			secretStore.store(c.vaultURL, name, v, c.ttl, generation)
+		}
+	}
+
+	return values[0], values[1], nil
+}
+
+// secretSource lee el valor actual de un secreto.
+type secretSource interface {
+	secret(ctx context.Context, name string) (string, error)
+}
+
+// azureVault lee secretos del Key Vault de Azure con la credencial por
+// defecto.
+type azureVault struct {
+	client *azsecrets.Client
+}
+
+func newSecretsClient(vaultURL string) (*azsecrets.Client, error) {
+	cred, err := azidentity.NewDefaultAzureCredential(nil)
+	if err != nil {
+		return nil, fmt.Errorf("failed to create DefaultAzureCredential: %w", err)
+	}
+
+	client, err := azsecrets.NewClient(vaultURL, timedCredential{cred}, nil)
+	if err != nil {
+		return nil, fmt.Errorf("failed to create secrets client: %w", err)
+	}
+	return client, nil
+}
+
+type secretValue struct {
+	value string
+	err   error
+}
+
+// fetchSecrets lee los secretos indicados en paralelo. Las lecturas
+// simultáneas del mismo secreto se agrupan en una sola petición al Key Vault,
+// pero sólo dentro de la misma generación de la cache: tras una invalidación
+// nadie se une a una lectura empezada antes, que puede traer el valor rotado.
+func fetchSecrets(ctx context.Context, source secretSource, vaultURL string, names []string, generation uint64) (map[string]string, error) {
+	values := make([]string, len(names))
+	errs := make([]error, len(names))
+	// La lectura agrupada no lleva el contexto del llamador: el modo se fija aquí
+	failFast := limits.isFailFast(ctx)
+
+	var wg sync.WaitGroup
+	for i, name := range names {
+		wg.Add(1)
+		go func(i int, name string) {
+			defer wg.Done()
+			flightKey := secretKey(vaultURL, name) + "|" + strconv.FormatUint(generation, 10)
+			secret, ok := secretFlights.do(ctx, flightKey, func(ctx context.Context) secretValue {
+				if err := limits.acquire(ctx, true, vaultURL, failFast); err != nil {
+					return secretValue{"", err}
+				}
+				start := time.Now()
+				value, err := source.secret(ctx, name)
+				var respErr *azcore.ResponseError
+				status := 0
+				if errors.As(err, &respErr) && respErr.RawResponse != nil {
+					status = respErr.StatusCode
+					limits.observe(true, vaultURL, respErr.StatusCode, respErr.RawResponse.Header)
+				} else if err == nil {
+					status = http.StatusOK
+					limits.observe(true, vaultURL, http.StatusOK, nil)
+				}
+				metrics.observeSince("secrets", "", status, start)
+				return secretValue{value, err}
+			})
+			if !ok {
+				errs[i] = ctx.Err()
+				return
+			}
+			values[i], errs[i] = secret.value, secret.err
+		}(i, name)
+	}
+	wg.Wait()
+
+	result := make(map[string]string, len(names))
+	for i, name := range names {
+		if errs[i] != nil {
+			return nil, fmt.Errorf("failed to get %s secret: %w", name, errs[i])
+		}
+		result[name] = values[i]
+	}
+	return result, nil
+}
+
+func (v azureVault) secret(ctx context.Context, name string) (string, error) {
+	// Versión vacía ("") => última versión del secreto
+	resp, err := v.client.GetSecret(ctx, name, "", nil)
+	if err != nil {
+		return "", err
+	}
+	if resp.Value == nil {
+		return "", fmt.Errorf("secret %s has nil value", name)
+	}
+	return *resp.Value, nil
+}
+
+// ============ KEY VAULT LOCAL ============
+
+// Para medir la librería sin Azure, con local_vault los secretos se leen de
+// vault_url con la API REST del Key Vault pero sin credencial: GET {vault_url}/secrets/{nombre} devuelve
+// {"value": "..."}. Es lo que sirven los suplentes de libcorehey.standins,
+// cuyo secreto url-whatapp apunta a su propia API de pruebas. La lectura pasa
+// por el transporte compartido, la cache de secretos y los límites de tasa
+// igual que con el Key Vault real. Sólo se activa con local_vault en la
+// propia configuración, nunca para todo el proceso: así un cliente de
+// producción no puede acabar leyendo secretos sin autenticar por error.
+
+type localVault struct {
+	vaultURL string
+}
+
+func (v localVault) secret(ctx context.Context, name string) (string, error) {
+	req, err := http.NewRequestWithContext(ctx, http.MethodGet, v.vaultURL+"/secrets/"+url.PathEscape(name)+"?api-version=7.4", nil)
+	if err != nil {
+		return "", err
+	}
+	resp, err := sharedTransport.do(req)
+	if err != nil {
+		return "", err
+	}
+	defer resp.Body.Close()
+
+	body, err := readBody(resp)
+	if err != nil {
+		return "", err
+	}
+	if resp.StatusCode != http.StatusOK {
+		return "", &azcore.ResponseError{StatusCode: resp.StatusCode, RawResponse: resp}
+	}
+	var secret struct {
+		Value *string `json:"value"`
+	}
+	if err := json.Unmarshal(body, &secret); err != nil {
+		return "", fmt.Errorf("secret %s: %v", name, err)
+	}
+	if secret.Value == nil {
+		return "", fmt.Errorf("secret %s has nil value", name)
+	}
+	return *secret.Value, nil
+}
+
+// ============ CACHE DE SECRETOS ============
+
+// secretRefreshAhead es la fracción del TTL a partir de la cual un secreto se
+// sigue sirviendo desde cache pero se refresca en segundo plano.
+const secretRefreshAhead = 0.8
+
+type secretEntry struct {
+	value      string
+	refreshAt  time.Time
+	expiresAt  time.Time
+	refreshing bool
+}
+
+// secretCache guarda secretos por (vault URL, nombre) para todo el proceso.
+// generation cuenta las invalidaciones: quien lee el Key Vault anota la
+// generación antes de leer, y store descarta el valor si entretanto hubo una
+// invalidación, para que una lectura previa a una rotación no lo vuelva a
+// dejar en cache durante todo un TTL.
+type secretCache struct {
+	mu         sync.Mutex
+	entries    map[string]*secretEntry
+	generation uint64
+}
+
+var secretStore = &secretCache{entries: make(map[string]*secretEntry)}
+
+func secretKey(vaultURL, name string) string {
+	return vaultURL + "|" + name
+}
+
+// lookup devuelve los valores en cache para names, los nombres que faltan (o
+// han expirado), los que deben refrescarse en segundo plano y la generación
+// con la que guardar lo que se lea. Los secretos devueltos en stale quedan
+// marcados como "refrescando".
+func (c *secretCache) lookup(vaultURL string, names []string) (values []string, missing []string, stale []string, generation uint64) {
+	now := time.Now()
+	values = make([]string, len(names))
+
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	for i, name := range names {
+		entry, ok := c.entries[secretKey(vaultURL, name)]
+		if !ok || !now.Before(entry.expiresAt) {
+			missing = append(missing, name)
+			continue
+		}
+		values[i] = entry.value
+		if !now.Before(entry.refreshAt) && !entry.refreshing {
+			entry.refreshing = true
+			stale = append(stale, name)
+		}
+	}
+	return values, missing, stale, c.generation
+}
+
+// store guarda un valor leído en la generación indicada; lo descarta si la
+// cache se invalidó después.
+func (c *secretCache) store(vaultURL, name, value string, ttl time.Duration, generation uint64) {
+	if ttl <= 0 {
+		return
+	}
+	now := time.Now()
+
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	if generation != c.generation {
+		return
+	}
+
+	c.entries[secretKey(vaultURL, name)] = &secretEntry{
+		value:     value,
+		refreshAt: now.Add(time.Duration(float64(ttl) * secretRefreshAhead)),
+		expiresAt: now.Add(ttl),
+	}
+}
+
+// refresh vuelve a leer los secretos indicados. Si falla, se conserva el valor
+// anterior hasta que expire.
+func (c *secretCache) refresh(source secretSource, vaultURL string, names []string, ttl time.Duration, generation uint64) {
+	ctx, cancel := context.WithTimeout(context.Background(), defaultCallTimeout)
+	defer cancel()
+
+	fetched, err := fetchSecrets(ctx, source, vaultURL, names, generation)
+	if err == nil {
+		for name, value := range fetched {
+			c.store(vaultURL, name, value, ttl, generation)
+		}
+		return
+	}
+
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	for _, name := range names {
+		if entry, ok := c.entries[secretKey(vaultURL, name)]; ok {
+			entry.refreshing = false
+		}
+	}
+}
+
+// invalidate elimina los secretos de vaultURL, o todos si vaultURL está vacío,
+// y descarta lo que traigan las lecturas en curso.
+func (c *secretCache) invalidate(vaultURL string) {
+	vaultURL = strings.TrimRight(vaultURL, "/")
+
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	c.generation++
+
+	if vaultURL == "" {
+		c.entries = make(map[string]*secretEntry)
+		return
+	}
+	prefix := vaultURL + "|"
+	for key := range c.entries {
+		if strings.HasPrefix(key, prefix) {
+			delete(c.entries, key)
+		}
+	}
+}
+
+//export InvalidateSecretCache
+func InvalidateSecretCache(vaultURL *C.char) {
+	secretStore.invalidate(C.GoString(vaultURL))
+}
+
+// ============ MODO DEMONIO (SIDECAR) ============
+
+// Compilado como ejecutable (go build -o libcorehey-daemon lib.go), lib.go es
+// un demonio que sirve respuestas rápidas y tipificaciones a todos los workers
+// Python del host por un socket Unix, de modo que comparten un único pool de
+// conexiones, cache de secretos y cache de respuestas, y no cargan el runtime
+// de Go en cada proceso.
+//
+// Cada conexión atiende peticiones de una en una. Tramas (little-endian):
+//
+//	petición:  uint32 longitud | uint8 op | uint8 endpoint | uint32 plazo-ms |
+//	           uint16+config | uint16+org | uint16+group | uint16+etag |
+//	           uint16+last-modified
+//	respuesta: uint32 longitud | uint16 status | uint8 code | uint8 flags |
+//	           uint16+etag | uint16+last-modified | cuerpo (resto de la trama)
+//
+// La longitud no se incluye a sí misma. Un plazo 0 usa defaultCallTimeout; la
+// cancelación es del lado del cliente, que cierra su conexión.
+//
+// Con daemonOpStream la respuesta lleva el cuerpo vacío y, si code es 0, la
+// siguen tramas con el cuerpo (ver RESPUESTAS EN STREAMING):
+//
+//	trozo: uint32 longitud (> 0) | datos
+//	fin:   uint32 0 | uint8 code (0 si el cuerpo llegó entero)
+
+const (
+	daemonOpFetch          = 1
+	daemonOpFetchIfChanged = 2
+	daemonOpPing           = 3
+	daemonOpStats          = 4 // cuerpo: el JSON de GetStats
+	daemonOpStream         = 5
+
+	daemonMaxRequest = 1 << 20
+	daemonChunkSize  = 64 << 10
+)
+
+// DaemonConfig es el fichero -config del demonio: la misma configuración que
+// aceptan ConfigureResponseCache, ConfigureTransport, ConfigureResilience,
+// ConfigureRateLimits, ConfigureStats, ConfigureSnapshot y
+// ClientRegisterHotKeys.
+type DaemonConfig struct {
+	ResponseCache *ResponseCacheConfig `json:"response_cache,omitempty"`
+	Transport     *TransportConfig     `json:"transport,omitempty"`
+	Resilience    *ResilienceConfig    `json:"resilience,omitempty"`
+	RateLimits    *RateLimitConfig     `json:"rate_limits,omitempty"`
+	Stats         *StatsConfig         `json:"stats,omitempty"`
+	Snapshot      *SnapshotConfig      `json:"snapshot,omitempty"`
+	HotKeys       []struct {
+		VaultConfig     json.RawMessage `json:"vault_config"`
+		Requests        []batchRequest  `json:"requests"`
+		IntervalSeconds float64         `json:"interval_seconds"`
+	} `json:"hot_keys,omitempty"`
+}
+
+// defaultDaemonSocket es $LIBCOREHEY_DAEMON_SOCKET o daemon.sock dentro de
+// libcorehey-<uid>, un directorio 0700 del usuario en el directorio temporal.
+func defaultDaemonSocket() string {
+	if path := os.Getenv("LIBCOREHEY_DAEMON_SOCKET"); path != "" {
+		return path
+	}
+	return filepath.Join(os.TempDir(), fmt.Sprintf("libcorehey-%d", os.Getuid()), "daemon.sock")
+}
+
+// ownedByUser indica si path (sin seguir enlaces) pertenece a este usuario.
+func ownedByUser(path string) bool {
+	cpath := C.CString(path)
+	defer C.free(unsafe.Pointer(cpath))
+	return int64(C.libcorehey_owner(cpath)) == int64(os.Getuid())
+}
+
+// prepareDaemonSocket deja socketPath listo para escuchar. El directorio por
+// defecto se crea privado y se rechaza si es de otro usuario o lo pueden abrir
+// otros. Un socket que nadie atiende es de un demonio anterior que no terminó
+// bien y se borra, pero nunca si no es un socket o no es de este usuario.
+func prepareDaemonSocket(socketPath string) error {
+	dir := filepath.Dir(socketPath)
+	if os.Getenv("LIBCOREHEY_DAEMON_SOCKET") == "" && socketPath == defaultDaemonSocket() {
+		if err := os.Mkdir(dir, 0o700); err != nil && !os.IsExist(err) {
+			return err
+		}
+		info, err := os.Lstat(dir)
+		if err != nil {
+			return err
+		}
+		if !info.IsDir() || !ownedByUser(dir) || (runtime.GOOS != "windows" && info.Mode().Perm()&0o077 != 0) {
+			return fmt.Errorf("refusing to use %s: not a private directory of this user", dir)
+		}
+	}
+
+	if conn, err := net.DialTimeout("unix", socketPath, time.Second); err == nil {
+		conn.Close()
+		return fmt.Errorf("another daemon is already listening on %s", socketPath)
+	}
+	info, err := os.Lstat(socketPath)
+	if os.IsNotExist(err) {
+		return nil
+	}
+	if err != nil {
+		return err
+	}
+	if info.Mode()&os.ModeSocket == 0 || !ownedByUser(socketPath) {
+		return fmt.Errorf("refusing to remove %s: not a socket owned by this user", socketPath)
+	}
+	return os.Remove(socketPath)
+}
+
+// listenDaemonSocket escucha en socketPath. El socket nace con umask 077, así
+// que en ningún momento otro usuario puede conectarse.
+func listenDaemonSocket(socketPath string) (net.Listener, error) {
+	previous := C.libcorehey_umask(0o077)
+	defer C.libcorehey_umask(previous)
+	return net.Listen("unix", socketPath)
+}
+
+func runDaemon(args []string) error {
+	flags := flag.NewFlagSet("libcorehey-daemon", flag.ContinueOnError)
+	socketPath := flags.String("socket", defaultDaemonSocket(), "Unix socket to listen on")
+	configPath := flags.String("config", "", "JSON file with response_cache, transport, resilience, rate_limits, stats and snapshot settings")
+	if err := flags.Parse(args); err != nil {
+		return err
+	}
+
+	if *configPath != "" {
+		data, err := os.ReadFile(*configPath)
+		if err != nil {
+			return err
+		}
+		var config DaemonConfig
+		if err := json.Unmarshal(data, &config); err != nil {
+			return fmt.Errorf("invalid daemon config: %v", err)
+		}
+		if config.Transport != nil {
+			sharedTransport.configure(*config.Transport)
+		}
+		if config.Resilience != nil {
+			upstream.configure(*config.Resilience)
+		}
+		if config.RateLimits != nil {
+			limits.configure(*config.RateLimits)
+		}
+		if config.Stats != nil {
+			metrics.enabled.Store(config.Stats.Enabled)
+		}
+		if config.ResponseCache != nil && config.ResponseCache.Enabled {
+			responseCacheStore.Store(newResponseCache(*config.ResponseCache))
+		}
+		if config.Snapshot != nil {
+			if err := snapshots.configure(*config.Snapshot); err != nil {
+				return err
+			}
+		}
+		for _, hot := range config.HotKeys {
+			vaultConfig := "{}"
+			if len(hot.VaultConfig) > 0 {
+				vaultConfig = string(hot.VaultConfig)
+			}
+			client, err := clientForConfig(vaultConfig)
+			if err != nil {
+				return err
+			}
+			interval := time.Duration(hot.IntervalSeconds * float64(time.Second))
+			if err := hotKeys.register(client, hot.Requests, interval); err != nil {
+				return err
+			}
+		}
+	}
+
+	if err := prepareDaemonSocket(*socketPath); err != nil {
+		return err
+	}
+	listener, err := listenDaemonSocket(*socketPath)
+	if err != nil {
+		return err
+	}
+
+	signals := make(chan os.Signal, 1)
+	signal.Notify(signals, os.Interrupt, syscall.SIGTERM)
+	go func() {
+		<-signals
+		listener.Close()
+	}()
+
+	log.Printf("libcorehey daemon listening on %s", *socketPath)
+	for {
+		conn, err := listener.Accept()
+		if err != nil {
+			if errors.Is(err, net.ErrClosed) {
+				break
+			}
+			log.Printf("accept: %v", err)
+			time.Sleep(100 * time.Millisecond)
+			continue
+		}
+		go serveDaemonConn(conn)
+	}
+
+	if err := snapshots.save(true); err != nil {
+		log.Printf("saving snapshot: %v", err)
+	}
+	return nil
+}
+
+func serveDaemonConn(conn net.Conn) {
+	defer conn.Close()
+	reader := bufio.NewReaderSize(conn, 4096)
+	writer := bufio.NewWriterSize(conn, 64<<10)
+
+	var header [4]byte
+	var chunk []byte
+	for {
+		if _, err := io.ReadFull(reader, header[:]); err != nil {
+			return
+		}
+		size := binary.LittleEndian.Uint32(header[:])
+		if size > daemonMaxRequest {
+			return
+		}
+		frame := make([]byte, size)
+		if _, err := io.ReadFull(reader, frame); err != nil {
+			return
+		}
+
+		result, stream, ok := handleDaemonRequest(frame)
+		if !ok {
+			return
+		}
+		if err := writeDaemonResult(writer, result); err != nil {
+			if stream != nil {
+				stream.close()
+			}
+			return
+		}
+		if stream != nil {
+			if chunk == nil {
+				chunk = make([]byte, daemonChunkSize)
+			}
+			if err := writeDaemonStream(writer, stream, chunk); err != nil {
+				return
+			}
+		}
+	}
+}
+
+// handleDaemonRequest atiende una trama; con daemonOpStream devuelve además el
+// stream del cuerpo. Devuelve false si está mal formada, en cuyo caso se
+// cierra la conexión.
+func handleDaemonRequest(frame []byte) (fetchResult, *responseStream, bool) {
+	request := binaryReader{data: frame}
+	op := request.uint8()
+	endpoint := int(request.uint8())
+	timeoutMs := C.longlong(request.uint32())
+	configJSON := string(request.bytes(int(request.uint16())))
+	org := string(request.bytes(int(request.uint16())))
+	group := string(request.bytes(int(request.uint16())))
+	var previous validators
+	previous.etag = string(request.bytes(int(request.uint16())))
+	previous.lastModified = string(request.bytes(int(request.uint16())))
+	if request.err {
+		return fetchResult{}, nil, false
+	}
+
+	switch op {
+	case daemonOpPing:
+		return fetchResult{status: http.StatusOK, index: -1}, nil, true
+	case daemonOpStats:
+		return fetchResult{status: http.StatusOK, body: statsJSON(), index: -1}, nil, true
+	}
+	client, err := clientForConfig(configJSON)
+	if err != nil {
+		return errorResult(resultErrConfig, "Invalid config", err), nil, true
+	}
+	ctx, cancel := callContext(timeoutMs, 0)
+	if op == daemonOpStream {
+		result, stream := client.openStream(ctx, cancel, endpoint, org, group)
+		return result, stream, true
+	}
+	defer cancel()
+	switch op {
+	case daemonOpFetch:
+		return client.fetch(ctx, endpoint, org, group), nil, true
+	case daemonOpFetchIfChanged:
+		return client.fetchIfChanged(ctx, endpoint, org, group, previous), nil, true
+	default:
+		return fetchResult{}, nil, false
+	}
+}
+
+func writeDaemonResult(writer *bufio.Writer, result fetchResult) error {
+	etag, lastModified := result.etag, result.lastModified
+	if len(etag) > 0xffff {
+		etag = ""
+	}
+	if len(lastModified) > 0xffff {
+		lastModified = ""
+	}
+
+	head := make([]byte, 0, 16+len(etag)+len(lastModified))
+	head = binary.LittleEndian.AppendUint32(head, uint32(2+1+1+2+len(etag)+2+len(lastModified)+len(result.body)))
+	head = binary.LittleEndian.AppendUint16(head, uint16(result.status))
+	head = append(head, byte(result.code), byte(result.flags))
+	head = binary.LittleEndian.AppendUint16(head, uint16(len(etag)))
+	head = append(head, etag...)
+	head = binary.LittleEndian.AppendUint16(head, uint16(len(lastModified)))
+	head = append(head, lastModified...)
+
+	writer.Write(head)
+	writer.Write(result.body)
+	return writer.Flush()
+}
+
+// writeDaemonStream envía el cuerpo del stream en trozos de como mucho
+// len(chunk) bytes, cada uno en cuanto llega, y la trama de fin.
+func writeDaemonStream(writer *bufio.Writer, stream *responseStream, chunk []byte) error {
+	defer stream.close()
+	var head [4]byte
+	for {
+		n, code := stream.read(chunk)
+		binary.LittleEndian.PutUint32(head[:], uint32(n))
+		writer.Write(head[:])
+		if n == 0 {
+			writer.WriteByte(byte(code))
+			return writer.Flush()
+		}
+		writer.Write(chunk[:n])
+		if err := writer.Flush(); err != nil {
+			return err
+		}
+	}
+}
+
+// ============ UTILIDADES MATEMÁTICAS ============
+
+// Funciones triviales expuestas a Python (add_numbers, multiply_numbers,
+// get_fibonacci, is_prime). Sirven también para medir el coste fijo de una
+// llamada Python -> Go. Operan con int de C: los resultados que no caben se
+// desbordan igual que en C.
+
+//export Add
+func Add(a, b C.int) C.int {
+	return a + b
+}
+
+//export Multiply
+func Multiply(a, b C.int) C.int {
+	return a * b
+}
+
+//export Fibonacci
+func Fibonacci(n C.int) C.int {
+	var a, b C.int = 0, 1
+	for i := C.int(0); i < n; i++ {
+		a, b = b, a+b
+	}
+	return a
+}
+
+//export IsPrime
+func IsPrime(n C.int) C.int {
+	if n < 2 {
+		return 0
+	}
+	if n%2 == 0 || n%3 == 0 {
+		if n <= 3 {
+			return 1
+		}
+		return 0
+	}
+	m := int64(n)
+	for i := int64(5); i*i <= m; i += 6 {
+		if m%i == 0 || m%(i+2) == 0 {
+			return 0
+		}
+	}
+	return 1
+}
+
+// ============ KERNELS SOBRE BUFFERS ============
+
+// Variantes de add_numbers, multiply_numbers e is_prime sobre arrays de int64
+// de Python (array.array, NumPy, memoryview): una sola llamada procesa los n
+// elementos, en lugar de pagar el coste fijo de una llamada por elemento. Los
+// punteros apuntan a memoria de Python, que sigue viva durante la llamada
+// (ctypes suelta el GIL mientras tanto). Los lotes grandes se reparten entre
+// GOMAXPROCS goroutines en bloques que cada una va tomando de un contador, de
+// forma que un bloque lento (primos grandes) no deja a las demás paradas.
+// Suma y producto se desbordan como int64 (complemento a dos); out puede ser
+// la misma memoria que a o b.
+
+const (
+	// Elementos por bloque: suficientes para amortizar el reparto
+	batchArithmeticBlock = 64 << 10
+	batchPrimeBlock      = 1 << 10
+)
+
+// parallelBlocks llama a body con los rangos [start, end) de n elementos en
+// bloques de block, en varias goroutines si hay más de un bloque.
+func parallelBlocks(n, block int, body func(start, end int)) {
+	blocks := (n + block - 1) / block
+	workers := runtime.GOMAXPROCS(0)
+	if workers > blocks {
+		workers = blocks
+	}
+	if workers <= 1 {
+		body(0, n)
+		return
+	}
+	var next atomic.Int64
+	var wg sync.WaitGroup
+	wg.Add(workers)
+	for w := 0; w < workers; w++ {
+		go func() {
+			defer wg.Done()
+			for {
+				start := int(next.Add(1)-1) * block
+				if start >= n {
+					return
+				}
+				body(start, min(start+block, n))
+			}
+		}()
+	}
+	wg.Wait()
+}
+
+func int64Slice(p *C.longlong, n C.longlong) []int64 {
+	return unsafe.Slice((*int64)(unsafe.Pointer(p)), int(n))
+}
+
+//export AddBatch
+func AddBatch(a, b, out *C.longlong, n C.longlong) {
+	if n <= 0 {
+		return
+	}
+	xs, ys, zs := int64Slice(a, n), int64Slice(b, n), int64Slice(out, n)
+	parallelBlocks(int(n), batchArithmeticBlock, func(start, end int) {
+		x, y, z := xs[start:end], ys[start:end], zs[start:end]
+		y, z = y[:len(x)], z[:len(x)]
+		for i := range x {
+			z[i] = x[i] + y[i]
+		}
+	})
+}
+
+//export MultiplyBatch
+func MultiplyBatch(a, b, out *C.longlong, n C.longlong) {
+	if n <= 0 {
+		return
+	}
+	xs, ys, zs := int64Slice(a, n), int64Slice(b, n), int64Slice(out, n)
+	parallelBlocks(int(n), batchArithmeticBlock, func(start, end int) {
+		x, y, z := xs[start:end], ys[start:end], zs[start:end]
+		y, z = y[:len(x)], z[:len(x)]
+		for i := range x {
+			z[i] = x[i] * y[i]
+		}
+	})
+}
+
+// IsPrimeBatch escribe en out[i] 1 si values[i] es primo y 0 si no (también
+// para valores menores que 2).
+//
+//export IsPrimeBatch
+func IsPrimeBatch(values *C.longlong, out *C.uchar, n C.longlong) {
+	if n <= 0 {
+		return
+	}
+	xs := int64Slice(values, n)
+	flags := unsafe.Slice((*byte)(unsafe.Pointer(out)), int(n))
+	parallelBlocks(int(n), batchPrimeBlock, func(start, end int) {
+		x, f := xs[start:end], flags[start:end]
+		f = f[:len(x)]
+		for i, v := range x {
+			if isPrime64(v) {
+				f[i] = 1
+			} else {
+				f[i] = 0
+			}
+		}
+	})
+}
+
+// Primos hasta 37: divisores de prueba y bases de Miller-Rabin. Con todas
+// ellas el test es exacto para cualquier int64.
+var smallPrimes = [...]uint64{2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37}
+
+// isPrime64 usa división de prueba por los primos pequeños y después
+// Miller-Rabin determinista: bases 2, 7 y 61 por debajo de 2^32 (bastan
+// hasta 4.759.123.141) y los doce primos pequeños por encima.
+func isPrime64(v int64) bool {
+	if v < 2 {
+		return false
+	}
+	n := uint64(v)
+	for _, p := range smallPrimes {
+		if n%p == 0 {
+			return n == p
+		}
+	}
+	if n < 37*37 {
+		return true
+	}
+
+	// n-1 = d * 2^s con d impar
+	d := n - 1
+	s := bits.TrailingZeros64(d)
+	d >>= uint(s)
+
+	if n < 1<<32 {
+		for _, a := range [...]uint64{2, 7, 61} {
+			if !millerRabin32(n, d, s, a) {
+				return false
+			}
+		}
+		return true
+	}
+	for _, a := range smallPrimes {
+		if !millerRabin64(n, d, s, a) {
+			return false
+		}
+	}
+	return true
+}
+
+// millerRabin32 es una ronda para n < 2^32, donde los productos caben en
+// uint64 y basta el operador %.
+func millerRabin32(n, d uint64, s int, a uint64) bool {
+	a %= n
+	if a == 0 {
+		return true
+	}
+	x := uint64(1)
+	for e := d; e > 0; e >>= 1 {
+		if e&1 == 1 {
+			x = x * a % n
+		}
+		a = a * a % n
+	}
+	if x == 1 || x == n-1 {
+		return true
+	}
+	for r := 1; r < s; r++ {
+		x = x * x % n
+		if x == n-1 {
+			return true
+		}
+	}
+	return false
+}
+
+// millerRabin64 es una ronda para n >= 2^32 (impar). Los productos de 128
+// bits se reducen en forma de Montgomery (R = 2^64), que cambia la división
+// de cada producto por dos multiplicaciones; inv es n^-1 mod 2^64.
+func millerRabin64(n, d uint64, s int, a uint64) bool {
+	inv := n // correcto en los 3 bits bajos; cada paso de Newton los duplica
+	for i := 0; i < 5; i++ {
+		inv *= 2 - n*inv
+	}
+	mulMod := func(x, y uint64) uint64 { // x*y/R mod n
+		hi, lo := bits.Mul64(x, y)
+		mh, _ := bits.Mul64(lo*inv, n)
+		if hi < mh {
+			return hi - mh + n
+		}
+		return hi - mh
+	}
+	toMont := func(x uint64) uint64 { // x*R mod n
+		_, rem := bits.Div64(x%n, 0, n)
+		return rem
+	}
+
+	one := toMont(1)
+	minusOne := n - one
+	x, base := one, toMont(a)
+	for e := d; e > 0; e >>= 1 {
+		if e&1 == 1 {
+			x = mulMod(x, base)
+		}
+		base = mulMod(base, base)
+	}
+	if x == one || x == minusOne {
+		return true
+	}
+	for r := 1; r < s; r++ {
+		x = mulMod(x, x)
+		if x == minusOne {
+			return true
+		}
+	}
+	return false
+}
+
+// ============ MANEJO DE MEMORIA ============
+
+//export FreeCString
+func FreeCString(p *C.char) {
+	C.free(unsafe.Pointer(p))
+}
+
+// Requerido para -buildmode=c-shared, donde no se ejecuta. Compilado como
+// ejecutable arranca el demonio (ver MODO DEMONIO).
+func main() {
+	if err := runDaemon(os.Args[1:]); err != nil {
+		fmt.Fprintln(os.Stderr, err)
+		os.Exit(1)
+	}
+}
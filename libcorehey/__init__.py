@@ -8,18 +8,70 @@ implemented in Go, including APIs for Quick Replies and Typification.
 from .core import (
     get_quick_replies,
     get_typification,
+    get_quick_replies_typed,
+    get_typification_typed,
+    fetch_quick_replies,
+    fetch_typification,
+    stream_quick_replies,
+    stream_typification,
+    fetch_many,
+    get_quick_replies_many,
+    get_typification_many,
     get_quick_replies_simple,
     get_typification_simple,
     get_quick_replies_ultra_simple,
     get_typification_ultra_simple,
     create_azure_config,
+    invalidate_secret_cache,
+    configure_transport,
+    get_transport_stats,
+    configure_resilience,
+    get_resilience_stats,
+    configure_rate_limits,
+    get_rate_limit_stats,
+    configure_response_cache,
+    clear_response_cache,
+    get_response_cache_stats,
+    get_coalescing_stats,
+    configure_stats,
+    stats,
+    reset_stats,
+    warmup,
+    WarmupReport,
+    WarmupPhase,
+    configure_shared_cache,
+    get_shared_cache_stats,
+    configure_snapshot,
+    save_snapshot,
+    get_snapshot_stats,
+    SNAPSHOT_PATH_ENV,
+    register_hot_keys,
+    unregister_hot_keys,
+    get_hot_key_stats,
     add_numbers,
     multiply_numbers,
     get_fibonacci,
     is_prime,
+    add_numbers_batch,
+    multiply_numbers_batch,
+    is_prime_batch,
+    LibCoreHeyClient,
+    LibCoreHeyResult,
+    CancelToken,
+    BatchRequest,
+    QUICK_REPLIES,
+    TYPIFICATION,
     LibCoreHeyError
 )
 
+from .metrics import render_prometheus
+from .stream import ResponseStream, iter_json_items
+from .models import QuickReply, Typification, QuickReplies, Typifications
+from .search import QuickReplyIndex
+from .tree import TypificationTree, get_typification_tree, forget_typification_trees
+from .watch import subscribe, ChangeSet, Subscription
+from . import aio
+
 __version__ = "1.0.0"
 __author__ = "HeyBanco Team"
 __email__ = "dev@heybanco.com"
@@ -27,14 +79,72 @@ __email__ = "dev@heybanco.com"
 __all__ = [
     "get_quick_replies",
     "get_typification",
+    "get_quick_replies_typed",
+    "get_typification_typed",
+    "QuickReply",
+    "Typification",
+    "QuickReplies",
+    "Typifications",
+    "QuickReplyIndex",
+    "TypificationTree",
+    "get_typification_tree",
+    "forget_typification_trees",
+    "fetch_quick_replies",
+    "fetch_typification",
+    "stream_quick_replies",
+    "stream_typification",
+    "ResponseStream",
+    "iter_json_items",
+    "fetch_many",
+    "get_quick_replies_many",
+    "get_typification_many",
     "get_quick_replies_simple",
     "get_typification_simple",
     "get_quick_replies_ultra_simple",
     "get_typification_ultra_simple", 
     "create_azure_config",
+    "invalidate_secret_cache",
+    "configure_transport",
+    "get_transport_stats",
+    "configure_resilience",
+    "get_resilience_stats",
+    "configure_rate_limits",
+    "get_rate_limit_stats",
+    "configure_response_cache",
+    "clear_response_cache",
+    "get_response_cache_stats",
+    "get_coalescing_stats",
+    "configure_stats",
+    "stats",
+    "reset_stats",
+    "render_prometheus",
+    "warmup",
+    "WarmupReport",
+    "WarmupPhase",
+    "configure_shared_cache",
+    "get_shared_cache_stats",
+    "configure_snapshot",
+    "save_snapshot",
+    "get_snapshot_stats",
+    "SNAPSHOT_PATH_ENV",
+    "register_hot_keys",
+    "unregister_hot_keys",
+    "get_hot_key_stats",
     "add_numbers",
     "multiply_numbers",
     "get_fibonacci",
     "is_prime",
-    "LibCoreHeyError"
+    "add_numbers_batch",
+    "multiply_numbers_batch",
+    "is_prime_batch",
+    "LibCoreHeyClient",
+    "LibCoreHeyResult",
+    "CancelToken",
+    "BatchRequest",
+    "QUICK_REPLIES",
+    "TYPIFICATION",
+    "LibCoreHeyError",
+    "subscribe",
+    "ChangeSet",
+    "Subscription",
 ]
\ No newline at end of file
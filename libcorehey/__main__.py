@@ -0,0 +1,28 @@
+"""
+Command line interface: ``libcorehey <command>`` or ``python -m libcorehey <command>``.
+
+Commands:
+    load    Apply load to the API and report throughput, errors and latency
+            percentiles (see libcorehey.loadgen)
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+
+from . import loadgen
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="libcorehey", description="LibCoreHey command line tools.")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+    loadgen.add_arguments(commands.add_parser(
+        "load", help="generate load and report latency percentiles",
+        description=loadgen.__doc__.strip().splitlines()[0]))
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
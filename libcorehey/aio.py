@@ -0,0 +1,307 @@
+"""
+Asyncio interface for LibCoreHey.
+
+Requests run in Go goroutines; when one finishes, the Go library writes its
+id to a pipe watched by the event loop, which then completes the awaiting
+future. No thread is tied up per in-flight request, and cancelling the
+awaiting task cancels the Go request. A ``timeout`` bounds the request inside
+the library (the result then has ERROR_TIMEOUT) rather than just the wait.
+
+On platforms or event loops without ``add_reader`` support (e.g. the Windows
+proactor loop), and for clients served by the sidecar daemon, calls fall back
+to the loop's default executor.
+"""
+
+import asyncio
+import os
+import struct
+import time
+import weakref
+from typing import Optional
+
+from . import core as _core
+from . import metrics as _metrics
+from .core import (
+    CancelToken,
+    LibCoreHeyClient,
+    LibCoreHeyError,
+    LibCoreHeyResult,
+    _ENDPOINT_NAMES,
+    _ENDPOINT_QUICK_REPLIES,
+    _ENDPOINT_TYPIFICATION,
+    _default_client,
+    _timeout_ms,
+    _token_id,
+)
+
+
+class _LoopNotifier:
+    """Pipe between the Go library and one event loop."""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, lib):
+        self._lib = lib
+        # Weak reference: the notifier is stored in a WeakKeyDictionary keyed by the loop
+        self._loop = weakref.ref(loop)
+        self._pending = {}
+        self._buffer = b""
+        
+        self._read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        try:
+            loop.add_reader(self._read_fd, self._drain)
+        except Exception:
+            os.close(self._read_fd)
+            os.close(self.write_fd)
+            raise
+        # From here on the Go library owns the write end
+        lib.RegisterNotifyFD(self.write_fd)
+        self._finalizer = weakref.finalize(loop, _close_notifier, lib, self._read_fd, self.write_fd)
+    
+    def add(self, request_id: int, future: asyncio.Future):
+        self._pending[request_id] = future
+    
+    def discard(self, request_id: int):
+        self._pending.pop(request_id, None)
+    
+    def _drain(self):
+        try:
+            data = os.read(self._read_fd, 8 * 1024)
+        except BlockingIOError:
+            return
+        data = self._buffer + data
+        usable = len(data) - len(data) % 8
+        self._buffer = data[usable:]
+        
+        for (request_id,) in struct.iter_unpack("<q", data[:usable]):
+            future = self._pending.pop(request_id, None)
+            ptr = self._lib.AsyncTakeResult(request_id)
+            if not ptr:
+                continue
+            result = LibCoreHeyResult(self._lib, ptr)
+            if future is None or future.done():
+                result.close()
+            else:
+                future.set_result(result)
+    
+    def close(self):
+        if self._finalizer.alive:
+            loop = self._loop()
+            if loop is not None and not loop.is_closed():
+                loop.remove_reader(self._read_fd)
+            self._finalizer()
+
+
+def _close_notifier(lib, read_fd: int, write_fd: int):
+    lib.CloseNotifyFD(write_fd)
+    os.close(read_fd)
+
+
+_notifiers = weakref.WeakKeyDictionary()
+
+
+def _get_notifier(loop: asyncio.AbstractEventLoop, lib) -> Optional[_LoopNotifier]:
+    """Get the loop's notifier, or None when the loop cannot watch pipes."""
+    if loop in _notifiers:
+        return _notifiers[loop]
+    notifier = None
+    if os.name == "posix":
+        try:
+            notifier = _LoopNotifier(loop, lib)
+        except NotImplementedError:
+            notifier = None
+    _notifiers[loop] = notifier
+    return notifier
+
+
+class AsyncLibCoreHeyClient:
+    """
+    Asyncio counterpart of LibCoreHeyClient.
+    
+    Example:
+        async with AsyncLibCoreHeyClient(create_azure_config()) as client:
+            replies = await client.get_quick_replies("org", "group")
+    """
+    
+    def __init__(self, vault_config: Optional[dict] = None, client: Optional[LibCoreHeyClient] = None):
+        """
+        Args:
+            vault_config: Azure Key Vault configuration (see libcorehey.get_quick_replies)
+            client: Existing LibCoreHeyClient to share instead of creating a new one
+        """
+        self._owns_client = client is None
+        self._client = client if client is not None else LibCoreHeyClient(vault_config)
+    
+    @property
+    def client(self) -> LibCoreHeyClient:
+        """The underlying synchronous client."""
+        return self._client
+    
+    async def _fetch(self, endpoint: int, org: str, group: str, timeout: Optional[float] = None,
+                     cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+        if not _metrics.enabled:
+            return await self._fetch_result(endpoint, org, group, timeout, cancel_token)
+        start = time.perf_counter_ns()
+        result = await self._fetch_result(endpoint, org, group, timeout, cancel_token)
+        result._endpoint = _ENDPOINT_NAMES.get(endpoint, "")
+        _metrics.observe("python_call", result._endpoint, result.status, time.perf_counter_ns() - start)
+        return result
+    
+    async def _fetch_result(self, endpoint: int, org: str, group: str, timeout: Optional[float] = None,
+                            cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+        client = self._client
+        client._check_open()
+        timeout_ms = _timeout_ms(timeout)
+        loop = asyncio.get_running_loop()
+        notifier = None if client.uses_daemon else _get_notifier(loop, client._lib)
+        if notifier is None:
+            # The executor thread cannot be interrupted: cancel the call through a token instead
+            token = cancel_token if cancel_token is not None else CancelToken()
+            try:
+                return await loop.run_in_executor(None, client._fetch_result, endpoint, org, group, timeout, token)
+            except asyncio.CancelledError:
+                token.cancel()
+                raise
+        
+        shared = _core._shared_cache
+        entry = None
+        if shared is not None:
+            key = client._shared_key(endpoint, org, group)
+            entry = shared.cache.get(key)
+            if entry is not None and entry.fresh:
+                return LibCoreHeyResult._from_shared(entry)
+        
+        request_id = client._lib.ClientStartAsync(client._handle, endpoint, org.encode('utf-8'),
+                                                  group.encode('utf-8'), timeout_ms,
+                                                  _token_id(client._lib, cancel_token), notifier.write_fd)
+        if not request_id:
+            raise LibCoreHeyError("Failed to start asynchronous request")
+        
+        future = loop.create_future()
+        notifier.add(request_id, future)
+        try:
+            result = await future
+        except asyncio.CancelledError:
+            notifier.discard(request_id)
+            client._lib.AsyncCancel(request_id)
+            raise
+        if shared is not None:
+            return client._share(shared, key, endpoint, result, entry)
+        return result
+    
+    async def fetch_quick_replies(self, org: str, group: str, timeout: Optional[float] = None,
+                                  cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+        """Get quick replies as a LibCoreHeyResult (timeout in seconds, default 30)."""
+        return await self._fetch(_ENDPOINT_QUICK_REPLIES, org, group, timeout, cancel_token)
+    
+    async def fetch_typification(self, org: str, group: str, timeout: Optional[float] = None,
+                                 cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+        """Get typifications as a LibCoreHeyResult (timeout in seconds, default 30)."""
+        return await self._fetch(_ENDPOINT_TYPIFICATION, org, group, timeout, cancel_token)
+    
+    async def get_quick_replies(self, org: str, group: str, timeout: Optional[float] = None,
+                                cancel_token: Optional[CancelToken] = None) -> str:
+        """Get quick replies as a JSON string."""
+        with await self.fetch_quick_replies(org, group, timeout, cancel_token) as result:
+            return result.text()
+    
+    async def get_typification(self, org: str, group: str, timeout: Optional[float] = None,
+                               cancel_token: Optional[CancelToken] = None) -> str:
+        """Get typifications as a JSON string."""
+        with await self.fetch_typification(org, group, timeout, cancel_token) as result:
+            return result.text()
+    
+    def close(self):
+        """Close the underlying client if this object created it."""
+        if self._owns_client:
+            self._client.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _default_async_client(vault_config: Optional[dict]) -> AsyncLibCoreHeyClient:
+    return AsyncLibCoreHeyClient(client=_default_client(vault_config))
+
+
+async def fetch_quick_replies(vault_config: dict, org: str, group: str, timeout: Optional[float] = None,
+                              cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+    """
+    Get quick replies as a LibCoreHeyResult without blocking the event loop.
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        org: Organization identifier
+        group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
+        cancel_token: CancelToken that aborts the call
+        
+    Returns:
+        LibCoreHeyResult with the response body, HTTP status and error code
+    """
+    return await _default_async_client(vault_config).fetch_quick_replies(org, group, timeout, cancel_token)
+
+
+async def fetch_typification(vault_config: dict, org: str, group: str, timeout: Optional[float] = None,
+                             cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+    """
+    Get typifications as a LibCoreHeyResult without blocking the event loop.
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        org: Organization identifier
+        group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
+        cancel_token: CancelToken that aborts the call
+        
+    Returns:
+        LibCoreHeyResult with the response body, HTTP status and error code
+    """
+    return await _default_async_client(vault_config).fetch_typification(org, group, timeout, cancel_token)
+
+
+async def get_quick_replies(vault_config: dict, org: str, group: str, timeout: Optional[float] = None,
+                            cancel_token: Optional[CancelToken] = None) -> str:
+    """
+    Get quick replies as a JSON string without blocking the event loop.
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        org: Organization identifier
+        group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
+        cancel_token: CancelToken that aborts the call
+        
+    Returns:
+        JSON string containing the quick replies response
+    """
+    return await _default_async_client(vault_config).get_quick_replies(org, group, timeout, cancel_token)
+
+
+async def get_typification(vault_config: dict, org: str, group: str, timeout: Optional[float] = None,
+                           cancel_token: Optional[CancelToken] = None) -> str:
+    """
+    Get typifications as a JSON string without blocking the event loop.
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        org: Organization identifier
+        group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
+        cancel_token: CancelToken that aborts the call
+        
+    Returns:
+        JSON string containing the typification response
+    """
+    return await _default_async_client(vault_config).get_typification(org, group, timeout, cancel_token)
+
+
+__all__ = [
+    "AsyncLibCoreHeyClient",
+    "fetch_quick_replies",
+    "fetch_typification",
+    "get_quick_replies",
+    "get_typification",
+]
@@ -5,12 +5,22 @@ This module provides the main interface to the HeyBanco Go library
 through Python bindings using ctypes.
 """
 
+import atexit
 import ctypes
+import hashlib
+import json
 import os
 import sys
 import platform
+import threading
+import time
+import weakref
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import metrics as _metrics
 
 
 class LibCoreHeyError(Exception):
@@ -18,198 +28,2277 @@ class LibCoreHeyError(Exception):
     pass
 
 
-class _LibraryLoader:
-    """Handles loading the Go shared library with cross-platform support."""
+# Error codes reported by the Go library in LibCoreHeyResult.error_code
+ERROR_NONE = 0
+ERROR_CONFIG = 1
+ERROR_SECRETS = 2
+ERROR_REQUEST = 3
+ERROR_READ = 4
+ERROR_HTTP_STATUS = 5
+ERROR_INVALID_HANDLE = 6
+ERROR_UNKNOWN_ENDPOINT = 7
+ERROR_CANCELED = 8
+ERROR_TIMEOUT = 9
+ERROR_CIRCUIT_OPEN = 10
+ERROR_RATE_LIMITED = 11
+
+# Flags reported by the Go library in the result envelope
+_FLAG_CACHED = 1
+_FLAG_STALE = 2
+
+# Endpoint identifiers accepted by ClientFetch
+_ENDPOINT_QUICK_REPLIES = 0
+_ENDPOINT_TYPIFICATION = 1
+
+QUICK_REPLIES = "quick_replies"
+TYPIFICATION = "typification"
+
+_ENDPOINTS = {
+    QUICK_REPLIES: _ENDPOINT_QUICK_REPLIES,
+    TYPIFICATION: _ENDPOINT_TYPIFICATION,
+}
+
+_ENDPOINT_NAMES = {code: name for name, code in _ENDPOINTS.items()}
+
+
+# Environment variable naming the snapshot file loaded when the library is first used
+SNAPSHOT_PATH_ENV = "LIBCOREHEY_SNAPSHOT_PATH"
+
+
+class BatchRequest(NamedTuple):
+    """One request of a batch: endpoint is QUICK_REPLIES or TYPIFICATION."""
+    endpoint: str
+    org: str
+    group: str
+
+
+class WarmupPhase(NamedTuple):
+    """Duration of one startup phase; error is set if the phase failed."""
+    name: str
+    ms: float
+    error: Optional[str] = None
+
+
+class WarmupReport(NamedTuple):
+    """
+    Per-phase timing returned by warmup().
+    
+    Phases, in order: load_library, create_client, credential, secrets
+    (token acquisition plus the secret reads), connect (TLS connection to the
+    API) and prefetch. Phases that do not apply are omitted and phases after a
+    failed one are skipped. ``prefetch`` holds one dict per prefetched key with
+    endpoint, org, group, status, error_code and ms.
+    """
+    phases: List[WarmupPhase]
+    prefetch: List[dict]
+    
+    @property
+    def ok(self) -> bool:
+        return all(phase.error is None for phase in self.phases)
+    
+    @property
+    def total_ms(self) -> float:
+        return sum(phase.ms for phase in self.phases)
+
+
+class _CResult(ctypes.Structure):
+    """Mirror of the CoreHeyResult struct returned by the Go library."""
+    _fields_ = [
+        ("data", ctypes.c_void_p),
+        ("len", ctypes.c_longlong),
+        ("status", ctypes.c_int),
+        ("code", ctypes.c_int),
+        ("index", ctypes.c_longlong),
+        ("flags", ctypes.c_int),
+        ("etag", ctypes.c_char_p),
+        ("last_modified", ctypes.c_char_p),
+    ]
+
+
+class _LibraryLoader:
+    """Handles loading the Go shared library with cross-platform support."""
+    
+    def __init__(self):
+        self._lib = None
+        self._loaded = False
+    
+    def _get_library_path(self) -> Path:
+        """Get the path to the shared library based on platform."""
+        package_dir = Path(__file__).parent
+        
+        system = platform.system().lower()
+        if system == "darwin":  # macOS
+            lib_name = "libcorehey.dylib"
+        elif system == "linux":
+            lib_name = "libcorehey.so"
+        elif system == "windows":
+            lib_name = "libcorehey.dll"
+        else:
+            raise LibCoreHeyError(f"Unsupported platform: {system}")
+            
+        return package_dir / lib_name
+    
+    def _setup_library_path(self):
+        """Setup library path for dynamic loading."""
+        package_dir = Path(__file__).parent
+        
+        if platform.system() == "Darwin":  # macOS
+            # Set DYLD_LIBRARY_PATH for macOS
+            current_path = os.environ.get('DYLD_LIBRARY_PATH', '')
+            if str(package_dir) not in current_path:
+                os.environ['DYLD_LIBRARY_PATH'] = f"{package_dir}:{current_path}".rstrip(':')
+        elif platform.system() == "Linux":
+            # Set LD_LIBRARY_PATH for Linux
+            current_path = os.environ.get('LD_LIBRARY_PATH', '')
+            if str(package_dir) not in current_path:
+                os.environ['LD_LIBRARY_PATH'] = f"{package_dir}:{current_path}".rstrip(':')
+    
+    def load_library(self):
+        """Load the Go shared library."""
+        if self._loaded:
+            return self._lib
+        
+        self._setup_library_path()
+        lib_path = self._get_library_path()
+        
+        if not lib_path.exists():
+            raise LibCoreHeyError(
+                f"Shared library not found at {lib_path}. "
+                f"Please ensure the library is properly built and installed."
+            )
+        
+        try:
+            self._lib = ctypes.CDLL(str(lib_path))
+            self._configure_functions()
+            self._loaded = True
+        except OSError as e:
+            raise LibCoreHeyError(f"Failed to load library {lib_path}: {e}")
+        
+        # Warm start from the snapshot named in the environment, if any
+        snapshot_path = os.environ.get(SNAPSHOT_PATH_ENV)
+        if snapshot_path:
+            _configure_snapshot(self._lib, {"path": snapshot_path})
+        return self._lib
+    
+    def _configure_functions(self):
+        """Configure function signatures for the Go library."""
+        # GetQuickReplies function
+        self._lib.GetQuickReplies.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
+        self._lib.GetQuickReplies.restype = ctypes.c_char_p
+        
+        # GetTypification function  
+        self._lib.GetTypification.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
+        self._lib.GetTypification.restype = ctypes.c_char_p
+        
+        # FreeCString function
+        self._lib.FreeCString.argtypes = [ctypes.c_void_p]
+        self._lib.FreeCString.restype = None
+        
+        # Shared HTTP transport functions
+        self._lib.ConfigureTransport.argtypes = [ctypes.c_char_p]
+        self._lib.ConfigureTransport.restype = ctypes.c_void_p
+        
+        self._lib.GetTransportStats.argtypes = []
+        self._lib.GetTransportStats.restype = ctypes.c_void_p
+        
+        # Resilience functions
+        self._lib.ConfigureResilience.argtypes = [ctypes.c_char_p]
+        self._lib.ConfigureResilience.restype = ctypes.c_void_p
+        
+        self._lib.GetResilienceStats.argtypes = []
+        self._lib.GetResilienceStats.restype = ctypes.c_void_p
+        
+        # Rate limit functions
+        self._lib.ConfigureRateLimits.argtypes = [ctypes.c_char_p]
+        self._lib.ConfigureRateLimits.restype = ctypes.c_void_p
+        
+        self._lib.GetRateLimitStats.argtypes = []
+        self._lib.GetRateLimitStats.restype = ctypes.c_void_p
+        
+        # Metrics functions
+        self._lib.ConfigureStats.argtypes = [ctypes.c_char_p]
+        self._lib.ConfigureStats.restype = ctypes.c_void_p
+        
+        self._lib.GetStats.argtypes = []
+        self._lib.GetStats.restype = ctypes.c_void_p
+        
+        self._lib.ResetStats.argtypes = []
+        self._lib.ResetStats.restype = None
+        
+        # Response cache functions
+        self._lib.ConfigureResponseCache.argtypes = [ctypes.c_char_p]
+        self._lib.ConfigureResponseCache.restype = ctypes.c_void_p
+        
+        self._lib.ClearResponseCache.argtypes = []
+        self._lib.ClearResponseCache.restype = None
+        
+        self._lib.GetResponseCacheStats.argtypes = []
+        self._lib.GetResponseCacheStats.restype = ctypes.c_void_p
+        
+        # Snapshot functions
+        self._lib.ConfigureSnapshot.argtypes = [ctypes.c_char_p]
+        self._lib.ConfigureSnapshot.restype = ctypes.c_void_p
+        
+        self._lib.SaveSnapshot.argtypes = []
+        self._lib.SaveSnapshot.restype = ctypes.c_void_p
+        
+        self._lib.GetSnapshotStats.argtypes = []
+        self._lib.GetSnapshotStats.restype = ctypes.c_void_p
+        
+        # Request coalescing functions
+        self._lib.GetCoalescingStats.argtypes = []
+        self._lib.GetCoalescingStats.restype = ctypes.c_void_p
+        
+        # Warmup function
+        self._lib.ClientWarmup.argtypes = [ctypes.c_longlong, ctypes.c_char_p, ctypes.c_longlong,
+                                           ctypes.c_longlong]
+        self._lib.ClientWarmup.restype = ctypes.c_void_p
+        
+        # Hot key refresh functions
+        self._lib.ClientRegisterHotKeys.argtypes = [ctypes.c_longlong, ctypes.c_char_p, ctypes.c_double]
+        self._lib.ClientRegisterHotKeys.restype = ctypes.c_void_p
+        
+        self._lib.ClientUnregisterHotKeys.argtypes = [ctypes.c_longlong, ctypes.c_char_p]
+        self._lib.ClientUnregisterHotKeys.restype = None
+        
+        self._lib.GetHotKeyStats.argtypes = []
+        self._lib.GetHotKeyStats.restype = ctypes.c_void_p
+        
+        # Cancellation token functions
+        self._lib.NewCancelToken.argtypes = []
+        self._lib.NewCancelToken.restype = ctypes.c_longlong
+        
+        self._lib.CancelToken.argtypes = [ctypes.c_longlong]
+        self._lib.CancelToken.restype = None
+        
+        self._lib.ReleaseCancelToken.argtypes = [ctypes.c_longlong]
+        self._lib.ReleaseCancelToken.restype = None
+        
+        # Persistent client functions
+        self._lib.CreateClient.argtypes = [ctypes.c_char_p, ctypes.POINTER(ctypes.c_void_p)]
+        self._lib.CreateClient.restype = ctypes.c_longlong
+        
+        self._lib.CloseClient.argtypes = [ctypes.c_longlong]
+        self._lib.CloseClient.restype = None
+        
+        self._lib.ClientFetch.argtypes = [ctypes.c_longlong, ctypes.c_int, ctypes.c_char_p, ctypes.c_char_p,
+                                          ctypes.c_longlong, ctypes.c_longlong]
+        self._lib.ClientFetch.restype = ctypes.POINTER(_CResult)
+        
+        self._lib.ClientFetchIfChanged.argtypes = [ctypes.c_longlong, ctypes.c_int, ctypes.c_char_p,
+                                                   ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p,
+                                                   ctypes.c_longlong, ctypes.c_longlong]
+        self._lib.ClientFetchIfChanged.restype = ctypes.POINTER(_CResult)
+        
+        # Batch functions
+        self._lib.ClientStartBatch.argtypes = [ctypes.c_longlong, ctypes.c_char_p, ctypes.c_int,
+                                               ctypes.c_longlong, ctypes.c_longlong,
+                                               ctypes.POINTER(ctypes.c_void_p)]
+        self._lib.ClientStartBatch.restype = ctypes.c_longlong
+        
+        self._lib.BatchNext.argtypes = [ctypes.c_longlong]
+        self._lib.BatchNext.restype = ctypes.POINTER(_CResult)
+        
+        self._lib.CloseBatch.argtypes = [ctypes.c_longlong]
+        self._lib.CloseBatch.restype = None
+        
+        # Streaming functions
+        self._lib.ClientOpenStream.argtypes = [ctypes.c_longlong, ctypes.c_int, ctypes.c_char_p,
+                                               ctypes.c_char_p, ctypes.c_longlong, ctypes.c_longlong,
+                                               ctypes.POINTER(ctypes.c_longlong)]
+        self._lib.ClientOpenStream.restype = ctypes.POINTER(_CResult)
+        
+        self._lib.StreamRead.argtypes = [ctypes.c_longlong, ctypes.c_void_p, ctypes.c_longlong]
+        self._lib.StreamRead.restype = ctypes.c_longlong
+        
+        self._lib.CloseStream.argtypes = [ctypes.c_longlong]
+        self._lib.CloseStream.restype = None
+        
+        # Asynchronous request functions
+        self._lib.RegisterNotifyFD.argtypes = [ctypes.c_int]
+        self._lib.RegisterNotifyFD.restype = None
+        
+        self._lib.CloseNotifyFD.argtypes = [ctypes.c_int]
+        self._lib.CloseNotifyFD.restype = None
+        
+        self._lib.ClientStartAsync.argtypes = [ctypes.c_longlong, ctypes.c_int, ctypes.c_char_p,
+                                               ctypes.c_char_p, ctypes.c_longlong, ctypes.c_longlong,
+                                               ctypes.c_int]
+        self._lib.ClientStartAsync.restype = ctypes.c_longlong
+        
+        self._lib.AsyncTakeResult.argtypes = [ctypes.c_longlong]
+        self._lib.AsyncTakeResult.restype = ctypes.POINTER(_CResult)
+        
+        self._lib.AsyncCancel.argtypes = [ctypes.c_longlong]
+        self._lib.AsyncCancel.restype = None
+        
+        # FreeResult function
+        self._lib.FreeResult.argtypes = [ctypes.POINTER(_CResult)]
+        self._lib.FreeResult.restype = None
+        
+        # InvalidateSecretCache function
+        self._lib.InvalidateSecretCache.argtypes = [ctypes.c_char_p]
+        self._lib.InvalidateSecretCache.restype = None
+        
+        # Math functions (if they exist in the library)
+        if hasattr(self._lib, 'Add'):
+            self._lib.Add.argtypes = [ctypes.c_int, ctypes.c_int]
+            self._lib.Add.restype = ctypes.c_int
+        
+        if hasattr(self._lib, 'Multiply'):
+            self._lib.Multiply.argtypes = [ctypes.c_int, ctypes.c_int]
+            self._lib.Multiply.restype = ctypes.c_int
+            
+        if hasattr(self._lib, 'Fibonacci'):
+            self._lib.Fibonacci.argtypes = [ctypes.c_int]
+            self._lib.Fibonacci.restype = ctypes.c_int
+            
+        if hasattr(self._lib, 'IsPrime'):
+            self._lib.IsPrime.argtypes = [ctypes.c_int]
+            self._lib.IsPrime.restype = ctypes.c_int
+        
+        # Batch math over int64 buffers: (a, b, out, n) and (values, out, n)
+        for name in ('AddBatch', 'MultiplyBatch'):
+            if hasattr(self._lib, name):
+                getattr(self._lib, name).argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p,
+                                                     ctypes.c_longlong]
+                getattr(self._lib, name).restype = None
+        
+        if hasattr(self._lib, 'IsPrimeBatch'):
+            self._lib.IsPrimeBatch.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_longlong]
+            self._lib.IsPrimeBatch.restype = None
+
+
+# Global library loader instance
+_loader = _LibraryLoader()
+
+
+def _get_library():
+    """Get the loaded library instance."""
+    return _loader.load_library()
+
+
+def _take_string(lib, ptr) -> str:
+    """Copy a Go-allocated C string into Python and free it."""
+    if not ptr:
+        return ""
+    try:
+        return ctypes.string_at(ptr).decode('utf-8')
+    finally:
+        lib.FreeCString(ptr)
+
+
+class LibCoreHeyResult:
+    """
+    Response returned by the Go library, with explicit ownership of its buffer.
+    
+    The body stays in the C buffer allocated by Go: ``view`` exposes it as a
+    read-only memoryview without copying, and ``close()`` (or leaving a
+    ``with`` block) frees it. Views obtained from ``view`` must not be used
+    after the result is closed. The HTTP status and error code are available
+    without decoding the body.
+    
+    Example:
+        with client.fetch_quick_replies("org", "group") as result:
+            if result.ok:
+                replies = result.json()
+            else:
+                print(result.status, result.error)
+    """
+    
+    # Endpoint name the decode timings are recorded under (set by the client)
+    _endpoint = ""
+    
+    def __init__(self, lib, ptr):
+        self._lib = lib
+        self._ptr = ptr
+        self._view = None
+        self._array = None
+        self._buffer = None
+        result = ptr.contents
+        self.status = int(result.status)
+        self.error_code = int(result.code)
+        self.index = int(result.index)
+        self._flags = int(result.flags)
+        self.etag = result.etag.decode('utf-8') if result.etag else None
+        self.last_modified = result.last_modified.decode('utf-8') if result.last_modified else None
+        self._data = result.data
+        self._len = int(result.len)
+    
+    @classmethod
+    def _from_buffer(cls, body: bytes, status: int, error_code: int = ERROR_NONE, flags: int = 0,
+                     etag: Optional[str] = None, last_modified: Optional[str] = None) -> "LibCoreHeyResult":
+        """Result backed by a Python bytes body (shared cache, daemon) instead of C memory."""
+        self = cls.__new__(cls)
+        self._lib = None
+        self._ptr = self._buffer = body
+        self._view = None
+        self._array = None
+        self.status = status
+        self.error_code = error_code
+        self.index = -1
+        self._flags = flags
+        self.etag = etag
+        self.last_modified = last_modified
+        self._data = None
+        self._len = len(body)
+        return self
+    
+    @classmethod
+    def _from_shared(cls, entry, etag: Optional[str] = None,
+                     last_modified: Optional[str] = None) -> "LibCoreHeyResult":
+        """
+        Result read from the shared cache.
+        
+        When ``etag`` or ``last_modified`` (the validators of a conditional
+        request) match the entry, a 304 with an empty body, as the API would
+        answer.
+        """
+        flags = _FLAG_CACHED if entry.fresh else _FLAG_CACHED | _FLAG_STALE
+        if ((etag is not None and etag == entry.etag)
+                or (last_modified is not None and last_modified == entry.last_modified)):
+            return cls._from_buffer(b"", 304, ERROR_NONE, flags, entry.etag, entry.last_modified)
+        return cls._from_buffer(entry.body, entry.status, ERROR_NONE, flags, entry.etag, entry.last_modified)
+    
+    @property
+    def ok(self) -> bool:
+        """True when the call succeeded and the API answered with a status below 400."""
+        return self.error_code == ERROR_NONE
+    
+    @property
+    def not_modified(self) -> bool:
+        """True when a conditional request found no changes (HTTP 304, empty body)."""
+        return self.status == 304
+    
+    @property
+    def cached(self) -> bool:
+        """True when the response was served from the response cache."""
+        return bool(self._flags & _FLAG_CACHED)
+    
+    @property
+    def stale(self) -> bool:
+        """True when an expired cached response was served while it is being refreshed."""
+        return bool(self._flags & _FLAG_STALE)
+    
+    @property
+    def closed(self) -> bool:
+        """True once the underlying buffer has been freed."""
+        return self._ptr is None
+    
+    def _check_open(self):
+        if self._ptr is None:
+            raise LibCoreHeyError("Result is closed")
+    
+    @property
+    def view(self) -> memoryview:
+        """Read-only memoryview over the response body (no copy)."""
+        self._check_open()
+        if self._view is None:
+            if self._buffer is not None:
+                self._view = memoryview(self._buffer)
+            elif self._len:
+                self._array = (ctypes.c_char * self._len).from_address(self._data)
+                self._view = memoryview(self._array).cast('B').toreadonly()
+            else:
+                self._view = memoryview(b"")
+        return self._view
+    
+    @property
+    def body(self) -> bytes:
+        """Response body as bytes."""
+        self._check_open()
+        if self._buffer is not None:
+            return self._buffer
+        return ctypes.string_at(self._data, self._len) if self._len else b""
+    
+    @property
+    def error(self) -> Optional[str]:
+        """Error message for failed calls, None when ok."""
+        if self.ok:
+            return None
+        try:
+            parsed = json.loads(self.body)
+            if isinstance(parsed, dict) and "error" in parsed:
+                return str(parsed["error"])
+        except ValueError:
+            pass
+        return f"HTTP {self.status}" if self.status else f"error code {self.error_code}"
+    
+    def text(self) -> str:
+        """Response body decoded as UTF-8."""
+        if not _metrics.enabled:
+            return self.body.decode('utf-8')
+        start = time.perf_counter_ns()
+        text = self.body.decode('utf-8')
+        _metrics.observe("decode", self._endpoint, self.status, time.perf_counter_ns() - start)
+        return text
+    
+    def json(self):
+        """Response body parsed as JSON."""
+        if not _metrics.enabled:
+            return json.loads(self.body)
+        start = time.perf_counter_ns()
+        value = json.loads(self.body)
+        _metrics.observe("decode", self._endpoint, self.status, time.perf_counter_ns() - start)
+        return value
+    
+    def raise_for_error(self):
+        """Raise LibCoreHeyError if the call failed."""
+        if not self.ok:
+            raise LibCoreHeyError(self.error)
+    
+    def close(self):
+        """Free the response buffer. Safe to call more than once."""
+        if self._ptr is not None:
+            view, self._view = self._view, None
+            ptr, self._ptr = self._ptr, None
+            buffer, self._buffer = self._buffer, None
+            if view is not None:
+                try:
+                    view.release()
+                except BufferError:
+                    pass  # still exported; the memory stays valid below
+            if buffer is not None:
+                return
+            c_array, self._array = self._array, None
+            if c_array is None:
+                self._lib.FreeResult(ptr)
+                return
+            # Slices or exports of the view may outlive it, and all of them
+            # keep the ctypes array over the C buffer alive: free the buffer
+            # when that array goes (right away if nothing else holds it)
+            weakref.finalize(c_array, self._lib.FreeResult, ptr)
+    
+    def __len__(self) -> int:
+        return self._len
+    
+    def __bytes__(self) -> bytes:
+        return self.body
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+    
+    def __repr__(self) -> str:
+        return f"<LibCoreHeyResult status={self.status} error_code={self.error_code} len={self._len}>"
+
+
+class CancelToken:
+    """
+    Cancels, from any thread, every call it is passed to.
+    
+    Calls that already finished are unaffected; calls in flight stop at once
+    with ERROR_CANCELED, wherever they are (Key Vault, connect, response), and
+    calls started after cancel() fail immediately. A token cannot be reset.
+    
+    Example:
+        token = CancelToken()
+        threading.Timer(0.5, token.cancel).start()
+        with client.fetch_quick_replies("org", "group", cancel_token=token) as result:
+            ...
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._lib = None
+        self._id = 0
+        self._callbacks = []
+    
+    @property
+    def cancelled(self) -> bool:
+        """True once cancel() has been called."""
+        return self._cancelled
+    
+    def cancel(self):
+        """Abort the calls using this token. Safe to call more than once."""
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+            token_id = self._id
+        if token_id:
+            self._lib.CancelToken(token_id)
+        for callback in callbacks:
+            callback()
+    
+    def _token_id(self, lib) -> int:
+        """Go-side id of the token, created on first in-process use."""
+        with self._lock:
+            if not self._id:
+                self._lib = lib
+                self._id = lib.NewCancelToken()
+                if self._cancelled:
+                    lib.CancelToken(self._id)
+            return self._id
+    
+    def _add_callback(self, callback) -> bool:
+        """Run callback on cancel(); False (and not registered) if already cancelled."""
+        with self._lock:
+            if self._cancelled:
+                return False
+            self._callbacks.append(callback)
+            return True
+    
+    def _remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+    
+    def close(self):
+        """Release the Go-side token. Calls still using it are cancelled."""
+        with self._lock:
+            token_id, self._id = self._id, 0
+            self._cancelled = True
+        if token_id:
+            self._lib.ReleaseCancelToken(token_id)
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def _timeout_ms(timeout: Optional[float]) -> int:
+    """Call deadline in milliseconds for the library (0: its 30 s default)."""
+    if timeout is None:
+        return 0
+    if timeout <= 0:
+        raise LibCoreHeyError("timeout must be positive")
+    return max(1, int(timeout * 1000))
+
+
+def _token_id(lib, cancel_token: Optional[CancelToken]) -> int:
+    return cancel_token._token_id(lib) if cancel_token is not None else 0
+
+
+def _canceled_result() -> LibCoreHeyResult:
+    """Result of a call whose token was cancelled before it reached the library."""
+    return LibCoreHeyResult._from_buffer(b'{"error":"Request canceled"}', 0, ERROR_CANCELED)
+
+
+class LibCoreHeyClient:
+    """
+    Persistent client backed by a Go-side handle.
+    
+    The Go library parses the vault configuration once and keeps the Azure
+    credential and Key Vault client alive for the lifetime of the handle, so
+    repeated calls skip the credential chain probe and reuse the cached token.
+    
+    When the sidecar daemon is running (see libcorehey.daemon) fetches go
+    through it instead and the library is only loaded in-process if the daemon
+    becomes unreachable.
+    
+    Example:
+        with LibCoreHeyClient(create_azure_config()) as client:
+            replies = client.get_quick_replies("org", "group")
+    """
+    
+    def __init__(self, vault_config: Optional[dict] = None):
+        """
+        Create a client for the given vault configuration.
+        
+        Args:
+            vault_config: Azure Key Vault configuration (see get_quick_replies);
+                defaults to an empty configuration that uses environment variables
+                
+        Raises:
+            LibCoreHeyError: If the library fails to load or the configuration is invalid
+        """
+        from .daemon import connect_daemon
+        
+        self._lib = None
+        self._handle = 0
+        self._closed = False
+        
+        self._config_bytes = json.dumps(vault_config or {}).encode('utf-8')
+        # Identifies the vault in shared cache keys without storing its credentials
+        self._vault_id = hashlib.sha256(json.dumps(vault_config or {}, sort_keys=True)
+                                        .encode('utf-8')).hexdigest()[:16]
+        self._daemon = connect_daemon()
+        if self._daemon is None:
+            self._open_handle()
+    
+    def _open_handle(self):
+        """Load the library in-process and create the Go-side handle."""
+        self._lib = _get_library()
+        error_ptr = ctypes.c_void_p()
+        handle = self._lib.CreateClient(self._config_bytes, ctypes.byref(error_ptr))
+        if not handle:
+            message = _take_string(self._lib, error_ptr.value) or "unknown error"
+            raise LibCoreHeyError(f"Failed to create client: {message}")
+        self._handle = handle
+    
+    @property
+    def closed(self) -> bool:
+        """True once close() has been called."""
+        return self._closed
+    
+    @property
+    def uses_daemon(self) -> bool:
+        """True while requests are served by the sidecar daemon."""
+        return self._daemon is not None
+    
+    def _check_open(self):
+        if self._closed:
+            raise LibCoreHeyError("Client is closed")
+    
+    def _check_not_daemon(self, feature: str):
+        self._check_open()
+        if self._daemon is not None:
+            raise LibCoreHeyError(f"{feature} are configured on the daemon, not through its clients")
+    
+    def _daemon_request(self, op: int, endpoint: int, org: str, group: str,
+                        etag: Optional[str] = None, last_modified: Optional[str] = None,
+                        timeout_ms: int = 0, cancel_token: Optional[CancelToken] = None) -> Optional[LibCoreHeyResult]:
+        """Send a request to the daemon; None (and in-process from now on) if it is gone."""
+        from .daemon import _forget_daemon
+        
+        daemon = self._daemon
+        try:
+            return daemon.request(op, endpoint, self._config_bytes, org, group, etag, last_modified,
+                                  timeout_ms, cancel_token)
+        except OSError:
+            _forget_daemon(daemon)
+            self._daemon = None
+            self._open_handle()
+            return None
+    
+    def _fetch(self, endpoint: int, org: str, group: str, timeout: Optional[float] = None,
+               cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+        if not _metrics.enabled:
+            return self._fetch_result(endpoint, org, group, timeout, cancel_token)
+        start = time.perf_counter_ns()
+        result = self._fetch_result(endpoint, org, group, timeout, cancel_token)
+        result._endpoint = _ENDPOINT_NAMES.get(endpoint, "")
+        _metrics.observe("python_call", result._endpoint, result.status, time.perf_counter_ns() - start)
+        return result
+    
+    def _shared_key(self, endpoint: int, org: str, group: str) -> str:
+        return f"{endpoint}|{org}|{group}|{self._vault_id}"
+    
+    def _share(self, shared: "_SharedCacheSettings", key: str, endpoint: int, result: LibCoreHeyResult,
+               entry, etag: Optional[str] = None, last_modified: Optional[str] = None) -> LibCoreHeyResult:
+        """
+        Put a fresh successful result in the shared cache, or replace a failed
+        one with the expired response of another worker.
+        
+        ``etag`` and ``last_modified`` are the validators a conditional request
+        was sent with: a 304 for the validators of ``entry`` renews it.
+        """
+        if result.ok and 200 <= result.status < 300 and not result.stale:
+            shared.cache.put(key, result.status, result.body, shared.ttls[endpoint],
+                             shared.stale_seconds, result.etag, result.last_modified)
+        elif result.not_modified and entry is not None:
+            if ((etag is not None and etag == entry.etag)
+                    or (last_modified is not None and last_modified == entry.last_modified)):
+                shared.cache.put(key, entry.status, entry.body, shared.ttls[endpoint],
+                                 shared.stale_seconds, entry.etag, entry.last_modified)
+        elif not result.ok and entry is not None:
+            # Upstream failure: fall back to the expired response of another worker
+            result.close()
+            return LibCoreHeyResult._from_shared(entry, etag, last_modified)
+        return result
+    
+    def _fetch_result(self, endpoint: int, org: str, group: str, timeout: Optional[float] = None,
+                      cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+        self._check_open()
+        timeout_ms = _timeout_ms(timeout)
+        shared = _shared_cache
+        entry = None
+        if shared is not None:
+            key = self._shared_key(endpoint, org, group)
+            entry = shared.cache.get(key)
+            if entry is not None and entry.fresh:
+                return LibCoreHeyResult._from_shared(entry)
+        
+        result = None
+        if self._daemon is not None:
+            from .daemon import _OP_FETCH
+            result = self._daemon_request(_OP_FETCH, endpoint, org, group, timeout_ms=timeout_ms,
+                                          cancel_token=cancel_token)
+        if result is None:
+            ptr = self._lib.ClientFetch(self._handle, endpoint, org.encode('utf-8'), group.encode('utf-8'),
+                                        timeout_ms, _token_id(self._lib, cancel_token))
+            if not ptr:
+                raise LibCoreHeyError("Library returned no result")
+            result = LibCoreHeyResult(self._lib, ptr)
+        
+        if shared is not None:
+            return self._share(shared, key, endpoint, result, entry)
+        return result
+    
+    def fetch_quick_replies(self, org: str, group: str, timeout: Optional[float] = None,
+                    cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+        """
+        Get quick replies as a LibCoreHeyResult.
+        
+        ``timeout`` bounds the whole call (Key Vault, connect, response and
+        body); when it runs out the result has error code ERROR_TIMEOUT.
+        
+        Args:
+            org: Organization identifier
+            group: Group identifier
+            timeout: Deadline in seconds for the whole call (default: 30)
+            cancel_token: CancelToken that aborts the call (ERROR_CANCELED)
+            
+        Returns:
+            LibCoreHeyResult with the response body, HTTP status and error code
+            
+        Raises:
+            LibCoreHeyError: If the client is closed
+        """
+        return self._fetch(_ENDPOINT_QUICK_REPLIES, org, group, timeout, cancel_token)
+    
+    def fetch_typification(self, org: str, group: str, timeout: Optional[float] = None,
+                    cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+        """
+        Get typifications as a LibCoreHeyResult.
+        
+        ``timeout`` bounds the whole call (Key Vault, connect, response and
+        body); when it runs out the result has error code ERROR_TIMEOUT.
+        
+        Args:
+            org: Organization identifier
+            group: Group identifier
+            timeout: Deadline in seconds for the whole call (default: 30)
+            cancel_token: CancelToken that aborts the call (ERROR_CANCELED)
+            
+        Returns:
+            LibCoreHeyResult with the response body, HTTP status and error code
+            
+        Raises:
+            LibCoreHeyError: If the client is closed
+        """
+        return self._fetch(_ENDPOINT_TYPIFICATION, org, group, timeout, cancel_token)
+    
+    def _stream(self, endpoint: int, org: str, group: str, chunk_size: Optional[int] = None,
+                timeout: Optional[float] = None, cancel_token: Optional[CancelToken] = None):
+        from .stream import DEFAULT_CHUNK_SIZE, ResponseStream, _LibraryStream
+        
+        self._check_open()
+        timeout_ms = _timeout_ms(timeout)
+        chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        if self._daemon is not None:
+            from .daemon import _forget_daemon
+            
+            daemon = self._daemon
+            try:
+                result, source = daemon.open_stream(endpoint, self._config_bytes, org, group, timeout_ms,
+                                                    cancel_token)
+                return ResponseStream(result, source, chunk_size)
+            except OSError:
+                _forget_daemon(daemon)
+                self._daemon = None
+                self._open_handle()
+        
+        stream_id = ctypes.c_longlong()
+        ptr = self._lib.ClientOpenStream(self._handle, endpoint, org.encode('utf-8'), group.encode('utf-8'),
+                                         timeout_ms, _token_id(self._lib, cancel_token), ctypes.byref(stream_id))
+        if not ptr:
+            raise LibCoreHeyError("Library returned no result")
+        source = _LibraryStream(self._lib, stream_id.value) if stream_id.value else None
+        return ResponseStream(LibCoreHeyResult(self._lib, ptr), source, chunk_size)
+    
+    def stream_quick_replies(self, org: str, group: str, chunk_size: Optional[int] = None,
+                             timeout: Optional[float] = None, cancel_token: Optional[CancelToken] = None):
+        """
+        Get quick replies as a ResponseStream, for payloads too large to hold whole.
+        
+        Returns once the response headers arrive; the body is then read in
+        chunks of at most ``chunk_size`` bytes (``iter_chunks()``) or as the
+        decoded items of its ``data`` array (``iter_items()``), so memory
+        stays flat whatever the payload size. ``timeout`` also bounds reading
+        the body. Streams bypass the shared cache and are not stored in the
+        response cache.
+        
+        Args:
+            org: Organization identifier
+            group: Group identifier
+            chunk_size: Largest chunk in bytes (default: 64 KiB)
+            timeout: Deadline in seconds for the whole call, body included (default: 30)
+            cancel_token: CancelToken that aborts the call, also midway through the body
+            
+        Returns:
+            ResponseStream with the HTTP status, error code and validators
+            
+        Raises:
+            LibCoreHeyError: If the client is closed
+        """
+        return self._stream(_ENDPOINT_QUICK_REPLIES, org, group, chunk_size, timeout, cancel_token)
+    
+    def stream_typification(self, org: str, group: str, chunk_size: Optional[int] = None,
+                            timeout: Optional[float] = None, cancel_token: Optional[CancelToken] = None):
+        """
+        Get typifications as a ResponseStream (see stream_quick_replies).
+        
+        Args:
+            org: Organization identifier
+            group: Group identifier
+            chunk_size: Largest chunk in bytes (default: 64 KiB)
+            timeout: Deadline in seconds for the whole call, body included (default: 30)
+            cancel_token: CancelToken that aborts the call, also midway through the body
+            
+        Returns:
+            ResponseStream with the HTTP status, error code and validators
+            
+        Raises:
+            LibCoreHeyError: If the client is closed
+        """
+        return self._stream(_ENDPOINT_TYPIFICATION, org, group, chunk_size, timeout, cancel_token)
+    
+    def fetch_if_changed(self, endpoint: str, org: str, group: str, etag: Optional[str] = None,
+                         last_modified: Optional[str] = None, timeout: Optional[float] = None,
+                         cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+        """
+        Conditional request: download the payload only if it changed.
+        
+        Sends If-None-Match / If-Modified-Since with the validators of a previous
+        result (its ``etag`` and ``last_modified``). When nothing changed the
+        result has status 304 (``not_modified``) and an empty body. The response
+        cache is bypassed; a fresh response in the shared cache answers without
+        a request (a 304 when it matches the validators).
+        
+        Args:
+            endpoint: QUICK_REPLIES or TYPIFICATION
+            org: Organization identifier
+            group: Group identifier
+            etag: ETag of the previous response (optional)
+            last_modified: Last-Modified of the previous response (optional)
+            timeout: Deadline in seconds for the whole call (default: 30)
+            cancel_token: CancelToken that aborts the call
+            
+        Returns:
+            LibCoreHeyResult with the response body (if changed), HTTP status and validators
+            
+        Raises:
+            LibCoreHeyError: If the client is closed or the endpoint is unknown
+        """
+        self._check_open()
+        if endpoint not in _ENDPOINTS:
+            raise LibCoreHeyError(f"Unknown endpoint: {endpoint}")
+        code = _ENDPOINTS[endpoint]
+        timeout_ms = _timeout_ms(timeout)
+        shared = _shared_cache
+        entry = None
+        if shared is not None:
+            key = self._shared_key(code, org, group)
+            entry = shared.cache.get(key)
+            if entry is not None and entry.fresh:
+                return LibCoreHeyResult._from_shared(entry, etag, last_modified)
+        
+        result = None
+        if self._daemon is not None:
+            from .daemon import _OP_FETCH_IF_CHANGED
+            result = self._daemon_request(_OP_FETCH_IF_CHANGED, code, org, group,
+                                          etag, last_modified, timeout_ms, cancel_token)
+        if result is None:
+            ptr = self._lib.ClientFetchIfChanged(self._handle, code, org.encode('utf-8'),
+                                                 group.encode('utf-8'), (etag or "").encode('utf-8'),
+                                                 (last_modified or "").encode('utf-8'),
+                                                 timeout_ms, _token_id(self._lib, cancel_token))
+            if not ptr:
+                raise LibCoreHeyError("Library returned no result")
+            result = LibCoreHeyResult(self._lib, ptr)
+        
+        if shared is not None:
+            return self._share(shared, key, code, result, entry, etag, last_modified)
+        return result
+    
+    def fetch_many(self, requests: Iterable[BatchRequest], concurrency: int = 16,
+                   timeout: Optional[float] = None,
+                   cancel_token: Optional[CancelToken] = None) -> Iterator[Tuple[BatchRequest, LibCoreHeyResult]]:
+        """
+        Fetch many (endpoint, org, group) requests in one call into the library.
+        
+        The requests run in Go goroutines, at most ``concurrency`` at a time, and
+        results are yielded as soon as each one completes (not in request order).
+        Stopping the iteration early discards requests that have not started.
+        Through the daemon, requests are sent from ``concurrency`` threads.
+        Fresh responses in the shared cache are yielded first, without a request.
+        
+        ``timeout`` is one deadline for the whole batch: requests still running
+        when it expires complete with ERROR_TIMEOUT.
+        
+        Args:
+            requests: BatchRequest tuples (or (endpoint, org, group) tuples)
+            concurrency: Maximum number of requests in flight
+            timeout: Deadline in seconds for the whole batch (default: 30)
+            cancel_token: CancelToken that aborts the requests still running
+            
+        Yields:
+            (BatchRequest, LibCoreHeyResult) pairs; each result carries its own
+            status and error code
+            
+        Raises:
+            LibCoreHeyError: If the client is closed or a request is invalid
+        """
+        self._check_open()
+        requests = [BatchRequest(*request) for request in requests]
+        payload = _requests_payload(requests)
+        timeout_ms = _timeout_ms(timeout)
+        if not requests:
+            return
+        if self._daemon is not None:
+            yield from self._fetch_many_threaded(requests, concurrency, timeout, cancel_token)
+            return
+        
+        # Position in requests of each request sent to the library
+        positions = range(len(requests))
+        shared = _shared_cache
+        if shared is not None:
+            positions, shared_entries = [], []
+            for position, request in enumerate(requests):
+                code = _ENDPOINTS[request.endpoint]
+                key = self._shared_key(code, request.org, request.group)
+                entry = shared.cache.get(key)
+                if entry is not None and entry.fresh:
+                    result = LibCoreHeyResult._from_shared(entry)
+                    result.index = position
+                    yield request, result
+                else:
+                    positions.append(position)
+                    shared_entries.append((key, code, entry))
+            if not positions:
+                return
+            payload = [payload[position] for position in positions]
+        
+        error_ptr = ctypes.c_void_p()
+        batch_id = self._lib.ClientStartBatch(self._handle, json.dumps(payload).encode('utf-8'),
+                                              concurrency, timeout_ms, _token_id(self._lib, cancel_token),
+                                              ctypes.byref(error_ptr))
+        if not batch_id:
+            message = _take_string(self._lib, error_ptr.value) or "unknown error"
+            raise LibCoreHeyError(f"Failed to start batch: {message}")
+        
+        try:
+            while True:
+                ptr = self._lib.BatchNext(batch_id)
+                if not ptr:
+                    break
+                result = LibCoreHeyResult(self._lib, ptr)
+                sent = result.index
+                if shared is not None:
+                    key, code, entry = shared_entries[sent]
+                    result = self._share(shared, key, code, result, entry)
+                result.index = positions[sent]
+                yield requests[result.index], result
+        finally:
+            self._lib.CloseBatch(batch_id)
+    
+    def _fetch_many_threaded(self, requests: List[BatchRequest], concurrency: int,
+                             timeout: Optional[float] = None,
+                             cancel_token: Optional[CancelToken] = None) -> Iterator[Tuple[BatchRequest, LibCoreHeyResult]]:
+        """fetch_many over the daemon: one blocking request per worker thread."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        
+        def fetch(request):
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return LibCoreHeyResult._from_buffer(b'{"error":"Deadline exceeded"}', 0, ERROR_TIMEOUT)
+            return self._fetch(_ENDPOINTS[request.endpoint], request.org, request.group, remaining, cancel_token)
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(requests))),
+                                      thread_name_prefix="libcorehey-batch")
+        futures = {executor.submit(fetch, request): request for request in requests}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    def register_hot_keys(self, requests: Iterable[BatchRequest],
+                          interval_seconds: Optional[float] = None):
+        """
+        Keep (endpoint, org, group) pairs always warm in the response cache.
+        
+        A background scheduler in the library refreshes each pair before it
+        expires (every ``interval_seconds`` with ±10% jitter, by default at 80%
+        of the endpoint TTL) using conditional requests. Failed refreshes back
+        off exponentially up to 5 minutes while the last good response keeps
+        being served, flagged as stale, and is never evicted. Enables the
+        response cache with its defaults if it is off.
+        
+        Args:
+            requests: BatchRequest tuples (or (endpoint, org, group) tuples)
+            interval_seconds: Refresh interval (default: 80% of the endpoint TTL)
+            
+        Raises:
+            LibCoreHeyError: If the client is closed, a request is invalid or
+                the client uses the daemon (set hot keys in its -config file)
+        """
+        self._check_not_daemon("Hot keys")
+        payload = _requests_payload(BatchRequest(*request) for request in requests)
+        error = _take_string(self._lib, self._lib.ClientRegisterHotKeys(
+            self._handle, json.dumps(payload).encode('utf-8'), interval_seconds or 0.0))
+        if error:
+            raise LibCoreHeyError(f"Failed to register hot keys: {error}")
+    
+    def unregister_hot_keys(self, requests: Iterable[BatchRequest]):
+        """
+        Stop refreshing pairs registered with register_hot_keys().
+        
+        Their cached responses become ordinary entries that expire and can be evicted.
+        
+        Args:
+            requests: BatchRequest tuples (or (endpoint, org, group) tuples)
+        """
+        self._check_not_daemon("Hot keys")
+        payload = _requests_payload(BatchRequest(*request) for request in requests)
+        self._lib.ClientUnregisterHotKeys(self._handle, json.dumps(payload).encode('utf-8'))
+    
+    def warmup(self, keys: Iterable[tuple] = (), timeout: Optional[float] = None,
+               cancel_token: Optional[CancelToken] = None) -> WarmupReport:
+        """
+        Create the credential, read the secrets and open the API connection now.
+        
+        Args:
+            keys: Pairs to prefetch, as (org, group) tuples (both endpoints) or
+                BatchRequest / (endpoint, org, group) tuples
+            timeout: Deadline in seconds for all phases together (default: 30)
+            cancel_token: CancelToken that aborts the remaining phases
+                
+        Returns:
+            WarmupReport with the credential, secrets, connect and prefetch phases
+            (only prefetch when the client uses the daemon, which warms itself)
+            
+        Raises:
+            LibCoreHeyError: If the client is closed or a key is invalid
+        """
+        self._check_open()
+        requests = _warmup_requests(keys)
+        timeout_ms = _timeout_ms(timeout)
+        if self._daemon is not None:
+            return self._warmup_through_daemon(requests, timeout, cancel_token)
+        
+        payload = json.dumps(_requests_payload(requests)).encode('utf-8')
+        report = json.loads(_take_string(self._lib, self._lib.ClientWarmup(
+            self._handle, payload, timeout_ms, _token_id(self._lib, cancel_token))))
+        if "error" in report:
+            raise LibCoreHeyError(f"Warmup failed: {report['error']}")
+        phases = [WarmupPhase(phase["name"], phase["ms"], phase.get("error"))
+                  for phase in report["phases"]]
+        prefetch = [_warmup_key(key["endpoint"], key["org"], key["group"], key["status"], key["code"], key["ms"])
+                    for key in report.get("prefetch") or []]
+        return WarmupReport(phases, prefetch)
+    
+    def _warmup_through_daemon(self, requests: List[BatchRequest], timeout: Optional[float] = None,
+                               cancel_token: Optional[CancelToken] = None) -> WarmupReport:
+        phases, prefetch = [], []
+        if requests:
+            start = time.perf_counter()
+            for request in requests:
+                key_start = time.perf_counter()
+                remaining = None if timeout is None else max(0.001, timeout - (key_start - start))
+                with self._fetch(_ENDPOINTS[request.endpoint], request.org, request.group,
+                                 remaining, cancel_token) as result:
+                    prefetch.append(_warmup_key(_ENDPOINTS[request.endpoint], request.org, request.group,
+                                                result.status, result.error_code,
+                                                (time.perf_counter() - key_start) * 1000))
+            failed = [key for key in prefetch if key["error_code"] != ERROR_NONE]
+            error = f"{len(failed)} of {len(prefetch)} keys failed" if failed else None
+            phases.append(WarmupPhase("prefetch", (time.perf_counter() - start) * 1000, error))
+        return WarmupReport(phases, prefetch)
+    
+    def get_quick_replies(self, org: str, group: str, timeout: Optional[float] = None,
+                  cancel_token: Optional[CancelToken] = None) -> str:
+        """
+        Get quick replies for an organization and group.
+        
+        Args:
+            org: Organization identifier
+            group: Group identifier
+            timeout: Deadline in seconds for the whole call (default: 30)
+            cancel_token: CancelToken that aborts the call
+            
+        Returns:
+            JSON string containing the quick replies response
+            
+        Raises:
+            LibCoreHeyError: If the client is closed or the API call fails
+        """
+        try:
+            with self.fetch_quick_replies(org, group, timeout, cancel_token) as result:
+                return result.text()
+        except LibCoreHeyError:
+            raise
+        except Exception as e:
+            raise LibCoreHeyError(f"Failed to get quick replies: {e}")
+    
+    def get_typification(self, org: str, group: str, timeout: Optional[float] = None,
+                  cancel_token: Optional[CancelToken] = None) -> str:
+        """
+        Get typifications for an organization and group.
+        
+        Args:
+            org: Organization identifier
+            group: Group identifier
+            timeout: Deadline in seconds for the whole call (default: 30)
+            cancel_token: CancelToken that aborts the call
+            
+        Returns:
+            JSON string containing the typification response
+            
+        Raises:
+            LibCoreHeyError: If the client is closed or the API call fails
+        """
+        try:
+            with self.fetch_typification(org, group, timeout, cancel_token) as result:
+                return result.text()
+        except LibCoreHeyError:
+            raise
+        except Exception as e:
+            raise LibCoreHeyError(f"Failed to get typification: {e}")
+    
+    def get_quick_replies_typed(self, org: str, group: str, timeout: Optional[float] = None,
+                                cancel_token: Optional[CancelToken] = None):
+        """
+        Get quick replies as a QuickReplies sequence of QuickReply objects.
+        
+        The body is kept as bytes and decoded in bulk on first access (see
+        libcorehey.models).
+        
+        Args:
+            org: Organization identifier
+            group: Group identifier
+            timeout: Deadline in seconds for the whole call (default: 30)
+            cancel_token: CancelToken that aborts the call
+            
+        Returns:
+            QuickReplies over the response body
+            
+        Raises:
+            LibCoreHeyError: If the client is closed or the API call fails
+        """
+        from .models import QuickReplies
+        
+        with self.fetch_quick_replies(org, group, timeout, cancel_token) as result:
+            result.raise_for_error()
+            return QuickReplies(result.body)
+    
+    def get_typification_typed(self, org: str, group: str, timeout: Optional[float] = None,
+                               cancel_token: Optional[CancelToken] = None):
+        """
+        Get typifications as a Typifications sequence of Typification objects.
+        
+        The body is kept as bytes and decoded in bulk on first access (see
+        libcorehey.models).
+        
+        Args:
+            org: Organization identifier
+            group: Group identifier
+            timeout: Deadline in seconds for the whole call (default: 30)
+            cancel_token: CancelToken that aborts the call
+            
+        Returns:
+            Typifications over the response body
+            
+        Raises:
+            LibCoreHeyError: If the client is closed or the API call fails
+        """
+        from .models import Typifications
+        
+        with self.fetch_typification(org, group, timeout, cancel_token) as result:
+            result.raise_for_error()
+            return Typifications(result.body)
+    
+    def close(self):
+        """Release the Go-side handle. Safe to call more than once."""
+        self._closed = True
+        self._daemon = None
+        if self._handle:
+            self._lib.CloseClient(self._handle)
+            self._handle = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def _requests_payload(requests: Iterable[BatchRequest]) -> List[dict]:
+    """Encode requests as the JSON objects the library expects."""
+    payload = []
+    for request in requests:
+        if request.endpoint not in _ENDPOINTS:
+            raise LibCoreHeyError(f"Unknown endpoint: {request.endpoint}")
+        payload.append({"endpoint": _ENDPOINTS[request.endpoint],
+                        "org": request.org, "group": request.group})
+    return payload
+
+
+class _SharedCacheSettings(NamedTuple):
+    cache: "SharedCache"
+    ttls: dict
+    stale_seconds: float
+
+
+# Cross-process response cache used by LibCoreHeyClient (None while disabled)
+_shared_cache: Optional[_SharedCacheSettings] = None
+
+
+def _warmup_requests(keys: Iterable[tuple]) -> List[BatchRequest]:
+    """Expand (org, group) pairs to both endpoints; keep explicit requests as they are."""
+    requests = []
+    for key in keys:
+        if len(key) == 2:
+            requests.extend(BatchRequest(endpoint, *key) for endpoint in _ENDPOINTS)
+        else:
+            requests.append(BatchRequest(*key))
+    return requests
+
+
+def _warmup_key(endpoint: int, org: str, group: str, status: int, error_code: int, ms: float) -> dict:
+    name = next(name for name, value in _ENDPOINTS.items() if value == endpoint)
+    return {"endpoint": name, "org": org, "group": group, "status": status,
+            "error_code": error_code, "ms": ms}
+
+
+# Default clients used by the module-level functions, one per vault configuration
+_default_clients = {}
+_default_clients_lock = threading.Lock()
+
+
+def _default_client(vault_config: Optional[dict]) -> LibCoreHeyClient:
+    """Get (or create) the shared client for a vault configuration."""
+    key = json.dumps(vault_config or {}, sort_keys=True)
+    client = _default_clients.get(key)
+    if client is None:
+        with _default_clients_lock:
+            client = _default_clients.get(key)
+            if client is None:
+                client = LibCoreHeyClient(vault_config)
+                _default_clients[key] = client
+    return client
+
+
+def get_quick_replies(vault_config: dict, org: str, group: str, timeout: Optional[float] = None,
+                      cancel_token: Optional[CancelToken] = None) -> str:
+    """
+    Get quick replies from HeyBanco API using Azure Key Vault with Managed Identity.
+    
+    Calls are served by a shared LibCoreHeyClient per vault configuration, so
+    the credential and Key Vault client are only created on the first call.
+    
+    Args:
+        vault_config: Dictionary containing Azure Key Vault configuration:
+            - vault_url: Azure Key Vault URL (optional if AZURE_KEY_VAULT_URL env var is set)
+            - use_managed_identity: True to use Managed Identity (default: True)
+            - client_id: Optional client ID for User-Assigned Managed Identity
+            
+        Note: The library will automatically look for these secrets in Key Vault:
+            - url-whatapp: WhatsApp API base URL
+            - token-whatapp: WhatsApp API authentication token
+            
+        org: Organization identifier
+        group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
+        cancel_token: CancelToken that aborts the call
+        
+    Returns:
+        JSON string containing the quick replies response
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load or API call fails
+    """
+    return _default_client(vault_config).get_quick_replies(org, group, timeout, cancel_token)
+
+
+def get_typification(vault_config: dict, org: str, group: str, timeout: Optional[float] = None,
+                     cancel_token: Optional[CancelToken] = None) -> str:
+    """
+    Get typifications from HeyBanco API using Azure Key Vault with Managed Identity.
+    
+    Calls are served by a shared LibCoreHeyClient per vault configuration, so
+    the credential and Key Vault client are only created on the first call.
+    
+    Args:
+        vault_config: Dictionary containing Azure Key Vault configuration:
+            - vault_url: Azure Key Vault URL (optional if AZURE_KEY_VAULT_URL env var is set)
+            - use_managed_identity: True to use Managed Identity (default: True)
+            - client_id: Optional client ID for User-Assigned Managed Identity
+            
+        Note: The library will automatically look for these secrets in Key Vault:
+            - url-whatapp: WhatsApp API base URL
+            - token-whatapp: WhatsApp API authentication token
+            
+        org: Organization identifier
+        group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
+        cancel_token: CancelToken that aborts the call
+        
+    Returns:
+        JSON string containing the typification response
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load or API call fails
+    """
+    return _default_client(vault_config).get_typification(org, group, timeout, cancel_token)
+
+
+def get_quick_replies_typed(vault_config: dict, org: str, group: str, timeout: Optional[float] = None,
+                            cancel_token: Optional[CancelToken] = None):
+    """
+    Get quick replies as QuickReply objects (see get_quick_replies for vault_config).
+    
+    Example:
+        for reply in get_quick_replies_typed(config, "org", "group"):
+            print(reply.shortcut, reply.text)
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        org: Organization identifier
+        group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
+        cancel_token: CancelToken that aborts the call
+        
+    Returns:
+        QuickReplies over the response body, decoded on first access
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load or API call fails
+    """
+    return _default_client(vault_config).get_quick_replies_typed(org, group, timeout, cancel_token)
+
+
+def get_typification_typed(vault_config: dict, org: str, group: str, timeout: Optional[float] = None,
+                           cancel_token: Optional[CancelToken] = None):
+    """
+    Get typifications as Typification objects (see get_quick_replies for vault_config).
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        org: Organization identifier
+        group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
+        cancel_token: CancelToken that aborts the call
+        
+    Returns:
+        Typifications over the response body, decoded on first access
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load or API call fails
+    """
+    return _default_client(vault_config).get_typification_typed(org, group, timeout, cancel_token)
+
+
+def fetch_quick_replies(vault_config: dict, org: str, group: str, timeout: Optional[float] = None,
+                        cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+    """
+    Get quick replies as a LibCoreHeyResult (see get_quick_replies for vault_config).
+    
+    The result exposes the HTTP status and error code without parsing the body
+    and must be closed (or used in a ``with`` block) to free its buffer.
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        org: Organization identifier
+        group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
+        cancel_token: CancelToken that aborts the call
+        
+    Returns:
+        LibCoreHeyResult with the response body, HTTP status and error code
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    return _default_client(vault_config).fetch_quick_replies(org, group, timeout, cancel_token)
+
+
+def fetch_typification(vault_config: dict, org: str, group: str, timeout: Optional[float] = None,
+                       cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+    """
+    Get typifications as a LibCoreHeyResult (see get_typification for vault_config).
+    
+    The result exposes the HTTP status and error code without parsing the body
+    and must be closed (or used in a ``with`` block) to free its buffer.
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        org: Organization identifier
+        group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
+        cancel_token: CancelToken that aborts the call
+        
+    Returns:
+        LibCoreHeyResult with the response body, HTTP status and error code
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    return _default_client(vault_config).fetch_typification(org, group, timeout, cancel_token)
+
+
+def stream_quick_replies(vault_config: dict, org: str, group: str, chunk_size: Optional[int] = None,
+                         timeout: Optional[float] = None, cancel_token: Optional[CancelToken] = None):
+    """
+    Get quick replies as a ResponseStream (see LibCoreHeyClient.stream_quick_replies).
+    
+    Example:
+        with stream_quick_replies(config, "org", "group") as stream:
+            for reply in stream.iter_items():
+                ...
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        org: Organization identifier
+        group: Group identifier
+        chunk_size: Largest chunk in bytes (default: 64 KiB)
+        timeout: Deadline in seconds for the whole call, body included (default: 30)
+        cancel_token: CancelToken that aborts the call
+        
+    Returns:
+        ResponseStream with the HTTP status, error code and validators
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    return _default_client(vault_config).stream_quick_replies(org, group, chunk_size, timeout, cancel_token)
+
+
+def stream_typification(vault_config: dict, org: str, group: str, chunk_size: Optional[int] = None,
+                        timeout: Optional[float] = None, cancel_token: Optional[CancelToken] = None):
+    """
+    Get typifications as a ResponseStream (see LibCoreHeyClient.stream_quick_replies).
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        org: Organization identifier
+        group: Group identifier
+        chunk_size: Largest chunk in bytes (default: 64 KiB)
+        timeout: Deadline in seconds for the whole call, body included (default: 30)
+        cancel_token: CancelToken that aborts the call
+        
+    Returns:
+        ResponseStream with the HTTP status, error code and validators
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    return _default_client(vault_config).stream_typification(org, group, chunk_size, timeout, cancel_token)
+
+
+def fetch_many(vault_config: dict, requests: Iterable[BatchRequest], concurrency: int = 16,
+               timeout: Optional[float] = None,
+               cancel_token: Optional[CancelToken] = None) -> Iterator[Tuple[BatchRequest, LibCoreHeyResult]]:
+    """
+    Fetch a mix of quick replies and typifications in one call into the library.
+    
+    See LibCoreHeyClient.fetch_many. Results are yielded as they complete.
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        requests: BatchRequest tuples (or (endpoint, org, group) tuples)
+        concurrency: Maximum number of requests in flight
+        timeout: Deadline in seconds for the whole batch (default: 30)
+        cancel_token: CancelToken that aborts the requests still running
+        
+    Yields:
+        (BatchRequest, LibCoreHeyResult) pairs
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load or a request is invalid
+    """
+    return _default_client(vault_config).fetch_many(requests, concurrency, timeout, cancel_token)
+
+
+def get_quick_replies_many(vault_config: dict, pairs: Iterable[Tuple[str, str]], concurrency: int = 16,
+                           timeout: Optional[float] = None,
+                           cancel_token: Optional[CancelToken] = None) -> Iterator[Tuple[BatchRequest, LibCoreHeyResult]]:
+    """
+    Fetch quick replies for many (org, group) pairs in one call into the library.
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        pairs: (org, group) tuples
+        concurrency: Maximum number of requests in flight
+        timeout: Deadline in seconds for the whole batch (default: 30)
+        cancel_token: CancelToken that aborts the requests still running
+        
+    Yields:
+        (BatchRequest, LibCoreHeyResult) pairs, as each request completes
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    requests = [BatchRequest(QUICK_REPLIES, org, group) for org, group in pairs]
+    return fetch_many(vault_config, requests, concurrency, timeout, cancel_token)
+
+
+def get_typification_many(vault_config: dict, pairs: Iterable[Tuple[str, str]], concurrency: int = 16,
+                          timeout: Optional[float] = None,
+                          cancel_token: Optional[CancelToken] = None) -> Iterator[Tuple[BatchRequest, LibCoreHeyResult]]:
+    """
+    Fetch typifications for many (org, group) pairs in one call into the library.
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        pairs: (org, group) tuples
+        concurrency: Maximum number of requests in flight
+        timeout: Deadline in seconds for the whole batch (default: 30)
+        cancel_token: CancelToken that aborts the requests still running
+        
+    Yields:
+        (BatchRequest, LibCoreHeyResult) pairs, as each request completes
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    requests = [BatchRequest(TYPIFICATION, org, group) for org, group in pairs]
+    return fetch_many(vault_config, requests, concurrency, timeout, cancel_token)
+
+
+def invalidate_secret_cache(vault_url: Optional[str] = None) -> None:
+    """
+    Drop cached Key Vault secrets so the next call reads them again.
+    
+    Secrets (url-whatapp, token-whatapp) are cached by the Go library per vault
+    URL and refreshed in the background shortly before their TTL expires. Use
+    this after rotating a secret to force a fresh read.
+    
+    Args:
+        vault_url: Vault whose secrets should be dropped (default: all vaults)
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    lib = _get_library()
+    lib.InvalidateSecretCache((vault_url or "").encode('utf-8'))
+
+
+def configure_transport(max_idle_conns_per_host: int = None, max_conns_per_host: int = None,
+                        idle_conn_timeout_seconds: int = None, http2: bool = None,
+                        dns_cache_ttl_seconds: int = None) -> None:
+    """
+    Tune the process-wide HTTP transport used for the WhatsApp API calls.
+    
+    All clients share one keep-alive connection pool. Omitted settings keep
+    their defaults; the same settings can be passed as the "transport" key of a
+    vault configuration (see create_azure_config).
+    
+    Args:
+        max_idle_conns_per_host: Idle keep-alive connections kept per host (default 64)
+        max_conns_per_host: Maximum total connections per host (default: unlimited)
+        idle_conn_timeout_seconds: Seconds before an idle connection is closed (default 90)
+        http2: Negotiate HTTP/2 when the server supports it (default True)
+        dns_cache_ttl_seconds: Seconds resolved addresses are cached (default 60;
+            a negative value disables the DNS cache)
+            
+    Raises:
+        LibCoreHeyError: If the library fails to load or the settings are rejected
+    """
+    lib = _get_library()
+    settings = _drop_none(
+        max_idle_conns_per_host=max_idle_conns_per_host,
+        max_conns_per_host=max_conns_per_host,
+        idle_conn_timeout_seconds=idle_conn_timeout_seconds,
+        http2=http2,
+        dns_cache_ttl_seconds=dns_cache_ttl_seconds,
+    )
+    error = _take_string(lib, lib.ConfigureTransport(json.dumps(settings).encode('utf-8')))
+    if error:
+        raise LibCoreHeyError(f"Failed to configure transport: {error}")
+
+
+def _drop_none(**settings) -> dict:
+    return {name: value for name, value in settings.items() if value is not None}
+
+
+def get_transport_stats() -> dict:
+    """
+    Get connection pool statistics for the shared HTTP transport.
+    
+    Returns:
+        Dictionary with open_conns, idle_conns, in_use_conns, total_dials,
+        reused_conns, dns_hits and dns_misses
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    lib = _get_library()
+    return json.loads(_take_string(lib, lib.GetTransportStats()))
+
+
+def configure_resilience(hedge: bool = None, hedge_quantile: float = None, hedge_min_delay_ms: int = None,
+                         hedge_max_delay_ms: int = None, max_retries: int = None,
+                         retry_base_delay_ms: int = None, retry_max_delay_ms: int = None,
+                         retry_budget_ratio: float = None, retry_budget_min_per_second: float = None,
+                         breaker: bool = None, breaker_failure_threshold: int = None,
+                         breaker_open_seconds: float = None) -> None:
+    """
+    Tune hedging, retries and the circuit breaker of the WhatsApp API calls.
+    
+    Hedging sends a second copy of a request that takes longer than the
+    ``hedge_quantile`` of the host's recent latencies and keeps the first
+    response. Transport errors and 502/503/504 responses are retried with
+    jittered exponential backoff. Retries and hedges share a process-wide
+    budget refilled by ``retry_budget_ratio`` per request (plus
+    ``retry_budget_min_per_second``), so an outage does not multiply the load.
+    After ``breaker_failure_threshold`` consecutive failures a host's breaker
+    opens and calls fail at once with ERROR_CIRCUIT_OPEN; after
+    ``breaker_open_seconds`` a single probe request decides whether it closes.
+    Omitted settings take their defaults (the whole configuration is replaced).
+    
+    Args:
+        hedge: Enable hedged requests (default False)
+        hedge_quantile: Latency quantile that triggers the hedge (default 0.95)
+        hedge_min_delay_ms: Lower bound of the hedge delay (default 5)
+        hedge_max_delay_ms: Upper bound of the hedge delay (default 2000)
+        max_retries: Retries per call, 0 to disable (default 2)
+        retry_base_delay_ms: Backoff of the first retry (default 50)
+        retry_max_delay_ms: Backoff cap (default 1000)
+        retry_budget_ratio: Retries/hedges earned per request (default 0.1)
+        retry_budget_min_per_second: Retries/hedges always allowed per second (default 5)
+        breaker: Enable the per-host circuit breaker (default True)
+        breaker_failure_threshold: Consecutive failures that open it (default 5)
+        breaker_open_seconds: Seconds it stays open before probing (default 10)
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load or the settings are rejected
+    """
+    lib = _get_library()
+    settings = _drop_none(
+        hedge=hedge,
+        hedge_quantile=hedge_quantile,
+        hedge_min_delay_ms=hedge_min_delay_ms,
+        hedge_max_delay_ms=hedge_max_delay_ms,
+        max_retries=max_retries,
+        retry_base_delay_ms=retry_base_delay_ms,
+        retry_max_delay_ms=retry_max_delay_ms,
+        retry_budget_ratio=retry_budget_ratio,
+        retry_budget_min_per_second=retry_budget_min_per_second,
+        breaker=breaker,
+        breaker_failure_threshold=breaker_failure_threshold,
+        breaker_open_seconds=breaker_open_seconds,
+    )
+    error = _take_string(lib, lib.ConfigureResilience(json.dumps(settings).encode('utf-8')))
+    if error:
+        raise LibCoreHeyError(f"Failed to configure resilience: {error}")
+
+
+def get_resilience_stats() -> dict:
+    """
+    Get retry, hedging and circuit breaker statistics.
+    
+    Returns:
+        Dictionary with requests, retries, retries_denied, hedges, hedge_wins,
+        hedges_denied, rejected, retry_budget and per-host entries in "hosts"
+        (host, state, consecutive_failures, times_opened, rejected, samples,
+        hedge_delay_ms)
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    lib = _get_library()
+    return json.loads(_take_string(lib, lib.GetResilienceStats()))
+
+
+def configure_rate_limits(host_rate: float = None, host_burst: int = None, vault_rate: float = None,
+                          vault_burst: int = None, max_in_flight_per_org: int = None,
+                          fail_fast: bool = None, max_wait_ms: int = None) -> None:
+    """
+    Limit the request rate per upstream host and per vault, and the calls in flight per org.
+    
+    Requests to the WhatsApp API take a token from their host's bucket and
+    Key Vault reads one from their vault's bucket. A 429 (or a 503 with
+    Retry-After) pauses the bucket until Retry-After passes and halves its
+    rate, which recovers gradually with successful responses; pauses apply
+    even when no rate is set. By default calls wait for their turn up to
+    ``max_wait_ms`` or their deadline; with ``fail_fast`` (or a client created
+    with ``rate_limit_mode="fail_fast"``) they fail at once. Rejected calls
+    have error code ERROR_RATE_LIMITED. Omitted settings disable their limit.
+    
+    Args:
+        host_rate: Requests per second per API host
+        host_burst: Bucket size of each host (default: one second of host_rate)
+        vault_rate: Key Vault reads per second per vault
+        vault_burst: Bucket size of each vault (default: one second of vault_rate)
+        max_in_flight_per_org: Concurrent API calls allowed per org
+        fail_fast: Reject instead of waiting when no token or slot is free
+        max_wait_ms: Longest wait for a token or slot (default: the call deadline)
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load or the settings are rejected
+    """
+    lib = _get_library()
+    settings = _drop_none(
+        host_rate=host_rate,
+        host_burst=host_burst,
+        vault_rate=vault_rate,
+        vault_burst=vault_burst,
+        max_in_flight_per_org=max_in_flight_per_org,
+        fail_fast=fail_fast,
+        max_wait_ms=max_wait_ms,
+    )
+    error = _take_string(lib, lib.ConfigureRateLimits(json.dumps(settings).encode('utf-8')))
+    if error:
+        raise LibCoreHeyError(f"Failed to configure rate limits: {error}")
+
+
+def get_rate_limit_stats() -> dict:
+    """
+    Get rate limiter and bulkhead statistics.
+    
+    Returns:
+        Dictionary with "hosts" and "vaults" buckets (name, rate,
+        effective_rate, tokens, paused_ms, acquired, waited, rejected,
+        throttled, wait_ms_total, wait_ms_max), orgs_in_flight, org_waited,
+        org_rejected and org_wait_ms_total
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    lib = _get_library()
+    return json.loads(_take_string(lib, lib.GetRateLimitStats()))
+
+
+def configure_response_cache(enabled: bool = True, max_entries: int = None, max_bytes: int = None,
+                             quick_replies_ttl_seconds: int = None,
+                             typification_ttl_seconds: int = None,
+                             stale_while_revalidate_seconds: int = None) -> None:
+    """
+    Enable (or disable) the in-process response cache.
+    
+    The cache is off by default. When enabled, successful quick reply and
+    typification responses are kept per (endpoint, org, group, vault) in an LRU
+    bounded by entries and bytes. After its TTL an entry is still served, flagged
+    as stale, for the stale-while-revalidate window while a background request
+    refreshes it. Error responses are never cached. Reconfiguring empties the cache.
+    
+    Args:
+        enabled: False to disable the cache
+        max_entries: Maximum number of cached responses (default 1024)
+        max_bytes: Maximum total size of cached responses (default 64 MiB)
+        quick_replies_ttl_seconds: Freshness of quick replies (default 300)
+        typification_ttl_seconds: Freshness of typifications (default 300)
+        stale_while_revalidate_seconds: Extra time an expired entry may be served while
+            it is refreshed (default 60; a negative value disables it)
+            
+    Raises:
+        LibCoreHeyError: If the library fails to load or the settings are rejected
+    """
+    lib = _get_library()
+    settings = _drop_none(
+        enabled=enabled,
+        max_entries=max_entries,
+        max_bytes=max_bytes,
+        quick_replies_ttl_seconds=quick_replies_ttl_seconds,
+        typification_ttl_seconds=typification_ttl_seconds,
+        stale_while_revalidate_seconds=stale_while_revalidate_seconds,
+    )
+    error = _take_string(lib, lib.ConfigureResponseCache(json.dumps(settings).encode('utf-8')))
+    if error:
+        raise LibCoreHeyError(f"Failed to configure response cache: {error}")
+
+
+def clear_response_cache() -> None:
+    """
+    Drop every cached response (counters are kept).
+    
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    _get_library().ClearResponseCache()
+
+
+def get_response_cache_stats() -> dict:
+    """
+    Get response cache counters.
+    
+    Returns:
+        Dictionary with enabled, entries, bytes, hits, stale_hits, misses,
+        evictions, uncacheable and revalidations
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    lib = _get_library()
+    return json.loads(_take_string(lib, lib.GetResponseCacheStats()))
+
+
+def configure_shared_cache(enabled: bool = True, path: Optional[str] = None,
+                           slots: int = None, slot_size: int = None,
+                           quick_replies_ttl_seconds: float = 300,
+                           typification_ttl_seconds: float = 300,
+                           stale_seconds: float = 600) -> None:
+    """
+    Share successful responses between the worker processes of a host.
+    
+    Responses are kept in a memory-mapped file (under /dev/shm when available)
+    that every process configured with the same ``path`` maps, so a fetch made
+    by one gunicorn/uwsgi worker is a hit for the others. Reads take no lock;
+    writers serialize on a file lock. The file has a fixed size of ``slots`` x
+    ``slot_size`` bytes and responses larger than a slot are not shared. After
+    its TTL an entry is only used, flagged as stale, if the library fails to
+    get a fresh response within ``stale_seconds``.
+    
+    Call it in every worker (e.g. in gunicorn's ``post_fork`` hook); the first
+    process to create the file sets its slots and slot size. Calling it again
+    swaps the cache; calls already using the previous one finish with it, and
+    its mapping is released once nothing references it.
+    
+    Args:
+        enabled: False to stop using the shared cache in this process
+        path: Shared file (default: /dev/shm/libcorehey-<uid>.cache or the temp directory)
+        slots: Number of cached responses (default 1024)
+        slot_size: Maximum size of a shared response, in bytes (default 64 KiB)
+        quick_replies_ttl_seconds: Freshness of quick replies
+        typification_ttl_seconds: Freshness of typifications
+        stale_seconds: How long an expired response may be served when fetching fails
+        
+    Raises:
+        LibCoreHeyError: If the shared file cannot be opened
+    """
+    global _shared_cache
+    from .shm import DEFAULT_SLOTS, DEFAULT_SLOT_SIZE, SharedCache
+    
+    # Calls in flight hold their own reference, so the old mapping is never
+    # closed under them
+    _shared_cache = None
+    if not enabled:
+        return
+    try:
+        cache = SharedCache(path, slots or DEFAULT_SLOTS, slot_size or DEFAULT_SLOT_SIZE)
+    except (OSError, ValueError) as e:
+        raise LibCoreHeyError(f"Failed to open shared cache: {e}")
+    _shared_cache = _SharedCacheSettings(
+        cache,
+        {_ENDPOINT_QUICK_REPLIES: quick_replies_ttl_seconds,
+         _ENDPOINT_TYPIFICATION: typification_ttl_seconds},
+        stale_seconds,
+    )
+
+
+def get_shared_cache_stats() -> dict:
+    """
+    Get shared cache counters.
+    
+    Returns:
+        Dictionary with enabled plus, when enabled, path, slots, slot_size,
+        used_slots and live_entries (across all processes) and this process's
+        hits, stale_hits, misses, writes, too_large and read_retries
+    """
+    shared = _shared_cache
+    if shared is None:
+        return {"enabled": False}
+    return {"enabled": True, **shared.cache.stats()}
+
+
+def configure_snapshot(path: Optional[str], max_bytes: int = None, max_age_seconds: int = None,
+                       save_interval_seconds: int = None) -> None:
+    """
+    Persist cached responses on disk for warm starts and upstream outages.
+    
+    The response cache (enabled with its defaults if needed) is written to
+    ``path`` every ``save_interval_seconds`` when it changed, and on interpreter
+    exit, in a checksummed binary file replaced atomically. Configuring loads
+    the existing file: its responses are served immediately, flagged as stale,
+    while fresh data is fetched in the background, for up to
+    ``max_age_seconds`` after the API last confirmed them. A corrupt file is
+    ignored. Setting the LIBCOREHEY_SNAPSHOT_PATH environment variable does the
+    same with the defaults when the library is first used.
+    
+    Call configure_response_cache() first if you need custom cache settings:
+    reconfiguring the cache empties it.
+    
+    Args:
+        path: Snapshot file; None disables the snapshot
+        max_bytes: Maximum snapshot size; the most recently used responses are
+            kept (default 32 MiB)
+        max_age_seconds: Maximum staleness of a response served from the
+            snapshot (default 86400)
+        save_interval_seconds: Seconds between saves (default 60; a negative
+            value only saves on exit or save_snapshot())
+            
+    Raises:
+        LibCoreHeyError: If the library fails to load or the settings are rejected
+    """
+    settings = _drop_none(
+        path=os.fspath(path) if path else "",
+        max_bytes=max_bytes,
+        max_age_seconds=max_age_seconds,
+        save_interval_seconds=save_interval_seconds,
+    )
+    _configure_snapshot(_get_library(), settings)
+
+
+def _configure_snapshot(lib, settings: dict):
+    error = _take_string(lib, lib.ConfigureSnapshot(json.dumps(settings).encode('utf-8')))
+    if error:
+        raise LibCoreHeyError(f"Failed to configure snapshot: {error}")
+    global _snapshot_saved_at_exit
+    if settings["path"] and not _snapshot_saved_at_exit:
+        atexit.register(_save_snapshot_at_exit)
+        _snapshot_saved_at_exit = True
+
+
+_snapshot_saved_at_exit = False
+
+
+def _save_snapshot_at_exit():
+    try:
+        save_snapshot()
+    except LibCoreHeyError:
+        pass
+
+
+def save_snapshot() -> None:
+    """
+    Write the snapshot now (no-op if it is not configured).
     
-    def __init__(self):
-        self._lib = None
-        self._loaded = False
+    Raises:
+        LibCoreHeyError: If the library fails to load or the file cannot be written
+    """
+    lib = _get_library()
+    error = _take_string(lib, lib.SaveSnapshot())
+    if error:
+        raise LibCoreHeyError(f"Failed to save snapshot: {error}")
+
+
+def get_snapshot_stats() -> dict:
+    """
+    Get snapshot counters.
     
-    def _get_library_path(self) -> Path:
-        """Get the path to the shared library based on platform."""
-        package_dir = Path(__file__).parent
+    Returns:
+        Dictionary with enabled, path, loaded and skipped (responses restored
+        or discarded on load), saves, last_save_seconds_ago, last_save_entries,
+        last_save_bytes and last_error
         
-        system = platform.system().lower()
-        if system == "darwin":  # macOS
-            lib_name = "libcorehey.dylib"
-        elif system == "linux":
-            lib_name = "libcorehey.so"
-        elif system == "windows":
-            lib_name = "libcorehey.dll"
-        else:
-            raise LibCoreHeyError(f"Unsupported platform: {system}")
-            
-        return package_dir / lib_name
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    lib = _get_library()
+    return json.loads(_take_string(lib, lib.GetSnapshotStats()))
+
+
+def get_coalescing_stats() -> dict:
+    """
+    Get request coalescing counters.
     
-    def _setup_library_path(self):
-        """Setup library path for dynamic loading."""
-        package_dir = Path(__file__).parent
-        
-        if platform.system() == "Darwin":  # macOS
-            # Set DYLD_LIBRARY_PATH for macOS
-            current_path = os.environ.get('DYLD_LIBRARY_PATH', '')
-            if str(package_dir) not in current_path:
-                os.environ['DYLD_LIBRARY_PATH'] = f"{package_dir}:{current_path}".rstrip(':')
-        elif platform.system() == "Linux":
-            # Set LD_LIBRARY_PATH for Linux
-            current_path = os.environ.get('LD_LIBRARY_PATH', '')
-            if str(package_dir) not in current_path:
-                os.environ['LD_LIBRARY_PATH'] = f"{package_dir}:{current_path}".rstrip(':')
+    Concurrent identical lookups (same endpoint, org, group and vault, or the
+    same Key Vault secret) share a single upstream request. The ``*_calls``
+    counters count upstream requests actually made and ``*_coalesced`` the
+    calls that waited on one already in flight.
     
-    def load_library(self):
-        """Load the Go shared library."""
-        if self._loaded:
-            return self._lib
-        
-        self._setup_library_path()
-        lib_path = self._get_library_path()
-        
-        if not lib_path.exists():
-            raise LibCoreHeyError(
-                f"Shared library not found at {lib_path}. "
-                f"Please ensure the library is properly built and installed."
-            )
+    Returns:
+        Dictionary with api_calls, api_coalesced, secret_calls and secret_coalesced
         
-        try:
-            self._lib = ctypes.CDLL(str(lib_path))
-            self._configure_functions()
-            self._loaded = True
-            return self._lib
-        except OSError as e:
-            raise LibCoreHeyError(f"Failed to load library {lib_path}: {e}")
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    lib = _get_library()
+    return json.loads(_take_string(lib, lib.GetCoalescingStats()))
+
+
+def configure_stats(enabled: bool = True) -> None:
+    """
+    Turn latency and call recording on or off.
     
-    def _configure_functions(self):
-        """Configure function signatures for the Go library."""
-        # GetQuickReplies function
-        self._lib.GetQuickReplies.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
-        self._lib.GetQuickReplies.restype = ctypes.c_char_p
-        
-        # GetTypification function  
-        self._lib.GetTypification.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
-        self._lib.GetTypification.restype = ctypes.c_char_p
-        
-        # FreeCString function
-        self._lib.FreeCString.argtypes = [ctypes.c_char_p]
-        self._lib.FreeCString.restype = None
-        
-        # Math functions (if they exist in the library)
-        if hasattr(self._lib, 'Add'):
-            self._lib.Add.argtypes = [ctypes.c_int, ctypes.c_int]
-            self._lib.Add.restype = ctypes.c_int
+    While on, the library records how long each phase of a call takes (Azure
+    token, Key Vault read, DNS, connect, TLS, time to first byte, body read,
+    each HTTP attempt, the whole call and the copy to C memory) in histograms
+    per endpoint and status, and counts calls, cache hits and stale hits per
+    error code; Python adds the whole fetch as seen by the caller and the
+    body decoding. Recording costs a few atomic operations per phase.
+    Setting ``LIBCOREHEY_STATS=1`` turns it on from the start. A sidecar
+    daemon records its own phases when its config has ``"stats": {"enabled": true}``.
+    
+    Args:
+        enabled: Whether to record
         
-        if hasattr(self._lib, 'Multiply'):
-            self._lib.Multiply.argtypes = [ctypes.c_int, ctypes.c_int]
-            self._lib.Multiply.restype = ctypes.c_int
-            
-        if hasattr(self._lib, 'Fibonacci'):
-            self._lib.Fibonacci.argtypes = [ctypes.c_int]
-            self._lib.Fibonacci.restype = ctypes.c_int
-            
-        if hasattr(self._lib, 'IsPrime'):
-            self._lib.IsPrime.argtypes = [ctypes.c_int]
-            self._lib.IsPrime.restype = ctypes.c_int
+    Raises:
+        LibCoreHeyError: If the library fails to load
+    """
+    _metrics.enabled = bool(enabled)
+    lib = _get_library()
+    error = _take_string(lib, lib.ConfigureStats(json.dumps({"enabled": bool(enabled)}).encode('utf-8')))
+    if error:
+        raise LibCoreHeyError(f"Failed to configure stats: {error}")
 
 
-# Global library loader instance
-_loader = _LibraryLoader()
+def stats() -> dict:
+    """
+    Get the recorded latency histograms and call counters.
+    
+    Merges the series of the sidecar daemon (when one is running), the
+    in-process library (when loaded) and the Python side. Render the result
+    for Prometheus with libcorehey.render_prometheus().
+    
+    Returns:
+        Dictionary with "enabled", "histograms" (phase, endpoint, status,
+        count, sum_ns, min_ns, max_ns, p50_ns, p90_ns, p99_ns, p999_ns and
+        sparse "buckets" as [index, count] pairs, see libcorehey.metrics) and
+        "counters" (name, endpoint, code, value)
+    """
+    from .daemon import connect_daemon
+    
+    sources = []
+    daemon = connect_daemon()
+    if daemon is not None:
+        try:
+            sources.append(daemon.stats())
+        except OSError:
+            pass
+    if _loader._loaded:
+        lib = _loader._lib
+        sources.append(json.loads(_take_string(lib, lib.GetStats())))
+    
+    return {
+        "enabled": _metrics.enabled or any(source.get("enabled") for source in sources),
+        "histograms": _metrics.merge_histograms([source.get("histograms", ()) for source in sources]
+                                                + [_metrics.python_histograms()]),
+        "counters": _metrics.merge_counters(source.get("counters", ()) for source in sources),
+    }
 
 
-def _get_library():
-    """Get the loaded library instance."""
-    return _loader.load_library()
+def reset_stats() -> None:
+    """Drop the series recorded in this process (a daemon keeps its own)."""
+    _metrics.reset()
+    if _loader._loaded:
+        _loader._lib.ResetStats()
 
 
-def get_quick_replies(vault_config: dict, org: str, group: str) -> str:
+def warmup(vault_config: Optional[dict] = None, keys: Iterable[tuple] = (),
+           background: bool = False, client: Optional[LibCoreHeyClient] = None,
+           timeout: Optional[float] = None, cancel_token: Optional[CancelToken] = None):
     """
-    Get quick replies from HeyBanco API using Azure Key Vault with Managed Identity.
+    Pay the first-call startup costs up front, e.g. before a readiness probe passes.
+    
+    Loads the library (starting the Go runtime), creates the shared client for
+    ``vault_config`` and its Azure credential, acquires the token, reads the
+    Key Vault secrets, opens a TLS connection to the API and optionally
+    prefetches the given keys (into the response cache, if enabled).
     
     Args:
-        vault_config: Dictionary containing Azure Key Vault configuration:
-            - vault_url: Azure Key Vault URL (optional if AZURE_KEY_VAULT_URL env var is set)
-            - use_managed_identity: True to use Managed Identity (default: True)
-            - client_id: Optional client ID for User-Assigned Managed Identity
-            
-        Note: The library will automatically look for these secrets in Key Vault:
-            - url-whatapp: WhatsApp API base URL
-            - token-whatapp: WhatsApp API authentication token
-            
-        org: Organization identifier
-        group: Group identifier
+        vault_config: Azure Key Vault configuration (ignored if client is given)
+        keys: Pairs to prefetch, as (org, group) tuples (both endpoints) or
+            BatchRequest / (endpoint, org, group) tuples
+        background: Run on a daemon thread and return immediately
+        client: LibCoreHeyClient to warm instead of the shared default client
+        timeout: Deadline in seconds for the client phases (default: 30)
+        cancel_token: CancelToken that aborts the remaining phases
         
     Returns:
-        JSON string containing the quick replies response
+        WarmupReport with the duration of each phase, or a
+        concurrent.futures.Future resolving to it when ``background`` is True
         
     Raises:
-        LibCoreHeyError: If the library fails to load or API call fails
+        LibCoreHeyError: If the library fails to load or a key is invalid
     """
-    lib = _get_library()
+    if background:
+        future = Future()
+        
+        def run():
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(warmup(vault_config, keys, client=client, timeout=timeout,
+                                             cancel_token=cancel_token))
+                except BaseException as e:
+                    future.set_exception(e)
+        
+        threading.Thread(target=run, name="libcorehey-warmup", daemon=True).start()
+        return future
     
-    import json
-    vault_config_json = json.dumps(vault_config)
-    vault_config_bytes = vault_config_json.encode('utf-8')
-    org_bytes = org.encode('utf-8')
-    group_bytes = group.encode('utf-8')
+    from .daemon import connect_daemon
     
-    try:
-        result_ptr = lib.GetQuickReplies(vault_config_bytes, org_bytes, group_bytes)
-        if result_ptr:
-            result = ctypes.cast(result_ptr, ctypes.c_char_p).value.decode('utf-8')
-            return result
-        else:
-            return ""
-    except Exception as e:
-        raise LibCoreHeyError(f"Failed to get quick replies: {e}")
+    phases = []
+    if client is None and connect_daemon() is None and not _loader._loaded:
+        start = time.perf_counter()
+        _get_library()
+        phases.append(WarmupPhase("load_library", (time.perf_counter() - start) * 1000))
+    if client is None:
+        start = time.perf_counter()
+        client = _default_client(vault_config)
+        phases.append(WarmupPhase("create_client", (time.perf_counter() - start) * 1000))
+    
+    report = client.warmup(keys, timeout, cancel_token)
+    return WarmupReport(phases + report.phases, report.prefetch)
 
 
-def get_typification(vault_config: dict, org: str, group: str) -> str:
+def register_hot_keys(vault_config: dict, requests: Iterable[BatchRequest],
+                      interval_seconds: Optional[float] = None) -> None:
     """
-    Get typifications from HeyBanco API using Azure Key Vault with Managed Identity.
+    Keep (endpoint, org, group) pairs always warm using the shared client.
+    
+    See LibCoreHeyClient.register_hot_keys().
     
     Args:
-        vault_config: Dictionary containing Azure Key Vault configuration:
-            - vault_url: Azure Key Vault URL (optional if AZURE_KEY_VAULT_URL env var is set)
-            - use_managed_identity: True to use Managed Identity (default: True)
-            - client_id: Optional client ID for User-Assigned Managed Identity
-            
-        Note: The library will automatically look for these secrets in Key Vault:
-            - url-whatapp: WhatsApp API base URL
-            - token-whatapp: WhatsApp API authentication token
-            
-        org: Organization identifier
-        group: Group identifier
+        vault_config: Azure Key Vault configuration
+        requests: BatchRequest tuples (or (endpoint, org, group) tuples)
+        interval_seconds: Refresh interval (default: 80% of the endpoint TTL)
         
+    Raises:
+        LibCoreHeyError: If a request is invalid or the library fails to load
+    """
+    _default_client(vault_config).register_hot_keys(requests, interval_seconds)
+
+
+def unregister_hot_keys(vault_config: dict, requests: Iterable[BatchRequest]) -> None:
+    """
+    Stop refreshing pairs registered with register_hot_keys().
+    
+    Args:
+        vault_config: Azure Key Vault configuration
+        requests: BatchRequest tuples (or (endpoint, org, group) tuples)
+    """
+    _default_client(vault_config).unregister_hot_keys(requests)
+
+
+def get_hot_key_stats() -> List[dict]:
+    """
+    Get the freshness of every registered hot key.
+    
     Returns:
-        JSON string containing the typification response
+        One dictionary per key with endpoint, org, group, vault_url,
+        interval_seconds, age_seconds (since the last successful refresh, -1 if
+        none yet), next_refresh_in_seconds, last_latency_ms,
+        consecutive_failures, refreshes, errors and last_error
         
     Raises:
-        LibCoreHeyError: If the library fails to load or API call fails
+        LibCoreHeyError: If the library fails to load
     """
     lib = _get_library()
-    
-    import json
-    vault_config_json = json.dumps(vault_config)
-    vault_config_bytes = vault_config_json.encode('utf-8')
-    org_bytes = org.encode('utf-8')
-    group_bytes = group.encode('utf-8')
-    
-    try:
-        result_ptr = lib.GetTypification(vault_config_bytes, org_bytes, group_bytes)
-        if result_ptr:
-            result = ctypes.cast(result_ptr, ctypes.c_char_p).value.decode('utf-8')
-            return result
-        else:
-            return ""
-    except Exception as e:
-        raise LibCoreHeyError(f"Failed to get typification: {e}")
+    return json.loads(_take_string(lib, lib.GetHotKeyStats()))
 
 
-def create_azure_config(vault_url: str = None, client_id: str = None) -> dict:
+def create_azure_config(vault_url: str = None, client_id: str = None,
+                        secret_ttl_seconds: int = None, transport: dict = None,
+                        rate_limit_mode: str = None, local_vault: bool = None) -> dict:
     """
     Create Azure Key Vault configuration with sensible defaults.
     
     Args:
         vault_url: Azure Key Vault URL (optional, uses AZURE_KEY_VAULT_URL env var if not provided)
         client_id: Client ID for User-Assigned Managed Identity (optional)
+        secret_ttl_seconds: How long Key Vault secrets are cached (optional, default 900;
+            a negative value disables the cache)
+        transport: Shared HTTP transport settings, same keys as configure_transport (optional)
+        rate_limit_mode: "wait" or "fail_fast" for this client's calls when a rate
+            limit or bulkhead is full (optional, default: see configure_rate_limits)
+        local_vault: Read secrets from a local stand-in at vault_url without Azure
+            credentials, as served by libcorehey.standins (optional)
         
     Returns:
         Configuration dictionary for Azure Key Vault
@@ -230,11 +2319,24 @@ def create_azure_config(vault_url: str = None, client_id: str = None) -> dict:
         config["client_id"] = client_id
     elif os.getenv("AZURE_CLIENT_ID"):
         config["client_id"] = os.getenv("AZURE_CLIENT_ID")
+    
+    if secret_ttl_seconds is not None:
+        config["secret_ttl_seconds"] = secret_ttl_seconds
+    
+    if transport:
+        config["transport"] = _drop_none(**transport)
+    
+    if rate_limit_mode:
+        config["rate_limit_mode"] = rate_limit_mode
+    
+    if local_vault:
+        config["local_vault"] = True
         
     return config
 
 
-def get_quick_replies_simple(org: str, group: str, vault_url: str = None, client_id: str = None) -> str:
+def get_quick_replies_simple(org: str, group: str, vault_url: str = None, client_id: str = None,
+                             timeout: Optional[float] = None) -> str:
     """
     Simplified function to get quick replies using Azure Key Vault with automatic configuration.
     
@@ -243,6 +2345,7 @@ def get_quick_replies_simple(org: str, group: str, vault_url: str = None, client
         group: Group identifier
         vault_url: Azure Key Vault URL (optional, uses AZURE_KEY_VAULT_URL env var)
         client_id: Client ID for User-Assigned Managed Identity (optional)
+        timeout: Deadline in seconds for the whole call (default: 30)
         
     Returns:
         JSON string containing the quick replies response
@@ -251,10 +2354,11 @@ def get_quick_replies_simple(org: str, group: str, vault_url: str = None, client
         LibCoreHeyError: If the library fails to load or API call fails
     """
     config = create_azure_config(vault_url, client_id)
-    return get_quick_replies(config, org, group)
+    return get_quick_replies(config, org, group, timeout)
 
 
-def get_typification_simple(org: str, group: str, vault_url: str = None, client_id: str = None) -> str:
+def get_typification_simple(org: str, group: str, vault_url: str = None, client_id: str = None,
+                            timeout: Optional[float] = None) -> str:
     """
     Simplified function to get typifications using Azure Key Vault with automatic configuration.
     
@@ -263,6 +2367,7 @@ def get_typification_simple(org: str, group: str, vault_url: str = None, client_
         group: Group identifier
         vault_url: Azure Key Vault URL (optional, uses AZURE_KEY_VAULT_URL env var)
         client_id: Client ID for User-Assigned Managed Identity (optional)
+        timeout: Deadline in seconds for the whole call (default: 30)
         
     Returns:
         JSON string containing the typification response
@@ -271,10 +2376,10 @@ def get_typification_simple(org: str, group: str, vault_url: str = None, client_
         LibCoreHeyError: If the library fails to load or API call fails
     """
     config = create_azure_config(vault_url, client_id)
-    return get_typification(config, org, group)
+    return get_typification(config, org, group, timeout)
 
 
-def get_quick_replies_ultra_simple(org: str, group: str) -> str:
+def get_quick_replies_ultra_simple(org: str, group: str, timeout: Optional[float] = None) -> str:
     """
     Ultra-simplified function for servers that already have az CLI access to Key Vault.
     
@@ -285,6 +2390,7 @@ def get_quick_replies_ultra_simple(org: str, group: str) -> str:
     Args:
         org: Organization identifier
         group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
         
     Returns:
         JSON string containing the quick replies response
@@ -294,10 +2400,10 @@ def get_quick_replies_ultra_simple(org: str, group: str) -> str:
     """
     # Configuración mínima - la librería Go intentará usar az CLI primero
     config = {"use_managed_identity": True}
-    return get_quick_replies(config, org, group)
+    return get_quick_replies(config, org, group, timeout)
 
 
-def get_typification_ultra_simple(org: str, group: str) -> str:
+def get_typification_ultra_simple(org: str, group: str, timeout: Optional[float] = None) -> str:
     """
     Ultra-simplified function for servers that already have az CLI access to Key Vault.
     
@@ -308,6 +2414,7 @@ def get_typification_ultra_simple(org: str, group: str) -> str:
     Args:
         org: Organization identifier
         group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
         
     Returns:
         JSON string containing the typification response
@@ -317,10 +2424,11 @@ def get_typification_ultra_simple(org: str, group: str) -> str:
     """
     # Configuración mínima - la librería Go intentará usar az CLI primero
     config = {"use_managed_identity": True}
-    return get_typification(config, org, group)
+    return get_typification(config, org, group, timeout)
 
 
-def get_quick_replies_managed_identity_only(org: str, group: str, vault_url: str = None, client_id: str = None) -> str:
+def get_quick_replies_managed_identity_only(org: str, group: str, vault_url: str = None, client_id: str = None,
+                                            timeout: Optional[float] = None) -> str:
     """
     Function that ONLY uses Managed Identity API, skipping az CLI completely.
     
@@ -331,6 +2439,7 @@ def get_quick_replies_managed_identity_only(org: str, group: str, vault_url: str
         group: Group identifier
         vault_url: Azure Key Vault URL (optional, uses default waSecrets vault)
         client_id: Client ID for User-Assigned Managed Identity (optional)
+        timeout: Deadline in seconds for the whole call (default: 30)
         
     Returns:
         JSON string containing the quick replies response
@@ -348,10 +2457,11 @@ def get_quick_replies_managed_identity_only(org: str, group: str, vault_url: str
     if client_id:
         config["client_id"] = client_id
         
-    return get_quick_replies(config, org, group)
+    return get_quick_replies(config, org, group, timeout)
 
 
-def get_typification_managed_identity_only(org: str, group: str, vault_url: str = None, client_id: str = None) -> str:
+def get_typification_managed_identity_only(org: str, group: str, vault_url: str = None, client_id: str = None,
+                                           timeout: Optional[float] = None) -> str:
     """
     Function that ONLY uses Managed Identity API, skipping az CLI completely.
     
@@ -362,6 +2472,7 @@ def get_typification_managed_identity_only(org: str, group: str, vault_url: str
         group: Group identifier
         vault_url: Azure Key Vault URL (optional, uses default waSecrets vault)
         client_id: Client ID for User-Assigned Managed Identity (optional)
+        timeout: Deadline in seconds for the whole call (default: 30)
         
     Returns:
         JSON string containing the typification response
@@ -379,7 +2490,7 @@ def get_typification_managed_identity_only(org: str, group: str, vault_url: str
     if client_id:
         config["client_id"] = client_id
         
-    return get_typification(config, org, group)
+    return get_typification(config, org, group, timeout)
 
 
 def add_numbers(a: int, b: int) -> int:
@@ -485,4 +2596,169 @@ def is_prime(n: int) -> bool:
     try:
         return lib.IsPrime(n) != 0
     except Exception as e:
-        raise LibCoreHeyError(f"Failed to check if number is prime: {e}")
\ No newline at end of file
+        raise LibCoreHeyError(f"Failed to check if number is prime: {e}")
+
+
+# Native-order int64 and one-byte formats accepted by the batch functions
+_BYTE_ORDER = "<" if sys.byteorder == "little" else ">"
+_INT64_FORMATS = ("q", "l")
+_FLAG_FORMATS = ("?", "b", "B", "c")
+
+
+def _batch_buffer(obj, name: str, formats: Tuple[str, ...], itemsize: int, writable: bool = False) -> memoryview:
+    """
+    Validate a buffer argument of the batch functions.
+    
+    Raises:
+        TypeError: If obj has no buffer or holds another element type
+        ValueError: If obj is not contiguous, or read-only where it is written
+    """
+    try:
+        view = memoryview(obj)
+    except TypeError:
+        raise TypeError(f"{name} must support the buffer protocol, got {type(obj).__name__}") from None
+    if view.itemsize != itemsize or view.format.lstrip("@=" + _BYTE_ORDER) not in formats:
+        kind = "int64" if itemsize == 8 else "one-byte"
+        raise TypeError(f"{name} must hold {kind} values, got format {view.format!r}")
+    if not view.c_contiguous:
+        raise ValueError(f"{name} must be C-contiguous")
+    if writable and view.readonly:
+        raise ValueError(f"{name} is read-only")
+    return view
+
+
+def _batch_address(view: memoryview):
+    """
+    (address, owner) of a buffer's memory; owner must stay alive during the call.
+    
+    ctypes only maps writable buffers, so a read-only input is copied.
+    """
+    raw = view.cast("B")
+    if raw.readonly:
+        owner = (ctypes.c_char * raw.nbytes).from_buffer_copy(raw)
+    else:
+        # A single c_char at the start pins the buffer without building an array type
+        owner = ctypes.c_char.from_buffer(raw)
+    return ctypes.addressof(owner), owner
+
+
+def _arithmetic_batch(export: str, a, b, out):
+    lib = _get_library()
+    
+    if not hasattr(lib, export):
+        raise LibCoreHeyError(f"{export} function not available in library")
+    
+    a_view = _batch_buffer(a, "a", _INT64_FORMATS, 8)
+    b_view = _batch_buffer(b, "b", _INT64_FORMATS, 8)
+    count = a_view.nbytes // 8
+    if b_view.nbytes // 8 != count:
+        raise ValueError(f"a and b differ in length ({count} != {b_view.nbytes // 8})")
+    if out is None:
+        out = array('q', [0]) * count
+    out_view = _batch_buffer(out, "out", _INT64_FORMATS, 8, writable=True)
+    if out_view.nbytes // 8 != count:
+        raise ValueError(f"out has {out_view.nbytes // 8} elements, expected {count}")
+    if count == 0:
+        return out
+    
+    a_address, a_owner = _batch_address(a_view)
+    b_address, b_owner = _batch_address(b_view)
+    out_address, out_owner = _batch_address(out_view)
+    try:
+        getattr(lib, export)(a_address, b_address, out_address, count)
+    except Exception as e:
+        raise LibCoreHeyError(f"Failed to run {export}: {e}")
+    return out
+
+
+def add_numbers_batch(a, b, out=None):
+    """
+    Add two int64 arrays element by element in one library call.
+    
+    ``a``, ``b`` and ``out`` are any C-contiguous buffers of int64
+    (``array.array('q')``, NumPy int64 arrays, memoryviews...). Large inputs
+    are split across cores. Sums wrap around on overflow, as in NumPy.
+    ``out`` may be ``a`` or ``b``.
+    
+    Args:
+        a: First operands
+        b: Second operands, as many as a
+        out: Writable int64 buffer for the results (default: a new array.array('q'))
+        
+    Returns:
+        out, holding a[i] + b[i]
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load or function is not available
+        TypeError: If an argument is not an int64 buffer
+        ValueError: If the lengths differ or out is read-only
+    """
+    return _arithmetic_batch('AddBatch', a, b, out)
+
+
+def multiply_numbers_batch(a, b, out=None):
+    """
+    Multiply two int64 arrays element by element in one library call.
+    
+    Takes the same buffers as add_numbers_batch. Products wrap around on
+    overflow, as in NumPy.
+    
+    Args:
+        a: First factors
+        b: Second factors, as many as a
+        out: Writable int64 buffer for the results (default: a new array.array('q'))
+        
+    Returns:
+        out, holding a[i] * b[i]
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load or function is not available
+        TypeError: If an argument is not an int64 buffer
+        ValueError: If the lengths differ or out is read-only
+    """
+    return _arithmetic_batch('MultiplyBatch', a, b, out)
+
+
+def is_prime_batch(values, out=None):
+    """
+    Check many int64 values for primality in one library call.
+    
+    Unlike is_prime, values below 2 are not an error: they are not prime.
+    The test is exact over the whole int64 range (deterministic
+    Miller-Rabin). Large inputs are split across cores.
+    
+    Args:
+        values: C-contiguous int64 buffer
+        out: Writable one-byte buffer (e.g. a NumPy bool array or a
+            bytearray) for the results (default: a new array.array('B'))
+            
+    Returns:
+        out, holding 1 where values[i] is prime and 0 elsewhere
+        
+    Raises:
+        LibCoreHeyError: If the library fails to load or function is not available
+        TypeError: If an argument has the wrong element type
+        ValueError: If out differs in length or is read-only
+    """
+    lib = _get_library()
+    
+    if not hasattr(lib, 'IsPrimeBatch'):
+        raise LibCoreHeyError("IsPrimeBatch function not available in library")
+    
+    view = _batch_buffer(values, "values", _INT64_FORMATS, 8)
+    count = view.nbytes // 8
+    if out is None:
+        out = array('B', bytes(count))
+    out_view = _batch_buffer(out, "out", _FLAG_FORMATS, 1, writable=True)
+    if out_view.nbytes != count:
+        raise ValueError(f"out has {out_view.nbytes} elements, expected {count}")
+    if count == 0:
+        return out
+    
+    values_address, values_owner = _batch_address(view)
+    out_address, out_owner = _batch_address(out_view)
+    try:
+        lib.IsPrimeBatch(values_address, out_address, count)
+    except Exception as e:
+        raise LibCoreHeyError(f"Failed to check if numbers are prime: {e}")
+    return out
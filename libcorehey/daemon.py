@@ -0,0 +1,339 @@
+"""
+Client for the LibCoreHey sidecar daemon.
+
+Built as an executable (``go build -o libcorehey-daemon lib.go``), the Go
+library runs as one daemon per host that serves every Python worker over a
+Unix socket, so workers share its connection pool, secret cache and response
+cache and never load the Go runtime themselves (which also makes them safe to
+fork). LibCoreHeyClient uses the daemon automatically when its socket is
+reachable and falls back to loading the library in-process otherwise.
+
+The socket is ``$LIBCOREHEY_DAEMON_SOCKET`` or ``daemon.sock`` in
+``libcorehey-<uid>``, a private directory in the temp directory. Only a
+socket owned by this user that no one else may open is used; set
+``LIBCOREHEY_DAEMON=0`` to never use the daemon.
+"""
+
+import json
+import os
+import socket
+import struct
+import tempfile
+import threading
+from typing import Optional, Tuple
+
+from .core import (
+    ERROR_CANCELED,
+    ERROR_INVALID_HANDLE,
+    ERROR_NONE,
+    ERROR_READ,
+    CancelToken,
+    LibCoreHeyError,
+    LibCoreHeyResult,
+    _canceled_result,
+)
+
+SOCKET_ENV = "LIBCOREHEY_DAEMON_SOCKET"
+DISABLE_ENV = "LIBCOREHEY_DAEMON"
+
+_OP_FETCH = 1
+_OP_FETCH_IF_CHANGED = 2
+_OP_PING = 3
+_OP_STATS = 4
+_OP_STREAM = 5
+
+_LENGTH = struct.Struct("<I")
+_REQUEST_HEAD = struct.Struct("<BBI")  # op, endpoint, timeout_ms
+_RESULT_HEAD = struct.Struct("<HBB")  # status, code, flags
+_FIELD = struct.Struct("<H")
+
+# Seconds to wait for a response; the daemon bounds each request on its side too
+DEFAULT_TIMEOUT = 60.0
+
+# Extra seconds granted to the daemon beyond a call deadline before giving up on it
+_DEADLINE_MARGIN = 5.0
+
+
+def default_socket_path() -> str:
+    """Socket named by LIBCOREHEY_DAEMON_SOCKET, or daemon.sock in this user's libcorehey-<uid> directory."""
+    user = os.getuid() if hasattr(os, "getuid") else -1  # -1 like os.Getuid in Go
+    return os.environ.get(SOCKET_ENV) or os.path.join(tempfile.gettempdir(), f"libcorehey-{user}", "daemon.sock")
+
+
+def _trusted_socket(path: str) -> bool:
+    """True when ``path`` belongs to this user and no group or other user may open it."""
+    try:
+        info = os.stat(path)
+    except OSError:
+        return False
+    return info.st_uid == os.getuid() and not info.st_mode & 0o077
+
+
+def _field(value: bytes) -> bytes:
+    if len(value) > 0xFFFF:
+        raise LibCoreHeyError("Request field too long for the daemon protocol")
+    return _FIELD.pack(len(value)) + value
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("Daemon closed the connection")
+        received += count
+    return buffer
+
+
+class DaemonClient:
+    """
+    Connection pool to the daemon socket.
+
+    Each request borrows a connection (one request at a time per connection),
+    so concurrent threads use separate connections. The pool is dropped after
+    a fork so parent and child never share a socket.
+    """
+
+    def __init__(self, path: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT):
+        self.path = path or default_socket_path()
+        self.timeout = timeout
+        self._pool = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _acquire(self) -> socket.socket:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pool, self._pid = [], os.getpid()
+            if self._pool:
+                return self._pool.pop()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _release(self, sock: socket.socket):
+        with self._lock:
+            if self._pid == os.getpid():
+                self._pool.append(sock)
+                return
+        sock.close()
+
+    def request(self, op: int, endpoint: int, config: bytes, org: str, group: str,
+                etag: Optional[str] = None, last_modified: Optional[str] = None,
+                timeout_ms: int = 0, cancel_token: Optional[CancelToken] = None) -> LibCoreHeyResult:
+        """
+        Send one request and wait for its result.
+
+        The daemon applies the ``timeout_ms`` deadline (0: its default).
+        Cancelling ``cancel_token`` drops the connection and returns a
+        canceled result right away.
+
+        Raises:
+            OSError: If the daemon cannot be reached or the connection breaks
+        """
+        return self._request(op, endpoint, config, org, group, etag, last_modified, timeout_ms, cancel_token)[0]
+
+    def open_stream(self, endpoint: int, config: bytes, org: str, group: str, timeout_ms: int = 0,
+                    cancel_token: Optional[CancelToken] = None) -> Tuple[LibCoreHeyResult, "Optional[_DaemonStream]"]:
+        """
+        Start a streamed fetch (see libcorehey.stream).
+
+        Returns:
+            The result with the status and validators (the error body when
+            the call failed) and, if it succeeded, the source of the body,
+            which keeps the connection until the body is read or closed
+
+        Raises:
+            OSError: If the daemon cannot be reached or the connection breaks
+        """
+        return self._request(_OP_STREAM, endpoint, config, org, group, None, None, timeout_ms, cancel_token,
+                             stream=True)
+
+    def _request(self, op: int, endpoint: int, config: bytes, org: str, group: str,
+                 etag: Optional[str], last_modified: Optional[str], timeout_ms: int,
+                 cancel_token: Optional[CancelToken], stream: bool = False):
+        payload = b"".join((
+            _REQUEST_HEAD.pack(op, endpoint, timeout_ms),
+            _field(config),
+            _field(org.encode("utf-8")),
+            _field(group.encode("utf-8")),
+            _field((etag or "").encode("utf-8")),
+            _field((last_modified or "").encode("utf-8")),
+        ))
+
+        sock = self._acquire()
+        abort = None
+        if cancel_token is not None:
+            def abort():
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            if not cancel_token._add_callback(abort):
+                self._release(sock)
+                return _canceled_result(), None
+        try:
+            sock.settimeout(timeout_ms / 1000 + _DEADLINE_MARGIN if timeout_ms else self.timeout)
+            sock.sendall(_LENGTH.pack(len(payload)) + payload)
+            (size,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+            frame = _recv_exactly(sock, size)
+        except BaseException:
+            sock.close()
+            if abort is not None:
+                cancel_token._remove_callback(abort)
+            if cancel_token is not None and cancel_token.cancelled:
+                return _canceled_result(), None
+            raise
+
+        status, code, flags = _RESULT_HEAD.unpack_from(frame)
+        position = _RESULT_HEAD.size
+        validators = []
+        for _ in range(2):
+            (length,) = _FIELD.unpack_from(frame, position)
+            position += _FIELD.size
+            validators.append(frame[position:position + length].decode("utf-8") or None)
+            position += length
+        body = bytes(memoryview(frame)[position:])
+        result = LibCoreHeyResult._from_buffer(body, status, code, flags, *validators)
+        if stream and code == ERROR_NONE:
+            # The body follows on this connection; the stream gives it back
+            return result, _DaemonStream(self, sock, cancel_token, abort)
+
+        self._finish(sock, cancel_token, abort)
+        return result, None
+
+    def _finish(self, sock: socket.socket, cancel_token: Optional[CancelToken], abort):
+        """Return a connection whose response was read in full to the pool."""
+        if abort is not None:
+            cancel_token._remove_callback(abort)
+            if cancel_token.cancelled:
+                sock.close()  # abort() may have shut it down after the response arrived
+                return
+        self._release(sock)
+
+    def ping(self) -> bool:
+        """True if the daemon answers."""
+        try:
+            with self.request(_OP_PING, 0, b"", "", "") as result:
+                return result.ok
+        except OSError:
+            return False
+
+    def stats(self) -> dict:
+        """
+        The daemon's latency histograms and call counters (see libcorehey.stats).
+
+        Raises:
+            OSError: If the daemon cannot be reached or the connection breaks
+        """
+        with self.request(_OP_STATS, 0, b"", "", "") as result:
+            return json.loads(result.body)
+
+    def close(self):
+        """Close the pooled connections."""
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for sock in pool:
+            sock.close()
+
+
+class _DaemonStream:
+    """
+    Body source of a streamed fetch, read from the daemon connection.
+
+    The daemon sends the body in length-prefixed chunks ended by a zero
+    length and the final error code; the connection goes back to the pool
+    once that end is read, and is closed if the stream is closed earlier.
+    """
+
+    def __init__(self, daemon: DaemonClient, sock: socket.socket, cancel_token: Optional[CancelToken], abort):
+        self._daemon = daemon
+        self._sock = sock
+        self._cancel_token = cancel_token
+        self._abort = abort
+        self._remaining = 0
+
+    def readinto(self, buffer: bytearray) -> int:
+        """Bytes read into ``buffer``, 0 at the end of the body or -code on failure."""
+        sock = self._sock
+        if sock is None:
+            return -ERROR_INVALID_HANDLE
+        try:
+            if not self._remaining:
+                (size,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+                if not size:
+                    code = _recv_exactly(sock, 1)[0]
+                    self._sock = None
+                    self._daemon._finish(sock, self._cancel_token, self._abort)
+                    return -code
+                self._remaining = size
+            count = sock.recv_into(buffer, min(len(buffer), self._remaining))
+            if not count:
+                raise ConnectionError("Daemon closed the connection")
+        except OSError:
+            self.close()
+            if self._cancel_token is not None and self._cancel_token.cancelled:
+                return -ERROR_CANCELED
+            return -ERROR_READ
+        self._remaining -= count
+        return count
+
+    def close(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+            if self._abort is not None:
+                self._cancel_token._remove_callback(self._abort)
+
+
+_daemon = None
+_daemon_lock = threading.Lock()
+
+
+def connect_daemon() -> Optional[DaemonClient]:
+    """
+    Get the shared DaemonClient if the daemon is reachable, None otherwise.
+
+    The socket is probed each time no daemon is known, so a daemon started
+    later is picked up by clients created afterwards.
+    """
+    global _daemon
+    if os.environ.get(DISABLE_ENV) == "0" or not hasattr(socket, "AF_UNIX"):
+        return None
+    path = default_socket_path()
+    with _daemon_lock:
+        if _daemon is not None and _daemon.path == path:
+            return _daemon
+        if not hasattr(os, "getuid") or not _trusted_socket(path):
+            return None
+        daemon = DaemonClient(path)
+        if not daemon.ping():
+            daemon.close()
+            return None
+        _daemon = daemon
+        return daemon
+
+
+def _forget_daemon(daemon: DaemonClient):
+    """Stop using a daemon that failed (clients fall back to the in-process library)."""
+    global _daemon
+    with _daemon_lock:
+        if _daemon is daemon:
+            _daemon = None
+    daemon.close()
+
+
+__all__ = [
+    "DaemonClient",
+    "connect_daemon",
+    "default_socket_path",
+    "SOCKET_ENV",
+    "DISABLE_ENV",
+]
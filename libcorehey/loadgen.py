@@ -0,0 +1,500 @@
+"""
+Load generator behind ``libcorehey load``.
+
+Two ways to apply load:
+
+- Closed loop (``--concurrency N``): N workers each send a request as soon
+  as their previous one finishes, so the offered load drops when the
+  service slows down.
+- Open loop (``--rate R``): requests are scheduled at a fixed rate whatever
+  the service does, as real traffic arrives.
+
+Requests run on threads, on asyncio (libcorehey.aio) or as batches
+(fetch_many). Results are recorded after the warm-up period in HDR-style
+histograms (libcorehey.metrics), both as service time (from the moment the
+request was actually sent) and corrected for coordinated omission: in open
+loop, latency counts from the moment the request was scheduled, so queueing
+behind a slow service is included; in closed loop, each sample longer than
+the expected interval also adds the samples the stalled worker would have
+sent meanwhile (as HdrHistogram's recordValueWithExpectedInterval does).
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from . import core
+from .core import BatchRequest, LibCoreHeyClient, LibCoreHeyError, QUICK_REPLIES, _ENDPOINTS
+from .metrics import Histogram, bucket_index, bucket_lower_bound, bucket_upper_bound
+
+MODES = ("thread", "asyncio", "batch")
+
+_ERROR_NAMES = {getattr(core, name): name for name in dir(core) if name.startswith("ERROR_")}
+
+QUANTILES = ((0.5, "p50"), (0.9, "p90"), (0.99, "p99"), (0.999, "p99.9"))
+
+
+def load_keys(path: str, default_endpoint: str = QUICK_REPLIES) -> List[BatchRequest]:
+    """
+    Read the keys to request from a file.
+
+    Each non-empty line not starting with ``#`` is ``org,group`` or
+    ``endpoint,org,group`` (commas or whitespace), or a JSON object with
+    "org", "group" and optionally "endpoint".
+
+    Raises:
+        LibCoreHeyError: If a line cannot be parsed or names an unknown endpoint
+    """
+    keys = []
+    with open(path, encoding="utf-8") as source:
+        for number, line in enumerate(source, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+                fields = [item.get("endpoint", default_endpoint), item.get("org"), item.get("group")]
+            else:
+                fields = line.replace(",", " ").split()
+                if len(fields) == 2:
+                    fields.insert(0, default_endpoint)
+            if len(fields) != 3 or not all(fields):
+                raise LibCoreHeyError(f"{path}:{number}: expected [endpoint,]org,group")
+            if fields[0] not in _ENDPOINTS:
+                raise LibCoreHeyError(f"{path}:{number}: unknown endpoint {fields[0]!r}")
+            keys.append(BatchRequest(*fields))
+    if not keys:
+        raise LibCoreHeyError(f"{path}: no keys")
+    return keys
+
+
+def _error_label(result) -> Optional[str]:
+    if result.ok:
+        return None
+    if result.error_code == core.ERROR_HTTP_STATUS:
+        return f"HTTP {result.status}"
+    return _ERROR_NAMES.get(result.error_code, f"error code {result.error_code}")
+
+
+class Recorder:
+    """Thread-safe sink for request outcomes; ignores those scheduled before the warm-up ends."""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.service = Histogram()
+        self.response = Histogram()
+        self.errors: Dict[str, int] = {}
+        self.ok = 0
+        self.last_end = None
+        self._lock = threading.Lock()
+
+    def record(self, intended: float, start: float, end: float, error: Optional[str]):
+        if intended < self.measure_from:
+            return
+        service_ns = int((end - start) * 1e9)
+        response_ns = int((end - intended) * 1e9)
+        with self._lock:
+            self.service.record(service_ns)
+            self.response.record(response_ns)
+            if error is None:
+                self.ok += 1
+            else:
+                self.errors[error] = self.errors.get(error, 0) + 1
+            self.last_end = end if self.last_end is None else max(self.last_end, end)
+
+
+def corrected_for_interval(histogram: Histogram, interval_ns: int) -> Histogram:
+    """
+    Copy of a closed-loop histogram with the samples coordinated omission hid.
+
+    A sample of ``v`` ns means the worker sent nothing else meanwhile; had it
+    kept sending every ``interval_ns``, those requests would have seen
+    ``v - interval``, ``v - 2 * interval``, ... down to ``interval``.
+    Bucket midpoints stand in for the exact values.
+    """
+    corrected = Histogram()
+    corrected.merge(histogram)
+    if interval_ns <= 0:
+        return corrected
+    for index, count in list(histogram.counts.items()):
+        value = (bucket_lower_bound(index) + bucket_upper_bound(index)) // 2
+        missing = value - interval_ns
+        while missing >= interval_ns:
+            slot = bucket_index(missing)
+            corrected.counts[slot] = corrected.counts.get(slot, 0) + count
+            corrected.count += count
+            corrected.sum_ns += missing * count
+            corrected.min_ns = min(corrected.min_ns, missing)
+            missing -= interval_ns
+    return corrected
+
+
+class LoadTest:
+    """
+    One load test run.
+
+    Args:
+        client: Client to send requests with
+        keys: Keys requested round-robin
+        mode: "thread", "asyncio" or "batch"
+        duration: Seconds measured after the warm-up
+        warmup: Seconds of load before measuring
+        concurrency: Closed loop: workers; open loop: most requests in flight
+            (threads and batches) or running (asyncio)
+        rate: Requests per second for an open loop; None for a closed loop
+        batch_size: Keys per fetch_many call in batch mode
+        timeout: Deadline in seconds for each request (batch: each batch)
+        expected_interval: Closed-loop correction interval in seconds
+            (default: the median service time)
+    """
+
+    def __init__(self, client: LibCoreHeyClient, keys: List[BatchRequest], mode: str = "thread",
+                 duration: float = 30.0, warmup: float = 5.0, concurrency: int = 16,
+                 rate: Optional[float] = None, batch_size: int = 16, timeout: Optional[float] = None,
+                 expected_interval: Optional[float] = None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive")
+        self.client = client
+        self.keys = keys
+        self.mode = mode
+        self.duration = duration
+        self.warmup = warmup
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.batch_size = max(1, batch_size)
+        self.timeout = timeout
+        self.expected_interval = expected_interval
+        self._next_key = itertools.cycle(range(len(keys))).__next__
+        self._key_lock = threading.Lock()
+
+    def _key(self) -> BatchRequest:
+        with self._key_lock:
+            return self.keys[self._next_key()]
+
+    def _fetch(self, key: BatchRequest) -> Optional[str]:
+        try:
+            with self.client._fetch(_ENDPOINTS[key.endpoint], key.org, key.group, self.timeout) as result:
+                return _error_label(result)
+        except LibCoreHeyError as e:
+            return f"exception: {e}"
+
+    def _fetch_batch(self, keys: List[BatchRequest], intended: List[float], recorder: Recorder):
+        start = time.perf_counter()
+        pending = {}
+        for key, when in zip(keys, intended):
+            pending.setdefault(key, []).append(when)
+        try:
+            for key, result in self.client.fetch_many(keys, concurrency=len(keys), timeout=self.timeout):
+                with result:
+                    error = _error_label(result)
+                end = time.perf_counter()
+                recorder.record(pending[key].pop(), start, end, error)
+        except LibCoreHeyError as e:
+            end = time.perf_counter()
+            for whens in pending.values():
+                for when in whens:
+                    recorder.record(when, start, end, f"exception: {e}")
+
+    # ---- closed loop ----
+
+    def _closed_threads(self, recorder: Recorder, stop_at: float):
+        def worker():
+            while True:
+                start = time.perf_counter()
+                if start >= stop_at:
+                    return
+                if self.mode == "batch":
+                    keys = [self._key() for _ in range(self.batch_size)]
+                    self._fetch_batch(keys, [start] * len(keys), recorder)
+                else:
+                    error = self._fetch(self._key())
+                    recorder.record(start, start, time.perf_counter(), error)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    async def _closed_asyncio(self, recorder: Recorder, stop_at: float):
+        from .aio import AsyncLibCoreHeyClient
+
+        aclient = AsyncLibCoreHeyClient(client=self.client)
+
+        async def worker():
+            while True:
+                start = time.perf_counter()
+                if start >= stop_at:
+                    return
+                recorder.record(start, start, *await self._fetch_async(aclient, self._key()))
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+    async def _fetch_async(self, aclient, key: BatchRequest):
+        try:
+            with await aclient._fetch(_ENDPOINTS[key.endpoint], key.org, key.group, self.timeout) as result:
+                error = _error_label(result)
+        except LibCoreHeyError as e:
+            error = f"exception: {e}"
+        return time.perf_counter(), error
+
+    # ---- open loop ----
+
+    def _open_threads(self, recorder: Recorder, started: float, stop_at: float):
+        interval = 1.0 / self.rate
+        group = self.batch_size if self.mode == "batch" else 1
+
+        def run_one(key, intended):
+            start = time.perf_counter()
+            error = self._fetch(key)
+            recorder.record(intended, start, time.perf_counter(), error)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="libcorehey-load") as pool:
+            sent = 0
+            keys, whens = [], []
+            while True:
+                intended = started + sent * interval
+                if intended >= stop_at:
+                    break
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                keys.append(self._key())
+                whens.append(intended)
+                sent += 1
+                if len(keys) >= group:
+                    if self.mode == "batch":
+                        pool.submit(self._fetch_batch, keys, whens, recorder)
+                    else:
+                        pool.submit(run_one, keys[0], whens[0])
+                    keys, whens = [], []
+            if keys and self.mode == "batch":
+                pool.submit(self._fetch_batch, keys, whens, recorder)
+
+    async def _open_asyncio(self, recorder: Recorder, started: float, stop_at: float):
+        from .aio import AsyncLibCoreHeyClient
+
+        aclient = AsyncLibCoreHeyClient(client=self.client)
+        interval = 1.0 / self.rate
+        in_flight = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        async def run_one(key, intended):
+            async with in_flight:
+                start = time.perf_counter()
+                recorder.record(intended, start, *await self._fetch_async(aclient, key))
+
+        sent = 0
+        while True:
+            intended = started + sent * interval
+            if intended >= stop_at:
+                break
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.ensure_future(run_one(self._key(), intended))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            sent += 1
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    # ---- run ----
+
+    def run(self) -> dict:
+        """Apply the load and return the report (see format_report)."""
+        started = time.perf_counter()
+        recorder = Recorder(started + self.warmup)
+        stop_at = recorder.measure_from + self.duration
+        if self.rate is None:
+            if self.mode == "asyncio":
+                asyncio.run(self._closed_asyncio(recorder, stop_at))
+            else:
+                self._closed_threads(recorder, stop_at)
+        elif self.mode == "asyncio":
+            asyncio.run(self._open_asyncio(recorder, started, stop_at))
+        else:
+            self._open_threads(recorder, started, stop_at)
+        return self._report(recorder, time.perf_counter() - started)
+
+    def _report(self, recorder: Recorder, elapsed: float) -> dict:
+        completed = recorder.service.count
+        if self.rate is None:
+            interval_ns = (int(self.expected_interval * 1e9) if self.expected_interval
+                           else recorder.service.quantile(0.5))
+            corrected = corrected_for_interval(recorder.service, interval_ns)
+        else:
+            interval_ns = int(1e9 / self.rate)
+            corrected = recorder.response
+        window = (recorder.last_end - recorder.measure_from) if completed else 0.0
+        return {
+            "loop": "open" if self.rate is not None else "closed",
+            "mode": self.mode,
+            "concurrency": self.concurrency,
+            "rate": self.rate,
+            "batch_size": self.batch_size if self.mode == "batch" else None,
+            "duration": self.duration,
+            "warmup": self.warmup,
+            "keys": len(self.keys),
+            "elapsed": round(elapsed, 3),
+            "requests": completed,
+            "ok": recorder.ok,
+            "errors": dict(sorted(recorder.errors.items(), key=lambda item: -item[1])),
+            "throughput": round(completed / window, 2) if window > 0 else 0.0,
+            "ok_throughput": round(recorder.ok / window, 2) if window > 0 else 0.0,
+            "correction_interval_ms": round(interval_ns / 1e6, 3),
+            "service": _summary(recorder.service),
+            "corrected": _summary(corrected),
+            "histogram": _ranges(corrected),
+        }
+
+
+def _summary(histogram: Histogram) -> dict:
+    summary = {label: round(histogram.quantile(q) / 1e6, 3) for q, label in QUANTILES}
+    summary["max"] = round(histogram.max_ns / 1e6, 3)
+    summary["mean"] = round(histogram.sum_ns / histogram.count / 1e6, 3) if histogram.count else 0.0
+    summary["count"] = histogram.count
+    return summary
+
+
+def _ranges(histogram: Histogram) -> List[dict]:
+    """Counts per power-of-two latency range, in milliseconds."""
+    ranges: Dict[int, int] = {}
+    for index, count in histogram.counts.items():
+        power = max(0, bucket_lower_bound(index).bit_length() - 1)
+        ranges[power] = ranges.get(power, 0) + count
+    return [{"from_ms": round((1 << power) / 1e6, 6) if power else 0.0,
+             "to_ms": round((2 << power) / 1e6, 6), "count": ranges[power]}
+            for power in sorted(ranges)]
+
+
+def format_report(report: dict) -> str:
+    """Human-readable report."""
+    if report["loop"] == "open":
+        load = f"open loop at {report['rate']:g} req/s (at most {report['concurrency']} in flight)"
+    else:
+        load = f"closed loop, {report['concurrency']} workers"
+    if report["batch_size"]:
+        load += f", batches of {report['batch_size']}"
+    lines = [
+        f"libcorehey load: {load}, {report['mode']}, {report['duration']:g}s "
+        f"(+{report['warmup']:g}s warm-up), {report['keys']} keys",
+        f"requests    {report['requests']}  ok {report['ok']}  errors {report['requests'] - report['ok']}",
+        f"throughput  {report['throughput']} req/s  (ok {report['ok_throughput']} req/s)",
+        "",
+        f"{'latency ms':<12}" + "".join(f"{label:>10}" for _, label in QUANTILES)
+        + f"{'max':>10}{'mean':>10}",
+    ]
+    correction = (f"corrected (interval {report['correction_interval_ms']} ms)"
+                  if report["loop"] == "closed" else "corrected (from schedule)")
+    for name, title in (("service", "service"), ("corrected", "corrected")):
+        summary = report[name]
+        lines.append(f"{title:<12}" + "".join(f"{summary[label]:>10}" for _, label in QUANTILES)
+                     + f"{summary['max']:>10}{summary['mean']:>10}")
+    lines.append(f"  {correction}")
+
+    if report["errors"]:
+        lines += ["", "errors"]
+        lines += [f"  {label:<40} {count:>8}" for label, count in report["errors"].items()]
+
+    if report["histogram"]:
+        lines += ["", "corrected latency histogram (ms)"]
+        peak = max(row["count"] for row in report["histogram"])
+        for row in report["histogram"]:
+            bar = "#" * max(1, round(40 * row["count"] / peak))
+            lines.append(f"  {row['from_ms']:>9.3g} - {row['to_ms']:<9.3g} {row['count']:>8}  {bar}")
+    return "\n".join(lines)
+
+
+def _vault_config(value: Optional[str]) -> dict:
+    if not value:
+        return core.create_azure_config()
+    if value.startswith("@"):
+        with open(value[1:], encoding="utf-8") as source:
+            return json.load(source)
+    return json.loads(value)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Arguments of the ``load`` command."""
+    target = parser.add_argument_group("target")
+    target.add_argument("--keys", help="file with one [endpoint,]org,group per line (or JSON lines)")
+    target.add_argument("--endpoint", default=QUICK_REPLIES, choices=sorted(_ENDPOINTS),
+                        help="endpoint for keys that do not name one")
+    target.add_argument("--config", help="vault config as JSON, or @file (default: create_azure_config())")
+    target.add_argument("--standins", action="store_true",
+                        help="run against local stand-ins for Key Vault and the API (libcorehey.standins)")
+    target.add_argument("--standins-latency-ms", type=float, default=5.0)
+    target.add_argument("--standins-jitter-ms", type=float, default=0.0)
+    target.add_argument("--standins-error-rate", type=float, default=0.0)
+    target.add_argument("--payload-bytes", type=int, default=8192, help="stand-in response size")
+    target.add_argument("--key-count", type=int, default=64, help="synthetic keys when --keys is not given")
+
+    load = parser.add_argument_group("load")
+    load.add_argument("--mode", choices=MODES, default="thread")
+    load.add_argument("--concurrency", type=int, default=16,
+                      help="closed loop: workers; open loop: most requests in flight")
+    load.add_argument("--rate", type=float, help="requests per second (open loop); omit for a closed loop")
+    load.add_argument("--batch-size", type=int, default=16, help="keys per fetch_many call in batch mode")
+    load.add_argument("--duration", type=float, default=30.0, help="seconds measured")
+    load.add_argument("--warmup", type=float, default=5.0, help="seconds of load before measuring")
+    load.add_argument("--timeout", type=float, help="deadline of each request in seconds")
+    load.add_argument("--expected-interval-ms", type=float,
+                      help="closed-loop correction interval (default: median service time)")
+    load.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.set_defaults(func=run_command)
+
+
+def run_command(args) -> int:
+    """Run the ``load`` command; exit status 1 if no request succeeded."""
+    standins = None
+    try:
+        if args.standins:
+            from .standins import StandIns
+
+            standins = StandIns(latency_ms=args.standins_latency_ms, jitter_ms=args.standins_jitter_ms,
+                                error_rate=args.standins_error_rate, payload_bytes=args.payload_bytes)
+            config = standins.vault_config()
+        else:
+            config = _vault_config(args.config)
+
+        if args.keys:
+            keys = load_keys(args.keys, args.endpoint)
+        elif args.standins:
+            keys = [BatchRequest(args.endpoint, f"org-{i // 8}", f"group-{i % 8}") for i in range(args.key_count)]
+        else:
+            print("libcorehey load: --keys is required unless --standins is given", file=sys.stderr)
+            return 2
+
+        with LibCoreHeyClient(config) as client:
+            test = LoadTest(client, keys, args.mode, args.duration, args.warmup, args.concurrency, args.rate,
+                            args.batch_size, args.timeout,
+                            args.expected_interval_ms / 1000 if args.expected_interval_ms else None)
+            report = test.run()
+    except (LibCoreHeyError, OSError, ValueError) as e:
+        print(f"libcorehey load: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if standins is not None:
+            standins.close()
+
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0 if report["ok"] else 1
+
+
+__all__ = [
+    "LoadTest",
+    "Recorder",
+    "load_keys",
+    "corrected_for_interval",
+    "format_report",
+    "MODES",
+]
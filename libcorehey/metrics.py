@@ -0,0 +1,272 @@
+"""
+Latency histograms and Prometheus rendering for libcorehey.stats().
+
+The Go library records how long each phase of a call takes (token, secrets,
+dns, connect, tls, ttfb, body, request, call, cstring, stream) in log-linear
+HDR-style histograms per endpoint and status; this module adds the phases
+that happen in Python ("python_call", a whole client fetch as Python sees
+it, and "decode", parsing the body with ``text()``/``json()``) using the
+same bucket layout, so series from both sides merge and render alike.
+
+Buckets: values below 32 ns have their own bucket and every power of two
+above is split in 16 equal buckets, which keeps the relative error under
+1/16 with 640 buckets up to ~73 minutes. Recording is off by default; turn it
+on with ``configure_stats()`` or ``LIBCOREHEY_STATS=1``.
+"""
+
+import math
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+STATS_ENV = "LIBCOREHEY_STATS"
+
+# Must match histSubBits / histBuckets in lib.go
+SUB_BUCKET_BITS = 4
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+BUCKETS = _SUB_BUCKETS * 40
+
+# Upper bounds (seconds) of the Prometheus buckets
+DEFAULT_PROMETHEUS_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                              0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Checked on every fetch; flipped by configure_stats()
+enabled = os.environ.get(STATS_ENV) == "1"
+
+
+def bucket_index(ns: int) -> int:
+    """Bucket holding a duration of ``ns`` nanoseconds."""
+    if ns < 2 * _SUB_BUCKETS:
+        return max(ns, 0)
+    shift = ns.bit_length() - SUB_BUCKET_BITS - 1
+    return min(_SUB_BUCKETS * (shift + 1) + (ns >> shift) - _SUB_BUCKETS, BUCKETS - 1)
+
+
+def bucket_lower_bound(index: int) -> int:
+    """Smallest duration (ns) that falls in bucket ``index``."""
+    if index < 2 * _SUB_BUCKETS:
+        return index
+    shift = index // _SUB_BUCKETS - 1
+    return (index % _SUB_BUCKETS + _SUB_BUCKETS) << shift
+
+
+def bucket_upper_bound(index: int) -> int:
+    """Largest duration (ns) that falls in bucket ``index``."""
+    return bucket_lower_bound(index + 1) - 1
+
+
+class Histogram:
+    """Sparse log-linear histogram of durations in nanoseconds."""
+
+    __slots__ = ("counts", "count", "sum_ns", "min_ns", "max_ns")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns: int):
+        index = bucket_index(ns)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        if not self.count or ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.count += 1
+        self.sum_ns += ns
+
+    def merge(self, other: "Histogram"):
+        """Add the samples of another histogram to this one."""
+        if not other.count:
+            return
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.min_ns = min(self.min_ns, other.min_ns) if self.count else other.min_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        self.count += other.count
+        self.sum_ns += other.sum_ns
+
+    def quantile(self, q: float) -> int:
+        """
+        Duration (ns) below which a fraction ``q`` of the samples fall.
+
+        Reported as the upper bound of the bucket holding that rank, clamped
+        to the observed minimum and maximum (0 without samples).
+        """
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(max(bucket_upper_bound(index), self.min_ns), self.max_ns)
+        return self.max_ns
+
+    def to_dict(self, phase: str, endpoint: str, status: int) -> dict:
+        """Series in the format of the Go GetStats histograms."""
+        return {
+            "phase": phase,
+            "endpoint": endpoint,
+            "status": status,
+            "count": self.count,
+            "sum_ns": self.sum_ns,
+            "min_ns": self.min_ns,
+            "max_ns": self.max_ns,
+            "p50_ns": self.quantile(0.5),
+            "p90_ns": self.quantile(0.9),
+            "p99_ns": self.quantile(0.99),
+            "p999_ns": self.quantile(0.999),
+            "buckets": [[index, self.counts[index]] for index in sorted(self.counts)],
+        }
+
+    @classmethod
+    def from_dict(cls, series: dict) -> "Histogram":
+        """Rebuild a histogram from a GetStats series."""
+        histogram = cls()
+        histogram.counts = {int(index): int(count) for index, count in series.get("buckets", ())}
+        histogram.count = sum(histogram.counts.values())
+        histogram.sum_ns = int(series.get("sum_ns", 0))
+        histogram.min_ns = int(series.get("min_ns", 0))
+        histogram.max_ns = int(series.get("max_ns", 0))
+        return histogram
+
+
+_lock = threading.Lock()
+_series: Dict[Tuple[str, str, int], Histogram] = {}
+
+
+def observe(phase: str, endpoint: str, status: int, ns: int):
+    """Record a Python-side phase duration (a no-op while stats are disabled)."""
+    if not enabled:
+        return
+    key = (phase, endpoint, status)
+    with _lock:
+        histogram = _series.get(key)
+        if histogram is None:
+            histogram = _series[key] = Histogram()
+        histogram.record(ns)
+
+
+def reset():
+    """Drop the Python-side series."""
+    with _lock:
+        _series.clear()
+
+
+def python_histograms() -> List[dict]:
+    """Python-side series in the format of the Go GetStats histograms."""
+    with _lock:
+        return [histogram.to_dict(*key) for key, histogram in sorted(_series.items())]
+
+
+def merge_histograms(groups: Iterable[Iterable[dict]]) -> List[dict]:
+    """Merge histogram series from several sources, adding those with the same key."""
+    merged: Dict[Tuple[str, str, int], Histogram] = {}
+    for series_list in groups:
+        for series in series_list:
+            key = (series["phase"], series["endpoint"], series["status"])
+            histogram = merged.get(key)
+            if histogram is None:
+                merged[key] = Histogram.from_dict(series)
+            else:
+                histogram.merge(Histogram.from_dict(series))
+    return [histogram.to_dict(*key) for key, histogram in sorted(merged.items())]
+
+
+def merge_counters(groups: Iterable[Iterable[dict]]) -> List[dict]:
+    """Merge counters from several sources, adding those with the same key."""
+    merged: Dict[Tuple[str, str, int], int] = {}
+    for counters in groups:
+        for counter in counters:
+            key = (counter["name"], counter["endpoint"], counter["code"])
+            merged[key] = merged.get(key, 0) + counter["value"]
+    return [{"name": name, "endpoint": endpoint, "code": code, "value": value}
+            for (name, endpoint, code), value in sorted(merged.items())]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_prometheus(snapshot: Optional[dict] = None, namespace: str = "libcorehey",
+                      buckets: Iterable[float] = DEFAULT_PROMETHEUS_BUCKETS) -> str:
+    """
+    Render stats in the Prometheus text exposition format.
+
+    Every phase series becomes one ``<namespace>_phase_duration_seconds``
+    histogram labelled by phase, endpoint and status. A fine-grained bucket
+    is counted under the first ``le`` boundary at or above its upper bound,
+    so the rendered buckets never understate a latency.
+
+    Args:
+        snapshot: Output of libcorehey.stats() (default: take it now)
+        namespace: Prefix of the metric names
+        buckets: Upper bounds in seconds of the rendered buckets
+
+    Returns:
+        The exposition text, ending with a newline
+    """
+    if snapshot is None:
+        from .core import stats
+        snapshot = stats()
+    bounds = sorted(buckets)
+    bounds_ns = [bound * 1e9 for bound in bounds]
+    metric = f"{namespace}_phase_duration_seconds"
+
+    lines = [
+        f"# HELP {metric} Duration of each phase of a libcorehey call.",
+        f"# TYPE {metric} histogram",
+    ]
+    for series in snapshot.get("histograms", ()):
+        labels = _labels(phase=series["phase"], endpoint=series["endpoint"], status=series["status"])
+        cumulative = [0] * len(bounds)
+        for index, count in series["buckets"]:
+            upper = bucket_upper_bound(int(index))
+            for position, bound in enumerate(bounds_ns):
+                if upper <= bound:
+                    cumulative[position] += count
+                    break
+        running = 0
+        for bound, count in zip(bounds, cumulative):
+            running += count
+            lines.append(f'{metric}_bucket{{{labels},le="{_format(bound)}"}} {running}')
+        lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {series["count"]}')
+        lines.append(f"{metric}_sum{{{labels}}} {_format(series['sum_ns'] / 1e9)}")
+        lines.append(f"{metric}_count{{{labels}}} {series['count']}")
+
+    names = sorted({counter["name"] for counter in snapshot.get("counters", ())})
+    for name in names:
+        counter_metric = f"{namespace}_{name}_total"
+        lines.append(f"# HELP {counter_metric} Calls counted as {name.replace('_', ' ')} by endpoint and error code.")
+        lines.append(f"# TYPE {counter_metric} counter")
+        for counter in snapshot["counters"]:
+            if counter["name"] == name:
+                labels = _labels(endpoint=counter["endpoint"], code=counter["code"])
+                lines.append(f"{counter_metric}{{{labels}}} {counter['value']}")
+
+    lines.append(f"# HELP {namespace}_stats_enabled Whether latency recording is on.")
+    lines.append(f"# TYPE {namespace}_stats_enabled gauge")
+    lines.append(f"{namespace}_stats_enabled {int(bool(snapshot.get('enabled')))}")
+    return "\n".join(lines) + "\n"
+
+
+__all__ = [
+    "Histogram",
+    "bucket_index",
+    "bucket_lower_bound",
+    "bucket_upper_bound",
+    "render_prometheus",
+    "STATS_ENV",
+    "DEFAULT_PROMETHEUS_BUCKETS",
+]
@@ -0,0 +1,226 @@
+"""
+Typed, compact models of quick-reply and typification payloads.
+
+``get_quick_replies`` returns JSON text that callers turn into a tree of
+dicts, one dict per item with its own key table. The models here keep each
+item in a ``__slots__`` object instead (no per-item dict, field names stored
+once in the class). Typification codes are interned so a parent code is
+shared by all its children. QuickReplies and Typifications hold the raw
+body and decode it in bulk on first access, so a cache of payloads that are
+rarely read costs little more than their bytes.
+
+Example:
+    replies = client.get_quick_replies_typed("org", "group")
+    for reply in replies:
+        print(reply.shortcut, reply.text)
+"""
+
+import json
+import sys
+from collections.abc import Sequence
+from operator import itemgetter
+from typing import Iterable, Iterator, Optional, Union
+
+from .core import LibCoreHeyError
+
+_intern = sys.intern
+
+
+class _Model:
+    """Base of the item models: ``_fields`` in schema order plus ``extra``."""
+
+    __slots__ = ()
+    _fields = ()
+
+    @classmethod
+    def from_dict(cls, item: dict) -> "_Model":
+        """Model of a decoded item; members outside the schema go to ``extra``."""
+        self = cls(*map(item.get, cls._fields))
+        if len(item) != len(cls._fields) or not all(name in item for name in cls._fields):
+            self.extra = {_intern(key): value for key, value in item.items() if key not in cls._fields} or None
+        return self
+
+    def to_dict(self) -> dict:
+        """The item as a plain dict, extra members included."""
+        item = {name: getattr(self, name) for name in self._fields}
+        if self.extra:
+            item.update(self.extra)
+        return item
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+
+class QuickReply(_Model):
+    """One quick reply: its id, the shortcut agents type and the text it expands to."""
+
+    __slots__ = ("id", "shortcut", "text", "extra")
+    _fields = ("id", "shortcut", "text")
+
+    def __init__(self, id=None, shortcut: Optional[str] = None, text: Optional[str] = None,
+                 extra: Optional[dict] = None):
+        self.id = id
+        self.shortcut = shortcut
+        self.text = text
+        self.extra = extra
+
+
+class Typification(_Model):
+    """One typification: its code, display name and parent code (None at the top)."""
+
+    __slots__ = ("code", "name", "parent", "extra")
+    _fields = ("code", "name", "parent")
+
+    def __init__(self, code: Optional[str] = None, name: Optional[str] = None, parent: Optional[str] = None,
+                 extra: Optional[dict] = None):
+        self.code = _intern(code) if type(code) is str else code
+        self.name = name
+        self.parent = _intern(parent) if type(parent) is str else parent
+        self.extra = extra
+
+
+def decode_items(model: type, items: Iterable[dict]) -> list:
+    """
+    Bulk-convert decoded items (e.g. ``json.loads(body)["data"]`` or a
+    stream's ``iter_items()``) into models.
+
+    Items with exactly the schema's members take a fast path that reads them
+    all at once; the rest go through ``model.from_dict``.
+
+    Raises:
+        LibCoreHeyError: If an item is not a JSON object
+    """
+    fields = model._fields
+    getter = itemgetter(*fields)
+    size = len(fields)
+    models = []
+    append = models.append
+    for item in items:
+        if type(item) is dict and len(item) == size:
+            try:
+                append(model(*getter(item)))
+                continue
+            except KeyError:
+                pass
+        if not isinstance(item, dict):
+            raise LibCoreHeyError(f"Expected a JSON object, got {type(item).__name__}")
+        append(model.from_dict(item))
+    return models
+
+
+class _ModelList(Sequence):
+    """
+    Items of one payload, decoded from its body on first access.
+
+    Until then only the body bytes are held; afterwards only the models.
+    ``fields`` holds the payload's other top-level members (e.g. org and
+    group).
+    """
+
+    __slots__ = ("_body", "_items", "_fields")
+    model = _Model
+
+    def __init__(self, body: Union[bytes, bytearray, memoryview, str]):
+        """
+        Wrap a response body without decoding it.
+
+        Args:
+            body: The response body, a JSON object with a ``data`` array or a JSON array
+        """
+        self._body = body.encode("utf-8") if isinstance(body, str) else bytes(body)
+        self._items = None
+        self._fields = None
+
+    @classmethod
+    def from_items(cls, items: Iterable[dict], fields: Optional[dict] = None) -> "_ModelList":
+        """Already decoded items, e.g. ``stream.iter_items()`` with ``stream.fields``."""
+        self = cls.__new__(cls)
+        self._body = None
+        self._items = decode_items(cls.model, items)
+        self._fields = dict(fields) if fields else {}
+        return self
+
+    @property
+    def decoded(self) -> bool:
+        """True once the body has been decoded."""
+        return self._items is not None
+
+    @property
+    def fields(self) -> dict:
+        """Top-level members of the payload other than ``data``."""
+        self._decode()
+        return self._fields
+
+    def _decode(self) -> list:
+        if self._items is None:
+            self._decode_body()
+        return self._items
+
+    def _decode_body(self):
+        try:
+            document = json.loads(self._body)
+        except ValueError as e:
+            raise LibCoreHeyError(f"Invalid {type(self).__name__} payload: {e}")
+        if isinstance(document, dict):
+            if "error" in document and "data" not in document:
+                raise LibCoreHeyError(str(document["error"]))
+            items = document.pop("data", None) or []
+        else:
+            items, document = document, {}
+        if not isinstance(items, list):
+            raise LibCoreHeyError(f"Invalid {type(self).__name__} payload: data is not an array")
+        self._items = decode_items(self.model, items)
+        self._fields = document
+        self._body = None
+
+    def __len__(self) -> int:
+        return len(self._decode())
+
+    def __getitem__(self, index):
+        return self._decode()[index]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._decode())
+
+    def __eq__(self, other):
+        if not isinstance(other, _ModelList):
+            return NotImplemented
+        return type(other) is type(self) and self._decode() == other._decode() and self.fields == other.fields
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        if self._items is None:
+            return f"<{type(self).__name__} undecoded {len(self._body)} bytes>"
+        return f"<{type(self).__name__} {len(self._items)} items>"
+
+
+class QuickReplies(_ModelList):
+    """Quick replies of one org and group (a sequence of QuickReply)."""
+
+    __slots__ = ()
+    model = QuickReply
+
+
+class Typifications(_ModelList):
+    """Typifications of one org and group (a sequence of Typification)."""
+
+    __slots__ = ()
+    model = Typification
+
+
+__all__ = [
+    "QuickReply",
+    "Typification",
+    "QuickReplies",
+    "Typifications",
+    "decode_items",
+]
@@ -0,0 +1,385 @@
+"""
+In-memory search over the quick replies of one org and group.
+
+Agent UIs autocomplete shortcuts on every keystroke. Scanning the JSON of
+the whole set each time costs milliseconds. A QuickReplyIndex answers in
+microseconds. It holds two structures:
+
+- A prefix trie of the shortcuts, for ``prefix()``.
+- An inverted index from the words of each reply's text and shortcut to
+  the replies containing them, for ``search()``.
+
+Both compare text folded for case and accents, so "informacion" finds
+"Información". When the set changes, ``update()`` or ``apply()`` touch only
+the replies that changed, so the index never has to be rebuilt.
+
+Example:
+    index = QuickReplyIndex(client.get_quick_replies_typed("org", "group"))
+    index.subscribe("org", "group", client=client)  # keeps it current
+    index.prefix("/sal")        # shortcuts starting with /sal
+    index.search("horario suc")  # replies with "horario" and a word starting with "suc"
+"""
+
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .core import QUICK_REPLIES, LibCoreHeyClient, LibCoreHeyError
+from .models import QuickReply
+
+_WORD = re.compile(r"\w+")
+
+# Combining diacritical marks, which NFKD splits off accented letters
+_ACCENTS = re.compile("[\u0300-\u036f]")
+
+# Vocabulary words a query's last, partial word may expand to
+_MAX_EXPANSIONS = 64
+
+# Results cached at each trie node, whatever k is asked for
+_CACHED_RESULTS = 16
+
+# Query terms whose ranked replies are kept between searches
+_CACHED_TERMS = 4096
+
+
+def normalize(text: str) -> str:
+    """
+    Fold ``text`` for matching: lower case, with accents removed.
+
+    "Información" and "INFORMACION" both become "informacion", and "ñ"
+    becomes "n".
+    """
+    if text.isascii():
+        return text.lower()
+    return _ACCENTS.sub("", unicodedata.normalize("NFKD", text)).casefold()
+
+
+def _shortcut_key(shortcut: Optional[str]) -> str:
+    # A leading "/" is optional when typing a shortcut
+    return normalize(shortcut or "").lstrip("/")
+
+
+def _words(reply: QuickReply) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for text in (reply.shortcut, reply.text):
+        if text:
+            for word in _WORD.findall(normalize(text)):
+                counts[word] = counts.get(word, 0) + 1
+    return counts
+
+
+def _reply_key(reply: QuickReply) -> Any:
+    return reply.id if reply.id is not None else reply.shortcut
+
+
+class _Node:
+    """Trie node: children by character and the replies whose shortcut ends here."""
+
+    __slots__ = ("children", "keys", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.keys: Optional[list] = None
+        # (limit, keys): best keys of the subtree, reset by any change below
+        self.top: Optional[Tuple[int, list]] = None
+
+
+class QuickReplyIndex:
+    """
+    Prefix and keyword index over a set of quick replies.
+
+    Replies are identified by ``id`` (by ``shortcut`` when they have none).
+    Queries and updates may run on different threads.
+    """
+
+    def __init__(self, replies: Iterable = ()):
+        """
+        Build the index.
+
+        Args:
+            replies: QuickReply objects (e.g. a QuickReplies) or plain dicts
+        """
+        self._lock = threading.Lock()
+        self._replies: Dict[Any, QuickReply] = {}
+        self._shortcuts: Dict[Any, str] = {}
+        self._root = _Node()
+        self._postings: Dict[str, Dict[Any, int]] = {}
+        self._vocabulary: List[str] = []
+        # Search term ("word", or "prefix*" for a partial word) -> [counts
+        # by reply, replies ranked by count or None until first needed]
+        self._terms: Dict[str, list] = {}
+        with self._lock:
+            for reply in replies:
+                self._upsert(_as_reply(reply))
+
+    # ---- updates ----
+
+    def add(self, reply) -> None:
+        """Add a reply, or replace the one with the same id."""
+        with self._lock:
+            self._upsert(_as_reply(reply))
+
+    def remove(self, key) -> bool:
+        """Remove the reply with this id (shortcut for replies without one); False if absent."""
+        with self._lock:
+            return self._remove(key)
+
+    def update(self, replies: Iterable) -> Tuple[int, int, int]:
+        """
+        Make the index hold exactly ``replies``, re-indexing only what changed.
+
+        Returns:
+            (added, removed, modified) reply counts
+        """
+        replies = [_as_reply(reply) for reply in replies]
+        with self._lock:
+            keys = {_reply_key(reply) for reply in replies}
+            removed = [key for key in self._replies if key not in keys]
+            for key in removed:
+                self._remove(key)
+            added = modified = 0
+            for reply in replies:
+                old = self._replies.get(_reply_key(reply))
+                if old is None:
+                    added += 1
+                elif old is reply:
+                    continue
+                elif old != reply:
+                    modified += 1
+                self._upsert(reply)
+        return added, len(removed), modified
+
+    def apply(self, changes) -> None:
+        """
+        Apply a ChangeSet from ``libcorehey.subscribe``.
+
+        Removed replies go first, so an item that changed identity shows up
+        as removed plus added.
+        """
+        with self._lock:
+            for item in changes.removed:
+                self._remove(_reply_key(_as_reply(item)))
+            for _, item in changes.modified:
+                self._upsert(_as_reply(item))
+            for item in changes.added:
+                self._upsert(_as_reply(item))
+
+    def subscribe(self, org: str, group: str, vault_config: Optional[dict] = None, interval: float = 30.0,
+                  client: Optional[LibCoreHeyClient] = None):
+        """
+        Keep the index current with the quick replies of a group.
+
+        The pair is polled with ``libcorehey.subscribe`` and every change is
+        applied incrementally. The first poll also loads the whole set, so
+        the index may start empty.
+
+        Returns:
+            Subscription handle; call cancel() to stop
+        """
+        from .watch import subscribe
+
+        return subscribe(org, group, self.apply, endpoint=QUICK_REPLIES, vault_config=vault_config,
+                         interval=interval, notify_initial=True, client=client)
+
+    def _upsert(self, reply: QuickReply):
+        key = _reply_key(reply)
+        old = self._replies.get(key)
+        if old is not None:
+            if old.shortcut == reply.shortcut and old.text == reply.text:
+                self._replies[key] = reply
+                return
+            self._remove(key)
+        self._replies[key] = reply
+
+        shortcut = self._shortcuts[key] = _shortcut_key(reply.shortcut)
+        node = self._root
+        node.top = None
+        for char in shortcut:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+            node = child
+            node.top = None
+        if node.keys is None:
+            node.keys = []
+        node.keys.append(key)
+
+        for word, count in _words(reply).items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+                insort(self._vocabulary, word)
+            postings[key] = count
+            self._forget(word)
+
+    def _remove(self, key) -> bool:
+        reply = self._replies.pop(key, None)
+        if reply is None:
+            return False
+
+        shortcut = self._shortcuts.pop(key)
+        path = [self._root]
+        for char in shortcut:
+            path.append(path[-1].children[char])
+        for node in path:
+            node.top = None
+        node = path[-1]
+        node.keys.remove(key)
+        if not node.keys:
+            node.keys = None
+        # Prune the branch left without replies
+        for depth in range(len(shortcut), 0, -1):
+            node = path[depth]
+            if node.keys or node.children:
+                break
+            del path[depth - 1].children[shortcut[depth - 1]]
+
+        for word in _words(reply):
+            postings = self._postings[word]
+            del postings[key]
+            if not postings:
+                del self._postings[word]
+                del self._vocabulary[bisect_left(self._vocabulary, word)]
+            self._forget(word)
+        return True
+
+    def _forget(self, word: str):
+        """Drop the cached terms ``word`` contributes to."""
+        terms = self._terms
+        if terms:
+            terms.pop(word, None)
+            for end in range(1, len(word) + 1):
+                terms.pop(word[:end] + "*", None)
+
+    # ---- queries ----
+
+    def prefix(self, prefix: str, k: int = 10) -> List[QuickReply]:
+        """
+        Replies whose shortcut starts with ``prefix``, shortest shortcut first.
+
+        Case, accents and a leading "/" are ignored. Shortcuts of the same
+        length come in alphabetical order.
+        """
+        if k <= 0:
+            return []
+        with self._lock:
+            node = self._root
+            for char in _shortcut_key(prefix):
+                node = node.children.get(char)
+                if node is None:
+                    return []
+            if node.top is None or node.top[0] < k:
+                node.top = (max(k, _CACHED_RESULTS), self._collect(node, max(k, _CACHED_RESULTS)))
+            return [self._replies[key] for key in node.top[1][:k]]
+
+    def _collect(self, node: _Node, limit: int) -> list:
+        """First ``limit`` keys of the subtree, breadth first so shorter shortcuts come first."""
+        keys = []
+        level = [node]
+        while level and len(keys) < limit:
+            ending = [key for node in level if node.keys for key in node.keys]
+            if ending:
+                ending.sort(key=lambda key: (self._shortcuts[key], str(key)))
+                keys += ending
+            level = [child for node in level for child in node.children.values()]
+        return keys[:limit]
+
+    def search(self, query: str, k: int = 10, prefix_last: bool = True) -> List[QuickReply]:
+        """
+        Replies containing every word of ``query`` in their text or shortcut.
+
+        Matching ignores case and accents. The last word may be incomplete,
+        as while typing ("horario suc" finds "sucursal"), unless
+        ``prefix_last`` is False. Replies are ranked by how often they
+        contain the query's most selective word, then by shortcut.
+        """
+        words = _WORD.findall(normalize(query))
+        if not words or k <= 0:
+            return []
+        if prefix_last:
+            words[-1] += "*"
+        with self._lock:
+            terms = []
+            for word in words:
+                term = self._term(word)
+                if term is None:
+                    return []
+                terms.append(term)
+            terms.sort(key=lambda term: len(term[0]))
+
+            # Walk the rarest term's replies best first, keeping those that
+            # have every other term; common queries stop after k matches
+            rarest = terms[0]
+            if rarest[1] is None:
+                counts, shortcuts = rarest[0], self._shortcuts
+                rarest[1] = sorted(counts, key=lambda key: (-counts[key], shortcuts[key], str(key)))
+            others = [term[0] for term in terms[1:]]
+            found = []
+            for key in rarest[1]:
+                if all(key in counts for counts in others):
+                    found.append(self._replies[key])
+                    if len(found) == k:
+                        break
+            return found
+
+    def _term(self, word: str) -> Optional[list]:
+        """Cached [counts, ranked] of a search term, None when no reply has it."""
+        term = self._terms.get(word)
+        if term is not None:
+            return term
+        if word.endswith("*"):
+            counts = self._expand(word[:-1])
+        else:
+            counts = self._postings.get(word)
+        if not counts:
+            return None
+        if len(self._terms) >= _CACHED_TERMS:
+            self._terms.clear()
+        term = self._terms[word] = [counts, None]
+        return term
+
+    def _expand(self, partial: str) -> Dict[Any, int]:
+        """Counts of the vocabulary words starting with ``partial``, merged by reply."""
+        vocabulary = self._vocabulary
+        start = bisect_left(vocabulary, partial)
+        words = []
+        for word in vocabulary[start:start + _MAX_EXPANSIONS]:
+            if not word.startswith(partial):
+                break
+            words.append(word)
+        if len(words) == 1:
+            return self._postings[words[0]]
+        merged: Dict[Any, int] = {}
+        for word in words:
+            for key, count in self._postings[word].items():
+                merged[key] = merged.get(key, 0) + count
+        return merged
+
+    def get(self, key) -> Optional[QuickReply]:
+        """The reply with this id (shortcut for replies without one), or None."""
+        return self._replies.get(key)
+
+    def __len__(self) -> int:
+        return len(self._replies)
+
+    def __contains__(self, key) -> bool:
+        return key in self._replies
+
+    def __repr__(self) -> str:
+        return f"<QuickReplyIndex {len(self._replies)} replies, {len(self._postings)} words>"
+
+
+def _as_reply(reply) -> QuickReply:
+    if isinstance(reply, QuickReply):
+        return reply
+    if isinstance(reply, dict):
+        return QuickReply.from_dict(reply)
+    raise LibCoreHeyError(f"Expected a QuickReply or a dict, got {type(reply).__name__}")
+
+
+__all__ = [
+    "QuickReplyIndex",
+    "normalize",
+]
@@ -0,0 +1,338 @@
+"""
+Cross-process response cache over a memory-mapped file.
+
+With prefork servers (gunicorn, uwsgi) every worker loads its own copy of the
+Go library and keeps its own response cache. The shared cache puts successful
+responses in a file mapped by every worker on the host, so one worker's fetch
+is a hit for all the others.
+
+Layout: a 64-byte header followed by ``slots`` fixed-size slots grouped in
+sets of ``_WAYS``. A key is hashed (blake2b, stable across processes) to a set
+and may live in any slot of it; a writer replaces the slot holding the same
+key, then an empty slot, then the oldest one. Each slot starts with a sequence
+number (seqlock): writers make it odd while they write and even again when
+done, and readers retry when it changed under them, so reads take no lock.
+Writers serialize on an exclusive lock on a companion ``.lock`` file. The
+file never grows: responses larger than a slot are simply not shared.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import weakref
+from typing import NamedTuple, Optional
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+_MAGIC = b"LCHSHM01"
+_VERSION = 1
+_HEADER = struct.Struct("<8sIII")           # magic, version, slots, slot_size
+_HEADER_SIZE = 64
+_SLOT = struct.Struct("<QQdddiIHHHH")       # seq, hash, stored_at, fresh_until, stale_until,
+                                            # status, body_len, key_len, etag_len, lm_len, pad
+_SEQ = struct.Struct("<Q")
+_WAYS = 4
+_READ_RETRIES = 4
+
+DEFAULT_SLOTS = 1024
+DEFAULT_SLOT_SIZE = 64 * 1024
+
+
+class SharedEntry(NamedTuple):
+    """A response read from the shared cache."""
+    status: int
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    fresh: bool
+
+
+def default_path() -> str:
+    """Shared memory (/dev/shm) when available, the temp directory otherwise."""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, "getuid") else os.getpid()
+    return os.path.join(base, f"libcorehey-{user}.cache")
+
+
+def _key_hash(key: bytes) -> int:
+    # Python's hash() is randomized per process, so it cannot index a shared table
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") or 1
+
+
+class _FileLock:
+    """Exclusive lock on a file, held across processes (and threads of this one)."""
+
+    def __init__(self, path: str):
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._thread_lock = threading.Lock()
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            if os.name == "nt":
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if os.name == "nt":
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+    def close(self):
+        os.close(self._fd)
+
+
+def _unmap(mm: mmap.mmap, fd: int, lock: _FileLock):
+    mm.close()
+    os.close(fd)
+    lock.close()
+
+
+class SharedCache:
+    """
+    Fixed-size response cache shared by the processes that map the same file.
+
+    The first process to open the file sets its geometry; later processes use
+    whatever the file already has. The mapping is released by close() or,
+    failing that, once the cache is garbage collected.
+    """
+
+    def __init__(self, path: Optional[str] = None, slots: int = DEFAULT_SLOTS,
+                 slot_size: int = DEFAULT_SLOT_SIZE):
+        """
+        Open (creating it if needed) a shared cache file.
+
+        Args:
+            path: Cache file (default: see default_path())
+            slots: Number of slots, rounded up to a multiple of 4
+            slot_size: Bytes per slot; bounds the largest shareable response
+
+        Raises:
+            OSError: If the file cannot be opened or mapped
+            ValueError: If the file has another format version
+        """
+        if slots <= 0 or slot_size <= _SLOT.size:
+            raise ValueError("slots must be positive and slot_size larger than the slot header")
+        self.path = path or default_path()
+        slots = -(-slots // _WAYS) * _WAYS
+
+        self._lock = _FileLock(self.path + ".lock")
+        self._fd = -1
+        try:
+            with self._lock:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                self._init_file(slots, slot_size)
+            self._mm = mmap.mmap(self._fd, _HEADER_SIZE + self.slots * self.slot_size)
+        except BaseException:
+            if self._fd >= 0:
+                os.close(self._fd)
+            self._lock.close()
+            raise
+        self._finalizer = weakref.finalize(self, _unmap, self._mm, self._fd, self._lock)
+
+        self._sets = self.slots // _WAYS
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.too_large = 0
+        self.read_retries = 0
+
+    def _init_file(self, slots: int, slot_size: int):
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        header = os.read(self._fd, _HEADER.size)
+        if len(header) == _HEADER.size and header[:len(_MAGIC)] == _MAGIC:
+            _, version, self.slots, self.slot_size = _HEADER.unpack(header)
+            if version != _VERSION:
+                raise ValueError(f"Shared cache {self.path} has version {version}, expected {_VERSION}")
+            return
+        self.slots, self.slot_size = slots, slot_size
+        # A sparse file: pages are only allocated as slots are written
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, _HEADER_SIZE + slots * slot_size)
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, _HEADER.pack(_MAGIC, _VERSION, slots, slot_size))
+
+    def _offsets(self, key_hash: int):
+        first = (key_hash % self._sets) * _WAYS
+        return [_HEADER_SIZE + (first + way) * self.slot_size for way in range(_WAYS)]
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[SharedEntry]:
+        """
+        Look a key up without taking any lock.
+
+        Returns:
+            The entry while it is fresh or within its stale window (with
+            ``fresh`` telling which), None otherwise
+        """
+        now = time.time() if now is None else now
+        key_bytes = key.encode("utf-8")
+        key_hash = _key_hash(key_bytes)
+        mm = self._mm
+
+        for offset in self._offsets(key_hash):
+            for _ in range(_READ_RETRIES):
+                seq = _SEQ.unpack_from(mm, offset)[0]
+                if seq & 1:
+                    self.read_retries += 1
+                    continue
+                (_, slot_hash, stored_at, fresh_until, stale_until, status,
+                 body_len, key_len, etag_len, lm_len, _) = _SLOT.unpack_from(mm, offset)
+                if seq == 0 or slot_hash != key_hash:
+                    break
+                start = offset + _SLOT.size
+                end = start + key_len + etag_len + lm_len + body_len
+                if end > offset + self.slot_size:
+                    self.read_retries += 1
+                    continue
+                data = mm[start:end]
+                if _SEQ.unpack_from(mm, offset)[0] != seq:
+                    self.read_retries += 1
+                    continue
+                if data[:key_len] != key_bytes:
+                    break
+                if now >= stale_until:
+                    self.misses += 1
+                    return None
+                fresh = now < fresh_until
+                if fresh:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                position = key_len
+                etag = data[position:position + etag_len].decode("utf-8") or None
+                position += etag_len
+                last_modified = data[position:position + lm_len].decode("utf-8") or None
+                position += lm_len
+                return SharedEntry(status, data[position:], etag, last_modified, stored_at, fresh)
+        self.misses += 1
+        return None
+
+    def put(self, key: str, status: int, body: bytes, ttl: float, stale_ttl: float = 0.0,
+            etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+        """
+        Store a response for every process.
+
+        Args:
+            key: Cache key
+            status: HTTP status
+            body: Response body
+            ttl: Seconds the response is fresh
+            stale_ttl: Extra seconds it may still be served as stale
+            etag: ETag validator
+            last_modified: Last-Modified validator
+
+        Returns:
+            False if the response does not fit in a slot
+        """
+        key_bytes = key.encode("utf-8")
+        etag_bytes = (etag or "").encode("utf-8")
+        lm_bytes = (last_modified or "").encode("utf-8")
+        payload = b"".join((key_bytes, etag_bytes, lm_bytes, body))
+        if (_SLOT.size + len(payload) > self.slot_size
+                or max(len(key_bytes), len(etag_bytes), len(lm_bytes)) > 0xFFFF):
+            self.too_large += 1
+            return False
+
+        key_hash = _key_hash(key_bytes)
+        now = time.time()
+        mm = self._mm
+
+        with self._lock:
+            offset = self._victim(key_hash, key_bytes)
+            seq = _SEQ.unpack_from(mm, offset)[0] | 1  # odd: write in progress
+            _SEQ.pack_into(mm, offset, seq)
+            mm[offset + _SLOT.size:offset + _SLOT.size + len(payload)] = payload
+            _SLOT.pack_into(mm, offset, seq, key_hash, now, now + ttl, now + ttl + stale_ttl,
+                            status, len(body), len(key_bytes), len(etag_bytes), len(lm_bytes), 0)
+            _SEQ.pack_into(mm, offset, seq + 1)
+        self.writes += 1
+        return True
+
+    def _victim(self, key_hash: int, key_bytes: bytes) -> int:
+        """Slot to write key into: its own slot, an empty one, or the oldest one."""
+        oldest, oldest_at = None, None
+        for offset in self._offsets(key_hash):
+            (seq, slot_hash, stored_at, _, _, _, _, key_len, _, _, _) = _SLOT.unpack_from(self._mm, offset)
+            if seq == 0 or slot_hash == 0:
+                return offset
+            start = offset + _SLOT.size
+            if slot_hash == key_hash and self._mm[start:start + key_len] == key_bytes:
+                return offset
+            if oldest is None or stored_at < oldest_at:
+                oldest, oldest_at = offset, stored_at
+        return oldest
+
+    def clear(self):
+        """Drop every entry for all processes."""
+        with self._lock:
+            for slot in range(self.slots):
+                offset = _HEADER_SIZE + slot * self.slot_size
+                seq = _SEQ.unpack_from(self._mm, offset)[0]
+                if seq:
+                    _SEQ.pack_into(self._mm, offset, seq | 1)
+                    _SLOT.pack_into(self._mm, offset, (seq | 1) + 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+
+    def stats(self) -> dict:
+        """Counters of this process plus the number of slots in use."""
+        now = time.time()
+        used = live = 0
+        for slot in range(self.slots):
+            offset = _HEADER_SIZE + slot * self.slot_size
+            seq, slot_hash, _, _, stale_until = _SLOT.unpack_from(self._mm, offset)[:5]
+            if seq and slot_hash:
+                used += 1
+                live += stale_until > now
+        return {
+            "path": self.path,
+            "slots": self.slots,
+            "slot_size": self.slot_size,
+            "used_slots": used,
+            "live_entries": live,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "too_large": self.too_large,
+            "read_retries": self.read_retries,
+        }
+
+    def close(self):
+        """Unmap the file. Other processes keep their mappings."""
+        if self._mm is not None:
+            self._mm = None
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+__all__ = [
+    "SharedCache",
+    "SharedEntry",
+    "default_path",
+    "DEFAULT_SLOTS",
+    "DEFAULT_SLOT_SIZE",
+]
@@ -0,0 +1,215 @@
+"""
+Local stand-ins for Azure Key Vault and the WhatsApp API.
+
+Benchmarks and load tests need the whole call path (secret lookup, HTTP
+request, body read, copy into Python) without Azure or the real upstream.
+StandIns serves both from one local HTTP server:
+
+- ``GET /secrets/{name}`` answers like Key Vault's REST API
+  (``{"value": ...}``), with ``url-whatapp`` pointing back at the server.
+- ``GET /v2/quick_replies`` and ``GET /v2/typification`` return a JSON
+  object whose ``data`` array pads the body to ``payload_bytes``, honouring
+  ``If-None-Match`` with 304.
+
+Clients read the secrets from it when their config has ``local_vault`` (see
+``vault_config``); no Azure credential is involved.
+
+Usage:
+    python -m libcorehey.standins --port 8200 --latency-ms 5 --payload-bytes 16384
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+_ITEM_TEXT = "Hola, gracias por comunicarte con HeyBanco. ¿En qué te podemos ayudar hoy?"
+
+
+def make_payload(endpoint: str, org: str, group: str, payload_bytes: int) -> bytes:
+    """
+    Build a response body of about ``payload_bytes`` bytes.
+
+    Quick replies are ``{"id", "shortcut", "text"}`` items and typifications
+    ``{"code", "name", "parent"}`` items forming a two-level tree, like the
+    real API.
+    """
+    items = []
+    size = 64
+    while size < payload_bytes or not items:
+        i = len(items)
+        if endpoint == "typification":
+            parent = None if i % 8 == 0 else f"T{i - i % 8}"
+            item = {"code": f"T{i}", "name": f"Tipificación {i}", "parent": parent}
+        else:
+            item = {"id": i, "shortcut": f"/respuesta{i}", "text": f"{_ITEM_TEXT} ({i})"}
+        items.append(item)
+        size += len(json.dumps(item, ensure_ascii=False).encode("utf-8")) + 2
+    return json.dumps({"org": org, "group": group, "data": items}, ensure_ascii=False).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, keep-alive
+    # requests would stall on delayed ACKs (~40 ms each)
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        standins = self.server.standins
+        url = urlparse(self.path)
+        if url.path.startswith("/secrets/"):
+            standins._sleep(standins.vault_latency_ms)
+            value = standins.secrets.get(url.path[len("/secrets/"):])
+            if value is None:
+                self._send(404, b'{"error":{"code":"SecretNotFound"}}')
+            else:
+                self._send(200, json.dumps({"value": value}).encode("utf-8"))
+            standins._count("secrets")
+            return
+
+        endpoint = url.path[len("/v2/"):] if url.path in ("/v2/quick_replies", "/v2/typification") else None
+        if endpoint is None:
+            self._send(404, b'{"error":"not found"}')
+            return
+        query = parse_qs(url.query)
+        body, etag = standins._payload(endpoint, query.get("org", [""])[0], query.get("group", [""])[0])
+        standins._sleep(standins.latency_ms)
+        standins._count(endpoint)
+        if standins.error_rate and random.random() < standins.error_rate:
+            self._send(503, b'{"error":"stand-in failure"}')
+        elif self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", etag)
+        else:
+            self._send(200, body, etag)
+
+    def _send(self, status: int, body: bytes, etag: Optional[str] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+    standins: "StandIns"
+
+    def handle_error(self, request, client_address):
+        # Clients that stop reading a streamed body close the connection midway
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StandIns:
+    """
+    Local Key Vault and WhatsApp API served from a background thread.
+
+    Example:
+        with StandIns(latency_ms=5, payload_bytes=16384) as standins:
+            client = LibCoreHeyClient(standins.vault_config())
+    """
+
+    def __init__(self, latency_ms: float = 0.0, payload_bytes: int = 2048, vault_latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, error_rate: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        """
+        Start the server.
+
+        Args:
+            latency_ms: Delay before each API response
+            payload_bytes: Approximate size of each API response body
+            vault_latency_ms: Delay before each secret
+            jitter_ms: Extra uniformly random delay added to both
+            error_rate: Fraction of API responses answered with 503
+            host: Interface to listen on
+            port: Port to listen on (0: any free port)
+        """
+        self.latency_ms = latency_ms
+        self.payload_bytes = payload_bytes
+        self.vault_latency_ms = vault_latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests: Dict[str, int] = {}
+        self._payloads: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+        self._server = _Server((host, port), _Handler)
+        self._server.standins = self
+        self.url = f"http://{host}:{self._server.server_address[1]}"
+        self.secrets = {"url-whatapp": self.url, "token-whatapp": "stand-in-token"}
+        self._thread = threading.Thread(target=self._server.serve_forever, name="libcorehey-standins",
+                                        daemon=True)
+        self._thread.start()
+
+    def vault_config(self, **settings) -> dict:
+        """Vault configuration that reads secrets from this server; extra keys are added as given."""
+        return dict({"vault_url": self.url, "local_vault": True}, **settings)
+
+    def _sleep(self, ms: float):
+        delay = ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+    def _payload(self, endpoint: str, org: str, group: str):
+        key = (endpoint, org, group)
+        cached = self._payloads.get(key)
+        if cached is None:
+            body = make_payload(endpoint, org, group, self.payload_bytes)
+            cached = self._payloads[key] = (body, '"%x"' % (hash(body) & 0xFFFFFFFF))
+        return cached
+
+    def close(self):
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local Key Vault and WhatsApp API for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--vault-latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--payload-bytes", type=int, default=2048)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    standins = StandIns(args.latency_ms, args.payload_bytes, args.vault_latency_ms, args.jitter_ms,
+                        args.error_rate, args.host, args.port)
+    print(f"Serving on {standins.url}; use vault config {json.dumps(standins.vault_config())}")
+    try:
+        standins._thread.join()
+    except KeyboardInterrupt:
+        standins.close()
+
+
+__all__ = [
+    "StandIns",
+    "make_payload",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+Streaming reads of large quick-reply and typification payloads.
+
+``fetch_*`` returns the whole body at once, and ``json()`` then parses it in
+one go, so peak memory grows with the payload. A ResponseStream instead
+hands the body over as it arrives, in chunks of at most ``chunk_size``
+bytes, read straight from the connection into one reused buffer.
+``iter_items()`` goes a step further and yields the decoded items of the
+payload's ``data`` array one at a time. Either way memory stays flat
+whatever the payload size, and processing starts before the download ends.
+
+Example:
+    with client.stream_typification("org", "group") as stream:
+        stream.raise_for_error()
+        for item in stream.iter_items():
+            index(item)
+"""
+
+import codecs
+import ctypes
+import json
+import re
+from typing import Iterable, Iterator, Optional
+
+from .core import (
+    ERROR_CANCELED,
+    ERROR_INVALID_HANDLE,
+    ERROR_NONE,
+    ERROR_READ,
+    ERROR_TIMEOUT,
+    LibCoreHeyError,
+    LibCoreHeyResult,
+    _FLAG_CACHED,
+    _FLAG_STALE,
+)
+
+# Bytes read per chunk unless the caller asks otherwise
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_STREAM_ERRORS = {
+    ERROR_READ: "Failed to read response",
+    ERROR_TIMEOUT: "Deadline exceeded",
+    ERROR_CANCELED: "Request canceled",
+    ERROR_INVALID_HANDLE: "Stream was closed",
+}
+
+
+class _LibraryStream:
+    """Body source backed by a Go-side stream of the in-process library."""
+
+    def __init__(self, lib, stream_id: int):
+        self._lib = lib
+        self._id = stream_id
+        self._buffer = None
+        self._address = 0
+
+    def readinto(self, buffer: bytearray) -> int:
+        """Bytes read into ``buffer``, 0 at the end of the body or -code on failure."""
+        if buffer is not self._buffer:
+            self._buffer = buffer
+            self._address = ctypes.addressof((ctypes.c_char * len(buffer)).from_buffer(buffer))
+        return self._lib.StreamRead(self._id, self._address, len(buffer))
+
+    def close(self):
+        if self._id:
+            self._lib.CloseStream(self._id)
+            self._id = 0
+
+
+class ResponseStream:
+    """
+    Response whose body is read incrementally instead of all at once.
+
+    The status, error code and validators are known as soon as the response
+    headers arrive; the body is then read with ``iter_chunks()`` or
+    ``iter_items()`` (only once). The call deadline also bounds reading the
+    body. A stream holds its connection until it is read to the end or
+    closed, so close it (or use a ``with`` block) when stopping early.
+    """
+
+    def __init__(self, result: LibCoreHeyResult, source=None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if chunk_size <= 0:
+            raise LibCoreHeyError("chunk_size must be positive")
+        self.status = result.status
+        self.error_code = result.error_code
+        self.etag = result.etag
+        self.last_modified = result.last_modified
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+        self.fields = {}
+        self._flags = result._flags
+        self._error = result.error
+        self._source = source
+        self._started = False
+        result.close()
+
+    @property
+    def ok(self) -> bool:
+        """True while the call has not failed, either opening or reading the body."""
+        return self.error_code == ERROR_NONE
+
+    @property
+    def cached(self) -> bool:
+        """True when the body comes from the response cache."""
+        return bool(self._flags & _FLAG_CACHED)
+
+    @property
+    def stale(self) -> bool:
+        """True when an expired cached body is served while it is being refreshed."""
+        return bool(self._flags & _FLAG_STALE)
+
+    @property
+    def closed(self) -> bool:
+        """True once the body has been read to the end or the stream closed."""
+        return self._source is None
+
+    @property
+    def error(self) -> Optional[str]:
+        """Error message for failed calls, None when ok."""
+        return None if self.ok else self._error
+
+    def raise_for_error(self):
+        """Raise LibCoreHeyError if the call failed."""
+        if not self.ok:
+            raise LibCoreHeyError(self.error)
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        """
+        Yield the body in chunks of at most ``chunk_size`` bytes as it arrives.
+
+        Raises:
+            LibCoreHeyError: If the call failed, the body was already read, or
+                reading it fails midway (``error_code`` then tells why)
+        """
+        self.raise_for_error()
+        if self._started:
+            raise LibCoreHeyError("Stream body was already read")
+        if self._source is None:
+            raise LibCoreHeyError("Stream is closed")
+        self._started = True
+        buffer = bytearray(self.chunk_size)
+        try:
+            while True:
+                count = self._source.readinto(buffer)
+                if count <= 0:
+                    break
+                self.bytes_read += count
+                yield bytes(memoryview(buffer)[:count])
+        finally:
+            self.close()
+        if count < 0:
+            self.error_code = -count
+            self._error = _STREAM_ERRORS.get(self.error_code, f"error code {self.error_code}")
+            self.raise_for_error()
+
+    def iter_items(self, key: Optional[str] = "data") -> Iterator:
+        """
+        Yield the decoded items of the payload's array as they arrive.
+
+        The array is the member ``key`` of the top-level object (the other
+        members are decoded whole into ``fields``), or the document itself
+        when it is a top-level array.
+
+        Raises:
+            LibCoreHeyError: As iter_chunks, or if the body is not valid JSON
+        """
+        return iter_json_items(self.iter_chunks(), key, self.fields)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.iter_chunks()
+
+    def close(self):
+        """Release the stream and its connection. Safe to call more than once."""
+        source, self._source = self._source, None
+        if source is not None:
+            source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __repr__(self) -> str:
+        return f"<ResponseStream status={self.status} error_code={self.error_code} bytes_read={self.bytes_read}>"
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_SEPARATOR = re.compile(r"[ \t\n\r]*,[ \t\n\r]*")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]+\Z")
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+# Parser states
+_START, _KEY, _COLON, _VALUE, _ITEMS, _END = range(6)
+
+
+class _ItemParser:
+    """
+    Incremental parser for the items of one JSON array.
+
+    Structure around the array (brackets, commas, member names) is scanned
+    here; every item and every other member is decoded whole by the json
+    module's C scanner, so only the item being received needs buffering.
+    """
+
+    def __init__(self, key: Optional[str], fields: Optional[dict]):
+        self._key = key
+        self._fields = fields
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._text = ""
+        self._position = 0
+        self._state = _START
+        self._in_object = False
+        self._member = None
+        # A ',' (or the closing bracket) is due / a value is due after a ','
+        self._comma = False
+        self._after_comma = False
+        self._final = False
+        self._wait_for = 0
+
+    def _decode_utf8(self, chunk: bytes, final: bool = False) -> str:
+        try:
+            return self._utf8.decode(chunk, final)
+        except UnicodeDecodeError as exc:
+            raise LibCoreHeyError(f"Invalid UTF-8 in JSON: {exc}") from None
+
+    def feed(self, chunk: bytes) -> Iterator:
+        self._text += self._decode_utf8(chunk)
+        if len(self._text) - self._position >= self._wait_for:
+            yield from self._parse()
+
+    def finish(self) -> Iterator:
+        self._text += self._decode_utf8(b"", final=True)
+        self._final = True
+        yield from self._parse()
+        if self._state != _END:
+            raise LibCoreHeyError("Invalid JSON: document ends early")
+
+    def _decode(self, text: str, position: int):
+        """(value, end) of the JSON value at ``position``, or None until more text arrives."""
+        try:
+            value, end = self._decoder.raw_decode(text, position)
+        except json.JSONDecodeError as exc:
+            if self._final:
+                raise LibCoreHeyError(f"Invalid JSON: {exc}") from None
+            return None
+        if not self._final and (end == len(text) or isinstance(value, (int, float))
+                                and _NUMBER_TAIL.match(text, end)):
+            return None  # a number may go on in the next chunk ("3" + ".5")
+        return value, end
+
+    def _parse(self) -> Iterator:
+        text = self._text
+        position = self._position
+        scan_once = self._decoder.scan_once
+        while True:
+            position = _WHITESPACE.match(text, position).end()
+            if position == len(text):
+                break
+            char = text[position]
+            state = self._state
+
+            if state == _START:
+                if char not in "[{":
+                    raise LibCoreHeyError("Invalid JSON: expected an object or an array")
+                self._in_object = char == "{"
+                self._state = _KEY if self._in_object else _ITEMS
+                position += 1
+            elif state in (_KEY, _ITEMS) and char == ("}" if state == _KEY else "]"):
+                if self._after_comma:
+                    raise LibCoreHeyError("Invalid JSON: trailing comma")
+                self._state = _KEY if state == _ITEMS and self._in_object else _END
+                self._comma = True
+                position += 1
+            elif state in (_KEY, _ITEMS) and self._comma:
+                if char != ",":
+                    raise LibCoreHeyError(f"Invalid JSON: expected ',' but found {char!r}")
+                self._comma, self._after_comma = False, True
+                position += 1
+            elif state == _KEY:
+                if char != '"':
+                    raise LibCoreHeyError("Invalid JSON: expected a member name")
+                decoded = self._decode(text, position)
+                if decoded is None:
+                    break
+                self._member, position = decoded
+                self._state = _COLON
+            elif state == _COLON:
+                if char != ":":
+                    raise LibCoreHeyError("Invalid JSON: expected ':'")
+                self._state = _VALUE
+                position += 1
+            elif state == _VALUE:
+                if self._member == self._key and char == "[":
+                    self._state = _ITEMS
+                    self._comma = self._after_comma = False
+                    position += 1
+                    continue
+                decoded = self._decode(text, position)
+                if decoded is None:
+                    break
+                value, position = decoded
+                if self._fields is not None:
+                    self._fields[self._member] = value
+                self._state = _KEY
+                self._comma, self._after_comma = True, False
+            elif state == _ITEMS:
+                decoded = self._decode(text, position)
+                if decoded is None:
+                    break
+                item, position = decoded
+                self._comma, self._after_comma = True, False
+                self._position = position
+                yield item
+                # Fast path for the run of "item, item, ..." that makes up
+                # most of the payload; anything unusual goes back through the
+                # states above
+                while True:
+                    separator = _SEPARATOR.match(text, position)
+                    if separator is None or separator.end() == len(text):
+                        break
+                    try:
+                        item, end = scan_once(text, separator.end())
+                    except (StopIteration, ValueError):
+                        break
+                    if end == len(text) or text[end] in _NUMBER_CHARS:
+                        break
+                    position = self._position = end
+                    yield item
+            else:
+                raise LibCoreHeyError("Invalid JSON: extra data after the document")
+
+        # Keep only the unparsed tail. A value split across chunks is retried
+        # once twice as much text is pending, so a long one is not rescanned
+        # on every chunk
+        self._text = text[position:]
+        self._position = 0
+        self._wait_for = 2 * len(self._text) if len(self._text) > DEFAULT_CHUNK_SIZE else 0
+
+
+def iter_json_items(chunks: Iterable[bytes], key: Optional[str] = "data",
+                    fields: Optional[dict] = None) -> Iterator:
+    """
+    Decode the items of a JSON array from a document arriving in chunks.
+
+    Args:
+        chunks: The UTF-8 document, split anywhere
+        key: Member of the top-level object holding the array (ignored when
+            the document is a top-level array)
+        fields: Dict that receives the other members of the top-level object
+
+    Yields:
+        Each item of the array, decoded, as soon as it is complete
+
+    Raises:
+        LibCoreHeyError: If the document is not valid JSON
+    """
+    parser = _ItemParser(key, fields)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.finish()
+
+
+__all__ = [
+    "ResponseStream",
+    "iter_json_items",
+    "DEFAULT_CHUNK_SIZE",
+]
@@ -0,0 +1,368 @@
+"""
+Typification catalogs as compact, array-backed trees.
+
+Classifying a conversation against the catalog returned by
+``get_typification`` otherwise means walking the raw JSON every time. A
+TypificationTree is built once per catalog version. It lays the nodes out
+in depth-first order in a few flat arrays, with no object per node:
+
+- ``codes`` and ``names`` hold interned strings, shared between the
+  catalogs of every org.
+- ``parents``, ``depths`` and ``ends`` are int32 arrays.
+
+A dict maps each code to its position. So a lookup is O(1), and so is
+testing whether a code lies under another one. A subtree is the contiguous
+slice ``[position, end)``, and a path follows the parent array.
+
+``version`` identifies the catalog content, so a tree can be checked for
+staleness by comparing one string. ``get_typification_tree`` keeps one tree
+per (org, group), and revalidates it with a conditional request that costs
+a 304 while the catalog is unchanged.
+
+Example:
+    tree = get_typification_tree(vault_config, "org", "group")
+    tree.path("T12")                 # ['T0', 'T1', 'T12']
+    tree.validate(["T12", "X9"])     # [True, False]
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import weakref
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .core import TYPIFICATION, CancelToken, LibCoreHeyClient, LibCoreHeyError, _default_client
+from .models import Typification
+
+_intern = sys.intern
+
+
+class TypificationTree:
+    """
+    A typification catalog, indexed by code.
+
+    Nodes whose parent is missing from the catalog are treated as roots.
+    Lookups of unknown codes raise LibCoreHeyError, except ``get``,
+    ``validate`` and ``in``.
+    """
+
+    __slots__ = ("version", "etag", "last_modified", "_codes", "_names", "_parents", "_depths", "_ends",
+                 "_positions", "__weakref__")
+
+    def __init__(self, items: Iterable, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """
+        Build the tree.
+
+        Args:
+            items: Typification objects (e.g. a Typifications) or dicts with
+                ``code``, ``name`` and ``parent``
+            etag: ETag of the response the items came from
+            last_modified: Last-Modified of that response
+
+        Raises:
+            LibCoreHeyError: If an item has no code, a code is repeated, or
+                parents form a cycle
+        """
+        self.etag = etag
+        self.last_modified = last_modified
+
+        codes: List[str] = []
+        names: List[Optional[str]] = []
+        parent_codes: List[Optional[str]] = []
+        positions: Dict[str, int] = {}
+        for item in items:
+            if isinstance(item, dict):
+                code, name, parent = item.get("code"), item.get("name"), item.get("parent")
+            else:
+                code, name, parent = item.code, item.name, item.parent
+            if code is None or code == "":
+                raise LibCoreHeyError("Typification without a code")
+            code = _intern(str(code))
+            if code in positions:
+                raise LibCoreHeyError(f"Duplicate typification code: {code!r}")
+            positions[code] = len(codes)
+            codes.append(code)
+            names.append(_intern(name) if type(name) is str else name)
+            parent_codes.append(None if parent is None or parent == "" else str(parent))
+
+        # Children in catalog order; unknown parents make roots
+        children: Dict[int, List[int]] = {}
+        roots: List[int] = []
+        for index, parent in enumerate(parent_codes):
+            parent_index = positions.get(parent) if parent is not None else None
+            if parent_index is None:
+                roots.append(index)
+            else:
+                children.setdefault(parent_index, []).append(index)
+
+        # Depth-first order, so every subtree is a contiguous run
+        order: List[int] = []
+        parents = array("i")
+        depths = array("i")
+        position_of = [0] * len(codes)
+        stack = [(index, -1, 0) for index in reversed(roots)]
+        while stack:
+            index, parent_position, depth = stack.pop()
+            position_of[index] = len(order)
+            order.append(index)
+            parents.append(parent_position)
+            depths.append(depth)
+            for child in reversed(children.get(index, ())):
+                stack.append((child, position_of[index], depth + 1))
+        if len(order) != len(codes):
+            cycle = sorted(codes[index] for index in set(range(len(codes))) - set(order))
+            raise LibCoreHeyError(f"Typification parents form a cycle: {cycle[:10]}")
+
+        sizes = [1] * len(order)
+        for position in range(len(order) - 1, 0, -1):
+            if parents[position] >= 0:
+                sizes[parents[position]] += sizes[position]
+
+        self._codes = [codes[index] for index in order]
+        self._names = [names[index] for index in order]
+        self._parents = parents
+        self._depths = depths
+        self._ends = array("i", [position + size for position, size in enumerate(sizes)])
+        self._positions = {code: position for position, code in enumerate(self._codes)}
+        self.version = self._digest()
+
+    @classmethod
+    def from_body(cls, body: Union[bytes, str], etag: Optional[str] = None,
+                  last_modified: Optional[str] = None) -> "TypificationTree":
+        """
+        Build the tree from a typification response body.
+
+        Raises:
+            LibCoreHeyError: If the body is not a typification payload
+        """
+        from .models import Typifications
+
+        return cls(Typifications(body), etag, last_modified)
+
+    def _digest(self) -> str:
+        parents = [self._codes[parent] if parent >= 0 else None for parent in self._parents]
+        document = json.dumps([self._codes, self._names, parents], ensure_ascii=False, separators=(",", ":"))
+        return hashlib.blake2b(document.encode("utf-8"), digest_size=8).hexdigest()
+
+    # ---- lookups ----
+
+    def _position(self, code: str) -> int:
+        position = self._positions.get(code)
+        if position is None:
+            raise LibCoreHeyError(f"Unknown typification code: {code!r}")
+        return position
+
+    def get(self, code: str) -> Optional[Typification]:
+        """The typification with this code, or None."""
+        position = self._positions.get(code)
+        if position is None:
+            return None
+        parent = self._parents[position]
+        return Typification(self._codes[position], self._names[position],
+                            self._codes[parent] if parent >= 0 else None)
+
+    def name(self, code: str) -> Optional[str]:
+        """Display name of a code."""
+        return self._names[self._position(code)]
+
+    def parent(self, code: str) -> Optional[str]:
+        """Parent code, None for a root."""
+        parent = self._parents[self._position(code)]
+        return self._codes[parent] if parent >= 0 else None
+
+    def depth(self, code: str) -> int:
+        """Number of ancestors (0 for a root)."""
+        return self._depths[self._position(code)]
+
+    def is_leaf(self, code: str) -> bool:
+        """True when the code has no children."""
+        position = self._position(code)
+        return self._ends[position] == position + 1
+
+    def is_descendant(self, code: str, ancestor: str) -> bool:
+        """True when ``code`` lies strictly under ``ancestor``."""
+        position, top = self._position(code), self._position(ancestor)
+        return top < position < self._ends[top]
+
+    # ---- paths and subtrees ----
+
+    def ancestors(self, code: str) -> List[str]:
+        """Codes above ``code``, its parent first."""
+        codes, parents = self._codes, self._parents
+        found = []
+        position = parents[self._position(code)]
+        while position >= 0:
+            found.append(codes[position])
+            position = parents[position]
+        return found
+
+    def path(self, code: str) -> List[str]:
+        """Codes from the root down to ``code``, both included."""
+        path = self.ancestors(code)
+        path.reverse()
+        path.append(self._codes[self._positions[code]])
+        return path
+
+    def path_names(self, code: str) -> List[Optional[str]]:
+        """Names along ``path(code)``."""
+        return [self._names[self._positions[step]] for step in self.path(code)]
+
+    def children(self, code: str) -> List[str]:
+        """Direct children, in catalog order."""
+        position = self._position(code)
+        return self._children(position)
+
+    def _children(self, position: int) -> List[str]:
+        codes, ends = self._codes, self._ends
+        found = []
+        child, end = position + 1, ends[position]
+        while child < end:
+            found.append(codes[child])
+            child = ends[child]
+        return found
+
+    def subtree(self, code: str, include_self: bool = True) -> List[str]:
+        """Every code under ``code`` in depth-first order, ``code`` first unless include_self is False."""
+        position = self._position(code)
+        return self._codes[position if include_self else position + 1:self._ends[position]]
+
+    def roots(self) -> List[str]:
+        """Top-level codes, in catalog order."""
+        codes, ends = self._codes, self._ends
+        found = []
+        position = 0
+        while position < len(codes):
+            found.append(codes[position])
+            position = ends[position]
+        return found
+
+    def leaves(self, code: Optional[str] = None) -> List[str]:
+        """Codes without children, under ``code`` when given."""
+        start, end = (0, len(self._codes)) if code is None else (self._position(code), None)
+        if end is None:
+            end = self._ends[start]
+        ends, codes = self._ends, self._codes
+        return [codes[position] for position in range(start, end) if ends[position] == position + 1]
+
+    # ---- batch validation ----
+
+    def validate(self, codes: Iterable[str], leaf_only: bool = False, under: Optional[str] = None) -> List[bool]:
+        """
+        Check many codes in one call.
+
+        Args:
+            codes: Codes to check
+            leaf_only: Also require each code to have no children
+            under: Also require each code to lie under (or be) this code
+
+        Returns:
+            One bool per code, in order
+
+        Raises:
+            LibCoreHeyError: If ``under`` is not in the catalog
+        """
+        get = self._positions.get
+        if not leaf_only and under is None:
+            return [get(code) is not None for code in codes]
+        ends = self._ends
+        start, end = 0, len(self._codes)
+        if under is not None:
+            start = self._position(under)
+            end = ends[start]
+        valid = []
+        for code in codes:
+            position = get(code)
+            valid.append(position is not None and start <= position < end
+                         and (not leaf_only or ends[position] == position + 1))
+        return valid
+
+    def invalid(self, codes: Iterable[str], leaf_only: bool = False, under: Optional[str] = None) -> List[str]:
+        """The codes ``validate`` rejects, in order."""
+        codes = list(codes)
+        return [code for code, ok in zip(codes, self.validate(codes, leaf_only, under)) if not ok]
+
+    # ---- container ----
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __contains__(self, code) -> bool:
+        return code in self._positions
+
+    def __iter__(self) -> Iterator[str]:
+        """Codes in depth-first order."""
+        return iter(self._codes)
+
+    def __repr__(self) -> str:
+        return f"<TypificationTree {len(self._codes)} codes version={self.version}>"
+
+
+# Trees by client, then by (org, group)
+_trees: "weakref.WeakKeyDictionary[LibCoreHeyClient, Dict[Tuple[str, str], TypificationTree]]" = \
+    weakref.WeakKeyDictionary()
+_trees_lock = threading.Lock()
+
+
+def get_typification_tree(vault_config: Optional[dict], org: str, group: str, timeout: Optional[float] = None,
+                          cancel_token: Optional[CancelToken] = None,
+                          client: Optional[LibCoreHeyClient] = None) -> TypificationTree:
+    """
+    Get the typification tree of a group, rebuilt only when the catalog changed.
+
+    The tree of each (org, group) is kept. Each call revalidates it with a
+    conditional request, which the API answers with a 304 while the catalog
+    is unchanged. A changed response whose content hashes to the same
+    ``version`` also keeps the existing tree, so trees can be compared by
+    identity or by ``version``.
+
+    Args:
+        vault_config: Azure Key Vault configuration (ignored if client is given)
+        org: Organization identifier
+        group: Group identifier
+        timeout: Deadline in seconds for the whole call (default: 30)
+        cancel_token: CancelToken that aborts the call
+        client: LibCoreHeyClient to use instead of the shared default client
+
+    Returns:
+        The current TypificationTree
+
+    Raises:
+        LibCoreHeyError: If the API call fails and no tree is kept yet, or
+            the catalog is invalid
+    """
+    client = client or _default_client(vault_config)
+    with _trees_lock:
+        trees = _trees.setdefault(client, {})
+        tree = trees.get((org, group))
+
+    etag, last_modified = (tree.etag, tree.last_modified) if tree is not None else (None, None)
+    with client.fetch_if_changed(TYPIFICATION, org, group, etag, last_modified, timeout, cancel_token) as result:
+        if result.not_modified and tree is not None:
+            return tree
+        if not result.ok:
+            if tree is not None:
+                return tree
+            result.raise_for_error()
+        fresh = TypificationTree.from_body(result.body, result.etag, result.last_modified)
+
+    if tree is not None and tree.version == fresh.version:
+        tree.etag, tree.last_modified = fresh.etag, fresh.last_modified
+        return tree
+    with _trees_lock:
+        trees[(org, group)] = fresh
+    return fresh
+
+
+def forget_typification_trees() -> None:
+    """Drop every kept tree, so the next get_typification_tree call rebuilds it."""
+    with _trees_lock:
+        _trees.clear()
+
+
+__all__ = [
+    "TypificationTree",
+    "get_typification_tree",
+    "forget_typification_trees",
+]
@@ -0,0 +1,264 @@
+"""
+Change notifications for quick replies and typifications.
+
+subscribe() polls an (org, group) pair with conditional requests (ETag /
+Last-Modified), so an unchanged payload only costs a 304 response, and calls
+back with a structural diff only when the content actually changed.
+"""
+
+import heapq
+import itertools
+import json
+import threading
+import time
+import zlib
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+from .core import (
+    QUICK_REPLIES,
+    LibCoreHeyClient,
+    LibCoreHeyError,
+    _ENDPOINTS,
+    _default_client,
+)
+
+# Fields tried, in order, to identify the items of a payload
+_ITEM_KEYS = ("id", "code", "key", "shortcut", "name")
+
+# Keys tried, in order, to find the item list inside an object payload
+_LIST_KEYS = ("data", "items", "results", "quick_replies", "typifications")
+
+
+class ChangeSet(NamedTuple):
+    """Changes between two versions of a payload."""
+    endpoint: str
+    org: str
+    group: str
+    added: List[Any]
+    removed: List[Any]
+    modified: List[Tuple[Any, Any]]  # (old, new) pairs
+    payload: Any                     # full new payload
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+
+def find_items(payload: Any) -> List[Any]:
+    """
+    Get the item list of a payload.
+
+    Returns the payload itself if it is a list, otherwise the first list found
+    under a well-known key (data, items, results, ...) or any other key. A
+    payload without a list is treated as a single item.
+    """
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for key in _LIST_KEYS:
+            if isinstance(payload.get(key), list):
+                return payload[key]
+        for value in payload.values():
+            if isinstance(value, list):
+                return value
+    return [payload]
+
+
+def _identity(*lists: List[Any]) -> Callable[[Any], Any]:
+    """Pick the field that identifies items, falling back to their full content."""
+    if all(isinstance(item, dict) for items in lists for item in items):
+        for key in _ITEM_KEYS:
+            if all(_unique_field(items, key) for items in lists):
+                return lambda item, key=key: _canonical(item.get(key))
+    return _canonical
+
+
+def _unique_field(items: List[Any], key: str) -> bool:
+    values = [item.get(key) for item in items]
+    return None not in values and len(set(map(_canonical, values))) == len(values)
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+def diff_items(old: List[Any], new: List[Any]) -> Tuple[List[Any], List[Any], List[Tuple[Any, Any]]]:
+    """
+    Compare two item lists.
+
+    Items are matched by the first of id, code, key, shortcut or name that is
+    present and unique in both lists; otherwise by their full content (so a
+    changed item shows up as removed + added).
+
+    Returns:
+        (added, removed, modified) where modified holds (old, new) pairs
+    """
+    identity = _identity(old, new)
+    old_by_key = {identity(item): item for item in old}
+    new_by_key = {identity(item): item for item in new}
+
+    added = [item for key, item in new_by_key.items() if key not in old_by_key]
+    removed = [item for key, item in old_by_key.items() if key not in new_by_key]
+    modified = [
+        (old_by_key[key], item)
+        for key, item in new_by_key.items()
+        if key in old_by_key and _canonical(old_by_key[key]) != _canonical(item)
+    ]
+    return added, removed, modified
+
+
+class Subscription:
+    """Handle returned by subscribe(); call cancel() to stop receiving changes."""
+
+    def __init__(self, client: LibCoreHeyClient, endpoint: str, org: str, group: str,
+                 callback: Callable[[ChangeSet], None], interval: float, notify_initial: bool):
+        self.endpoint = endpoint
+        self.org = org
+        self.group = group
+        self.interval = interval
+        self.last_error: Optional[str] = None
+        self.last_checked: Optional[float] = None
+        self.last_changed: Optional[float] = None
+
+        self._client = client
+        self._callback = callback
+        self._notify_initial = notify_initial
+        self._active = True
+        self._etag = None
+        self._last_modified = None
+        self._checksum = None
+        self._items = None
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    def cancel(self):
+        """Stop polling. The callback is not called again."""
+        self._active = False
+
+    def poll(self) -> Optional[ChangeSet]:
+        """Check for changes now; calls the callback and returns the ChangeSet if any."""
+        self.last_checked = time.time()
+        with self._client.fetch_if_changed(self.endpoint, self.org, self.group,
+                                           self._etag, self._last_modified) as result:
+            if result.not_modified:
+                return None
+            if not result.ok:
+                self.last_error = result.error
+                return None
+            body = result.body
+            etag, last_modified = result.etag, result.last_modified
+
+        self.last_error = None
+        self._etag, self._last_modified = etag, last_modified
+
+        # Servers without validators still answer 200: skip identical bodies
+        checksum = zlib.crc32(body)
+        if checksum == self._checksum:
+            return None
+        self._checksum = checksum
+
+        payload = json.loads(body)
+        items = find_items(payload)
+        initial = self._items is None
+        if initial:
+            changes = ChangeSet(self.endpoint, self.org, self.group, list(items), [], [], payload)
+        else:
+            added, removed, modified = diff_items(self._items, items)
+            changes = ChangeSet(self.endpoint, self.org, self.group, added, removed, modified, payload)
+        self._items = items
+
+        if (initial and not self._notify_initial) or not changes or not self._active:
+            return None
+        self.last_changed = time.time()
+        self._callback(changes)
+        return changes
+
+    def __repr__(self) -> str:
+        state = "active" if self._active else "cancelled"
+        return f"<Subscription {self.endpoint} org={self.org!r} group={self.group!r} {state}>"
+
+
+class _Watcher:
+    """Single background thread that polls every subscription when it is due."""
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._queue = []
+        self._counter = itertools.count()
+        self._thread = None
+
+    def add(self, subscription: Subscription, delay: float = 0.0):
+        with self._lock:
+            heapq.heappush(self._queue, (time.monotonic() + delay, next(self._counter), subscription))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="libcorehey-watch", daemon=True)
+                self._thread.start()
+            self._lock.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._queue or self._queue[0][0] > time.monotonic():
+                    timeout = self._queue[0][0] - time.monotonic() if self._queue else None
+                    self._lock.wait(timeout)
+                _, _, subscription = heapq.heappop(self._queue)
+
+            if not subscription.active:
+                continue
+            try:
+                subscription.poll()
+            except Exception as e:
+                subscription.last_error = str(e)
+            if subscription.active:
+                self.add(subscription, subscription.interval)
+
+
+_watcher = _Watcher()
+
+
+def subscribe(org: str, group: str, callback: Callable[[ChangeSet], None],
+              endpoint: str = QUICK_REPLIES, vault_config: Optional[dict] = None,
+              interval: float = 30.0, notify_initial: bool = False,
+              client: Optional[LibCoreHeyClient] = None) -> Subscription:
+    """
+    Get notified when the quick replies or typifications of a group change.
+
+    The pair is polled every ``interval`` seconds from a shared background
+    thread using conditional requests, so unchanged content costs a 304. The
+    callback runs on that thread and receives a ChangeSet with the added,
+    removed and modified items.
+
+    Args:
+        org: Organization identifier
+        group: Group identifier
+        callback: Called with a ChangeSet when the content changed
+        endpoint: QUICK_REPLIES (default) or TYPIFICATION
+        vault_config: Azure Key Vault configuration (ignored if client is given)
+        interval: Seconds between checks
+        notify_initial: Also call back with the first payload (all items as added)
+        client: LibCoreHeyClient to use instead of the shared default client
+
+    Returns:
+        Subscription handle; call cancel() to stop
+
+    Raises:
+        LibCoreHeyError: If the endpoint is unknown or the library fails to load
+    """
+    if endpoint not in _ENDPOINTS:
+        raise LibCoreHeyError(f"Unknown endpoint: {endpoint}")
+    if interval <= 0:
+        raise ValueError("interval must be positive")
+    client = client or _default_client(vault_config)
+    subscription = Subscription(client, endpoint, org, group, callback, interval, notify_initial)
+    _watcher.add(subscription)
+    return subscription
+
+
+__all__ = [
+    "ChangeSet",
+    "Subscription",
+    "subscribe",
+    "diff_items",
+    "find_items",
+]
@@ -1,5 +1,9 @@
-from libcorehey.core import get_quick_replies_ultra_simple, get_typification_ultra_simple
+from libcorehey.core import fetch_quick_replies, fetch_typification
 import json
+import sys
+
+# Configuración mínima - igual que get_*_ultra_simple
+ULTRA_SIMPLE_CONFIG = {"use_managed_identity": True}
 
 
 def console_interface():
@@ -22,8 +26,8 @@ def console_interface():
                     continue
                     
                 print("🔄 Consultando Quick Replies...")
-                result = get_quick_replies_ultra_simple(org, group)
-                print_result(result)
+                with fetch_quick_replies(ULTRA_SIMPLE_CONFIG, org, group) as result:
+                    print_result(result)
                     
             elif choice == "2":
                 org = input("Organización: ").strip()
@@ -34,8 +38,8 @@ def console_interface():
                     continue
                     
                 print("🔄 Consultando Tipificaciones...")
-                result = get_typification_ultra_simple(org, group)
-                print_result(result)
+                with fetch_typification(ULTRA_SIMPLE_CONFIG, org, group) as result:
+                    print_result(result)
                     
             elif choice == "3":
                 print("¡Hasta luego!")
@@ -49,20 +53,24 @@ def console_interface():
 
 
 def print_result(result):
-    """Muestra el resultado de la consulta."""
-    if result:
+    """Muestra el resultado de la consulta (LibCoreHeyResult)."""
+    if not result.ok:
+        print(f"❌ Error (HTTP {result.status}): {result.error}")
+    elif len(result) == 0:
+        print("❌ Sin respuesta")
+    else:
         try:
-            parsed = json.loads(result)
-            if "error" in parsed:
-                print(f"❌ Error: {parsed['error']}")
-            else:
-                print("✅ Resultado:")
-                print(json.dumps(parsed, indent=2, ensure_ascii=False))
+            parsed = result.json()
+            print("✅ Resultado:")
+            print(json.dumps(parsed, indent=2, ensure_ascii=False))
         except json.JSONDecodeError:
-            print(f"✅ Resultado: {result}")
-    else:
-        print("❌ Sin respuesta")
+            print(f"✅ Resultado: {result.text()}")
 
 
 if __name__ == "__main__":
+    # "python main.py load ..." genera carga (igual que "libcorehey load");
+    # sin argumentos abre el menú interactivo
+    if len(sys.argv) > 1:
+        from libcorehey.__main__ import main
+        sys.exit(main(sys.argv[1:]))
     console_interface()
@@ -150,6 +150,11 @@ setup(
     },
     include_package_data=True,
     zip_safe=False,  # Required for shared libraries
+    entry_points={
+        "console_scripts": [
+            "libcorehey=libcorehey.__main__:main",
+        ],
+    },
     keywords="heybanco api whatsapp go python wrapper",
     project_urls={
         "Bug Reports": "https://github.com/heybanco/LibCoreHey/issues",
@@ -0,0 +1,180 @@
+"""Tests for QuickReplyIndex: incremental updates checked against a brute-force scan."""
+
+import random
+from bisect import bisect_left
+
+import pytest
+
+from libcorehey import search
+from libcorehey.core import LibCoreHeyError
+from libcorehey.models import QuickReply
+from libcorehey.search import QuickReplyIndex, normalize
+from libcorehey.watch import ChangeSet
+
+WORDS = ["Hola", "horario", "hora", "sucursal", "Sucursales", "información", "informacion", "cuenta",
+         "tarjeta", "saldo", "crédito", "ÑANDÚ", "gracias", "comunicarte", "su"]
+
+QUERIES = ["hora", "horario suc", "INFORMACIÓN", "informacion cuenta", "su", "s", "ñandu", "credito saldo",
+           "gracias por", "tarjeta", "zzz", "h"]
+
+PREFIXES = ["", "/", "h", "/ho", "hor", "s", "/su", "suc", "inf", "ñ", "n", "c", "cr", "x"]
+
+
+def _reply(rng: random.Random, key) -> QuickReply:
+    shortcut = "/" + rng.choice(WORDS) + rng.choice(["", "", "1", "2", "_x"])
+    text = " ".join(rng.choice(WORDS) for _ in range(rng.randrange(1, 7)))
+    return QuickReply(key, shortcut, text)
+
+
+def _expected_prefix(replies: dict, prefix: str, k: int):
+    wanted = search._shortcut_key(prefix)
+    matches = [(search._shortcut_key(reply.shortcut), str(key), key) for key, reply in replies.items()
+               if search._shortcut_key(reply.shortcut).startswith(wanted)]
+    matches.sort(key=lambda match: (len(match[0]), match[0], match[1]))
+    return [key for _, _, key in matches[:k]]
+
+
+def _expected_search(replies: dict, query: str, k: int, prefix_last: bool = True):
+    words = search._WORD.findall(normalize(query))
+    if not words or k <= 0:
+        return []
+    counts = {key: search._words(reply) for key, reply in replies.items()}
+    vocabulary = sorted({word for words_of in counts.values() for word in words_of})
+
+    terms = []
+    for position, word in enumerate(words):
+        if prefix_last and position == len(words) - 1:
+            start = bisect_left(vocabulary, word)
+            expansions = [w for w in vocabulary[start:start + search._MAX_EXPANSIONS] if w.startswith(word)]
+        else:
+            expansions = [word]
+        term = {}
+        for key, words_of in counts.items():
+            total = sum(words_of.get(w, 0) for w in expansions)
+            if total:
+                term[key] = total
+        if not term:
+            return []
+        terms.append(term)
+
+    rarest = min(terms, key=len)
+    shortcuts = {key: search._shortcut_key(reply.shortcut) for key, reply in replies.items()}
+    ranked = sorted(rarest, key=lambda key: (-rarest[key], shortcuts[key], str(key)))
+    return [key for key in ranked if all(key in term for term in terms)][:k]
+
+
+def _check(index: QuickReplyIndex, replies: dict):
+    assert len(index) == len(replies)
+    for prefix in PREFIXES:
+        for k in (1, 3, 20):
+            got = [search._reply_key(reply) for reply in index.prefix(prefix, k)]
+            assert got == _expected_prefix(replies, prefix, k), (prefix, k)
+    for query in QUERIES:
+        for k in (2, 10):
+            got = [search._reply_key(reply) for reply in index.search(query, k)]
+            assert got == _expected_search(replies, query, k), (query, k)
+        got = [search._reply_key(reply) for reply in index.search(query, 10, prefix_last=False)]
+        assert got == _expected_search(replies, query, 10, prefix_last=False), query
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_changes_match_a_brute_force_scan(seed):
+    rng = random.Random(seed)
+    replies = {key: _reply(rng, key) for key in range(30)}
+    index = QuickReplyIndex(replies.values())
+    next_key = len(replies)
+    _check(index, replies)
+
+    for _ in range(120):
+        operation = rng.randrange(5)
+        if operation == 0:
+            reply = _reply(rng, next_key)
+            next_key += 1
+            replies[reply.id] = reply
+            index.add(reply)
+        elif operation == 1 and replies:
+            key = rng.choice(list(replies))
+            del replies[key]
+            assert index.remove(key)
+        elif operation == 2 and replies:
+            key = rng.choice(list(replies))
+            replies[key] = _reply(rng, key)
+            index.add(replies[key].to_dict() if rng.random() < 0.5 else replies[key])
+        elif operation == 3:
+            # A whole new version of the set: some kept, some changed, some new
+            fresh = {}
+            for key, reply in replies.items():
+                roll = rng.random()
+                if roll < 0.6:
+                    fresh[key] = reply
+                elif roll < 0.8:
+                    fresh[key] = _reply(rng, key)
+            for _ in range(rng.randrange(4)):
+                fresh[next_key] = _reply(rng, next_key)
+                next_key += 1
+            added = sum(key not in replies for key in fresh)
+            removed = sum(key not in fresh for key in replies)
+            modified = sum(key in replies and replies[key] != reply and replies[key] is not reply
+                           for key, reply in fresh.items())
+            assert index.update(list(fresh.values())) == (added, removed, modified)
+            replies = fresh
+        else:
+            removed = rng.sample(list(replies), min(len(replies), rng.randrange(3)))
+            modified = [key for key in replies if key not in removed and rng.random() < 0.1]
+            added = [_reply(rng, next_key + n) for n in range(rng.randrange(3))]
+            next_key += len(added)
+            changes = ChangeSet("quick_replies", "org", "group",
+                                added=[reply.to_dict() for reply in added],
+                                removed=[replies[key].to_dict() for key in removed],
+                                modified=[(replies[key].to_dict(), _reply(rng, key).to_dict()) for key in modified],
+                                payload=None)
+            index.apply(changes)
+            for key in removed:
+                del replies[key]
+            for _, item in changes.modified:
+                replies[item["id"]] = QuickReply.from_dict(item)
+            for reply in added:
+                replies[reply.id] = reply
+        _check(index, replies)
+
+    # Nothing is left behind once every reply is gone
+    index.update([])
+    assert len(index) == 0
+    assert index._root.children == {}
+    assert index._postings == {} and index._vocabulary == []
+    assert index.prefix("") == [] and index.search("hora") == []
+
+
+def test_accents_and_case_are_folded():
+    index = QuickReplyIndex([QuickReply(1, "/Información", "Horario de la SUCURSAL")])
+    assert [reply.id for reply in index.prefix("INFORMACION")] == [1]
+    assert [reply.id for reply in index.search("informacion sucursal")] == [1]
+    assert [reply.id for reply in index.search("horário suc")] == [1]
+    assert index.search("horario suc", prefix_last=False) == []
+
+
+def test_replies_without_id_are_keyed_by_shortcut():
+    index = QuickReplyIndex([{"shortcut": "/hola", "text": "Hola"}])
+    index.add({"shortcut": "/hola", "text": "Buenas"})
+    assert len(index) == 1
+    assert index.get("/hola").text == "Buenas"
+    assert [reply.text for reply in index.search("hola", prefix_last=False)] == ["Buenas"]
+    assert index.remove("/hola")
+    assert not index.remove("/hola")
+
+
+def test_rejects_other_types():
+    with pytest.raises(LibCoreHeyError):
+        QuickReplyIndex(["not a reply"])
+
+
+def test_cached_results_follow_changes():
+    index = QuickReplyIndex([QuickReply(n, f"/saludo{n}", "hola") for n in range(20)])
+    assert len(index.prefix("/sal", 20)) == 20
+    assert len(index.search("hol", 20)) == 20
+    index.remove(3)
+    index.add(QuickReply(99, "/s", "hola hola"))
+    assert [reply.id for reply in index.prefix("/s", 1)] == [99]
+    assert [reply.id for reply in index.search("hol", 1)] == [99]
+    assert 3 not in [reply.id for reply in index.prefix("/sal", 20)]
+    assert 3 not in [reply.id for reply in index.search("hola", 20)]
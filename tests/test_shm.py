@@ -0,0 +1,194 @@
+"""Tests for libcorehey.shm: the seqlock protocol, eviction and file geometry."""
+
+import hashlib
+import multiprocessing
+import struct
+import threading
+import time
+
+import pytest
+
+from libcorehey import shm
+from libcorehey.shm import SharedCache
+
+
+def _body(version: int, size: int) -> bytes:
+    """Body whose every byte depends on ``version``, so a mix of two writes is detectable."""
+    block = hashlib.sha256(str(version).encode()).digest()
+    return (block * (size // len(block) + 1))[:size]
+
+
+def _same_set_keys(cache: SharedCache, count: int):
+    keys, target = [], None
+    for n in range(100000):
+        key = f"key-{n}"
+        index = shm._key_hash(key.encode()) % cache._sets
+        if target is None:
+            target = index
+        if index == target:
+            keys.append(key)
+            if len(keys) == count:
+                return keys
+    raise AssertionError("not enough colliding keys")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with SharedCache(str(tmp_path / "cache"), slots=16, slot_size=4096) as cache:
+        yield cache
+
+
+def test_put_get_round_trip(cache):
+    assert cache.put("a", 200, b'{"data":[]}', ttl=60, etag='"v1"', last_modified="Mon")
+    entry = cache.get("a")
+    assert entry.status == 200
+    assert entry.body == b'{"data":[]}'
+    assert (entry.etag, entry.last_modified, entry.fresh) == ('"v1"', "Mon", True)
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses, cache.writes) == (1, 1, 1)
+
+
+def test_stale_window(cache):
+    cache.put("a", 200, b"x", ttl=10, stale_ttl=20)
+    now = time.time()
+    assert cache.get("a", now + 5).fresh
+    entry = cache.get("a", now + 15)
+    assert entry is not None and not entry.fresh
+    assert cache.get("a", now + 31) is None
+    assert cache.stale_hits == 1
+
+
+def test_replacing_a_key_reuses_its_slot(cache):
+    cache.put("a", 200, b"old", ttl=60)
+    cache.put("a", 200, b"new", ttl=60)
+    assert cache.get("a").body == b"new"
+    assert cache.stats()["used_slots"] == 1
+
+
+def test_too_large(cache):
+    assert not cache.put("a", 200, b"x" * 4096, ttl=60)
+    assert cache.too_large == 1
+    assert cache.get("a") is None
+    assert not cache.put("k" * 0x10000, 200, b"", ttl=60)
+
+
+def test_full_set_evicts_the_oldest(cache, monkeypatch):
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(shm.time, "time", lambda: float(next(clock)))
+    keys = _same_set_keys(cache, shm._WAYS + 1)
+    for key in keys:
+        assert cache.put(key, 200, key.encode(), ttl=10 ** 6)
+    assert cache.get(keys[0]) is None
+    for key in keys[1:]:
+        assert cache.get(key).body == key.encode()
+
+
+def test_odd_sequence_is_retried_then_missed(cache):
+    cache.put("a", 200, b"x", ttl=60)
+    offset = next(offset for offset in cache._offsets(shm._key_hash(b"a"))
+                  if shm._SEQ.unpack_from(cache._mm, offset)[0])
+    seq = shm._SEQ.unpack_from(cache._mm, offset)[0]
+
+    # A writer is midway: readers retry and give up instead of reading the slot
+    shm._SEQ.pack_into(cache._mm, offset, seq | 1)
+    assert cache.get("a") is None
+    assert cache.read_retries == shm._READ_RETRIES
+
+    shm._SEQ.pack_into(cache._mm, offset, seq)
+    assert cache.get("a").body == b"x"
+
+
+def test_lengths_past_the_slot_are_rejected(cache):
+    cache.put("a", 200, b"x", ttl=60)
+    offset = next(offset for offset in cache._offsets(shm._key_hash(b"a"))
+                  if shm._SEQ.unpack_from(cache._mm, offset)[0])
+    # A torn header claiming more bytes than the slot holds
+    struct.pack_into("<I", cache._mm, offset + struct.calcsize("<QQdddi"), cache.slot_size)
+    assert cache.get("a") is None
+    assert cache.read_retries == shm._READ_RETRIES
+
+
+def test_existing_file_keeps_its_geometry(tmp_path):
+    path = str(tmp_path / "cache")
+    with SharedCache(path, slots=8, slot_size=1024) as first:
+        first.put("a", 200, b"x", ttl=60)
+        with SharedCache(path, slots=64, slot_size=8192) as second:
+            assert (second.slots, second.slot_size) == (8, 1024)
+            assert second.get("a").body == b"x"
+
+
+def test_other_version_is_refused(tmp_path):
+    path = str(tmp_path / "cache")
+    SharedCache(path, slots=8, slot_size=1024).close()
+    with open(path, "r+b") as file:
+        file.write(shm._HEADER.pack(shm._MAGIC, shm._VERSION + 1, 8, 1024))
+    with pytest.raises(ValueError):
+        SharedCache(path)
+
+
+def test_invalid_geometry(tmp_path):
+    with pytest.raises(ValueError):
+        SharedCache(str(tmp_path / "cache"), slots=0)
+    with pytest.raises(ValueError):
+        SharedCache(str(tmp_path / "cache"), slot_size=shm._SLOT.size)
+
+
+def test_clear(cache):
+    cache.put("a", 200, b"x", ttl=60)
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.stats()["used_slots"] == 0
+
+
+def _write_forever(path, keys, stop):
+    with SharedCache(path) as cache:
+        version = 0
+        while not stop.is_set():
+            version += 1
+            key = keys[version % len(keys)]
+            cache.put(key, 200, _body(version, 64 + version % 3000), ttl=60, etag=str(version))
+
+
+def _check_reads(cache, keys, seconds):
+    hits = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for key in keys:
+            entry = cache.get(key)
+            if entry is not None:
+                hits += 1
+                assert entry.body == _body(int(entry.etag), len(entry.body)), "torn entry"
+                assert 64 <= len(entry.body) < 64 + 3000
+    return hits
+
+
+def test_no_torn_reads_under_a_writer_process(tmp_path):
+    path = str(tmp_path / "cache")
+    # Few slots, so the writer keeps overwriting the slots being read
+    keys = [f"key-{n}" for n in range(12)]
+    with SharedCache(path, slots=8, slot_size=4096) as cache:
+        context = multiprocessing.get_context("spawn")
+        stop = context.Event()
+        writer = context.Process(target=_write_forever, args=(path, keys, stop))
+        writer.start()
+        try:
+            assert _check_reads(cache, keys, 1.5) > 0
+        finally:
+            stop.set()
+            writer.join(10)
+
+
+def test_no_torn_reads_under_writer_threads(tmp_path):
+    path = str(tmp_path / "cache")
+    keys = [f"key-{n}" for n in range(12)]
+    with SharedCache(path, slots=8, slot_size=4096) as cache:
+        stop = threading.Event()
+        writers = [threading.Thread(target=_write_forever, args=(path, keys, stop)) for _ in range(2)]
+        for writer in writers:
+            writer.start()
+        try:
+            assert _check_reads(cache, keys, 1.0) > 0
+        finally:
+            stop.set()
+            for writer in writers:
+                writer.join(10)
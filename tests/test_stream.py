@@ -0,0 +1,149 @@
+"""Tests for iter_json_items: chunk-split round trips and malformed documents."""
+
+import json
+import random
+
+import pytest
+
+from libcorehey.core import LibCoreHeyError
+from libcorehey.stream import iter_json_items
+
+
+def _splits(data: bytes, cuts):
+    cuts = sorted(set(cuts))
+    return [data[start:end] for start, end in zip([0] + cuts, cuts + [len(data)])]
+
+
+def _decode(chunks, key="data"):
+    fields = {}
+    items = list(iter_json_items(chunks, key, fields))
+    return items, fields
+
+
+def _document(rng: random.Random) -> dict:
+    def value(depth=0):
+        kind = rng.randrange(8 if depth < 2 else 5)
+        if kind == 0:
+            return rng.randint(-10 ** 12, 10 ** 12)
+        if kind == 1:
+            return rng.choice([0.5, -3.25e-7, 1e300, 123456.789, -0.0])
+        if kind == 2:
+            return "".join(rng.choice("ab ñé€😀\"\\\n/") for _ in range(rng.randrange(12)))
+        if kind == 3:
+            return rng.choice([True, False, None])
+        if kind == 4:
+            return ""
+        if kind == 5:
+            return [value(depth + 1) for _ in range(rng.randrange(4))]
+        return {f"k{i}": value(depth + 1) for i in range(rng.randrange(4))}
+
+    document = {}
+    for i in range(rng.randrange(3)):
+        document[f"before{i}"] = value()
+    document["data"] = [value() for _ in range(rng.randrange(30))]
+    for i in range(rng.randrange(3)):
+        document[f"after{i}"] = value()
+    return document
+
+
+def _encodings(document):
+    yield json.dumps(document, ensure_ascii=False).encode("utf-8")
+    yield json.dumps(document, indent=2).encode("utf-8")
+    yield json.dumps(document, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def test_random_documents_split_anywhere_match_json_loads():
+    rng = random.Random(0)
+    for _ in range(200):
+        document = _document(rng)
+        expected_fields = {key: value for key, value in document.items() if key != "data"}
+        for data in _encodings(document):
+            cuts = [rng.randrange(len(data) + 1) for _ in range(rng.randrange(1, 12))]
+            items, fields = _decode(_splits(data, cuts))
+            assert items == json.loads(data)["data"]
+            assert fields == expected_fields
+
+
+def test_every_single_split_point():
+    data = ('{"total": 3, "data": [1, -2.5e-3, "año €😀", {"a": [true, null]}, 10, []], '
+            '"next": null}').encode("utf-8")
+    for cut in range(len(data) + 1):
+        items, fields = _decode(_splits(data, [cut]))
+        assert items == [1, -2.5e-3, "año €😀", {"a": [True, None]}, 10, []]
+        assert fields == {"total": 3, "next": None}
+
+
+def test_one_byte_chunks():
+    data = json.dumps({"data": [123, 4.5e6, "ñ😀", {"x": "y"}, 7]}, ensure_ascii=False).encode("utf-8")
+    items, _ = _decode([data[i:i + 1] for i in range(len(data))])
+    assert items == [123, 4.5e6, "ñ😀", {"x": "y"}, 7]
+
+
+@pytest.mark.parametrize("number", ["3", "-12", "3.5", "1e10", "-2.5E-3", "12345678901234567890"])
+def test_numbers_split_across_chunks(number):
+    data = f'{{"data": [{number}, {number}]}}'.encode()
+    for cut in range(len(data) + 1):
+        items, _ = _decode(_splits(data, [cut]))
+        assert items == [json.loads(number)] * 2
+
+
+def test_utf8_split_mid_codepoint():
+    text = "é€😀"
+    data = json.dumps({"data": [text]}, ensure_ascii=False).encode("utf-8")
+    start = data.index(text.encode("utf-8"))
+    for cut in range(start, start + len(text.encode("utf-8")) + 1):
+        items, _ = _decode(_splits(data, [cut]))
+        assert items == [text]
+
+
+def test_top_level_array():
+    data = b'[{"id": 1}, {"id": 2}, 3.0]'
+    for cut in range(len(data) + 1):
+        items, fields = _decode(_splits(data, [cut]))
+        assert items == [{"id": 1}, {"id": 2}, 3.0]
+        assert fields == {}
+
+
+def test_other_key_and_missing_array():
+    assert _decode([b'{"items": [1, 2], "data": [3]}'], key="items") == ([1, 2], {"data": [3]})
+    assert _decode([b'{"data": 5}']) == ([], {"data": 5})
+    assert _decode([b'{"other": [1]}']) == ([], {"other": [1]})
+    assert _decode([b'{"data": []}']) == ([], {})
+
+
+def test_large_item_across_many_chunks():
+    item = {"text": "x" * 300000}
+    data = json.dumps({"data": [item, 1]}).encode()
+    chunks = [data[i:i + 1000] for i in range(0, len(data), 1000)]
+    assert _decode(chunks)[0] == [item, 1]
+
+
+@pytest.mark.parametrize("data", [
+    b'{"data": [1, 2,]}',
+    b'[1, 2,]',
+    b'{"data": [1], "a": 1,}',
+    b'{"data": [1]} 2',
+    b'[1] [2]',
+    b'[1 2]',
+    b'{"data": [1, 2]',
+    b'[1, 2',
+    b'{"data" [1]}',
+    b'{data: [1]}',
+    b'"data"',
+    b'42',
+    b'',
+    b'[1, tru]',
+    b'{"data": [1, "unterminated]}',
+])
+def test_malformed_documents(data):
+    for cut in range(len(data) + 1):
+        with pytest.raises(LibCoreHeyError):
+            _decode(_splits(data, [cut]))
+
+
+def test_invalid_utf8():
+    with pytest.raises(LibCoreHeyError):
+        _decode([b'{"data": ["\xff"]}'])
+    # A code point cut short by the end of the document
+    with pytest.raises(LibCoreHeyError):
+        _decode([b'{"data": ["\xc3'])
@@ -0,0 +1,187 @@
+"""Tests for TypificationTree and get_typification_tree."""
+
+import json
+import random
+
+import pytest
+
+from libcorehey.core import ERROR_HTTP_STATUS, TYPIFICATION, LibCoreHeyError, LibCoreHeyResult
+from libcorehey.models import Typification
+from libcorehey.tree import TypificationTree, forget_typification_trees, get_typification_tree
+
+
+def _catalog(rng: random.Random, count: int):
+    """Random forest as dicts in shuffled order, plus the parent of each code."""
+    parents = {}
+    for index in range(count):
+        code = f"T{index}"
+        parents[code] = rng.choice([None] + [f"T{other}" for other in range(index)]) if index else None
+    items = [{"code": code, "name": f"Name {code}", "parent": parent} for code, parent in parents.items()]
+    rng.shuffle(items)
+    return items, parents
+
+
+def _ancestors(parents, code):
+    found = []
+    while parents[code] is not None:
+        code = parents[code]
+        found.append(code)
+    return found
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_layout_matches_a_brute_force_walk(seed):
+    rng = random.Random(seed)
+    items, parents = _catalog(rng, 60)
+    tree = TypificationTree(items)
+    codes = list(tree)
+    order = {code: position for position, code in enumerate(codes)}
+    children = {code: [item["code"] for item in items if item["parent"] == code] for code in parents}
+
+    assert sorted(codes) == sorted(parents)
+    assert tree.roots() == [item["code"] for item in items if item["parent"] is None]
+    for code in parents:
+        ancestors = _ancestors(parents, code)
+        descendants = {other for other in parents if code in _ancestors(parents, other)}
+        assert tree.ancestors(code) == ancestors
+        assert tree.path(code) == ancestors[::-1] + [code]
+        assert tree.path_names(code) == [f"Name {step}" for step in tree.path(code)]
+        assert tree.depth(code) == len(ancestors)
+        assert tree.parent(code) == parents[code]
+        assert tree.children(code) == children[code]
+        assert tree.is_leaf(code) == (not children[code])
+        # Depth-first: a subtree is the contiguous run that starts at its root
+        subtree = tree.subtree(code)
+        assert subtree[0] == code and set(subtree[1:]) == descendants
+        assert subtree == codes[order[code]:order[code] + len(subtree)]
+        assert tree.subtree(code, include_self=False) == subtree[1:]
+        assert tree.leaves(code) == [other for other in subtree if not children[other]]
+        for other in parents:
+            assert tree.is_descendant(other, code) == (other in descendants)
+    assert tree.leaves() == [code for code in codes if not children[code]]
+
+
+def test_lookups():
+    tree = TypificationTree([Typification("B", "Child", "A"), {"code": "A", "name": "Root", "parent": ""}])
+    assert list(tree) == ["A", "B"]
+    assert tree.get("B") == Typification("B", "Child", "A")
+    assert tree.get("Z") is None
+    assert tree.name("A") == "Root"
+    assert "B" in tree and "Z" not in tree and len(tree) == 2
+    with pytest.raises(LibCoreHeyError):
+        tree.path("Z")
+    with pytest.raises(LibCoreHeyError):
+        tree.is_descendant("A", "Z")
+
+
+def test_orphans_become_roots():
+    tree = TypificationTree([{"code": "A", "parent": "missing"}, {"code": "B", "parent": "A"}])
+    assert tree.roots() == ["A"]
+    assert tree.parent("A") is None
+    assert tree.path("B") == ["A", "B"]
+
+
+@pytest.mark.parametrize("items", [
+    [{"code": "A", "parent": "A"}],
+    [{"code": "A", "parent": "C"}, {"code": "B", "parent": "A"}, {"code": "C", "parent": "B"}],
+    [{"code": "R"}, {"code": "A", "parent": "B"}, {"code": "B", "parent": "A"}],
+])
+def test_cycles_are_rejected(items):
+    with pytest.raises(LibCoreHeyError, match="cycle"):
+        TypificationTree(items)
+
+
+def test_invalid_items_are_rejected():
+    with pytest.raises(LibCoreHeyError, match="Duplicate"):
+        TypificationTree([{"code": "A"}, {"code": "A"}])
+    with pytest.raises(LibCoreHeyError, match="without a code"):
+        TypificationTree([{"name": "nameless"}])
+
+
+def test_validate():
+    tree = TypificationTree([{"code": "A"}, {"code": "B", "parent": "A"}, {"code": "C", "parent": "B"},
+                             {"code": "D"}])
+    assert tree.validate(["A", "C", "X"]) == [True, True, False]
+    assert tree.validate(["A", "C", "D"], leaf_only=True) == [False, True, True]
+    assert tree.validate(["A", "B", "C", "D"], under="B") == [False, True, True, False]
+    assert tree.invalid(["A", "C", "X"], leaf_only=True, under="A") == ["A", "X"]
+    with pytest.raises(LibCoreHeyError):
+        tree.validate(["A"], under="X")
+
+
+def test_version_follows_content_only():
+    items = [{"code": "A", "name": "Root"}, {"code": "B", "name": "Child", "parent": "A"}]
+    tree = TypificationTree(items)
+    assert TypificationTree(items, etag='"other"').version == tree.version
+    assert TypificationTree([dict(items[0], name="Renamed"), items[1]]).version != tree.version
+    assert TypificationTree(items[:1]).version != tree.version
+
+
+def _body(names):
+    data = [{"code": "A", "name": names[0], "parent": None}, {"code": "B", "name": names[1], "parent": "A"}]
+    return json.dumps({"data": data}).encode()
+
+
+class _StubClient:
+    """Answers fetch_if_changed from a queue of (status, body, etag) responses."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def fetch_if_changed(self, endpoint, org, group, etag=None, last_modified=None, timeout=None,
+                         cancel_token=None):
+        assert endpoint == TYPIFICATION
+        self.calls.append((org, group, etag))
+        status, body, response_etag = self.responses.pop(0)
+        error = 0 if status < 400 else ERROR_HTTP_STATUS
+        return LibCoreHeyResult._from_buffer(body, status, error, etag=response_etag)
+
+
+@pytest.fixture(autouse=True)
+def _forget_trees():
+    forget_typification_trees()
+    yield
+    forget_typification_trees()
+
+
+def test_get_typification_tree_reuses_unchanged_trees():
+    client = _StubClient(
+        (200, _body(["Root", "Child"]), '"v1"'),
+        (304, b"", '"v1"'),
+        (200, _body(["Root", "Child"]), '"v2"'),   # new ETag, same content
+        (200, _body(["Root", "Renamed"]), '"v3"'),
+    )
+    first = get_typification_tree(None, "org", "group", client=client)
+    assert first.name("B") == "Child" and first.etag == '"v1"'
+
+    assert get_typification_tree(None, "org", "group", client=client) is first
+    assert client.calls[1] == ("org", "group", '"v1"')
+
+    assert get_typification_tree(None, "org", "group", client=client) is first
+    assert first.etag == '"v2"'
+
+    changed = get_typification_tree(None, "org", "group", client=client)
+    assert changed is not first and changed.name("B") == "Renamed"
+    assert client.calls[3] == ("org", "group", '"v2"')
+
+
+def test_get_typification_tree_keeps_the_tree_on_errors():
+    client = _StubClient((200, _body(["Root", "Child"]), '"v1"'), (503, b'{"error":"down"}', None))
+    tree = get_typification_tree(None, "org", "group", client=client)
+    assert get_typification_tree(None, "org", "group", client=client) is tree
+
+    with pytest.raises(LibCoreHeyError):
+        get_typification_tree(None, "org", "other", client=_StubClient((503, b'{"error":"down"}', None)))
+
+
+def test_trees_are_kept_per_group_and_client():
+    client = _StubClient((200, _body(["Root", "One"]), '"a"'), (200, _body(["Root", "Two"]), '"b"'))
+    one = get_typification_tree(None, "org", "one", client=client)
+    two = get_typification_tree(None, "org", "two", client=client)
+    assert (one.name("B"), two.name("B")) == ("One", "Two")
+    assert client.calls == [("org", "one", None), ("org", "two", None)]
+
+    other = _StubClient((200, _body(["Root", "One"]), '"a"'))
+    get_typification_tree(None, "org", "one", client=other)
+    assert other.calls == [("org", "one", None)]